@@ -1,14 +1,12 @@
 # -*- coding: utf-8 -*-
 
-import os
-
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets, QtGui
 from qgis.PyQt.QtCore import QUrl
 from qgis.PyQt.QtGui import QDesktopServices
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'about_dialog_base.ui'))
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('about_dialog_base.ui')
 
 
 class AboutRFToolsDialog(QtWidgets.QDialog, FORM_CLASS):
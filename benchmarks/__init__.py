@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Headless benchmarks of the RF Tools engines.
+
+Synthetic hexagonal networks from :mod:`benchmarks.synthetic` are run
+through the engines of the ``core`` package, without QGIS. Run from the
+plugin directory::
+
+    python -m benchmarks --sizes 1000 10000 --output benchmark.json
+
+The JSON results carry the commit, interpreter and library versions so
+runs of different commits can be compared with ``--compare``.
+"""
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Command line entry point: ``python -m benchmarks --help``."""
+
+import argparse
+import sys
+
+from .suite import (RASTER_SIZES, REPEAT, SIZES, cases, compare, load_results, run_suite,
+                    save_results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time the RF Tools engines on synthetic networks.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help='network sizes in sectors')
+    parser.add_argument('--raster-sizes', type=int, nargs='+', default=list(RASTER_SIZES),
+                        help='coverage raster widths in pixels')
+    parser.add_argument('--cases', nargs='+', choices=[case.name for case in cases(())] + ['coverage'],
+                        metavar='CASE', help='cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs per case')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic network seed')
+    parser.add_argument('--no-limits', action='store_true',
+                        help='run every case on every size, ignoring the per case limits')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    def show(result):
+        print(f"{result['case']:<16} {result['sectors']:>8,} sectors  best {result['best']:9.3f} s  "
+              f"median {result['median']:9.3f} s", flush=True)
+
+    results = run_suite(args.sizes, args.raster_sizes, args.repeat, args.cases, not args.no_limits,
+                        args.seed, show)
+    if args.output:
+        save_results(args.output, results)
+    if args.compare:
+        print()
+        for case, sectors, before, after, speedup in compare(load_results(args.compare), results):
+            print(f'{case:<16} {sectors:>8,} sectors  {before:9.3f} s -> {after:9.3f} s  x{speedup:.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
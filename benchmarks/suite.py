@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""Benchmark cases of the RF Tools engines and their runner.
+
+Every case runs one engine the way its dialog does, on the arrays of a
+synthetic network, and returns a few result figures so runs can be
+checked for doing the same work. Cases with a ``max_sectors`` limit are
+skipped on larger networks unless limits are disabled.
+"""
+
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from core.azimuth import BALANCED, group_sites, sector_azimuths, site_neighbors
+from core.azimuth_search import OverlapCost, optimize_azimuths
+from core.coverage import NO_SIGNAL, add_site_coverage, raster_grid, sector_rsrp
+from core.geodesy import meters_to_degrees
+from core.interference import (adjacent_channel_issues, co_channel_issues, pci_conflict_issues,
+                               sector_pairs)
+from core.interference_matrix import InterferenceMatrix, interference_overlap
+from core.neighbors import BestServers, handover_overlap, pixel_areas_km2, top_neighbors
+from core.pci_planning import plan_group, planning_groups
+from core.propagation import COST231_HATA
+from core.site_see import band_ranks, nested_band_scale, sector_polygons_wkb
+from core.sparse import PairCounts
+from core.spatial_index import PointIndex
+from core.tilt import neighbor_aggregates, optimal_tilts
+from core.tilt_search import CoverageSurrogate, optimize_tilts
+
+from .synthetic import hex_network
+
+RESULTS_VERSION = 1
+
+SIZES = (1000, 10000, 100000)
+RASTER_SIZES = (128, 256, 512)
+REPEAT = 3
+
+# Interference and PCI reuse search radius (km)
+NEIGHBOR_RADIUS_KM = 3.0
+# Beam overlap (%) flagging an interference issue
+OVERLAP_THRESHOLD = 30.0
+# Tilt and azimuth neighbor radius (km)
+OPTIMIZER_RADIUS_KM = 3.0
+# Sector reach (km) of the coverage prediction and the tilt surrogate
+COVERAGE_RADIUS_KM = 2.0
+SECTOR_RADIUS_M = 500.0
+# Pixel size (m) of the neighbor planning best server rasters
+NEIGHBOR_RESOLUTION_M = 100.0
+SEARCH_SWEEPS = 2
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+
+def neighbor_search(network):
+    """Radius neighbors of every sector."""
+    index = PointIndex(network['x'], network['y'])
+    indptr, _, _ = index.neighbor_lists(NEIGHBOR_RADIUS_KM * 1000.0)
+    return {'pairs': int(indptr[-1])}
+
+
+def interference(network):
+    """Co-channel, adjacent channel and PCI conflict checks on shared sector pairs."""
+    pairs = sector_pairs(network['x'], network['y'], NEIGHBOR_RADIUS_KM)
+    bands = network['frequency']
+    sector_ids = network['site'] * 3 + network['sector'] % 3
+    issues = co_channel_issues(pairs, bands, network['frequency'], network['azimuth'],
+                               network['beamwidth'], NEIGHBOR_RADIUS_KM, OVERLAP_THRESHOLD)
+    issues += adjacent_channel_issues(pairs, bands, network['frequency'], network['azimuth'],
+                                      network['beamwidth'], NEIGHBOR_RADIUS_KM, OVERLAP_THRESHOLD)
+    issues += pci_conflict_issues(pairs, bands, network['pci'], sector_ids, network['azimuth'],
+                                  network['beamwidth'], NEIGHBOR_RADIUS_KM, OVERLAP_THRESHOLD)
+    return {'pairs': len(pairs[0]), 'issues': len(issues)}
+
+
+def pci_planning(network):
+    """Greedy PCI and RSI plan of every band."""
+    count = len(network['x'])
+    groups = planning_groups(['LTE'] * count, network['frequency'].tolist())
+    has_point = np.ones(count, dtype=bool)
+    locked = np.zeros(count, dtype=bool)
+    planned = 0
+    for rows in groups.values():
+        planned += len(plan_group(rows, network['x'], network['y'], has_point, locked,
+                                  reuse_distance_km=NEIGHBOR_RADIUS_KM))
+    return {'planned': planned}
+
+
+def tilt_rules(network):
+    """Neighbor aware rule based tilts of every sector."""
+    index = PointIndex(network['x'], network['y'])
+    indptr, neighbors, distances_m = index.neighbor_lists(OPTIMIZER_RADIUS_KM * 1000.0)
+    aggregates = neighbor_aggregates(indptr, neighbors, distances_m / 1000.0, network['height'])
+    tilts = optimal_tilts(network['height'], network['v_beamwidth'], network['beamwidth'],
+                          network['power'], network['gain'], network['frequency'], COST231_HATA,
+                          COVERAGE_RADIUS_KM / 2.0, *aggregates)
+    return {'mean_tilt': round(float(np.mean(tilts)), 3)}
+
+
+def tilt_search(network):
+    """Coordinate descent of the tilts on the coverage surrogate."""
+    surrogate = CoverageSurrogate(network['x'], network['y'], network['height'], network['azimuth'],
+                                  network['beamwidth'], network['v_beamwidth'],
+                                  network['power'] + network['gain'], network['frequency'],
+                                  COST231_HATA, COVERAGE_RADIUS_KM, 250.0)
+    optimize_tilts(surrogate, network['tilt'], max_sweeps=SEARCH_SWEEPS)
+    return {'grid_cells': int(np.prod(surrogate.grid_shape)),
+            'objective': round(float(surrogate.objective()), 3)}
+
+
+def _sites(network):
+    # Azimuth tools treat every band of a site as its own site
+    site_index, site_indptr, site_sectors, _ = group_sites(
+        list(zip(network['site'].tolist(), network['frequency'].tolist())))
+    neighbors = site_neighbors(network['x'], network['y'], site_index, site_indptr, site_sectors,
+                               OPTIMIZER_RADIUS_KM)
+    return site_index, site_indptr, site_sectors, neighbors
+
+
+def azimuth_rules(network):
+    """Per-site rule based azimuths."""
+    _, site_indptr, site_sectors, neighbors = _sites(network)
+    indptr, _, distances_km, bearings = neighbors
+    azimuths = sector_azimuths(network['azimuth'], network['beamwidth'],
+                               np.zeros(len(network['x']), dtype=bool), site_indptr, site_sectors,
+                               indptr, distances_km, bearings, BALANCED)
+    return {'moved': int(np.count_nonzero(azimuths != network['azimuth']))}
+
+
+def azimuth_search(network):
+    """Network overlap cost and its parallel local search."""
+    site_index, site_indptr, site_sectors, neighbors = _sites(network)
+    cost = OverlapCost(network['beamwidth'], site_index, site_indptr, site_sectors, *neighbors)
+    azimuths = optimize_azimuths(cost, network['azimuth'], max_sweeps=SEARCH_SWEEPS)
+    return {'cost_before': round(float(cost.cost(network['azimuth'])), 3),
+            'cost_after': round(float(cost.cost(azimuths)), 3)}
+
+
+def site_see(network):
+    """Nested multi-band sector polygons as WKB."""
+    rank, group_size = band_ranks(network['y'], network['x'], network['azimuth'], network['frequency'])
+    radius = SECTOR_RADIUS_M * nested_band_scale(rank, group_size)
+    radius_x, radius_y = meters_to_degrees(network['y'], radius, radius)
+    wkbs = sector_polygons_wkb(network['x'], network['y'], network['azimuth'], network['beamwidth'],
+                               radius_x, radius_y)
+    return {'bytes': sum(len(wkb) for wkb in wkbs)}
+
+
+def coverage(network, raster_size):
+    """Best server RSRP raster of ``raster_size`` columns over the network.
+
+    Every sector is evaluated over the raster window of its maximum
+    distance, as the Coverage Prediction does.
+    """
+    margin_x, margin_y = meters_to_degrees(float(np.mean(network['y'])), COVERAGE_RADIUS_KM * 1000.0,
+                                           COVERAGE_RADIUS_KM * 1000.0)
+    x_min = network['x'].min() - margin_x
+    y_max = network['y'].max() + margin_y
+    resolution = (network['x'].max() + margin_x - x_min) / raster_size
+    rows = int(np.ceil((y_max - network['y'].min() + margin_y) / resolution))
+    xx, yy = raster_grid(x_min, y_max, resolution, rows, raster_size)
+
+    raster = np.full((rows, raster_size), NO_SIGNAL, dtype=np.float32)
+    for sector in range(len(network['x'])):
+        add_site_coverage(raster, xx, yy, network['x'][sector], network['y'][sector],
+                          network['height'][sector], network['azimuth'][sector],
+                          network['beamwidth'][sector], network['power'][sector],
+                          network['gain'][sector], network['frequency'][sector], COST231_HATA,
+                          COVERAGE_RADIUS_KM)
+    return {'pixels': int(raster.size), 'covered': int(np.count_nonzero(raster >= -100.0))}
+
+
+def _band_servers(network):
+    """Best servers of every band on one raster over the network.
+
+    :returns: ``(pixel areas, [(sectors, rsrp_window, servers)])`` with
+        one entry per band.
+    """
+    margin_x, margin_y = meters_to_degrees(float(np.mean(network['y'])), COVERAGE_RADIUS_KM * 1000.0,
+                                           COVERAGE_RADIUS_KM * 1000.0)
+    x_min = network['x'].min() - margin_x
+    y_max = network['y'].max() + margin_y
+    _, resolution = meters_to_degrees(float(np.mean(network['y'])), 0.0, NEIGHBOR_RESOLUTION_M)
+    cols = int(np.ceil((network['x'].max() + margin_x - x_min) / resolution))
+    rows = int(np.ceil((y_max - network['y'].min() + margin_y) / resolution))
+    xx, yy = raster_grid(x_min, y_max, resolution, rows, cols)
+
+    def rsrp_window(sector):
+        return sector_rsrp(xx, yy, network['x'][sector], network['y'][sector], network['height'][sector],
+                           network['azimuth'][sector], network['beamwidth'][sector],
+                           network['power'][sector], network['gain'][sector],
+                           network['frequency'][sector], COST231_HATA, COVERAGE_RADIUS_KM)
+
+    bands = []
+    for band in np.unique(network['frequency']):
+        sectors = np.nonzero(network['frequency'] == band)[0]
+        servers = BestServers(rows, cols)
+        for sector in sectors:
+            result = rsrp_window(sector)
+            if result is not None:
+                servers.add(sector, *result)
+        bands.append((sectors, rsrp_window, servers))
+    return pixel_areas_km2(yy, resolution), bands
+
+
+def neighbor_planning(network):
+    """Handover overlap neighbor lists of every band from windowed best server rasters."""
+    pixel_areas, bands = _band_servers(network)
+    counts = PairCounts(len(network['x']))
+    for _, _, servers in bands:
+        handover_overlap(servers, pixel_areas, counts)
+    sources, _, _, _ = top_neighbors(*counts.to_csr())
+    return {'pixels': int(np.prod(bands[0][2].shape)), 'pairs': len(counts), 'relations': len(sources)}
+
+
+def interference_matrix(network):
+    """C/I interference matrix of every band, saved and loaded back as a compressed file."""
+    pixel_areas, bands = _band_servers(network)
+    counts = PairCounts(len(network['x']))
+    for sectors, rsrp_window, servers in bands:
+        interference_overlap(servers, sectors, rsrp_window, pixel_areas, counts)
+    matrix = InterferenceMatrix.from_counts(np.arange(len(network['x'])).astype(str), counts)
+    buffer = io.BytesIO()
+    matrix.save(buffer)
+    size = buffer.tell()
+    buffer.seek(0)
+    matrix = InterferenceMatrix.load(buffer)
+    return {'pairs': matrix.pair_count, 'bytes': size,
+            'co_channel_cost': round(matrix.channel_cost(network['frequency']), 3)}
+
+
+class Case:
+    """A named benchmark of one engine.
+
+    :param function: ``callable(network, **parameters)`` returning a dict
+        of result figures.
+    :param max_sectors: Largest network the case runs on by default.
+    """
+
+    def __init__(self, name, function, parameters=None, max_sectors=None):
+        self.name = name
+        self.function = function
+        self.parameters = parameters or {}
+        self.max_sectors = max_sectors
+
+
+def cases(raster_sizes=RASTER_SIZES):
+    """All benchmark cases, coverage once per raster size."""
+    registry = [
+        Case('neighbor_search', neighbor_search),
+        Case('interference', interference),
+        Case('pci_planning', pci_planning, max_sectors=10000),
+        Case('tilt_rules', tilt_rules),
+        Case('tilt_search', tilt_search, max_sectors=10000),
+        Case('azimuth_rules', azimuth_rules),
+        Case('azimuth_search', azimuth_search, max_sectors=10000),
+        Case('site_see', site_see),
+        Case('neighbor_planning', neighbor_planning, max_sectors=10000),
+        Case('interference_matrix', interference_matrix, max_sectors=10000),
+    ]
+    registry += [Case(f'coverage_{size}', coverage, {'raster_size': size}, max_sectors=1000)
+                 for size in raster_sizes]
+    return registry
+
+
+def run_case(case, network, repeat=REPEAT):
+    """Time ``repeat`` runs of ``case`` on ``network``."""
+    seconds = []
+    details = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        details = case.function(network, **case.parameters)
+        seconds.append(time.perf_counter() - start)
+    return {
+        'case': case.name,
+        'sectors': len(network['x']),
+        'parameters': case.parameters,
+        'seconds': [round(value, 6) for value in seconds],
+        'best': round(min(seconds), 6),
+        'median': round(statistics.median(seconds), 6),
+        'details': details,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Commit and platform of a run, stored with its results."""
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+    return {
+        'commit': _git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy_version,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+    }
+
+
+def run_suite(sizes=SIZES, raster_sizes=RASTER_SIZES, repeat=REPEAT, names=None, limits=True,
+              seed=0, progress=None):
+    """Run every selected case on a synthetic network of each size.
+
+    :param names: Case names to run, all when None; ``coverage`` selects
+        the coverage cases of every raster size.
+    :param limits: Skip cases on networks above their ``max_sectors``.
+    :param progress: Optional ``callable(result)`` called after every case.
+    :returns: JSON serializable dict of the environment and the results.
+    """
+    selected = [case for case in cases(raster_sizes)
+                if names is None or case.name in names or case.function.__name__ in names]
+    results = []
+    for size in sizes:
+        network = hex_network(size, seed=seed)
+        for case in selected:
+            if limits and case.max_sectors is not None and size > case.max_sectors:
+                continue
+            result = run_case(case, network, repeat)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {'version': RESULTS_VERSION, 'environment': environment(), 'seed': seed,
+            'repeat': repeat, 'results': results}
+
+
+def _key(result):
+    return result['case'], result['sectors']
+
+
+def compare(baseline, current):
+    """``[(case, sectors, baseline best, current best, speedup)]`` of the runs found in both."""
+    previous = {_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get(_key(result))
+        if before is not None:
+            rows.append((result['case'], result['sectors'], before['best'], result['best'],
+                         before['best'] / result['best'] if result['best'] else float('inf')))
+    return rows
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as handle:
+        results = json.load(handle)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f'Unsupported benchmark results version: {results.get("version")}')
+    return results
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2)
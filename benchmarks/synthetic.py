@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Synthetic hexagonal LTE networks for benchmarks.
+
+Sites sit on a jittered hexagonal grid around a geographic origin. Every
+site carries three sectors per band; the sectors of a site share their
+azimuths across bands, as co-located antennas do, and the site's sector
+plan is rotated by a random offset. PCIs follow a site-wise SSS group
+reuse (``3 * group + sector``) and root sequence indices a cell-wise
+reuse, so conflicts appear only between distant sites.
+"""
+
+import numpy as np
+
+from core.geodesy import meters_to_degrees
+
+# Carrier frequencies (MHz) of the default band layers
+BANDS = (800.0, 1800.0, 2600.0)
+SECTORS_PER_SITE = 3
+# Default inter-site distance (m) of an urban macro layer
+INTER_SITE_DISTANCE_M = 1500.0
+ORIGIN = (-95.37, 29.76)
+
+PCI_GROUPS = 168
+RSI_COUNT = 838
+RSI_STEP = 10
+
+# Vertical beamwidth (degrees) of the antennas of each band
+_V_BEAMWIDTHS = {800.0: 10.0, 1800.0: 7.0, 2600.0: 6.5}
+
+
+def hex_network(sectors, bands=BANDS, inter_site_distance_m=INTER_SITE_DISTANCE_M,
+                origin=ORIGIN, seed=0):
+    """Synthetic network of ``sectors`` sectors in geographic coordinates.
+
+    :param bands: Carrier frequency (MHz) of every band layer.
+    :param seed: Seed of the random generator, so runs are reproducible.
+    :returns: Dict of sector arrays ``x`` (lon), ``y`` (lat), ``site``,
+        ``sector``, ``frequency``, ``azimuth``, ``beamwidth``,
+        ``v_beamwidth``, ``height``, ``tilt``, ``power``, ``gain``,
+        ``pci`` and ``rsi``.
+    """
+    rng = np.random.RandomState(seed)
+    per_site = SECTORS_PER_SITE * len(bands)
+    sites = max(int(np.ceil(sectors / per_site)), 1)
+
+    # Hexagonal grid: odd rows shifted by half a spacing
+    columns = int(np.ceil(np.sqrt(sites)))
+    row, column = np.divmod(np.arange(sites), columns)
+    east = inter_site_distance_m * (column + 0.5 * (row % 2))
+    north = inter_site_distance_m * np.sqrt(3.0) / 2.0 * row
+    east = east - east.mean() + rng.normal(0.0, 0.1 * inter_site_distance_m, sites)
+    north = north - north.mean() + rng.normal(0.0, 0.1 * inter_site_distance_m, sites)
+    dlon, dlat = meters_to_degrees(origin[1], east, north)
+    site_height = rng.uniform(20.0, 45.0, sites)
+    site_rotation = rng.normal(0.0, 15.0, sites)
+    # Sites take SSS groups in a shuffled order, wrapping after 168 sites
+    site_group = rng.permutation(sites) % PCI_GROUPS
+
+    # Sector order: site, then band, then sector position
+    site = np.repeat(np.arange(sites), per_site)
+    band = np.tile(np.repeat(np.arange(len(bands)), SECTORS_PER_SITE), sites)
+    position = np.tile(np.arange(SECTORS_PER_SITE), sites * len(bands))
+    frequency = np.asarray(bands, dtype=float)[band]
+    # The jitter of a sector position is shared by all bands of the site
+    jitter = rng.normal(0.0, 5.0, (sites, SECTORS_PER_SITE))
+    azimuth = (position * (360.0 / SECTORS_PER_SITE) + site_rotation[site] +
+               jitter[site, position]) % 360.0
+    count = len(site)
+    network = {
+        'x': origin[0] + dlon[site],
+        'y': origin[1] + dlat[site],
+        'site': site,
+        'sector': position,
+        'frequency': frequency,
+        'azimuth': np.round(azimuth, 1),
+        'beamwidth': np.full(count, 65.0),
+        'v_beamwidth': np.array([_V_BEAMWIDTHS.get(f, 8.0) for f in bands])[band],
+        'height': site_height[site],
+        'tilt': np.round(rng.uniform(2.0, 8.0, count), 1),
+        'power': np.full(count, 43.0),
+        'gain': np.where(frequency < 1000.0, 15.0, 18.0),
+        'pci': 3 * site_group[site] + position,
+        'rsi': ((site * SECTORS_PER_SITE + position) * RSI_STEP) % RSI_COUNT,
+    }
+    return {name: values[:sectors] for name, values in network.items()}
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import Qt, QVariant
+from qgis.core import (QgsCoordinateTransform, QgsFeature, QgsField, QgsPointXY, QgsProject,
+                       QgsVectorLayer)
+
+from .core.calibration import cell_statistics, fit_profile, point_features, save_profiles
+from .core.propagation import MODELS
+from .dialog_state import FieldMappings, LayerList
+from .network_model import network_model
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('calibration_dialog_base.ui')
+
+NO_CLUTTER = '(none)'
+
+
+class CalibrationDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Fit propagation model corrections to drive-test RSRP.
+
+    Points are matched to their serving cell by identifier; the fitted
+    profiles can be saved for the Coverage Prediction tool and the
+    remaining error is reported per cell.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(CalibrationDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self._profiles = []
+        self.progressBar.setValue(0)
+        self.saveButton.setEnabled(False)
+        self.resultsTableWidget.setHorizontalHeaderLabels(
+            ['Model', 'Points', 'RMSE before (dB)', 'RMSE after (dB)', 'Mean error (dB)',
+             'Intercept (dB)', 'Slope (dB/decade)', 'Clutter classes'])
+
+        for model in MODELS:
+            item = QtWidgets.QListWidgetItem(model, self.modelsListWidget)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+
+        # Created first: selecting the first layer restores its fields
+        self._point_fields = FieldMappings('CalibrationPoints', [
+            self.rsrpFieldComboBox,
+            self.servingCellFieldComboBox,
+            self.clutterFieldComboBox,
+        ])
+        self._cell_fields = FieldMappings('CalibrationCells', [
+            self.cellIdFieldComboBox,
+            self.heightFieldComboBox,
+            self.azimuthFieldComboBox,
+            self.beamwidthFieldComboBox,
+            self.powerFieldComboBox,
+            self.gainFieldComboBox,
+            self.frequencyFieldComboBox,
+        ])
+        self._point_layers = LayerList(self.pointsLayerComboBox)
+        self._cell_layers = LayerList(self.cellsLayerComboBox)
+        self._point_layers.fieldsChanged.connect(self._on_point_fields_changed)
+        self._cell_layers.fieldsChanged.connect(self._on_cell_fields_changed)
+        self.pointsLayerComboBox.currentIndexChanged.connect(self._on_points_layer_changed)
+        self.cellsLayerComboBox.currentIndexChanged.connect(self._on_cells_layer_changed)
+        self._on_points_layer_changed()
+        self._on_cells_layer_changed()
+
+        self.runButton.clicked.connect(self._run_calibration)
+        self.saveButton.clicked.connect(self._save_profiles)
+
+    def _on_point_fields_changed(self):
+        """Rebuild the field combos when fields of the selected points layer change."""
+        with self._point_fields.kept():
+            self._on_points_layer_changed()
+
+    def _on_cell_fields_changed(self):
+        """Rebuild the field combos when fields of the selected cells layer change."""
+        with self._cell_fields.kept():
+            self._on_cells_layer_changed()
+
+    def _on_points_layer_changed(self, index=None):
+        combos = [self.rsrpFieldComboBox, self.servingCellFieldComboBox, self.clutterFieldComboBox]
+        for combo in combos:
+            combo.clear()
+        self.clutterFieldComboBox.addItem(NO_CLUTTER)
+        layer = self._point_layers.current()
+        if layer is None:
+            return
+        names = [field.name() for field in layer.fields()]
+        for combo in combos:
+            combo.addItems(names)
+        self._point_fields.restore(layer)
+
+    def _on_cells_layer_changed(self, index=None):
+        combos = [self.cellIdFieldComboBox, self.heightFieldComboBox, self.azimuthFieldComboBox,
+                  self.beamwidthFieldComboBox, self.powerFieldComboBox, self.gainFieldComboBox,
+                  self.frequencyFieldComboBox]
+        for combo in combos:
+            combo.clear()
+        layer = self._cell_layers.current()
+        if layer is None:
+            return
+        names = [field.name() for field in layer.fields()]
+        for combo in combos:
+            combo.addItems(names)
+        self._cell_fields.restore(layer)
+
+    def _checked_models(self):
+        items = (self.modelsListWidget.item(row) for row in range(self.modelsListWidget.count()))
+        return [item.text() for item in items if item.checkState() == Qt.Checked]
+
+    def _point_coordinates(self, points, cells):
+        """Point coordinates in the CRS of the cell layer."""
+        if points.crs == cells.crs:
+            return points.x, points.y
+        transform = QgsCoordinateTransform(points.crs, cells.crs, QgsProject.instance())
+        x = np.full(len(points), np.nan)
+        y = np.full(len(points), np.nan)
+        for row in points.positioned:
+            point = transform.transform(QgsPointXY(points.x[row], points.y[row]))
+            x[row] = point.x()
+            y[row] = point.y()
+        return x, y
+
+    def _run_calibration(self):
+        points_layer = self._point_layers.current()
+        cells_layer = self._cell_layers.current()
+        if points_layer is None or cells_layer is None:
+            QtWidgets.QMessageBox.warning(self, 'Model Calibration',
+                                          'Please select a drive test layer and a cell layer.')
+            return
+        models = self._checked_models()
+        if not models:
+            QtWidgets.QMessageBox.warning(self, 'Model Calibration', 'Please check at least one model.')
+            return
+        self._point_fields.save(points_layer)
+        self._cell_fields.save(cells_layer)
+
+        rsrp_field = self.rsrpFieldComboBox.currentText()
+        serving_field = self.servingCellFieldComboBox.currentText()
+        clutter_field = self.clutterFieldComboBox.currentText()
+        cell_id_field = self.cellIdFieldComboBox.currentText()
+
+        cells = network_model(cells_layer)
+        cells.load([cell_id_field, self.heightFieldComboBox.currentText(),
+                    self.azimuthFieldComboBox.currentText(), self.beamwidthFieldComboBox.currentText(),
+                    self.powerFieldComboBox.currentText(), self.gainFieldComboBox.currentText(),
+                    self.frequencyFieldComboBox.currentText()])
+        cell_arrays = {
+            'x': cells.x,
+            'y': cells.y,
+            'height': cells.floats(self.heightFieldComboBox.currentText(), 30.0),
+            'azimuth': cells.floats(self.azimuthFieldComboBox.currentText(), 0.0),
+            'beamwidth': cells.floats(self.beamwidthFieldComboBox.currentText(), 65.0),
+            'power': cells.floats(self.powerFieldComboBox.currentText(), 43.0),
+            'gain': cells.floats(self.gainFieldComboBox.currentText(), 18.0),
+            'frequency': cells.floats(self.frequencyFieldComboBox.currentText(), 2100.0),
+        }
+        cell_ids = cells.texts(cell_id_field)
+        cell_rows = {cell_ids[row]: row for row in cells.positioned}
+
+        points = network_model(points_layer)
+        points.load([rsrp_field, serving_field] + ([clutter_field] if clutter_field != NO_CLUTTER else []))
+        rsrp = points.floats(rsrp_field, np.nan)
+        serving = np.array([cell_rows.get(cell_id, -1) for cell_id in points.texts(serving_field)],
+                           dtype=np.int64)
+        point_x, point_y = self._point_coordinates(points, cells)
+        keep = (serving >= 0) & np.isfinite(rsrp) & np.isfinite(point_x)
+        if not keep.any():
+            QtWidgets.QMessageBox.warning(
+                self, 'Model Calibration',
+                'No drive test point has an RSRP value and a serving cell found in the cell layer.')
+            return
+        clutter = None
+        if clutter_field != NO_CLUTTER:
+            clutter = np.array(points.texts(clutter_field), dtype=object)[keep]
+
+        features = point_features(point_x[keep], point_y[keep], serving[keep], cell_arrays,
+                                  **cells.distance_args)
+        self._profiles = []
+        statistics = []
+        for step, model in enumerate(models):
+            self.progressBar.setValue(int(100 * step / len(models)))
+            QtWidgets.QApplication.processEvents()
+            profile, error = fit_profile(features, rsrp[keep], model, clutter,
+                                         self.minClassPointsSpinBox.value())
+            self._profiles.append(profile)
+            statistics.append((model, cell_statistics(serving[keep], error, len(cells))))
+        self.progressBar.setValue(100)
+
+        self._show_profiles()
+        self._add_cell_error_layer(cell_ids, statistics)
+        self.saveButton.setEnabled(True)
+
+    def _show_profiles(self):
+        self.resultsTableWidget.setRowCount(len(self._profiles))
+        for row, profile in enumerate(self._profiles):
+            values = [profile.model, f'{profile.points:,}', f'{profile.uncalibrated_rmse:.2f}',
+                      f'{profile.rmse:.2f}', f'{profile.mean_error:.2f}', f'{profile.intercept:.2f}',
+                      f'{profile.slope:.2f}', ', '.join(sorted(profile.clutter))]
+            for column, text in enumerate(values):
+                self.resultsTableWidget.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+        self.resultsTableWidget.resizeColumnsToContents()
+
+    def _add_cell_error_layer(self, cell_ids, statistics):
+        """Table layer with the calibrated error of every measured cell and model."""
+        layer = QgsVectorLayer('None', 'Calibration_Cell_Errors', 'memory')
+        provider = layer.dataProvider()
+        provider.addAttributes([QgsField('cell_id', QVariant.String), QgsField('model', QVariant.String),
+                                QgsField('points', QVariant.Int), QgsField('mean_error', QVariant.Double),
+                                QgsField('rmse', QVariant.Double)])
+        layer.updateFields()
+        features = []
+        for model, (counts, mean_errors, rmses) in statistics:
+            for row in np.nonzero(counts)[0].tolist():
+                feature = QgsFeature()
+                feature.setAttributes([cell_ids[row], model, int(counts[row]),
+                                       float(mean_errors[row]), float(rmses[row])])
+                features.append(feature)
+        provider.addFeatures(features)
+        QgsProject.instance().addMapLayer(layer)
+
+    def _save_profiles(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Save Calibration Profiles', '', 'Calibration profiles (*.json)')
+        if not path:
+            return
+        if not path.lower().endswith('.json'):
+            path += '.json'
+        try:
+            save_profiles(path, self._profiles)
+        except OSError as e:
+            QtWidgets.QMessageBox.critical(self, 'Model Calibration', f'Could not save the profiles: {e}')
+            return
+        self.iface.messageBar().pushSuccess(
+            'Model Calibration', f'{len(self._profiles)} calibration profiles saved to {path}')
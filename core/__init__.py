@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Array-based engines shared by the RF Tools dialogs.
+
+Modules in this package only depend on the Python standard library and
+NumPy (SciPy is used when installed) so they can be used and tested
+without a running QGIS instance.
+"""
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""3GPP (TR 36.814) sector antenna pattern attenuations in dB."""
+
+import numpy as np
+
+# Maximum horizontal attenuation (front-to-back ratio)
+MAX_ATTENUATION = 25.0
+# Vertical side lobe attenuation
+VERTICAL_SIDE_LOBE = 20.0
+
+
+def angle_difference(bearing, azimuth):
+    """Absolute angle between two directions in degrees (0-180)."""
+    diff = np.abs(np.asarray(bearing, dtype=float) - azimuth) % 360.0
+    return np.where(diff > 180.0, 360.0 - diff, diff)
+
+
+def horizontal_attenuation(angle_diff, beamwidth, max_attenuation=MAX_ATTENUATION):
+    """A_H(phi) = min(12 * (phi / phi_3dB)^2, A_m)."""
+    return np.minimum(12.0 * (np.asarray(angle_diff, dtype=float) / beamwidth) ** 2, max_attenuation)
+
+
+def vertical_attenuation(elevation, tilt, v_beamwidth, side_lobe=VERTICAL_SIDE_LOBE):
+    """A_V(theta) = min(12 * ((theta - theta_tilt) / theta_3dB)^2, SLA_v).
+
+    ``elevation`` and ``tilt`` are measured downwards from the horizon.
+    """
+    offset = np.asarray(elevation, dtype=float) - tilt
+    return np.minimum(12.0 * (offset / v_beamwidth) ** 2, side_lobe)
+
+
+def combined_attenuation(horizontal, vertical, max_attenuation=MAX_ATTENUATION):
+    """A(phi, theta) = min(A_H + A_V, A_m)."""
+    return np.minimum(horizontal + vertical, max_attenuation)
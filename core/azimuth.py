@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Sector azimuth optimization on flat sector arrays.
+
+Sectors are grouped into sites (site id plus band) with
+:func:`group_sites`, the sectors around every site are found with one
+:class:`core.spatial_index.PointIndex` by :func:`site_neighbors`, and
+:func:`sector_azimuths` applies the per-site azimuth rules of the
+Azimuth Optimizer with the neighbor bearings and distances as arrays.
+"""
+
+import numpy as np
+
+from .antenna import MAX_ATTENUATION, angle_difference, horizontal_attenuation
+from .geodesy import local_distance_bearing
+from .spatial_index import PointIndex
+
+MINIMIZE_OVERLAP = 'Minimize Overlap'
+MAXIMIZE_COVERAGE = 'Maximize Coverage'
+BALANCED = 'Balanced'
+
+# Distance offset (km) damping the proximity weight of very close neighbors
+PROXIMITY_SMOOTHING_KM = 11.1
+# Pattern attenuation (dB) below which a neighbor receives significant signal
+SIGNIFICANT_ATTENUATION = 15.0
+# Azimuth nudge (degrees) away from a neighbor in the main beam
+AVOIDANCE_STEP = 15.0
+# Bearing bins used to look for coverage gaps
+GAP_BINS = 12
+
+
+def group_sites(site_keys):
+    """Group sectors by site key, keeping the order of first appearance.
+
+    :returns: ``(site_index, site_indptr, site_sectors, keys)`` where
+        ``site_index[i]`` is the site of sector ``i`` and the sectors of
+        site ``s`` are ``site_sectors[site_indptr[s]:site_indptr[s + 1]]``
+        in input order, so a sector's ordinal is its position in that
+        slice. ``keys[s]`` is the key of site ``s``.
+    """
+    lookup = {}
+    site_index = np.empty(len(site_keys), dtype=np.int64)
+    for i, key in enumerate(site_keys):
+        site_index[i] = lookup.setdefault(key, len(lookup))
+    site_indptr = np.concatenate(([0], np.cumsum(np.bincount(site_index, minlength=len(lookup)))))
+    # A stable sort keeps the input order of the sectors within each site
+    site_sectors = np.argsort(site_index, kind='stable')
+    return site_index, site_indptr, site_sectors, list(lookup)
+
+
+def site_neighbors(x, y, site_index, site_indptr, site_sectors, max_distance_km,
+                   geographic=True, unit_to_meters=1.0, sector_index=None):
+    """Sectors of other sites within ``max_distance_km`` of every site.
+
+    Distances and bearings are measured from the first sector of each
+    site.
+
+    :param sector_index: Optional prebuilt :class:`PointIndex` over ``x``/``y``.
+    :returns: CSR style ``(indptr, sectors, distances_km, bearings)``; the
+        neighbors of site ``s`` are ``sectors[indptr[s]:indptr[s + 1]]``
+        in sector order.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if sector_index is None:
+        sector_index = PointIndex(x, y, geographic, unit_to_meters)
+    first = site_sectors[site_indptr[:-1]]
+
+    lists = []
+    for site, sector in enumerate(first):
+        candidates, _ = sector_index.query_radius(x[sector], y[sector], max_distance_km * 1000.0)
+        lists.append(candidates[site_index[candidates] != site])
+
+    lengths = np.array([len(c) for c in lists], dtype=np.int64)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    sectors = np.concatenate(lists) if lengths.sum() else np.zeros(0, dtype=np.int64)
+    origins = np.repeat(first, lengths)
+    distances_m, bearings = local_distance_bearing(x[origins], y[origins], x[sectors], y[sectors],
+                                                   geographic, unit_to_meters)
+    return indptr, sectors, distances_m / 1000.0, bearings
+
+
+def interference_adjustment(azimuth, beamwidth, bearings, distances_km):
+    """Azimuth nudge (degrees) away from neighbors in the 3GPP main beam.
+
+    Neighbors attenuated by less than :data:`SIGNIFICANT_ATTENUATION`
+    push the azimuth by :data:`AVOIDANCE_STEP` away from themselves,
+    weighted by proximity and by how little the pattern attenuates them.
+
+    :param azimuth: Scalar or array of candidate azimuths.
+    :returns: Adjustment for every azimuth (0 without significant neighbors).
+    """
+    azimuth = np.asarray(azimuth, dtype=float)
+    bearings = np.asarray(bearings, dtype=float)
+    if not len(bearings):
+        return np.zeros(azimuth.shape)
+    azimuth_column = azimuth[..., np.newaxis]
+
+    loss = horizontal_attenuation(angle_difference(bearings, azimuth_column), beamwidth)
+    weight = np.where(
+        loss < SIGNIFICANT_ATTENUATION,
+        (1.0 / (np.asarray(distances_km, dtype=float) + PROXIMITY_SMOOTHING_KM)) *
+        (1.0 - loss / MAX_ATTENUATION),
+        0.0)
+    # Neighbors clockwise of the beam push it counter-clockwise and vice versa
+    step = np.where((bearings - azimuth_column) % 360 < 180, -AVOIDANCE_STEP, AVOIDANCE_STEP)
+    weight_sum = weight.sum(axis=-1)
+    total = (step * weight).sum(axis=-1)
+    return np.where(weight_sum > 0, total / np.where(weight_sum > 0, weight_sum, 1.0), 0.0)
+
+
+def coverage_gap(bearings, bins=GAP_BINS):
+    """Center bearing of the direction with the fewest neighbors, None without neighbors."""
+    bearings = np.asarray(bearings, dtype=float)
+    if not len(bearings):
+        return None
+    size = 360.0 / bins
+    counts = np.bincount((bearings // size).astype(np.int64) % bins, minlength=bins)
+    return (int(np.argmin(counts)) * size + size / 2) % 360
+
+
+def site_azimuths(azimuths, beamwidths, bearings, distances_km, mode):
+    """Optimal azimuths of the sectors of one site, in site order.
+
+    A single sector points away from its nearest neighbor; several sectors
+    are spread evenly and then nudged away from neighbors or towards the
+    largest coverage gap depending on ``mode``.
+    """
+    azimuths = np.asarray(azimuths, dtype=float)
+    count = len(azimuths)
+    if count == 1:
+        if not len(bearings):
+            return np.round(azimuths, 1)
+        nearest = int(np.argmin(distances_km))
+        return np.array([round((bearings[nearest] + 180) % 360, 1)])
+
+    base = (360.0 / count) * np.arange(count)
+    if mode == MINIMIZE_OVERLAP:
+        optimal = (base + interference_adjustment(base, np.asarray(beamwidths)[:, np.newaxis],
+                                                  bearings, distances_km)) % 360
+    elif mode == MAXIMIZE_COVERAGE:
+        gap = coverage_gap(bearings)
+        optimal = (base * 0.7 + gap * 0.3) % 360 if gap is not None else base
+    else:
+        adjustment = interference_adjustment(base, np.asarray(beamwidths)[:, np.newaxis],
+                                             bearings, distances_km)
+        optimal = (base + adjustment * 0.5) % 360
+    return np.round(optimal, 1)
+
+
+def sector_azimuths(azimuth, beamwidth, locked, site_indptr, site_sectors,
+                    indptr, neighbor_distances_km, neighbor_bearings, mode):
+    """Optimal azimuth of every sector; locked sectors keep their azimuth.
+
+    :param site_indptr: Site row pointers from :func:`group_sites`.
+    :param site_sectors: Sectors grouped by site from :func:`group_sites`.
+    :param indptr: Site neighbor row pointers from :func:`site_neighbors`.
+    :returns: Array of azimuths in sector order.
+    """
+    azimuth = np.asarray(azimuth, dtype=float)
+    beamwidth = np.asarray(beamwidth, dtype=float)
+    locked = np.asarray(locked, dtype=bool)
+    result = azimuth.copy()
+
+    for site in range(len(site_indptr) - 1):
+        members = site_sectors[site_indptr[site]:site_indptr[site + 1]]
+        rows = slice(indptr[site], indptr[site + 1])
+        optimal = site_azimuths(azimuth[members], beamwidth[members],
+                                neighbor_bearings[rows], neighbor_distances_km[rows], mode)
+        free = ~locked[members]
+        result[members[free]] = optimal[free]
+    return result
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""Network-wide azimuth search minimizing sector overlap.
+
+The network cost has two parts, both built once as flat arrays:
+
+* Pair overlap: for every pair of sectors of neighboring sites, the
+  product of the linear 3GPP horizontal pattern gains each sector points
+  at the other, weighted by proximity. Sectors of the same site are
+  scored on the gain between their main beams.
+* Coverage gap: every site with neighbors pays for the attenuation its
+  best aligned sector has towards the site's coverage gap
+  (:func:`core.azimuth.coverage_gap`).
+
+The search moves one sector per site at a time. Sites are colored so no
+two sites of a color share a pair, which makes the moves of all sites of
+one color independent: they are scored and applied together in one
+vectorized step.
+"""
+
+import numpy as np
+
+from .antenna import MAX_ATTENUATION, angle_difference, horizontal_attenuation
+from .azimuth import PROXIMITY_SMOOTHING_KM, coverage_gap
+
+# Weight of a site whose coverage gap is not served (same scale as a co-located pair)
+GAP_WEIGHT = 1.0 / PROXIMITY_SMOOTHING_KM
+# Azimuth moves tried for each sector per sweep (degrees)
+AZIMUTH_STEPS = (-20.0, -10.0, -5.0, 5.0, 10.0, 20.0)
+
+
+def _gain(angle, beamwidth):
+    """Linear horizontal pattern gain towards ``angle`` off boresight."""
+    return 10.0 ** (-horizontal_attenuation(angle, beamwidth) / 10.0)
+
+
+class OverlapCost:
+    """Network overlap and coverage gap cost of a set of sector azimuths.
+
+    :param beamwidth: Horizontal beamwidth of every sector.
+    :param site_index: Site of every sector from :func:`core.azimuth.group_sites`.
+    :param site_indptr: Site row pointers from :func:`core.azimuth.group_sites`.
+    :param site_sectors: Sectors grouped by site from :func:`core.azimuth.group_sites`.
+    :param neighbor_indptr: Site neighbor row pointers from
+        :func:`core.azimuth.site_neighbors`.
+    :param neighbor_sectors: Neighbor sectors of every site.
+    :param neighbor_distances_km: Distance of every neighbor entry in km.
+    :param neighbor_bearings: Bearing from the site to every neighbor entry.
+    """
+
+    def __init__(self, beamwidth, site_index, site_indptr, site_sectors,
+                 neighbor_indptr, neighbor_sectors, neighbor_distances_km, neighbor_bearings):
+        self.beamwidth = np.asarray(beamwidth, dtype=float)
+        self.site_index = np.asarray(site_index, dtype=np.int64)
+        self.site_indptr = np.asarray(site_indptr, dtype=np.int64)
+        self.site_sectors = np.asarray(site_sectors, dtype=np.int64)
+        self.site_size = np.diff(self.site_indptr)
+        self._build_pairs(np.asarray(neighbor_indptr, dtype=np.int64),
+                          np.asarray(neighbor_sectors, dtype=np.int64),
+                          np.asarray(neighbor_distances_km, dtype=float),
+                          np.asarray(neighbor_bearings, dtype=float))
+
+        # Coverage gap direction of every site (NaN without neighbors)
+        self.gap = np.full(len(self.site_size), np.nan)
+        for site in range(len(self.site_size)):
+            gap = coverage_gap(neighbor_bearings[neighbor_indptr[site]:neighbor_indptr[site + 1]])
+            if gap is not None:
+                self.gap[site] = gap
+        self.azimuth = None
+
+    def _build_pairs(self, neighbor_indptr, neighbor_sectors, distances_km, bearings):
+        """Flatten the site neighbor lists into unique sector pairs."""
+        # Every sector of a site against every neighbor sector of that site
+        rows = np.repeat(np.arange(len(self.site_size)), np.diff(neighbor_indptr))
+        member_counts = self.site_size[rows]
+        entry = np.repeat(np.arange(len(neighbor_sectors)), member_counts)
+        offsets = np.arange(len(entry)) - np.repeat(np.cumsum(member_counts) - member_counts, member_counts)
+        a = self.site_sectors[self.site_indptr[rows[entry]] + offsets]
+        b = neighbor_sectors[entry]
+        bearing = bearings[entry]
+        distance = distances_km[entry]
+
+        # Keep each unordered pair once, oriented from the lower sector index
+        swap = a > b
+        a, b = np.where(swap, b, a), np.where(swap, a, b)
+        bearing = np.where(swap, (bearing + 180.0) % 360, bearing)
+        _, first = np.unique(a * (len(self.beamwidth) + 1) + b, return_index=True)
+        self.pair_a = a[first]
+        self.pair_b = b[first]
+        self.pair_bearing = bearing[first]
+        self.pair_weight = 1.0 / (distance[first] + PROXIMITY_SMOOTHING_KM)
+
+        # Sectors of the same site
+        intra_a = []
+        intra_b = []
+        for site in range(len(self.site_size)):
+            members = self.site_sectors[self.site_indptr[site]:self.site_indptr[site + 1]]
+            i, j = np.triu_indices(len(members), 1)
+            intra_a.append(members[i])
+            intra_b.append(members[j])
+        self.intra_a = np.concatenate(intra_a) if intra_a else np.zeros(0, dtype=np.int64)
+        self.intra_b = np.concatenate(intra_b) if intra_b else np.zeros(0, dtype=np.int64)
+        self.intra_weight = 1.0 / PROXIMITY_SMOOTHING_KM
+
+    def _pair_terms(self, az_a, az_b, bearing, bw_a, bw_b, weight):
+        """Overlap of neighbor pairs; both sectors pointing at each other scores highest."""
+        return weight * _gain(angle_difference(bearing, az_a), bw_a) * \
+            _gain(angle_difference((bearing + 180.0) % 360, az_b), bw_b)
+
+    def _intra_terms(self, az_a, az_b, bw_a, bw_b):
+        """Overlap between the main beams of two sectors of one site."""
+        return self.intra_weight * _gain(angle_difference(az_a, az_b), (bw_a + bw_b) / 2.0)
+
+    def _gap_attenuation(self, azimuth):
+        """Normalized attenuation of every sector towards its site's gap (NaN without gap)."""
+        gap = self.gap[self.site_index]
+        return horizontal_attenuation(angle_difference(gap, azimuth), self.beamwidth) / MAX_ATTENUATION
+
+    def components(self, azimuth):
+        """Return ``{'overlap', 'gap', 'total'}`` costs of a set of azimuths."""
+        azimuth = np.asarray(azimuth, dtype=float)
+        overlap = np.sum(self._pair_terms(
+            azimuth[self.pair_a], azimuth[self.pair_b], self.pair_bearing,
+            self.beamwidth[self.pair_a], self.beamwidth[self.pair_b], self.pair_weight))
+        overlap += np.sum(self._intra_terms(
+            azimuth[self.intra_a], azimuth[self.intra_b],
+            self.beamwidth[self.intra_a], self.beamwidth[self.intra_b]))
+
+        attenuation = self._gap_attenuation(azimuth)
+        site_attenuation = np.full(len(self.site_size), np.inf)
+        np.minimum.at(site_attenuation, self.site_index, np.where(np.isnan(attenuation), np.inf, attenuation))
+        gap = GAP_WEIGHT * np.sum(site_attenuation[np.isfinite(site_attenuation)])
+        return {'overlap': float(overlap), 'gap': float(gap), 'total': float(overlap + gap)}
+
+    def cost(self, azimuth):
+        """Total network cost of a set of azimuths."""
+        return self.components(azimuth)['total']
+
+    def site_colors(self):
+        """Greedy coloring of the sites so no two sites of a color share a pair."""
+        sites_a = self.site_index[self.pair_a]
+        sites_b = self.site_index[self.pair_b]
+        edges = np.concatenate([np.column_stack([sites_a, sites_b]), np.column_stack([sites_b, sites_a])])
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        order = np.argsort(edges[:, 0], kind='stable')
+        targets = edges[order, 1]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(edges[:, 0], minlength=len(self.site_size)))))
+
+        colors = np.full(len(self.site_size), -1, dtype=np.int64)
+        # Most connected sites first keeps the number of colors low
+        for site in np.argsort(-np.diff(indptr), kind='stable'):
+            used = set(colors[targets[indptr[site]:indptr[site + 1]]].tolist())
+            color = 0
+            while color in used:
+                color += 1
+            colors[site] = color
+        return colors
+
+    def set_azimuths(self, azimuth):
+        """Set the current azimuths the moves are scored against."""
+        self.azimuth = np.array(azimuth, dtype=float)
+
+    def evaluate(self, sectors, candidates):
+        """Cost change of moving each of ``sectors`` to each of its candidates.
+
+        The sectors must belong to different sites that share no pair
+        (e.g. one sector per site of one color of :meth:`site_colors`).
+
+        :param sectors: Array of ``k`` sector indices.
+        :param candidates: ``(k, c)`` array of candidate azimuths.
+        :returns: ``(k, c)`` array of cost changes (negative is better).
+        """
+        sectors = np.asarray(sectors, dtype=np.int64)
+        candidates = np.asarray(candidates, dtype=float)
+        azimuth = self.azimuth
+        position = np.full(len(azimuth), -1, dtype=np.int64)
+        position[sectors] = np.arange(len(sectors))
+        deltas = np.zeros(candidates.shape)
+
+        # Neighbor pairs touching a moving sector on either side
+        for moving, fixed, flip in ((self.pair_a, self.pair_b, False), (self.pair_b, self.pair_a, True)):
+            pairs = np.nonzero(position[moving] >= 0)[0]
+            if not len(pairs):
+                continue
+            rows = position[moving[pairs]]
+            # Orient every pair from the moving sector
+            bearing = self.pair_bearing[pairs]
+            if flip:
+                bearing = (bearing + 180.0) % 360
+            bearing = bearing[:, np.newaxis]
+            bw_moving = self.beamwidth[moving[pairs]][:, np.newaxis]
+            bw_fixed = self.beamwidth[fixed[pairs]][:, np.newaxis]
+            az_fixed = azimuth[fixed[pairs]][:, np.newaxis]
+            weight = self.pair_weight[pairs][:, np.newaxis]
+            new = self._pair_terms(candidates[rows], az_fixed, bearing, bw_moving, bw_fixed, weight)
+            old = self._pair_terms(azimuth[moving[pairs]][:, np.newaxis], az_fixed, bearing,
+                                   bw_moving, bw_fixed, weight)
+            np.add.at(deltas, rows, new - old)
+
+        # Beams of the other sectors of the same site
+        for moving, fixed in ((self.intra_a, self.intra_b), (self.intra_b, self.intra_a)):
+            pairs = np.nonzero(position[moving] >= 0)[0]
+            if not len(pairs):
+                continue
+            rows = position[moving[pairs]]
+            bw_moving = self.beamwidth[moving[pairs]][:, np.newaxis]
+            bw_fixed = self.beamwidth[fixed[pairs]][:, np.newaxis]
+            az_fixed = azimuth[fixed[pairs]][:, np.newaxis]
+            new = self._intra_terms(candidates[rows], az_fixed, bw_moving, bw_fixed)
+            old = self._intra_terms(azimuth[moving[pairs]][:, np.newaxis], az_fixed, bw_moving, bw_fixed)
+            np.add.at(deltas, rows, new - old)
+
+        # Coverage gap: the best aligned sector of the site defines its penalty
+        sites = self.site_index[sectors]
+        has_gap = ~np.isnan(self.gap[sites])
+        if np.any(has_gap):
+            attenuation = self._gap_attenuation(azimuth)
+            others = np.full(len(sectors), np.inf)
+            for row, (sector, site) in enumerate(zip(sectors, sites)):
+                if has_gap[row]:
+                    members = self.site_sectors[self.site_indptr[site]:self.site_indptr[site + 1]]
+                    members = members[members != sector]
+                    if len(members):
+                        others[row] = attenuation[members].min()
+            current = np.minimum(others, attenuation[sectors])
+            new_attenuation = horizontal_attenuation(
+                angle_difference(self.gap[sites][:, np.newaxis], candidates),
+                self.beamwidth[sectors][:, np.newaxis]) / MAX_ATTENUATION
+            gap_delta = GAP_WEIGHT * (np.minimum(others[:, np.newaxis], new_attenuation) - current[:, np.newaxis])
+            deltas += np.where(has_gap[:, np.newaxis], gap_delta, 0.0)
+        return deltas
+
+    def apply(self, sectors, azimuths):
+        """Commit new azimuths for ``sectors``."""
+        self.azimuth[np.asarray(sectors, dtype=np.int64)] = azimuths
+
+
+def optimize_azimuths(cost, initial_azimuths, locked=None, steps=AZIMUTH_STEPS, max_sweeps=10,
+                      progress=None):
+    """Parallel local search over sector azimuths.
+
+    Every sweep visits the site colors in turn. Within a color the sectors
+    at the same position of every site move together: each scores the
+    moves in ``steps`` and keeps the best improving one. Locked sectors
+    never move. The search stops after a sweep without improvement or
+    ``max_sweeps``.
+
+    :param cost: :class:`OverlapCost` of the network.
+    :param progress: Optional ``callable(sweep, max_sweeps)`` called after
+        every sweep.
+    :returns: Array of optimized azimuths.
+    """
+    azimuths = np.array(initial_azimuths, dtype=float) % 360
+    locked = np.zeros(len(azimuths), dtype=bool) if locked is None else np.asarray(locked, dtype=bool)
+    steps = np.asarray(steps, dtype=float)
+    cost.set_azimuths(azimuths)
+
+    colors = cost.site_colors()
+    color_sites = [np.nonzero(colors == color)[0] for color in range(colors.max() + 1)] if len(colors) else []
+    for sweep in range(max_sweeps):
+        moved = 0
+        for sites in color_sites:
+            for position in range(int(cost.site_size[sites].max())):
+                members = sites[cost.site_size[sites] > position]
+                sectors = cost.site_sectors[cost.site_indptr[members] + position]
+                sectors = sectors[~locked[sectors]]
+                if not len(sectors):
+                    continue
+                candidates = (azimuths[sectors][:, np.newaxis] + steps) % 360
+                deltas = cost.evaluate(sectors, candidates)
+                best = np.argmin(deltas, axis=1)
+                improving = deltas[np.arange(len(sectors)), best] < -1e-12
+                if np.any(improving):
+                    chosen = sectors[improving]
+                    azimuths[chosen] = candidates[improving, best[improving]]
+                    cost.apply(chosen, azimuths[chosen])
+                    moved += int(np.count_nonzero(improving))
+        if progress is not None:
+            progress(sweep + 1, max_sweeps)
+        if not moved:
+            break
+    return azimuths
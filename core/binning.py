@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Binning of point measurements onto a north-up raster grid.
+
+Points are mapped to the flat cell index of a GDAL geotransform, the same
+grid the coverage prediction writes. Counts, sums, minimum and maximum
+are reduced with ``np.bincount`` and ``ufunc.at``; medians and percentiles
+sort the values by cell once and interpolate inside each cell's run, as
+``np.percentile`` does with linear interpolation.
+"""
+
+import re
+
+import numpy as np
+
+STATISTICS = ('mean', 'median', 'count', 'min', 'max', 'p10', 'p90')
+
+_PERCENTILE = re.compile(r'^p(\d+(?:\.\d+)?)$')
+
+
+def cell_indices(x, y, geotransform, rows, cols):
+    """Flat ``row * cols + col`` cell index of every point, -1 outside the grid.
+
+    :param geotransform: GDAL ``(x0, dx, 0, y0, 0, dy)`` of a north-up grid.
+    """
+    x0, dx, x_rotation, y0, y_rotation, dy = geotransform
+    if x_rotation or y_rotation:
+        raise ValueError('Only north-up rasters are supported.')
+    col = np.floor((np.asarray(x, dtype=float) - x0) / dx)
+    row = np.floor((np.asarray(y, dtype=float) - y0) / dy)
+    inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+    flat = np.full(col.shape, -1, dtype=np.int64)
+    flat[inside] = row[inside].astype(np.int64) * cols + col[inside].astype(np.int64)
+    return flat
+
+
+def _percentiles(sorted_values, starts, counts, q):
+    """Linear-interpolated ``q`` percentile of every run of ``sorted_values``."""
+    position = starts + (q / 100.0) * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def bin_statistics(flat, values, size, statistics=STATISTICS):
+    """Per-cell statistics of ``values`` grouped by flat cell index.
+
+    :param flat: Cell index per value; negative indices and NaN values are skipped.
+    :param size: Number of cells of the grid.
+    :param statistics: Names from :data:`STATISTICS` or ``p<q>`` for any percentile.
+    :returns: ``{name: flat array}``; cells without values are NaN (0 for ``count``).
+    """
+    flat = np.asarray(flat, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    keep = (flat >= 0) & ~np.isnan(values)
+    flat = flat[keep]
+    values = values[keep]
+
+    counts = np.bincount(flat, minlength=size)
+    occupied = counts > 0
+    results = {}
+    sorted_runs = None
+    for name in statistics:
+        if name == 'count':
+            results[name] = counts
+        elif name == 'mean':
+            mean = np.full(size, np.nan)
+            mean[occupied] = np.bincount(flat, weights=values, minlength=size)[occupied] / counts[occupied]
+            results[name] = mean
+        elif name in ('min', 'max'):
+            extreme = np.full(size, np.inf if name == 'min' else -np.inf)
+            (np.minimum if name == 'min' else np.maximum).at(extreme, flat, values)
+            extreme[~occupied] = np.nan
+            results[name] = extreme
+        else:
+            match = _PERCENTILE.match(name)
+            q = 50.0 if name == 'median' else float(match.group(1)) if match else None
+            if q is None or not 0.0 <= q <= 100.0:
+                raise ValueError(f'Unknown statistic: {name}')
+            if sorted_runs is None:
+                # One sort by cell, then value, serves every percentile
+                order = np.lexsort((values, flat))
+                cells, starts, run_counts = np.unique(flat[order], return_index=True,
+                                                      return_counts=True)
+                sorted_runs = (values[order], cells, starts, run_counts)
+            sorted_values, cells, starts, run_counts = sorted_runs
+            percentile = np.full(size, np.nan)
+            percentile[cells] = _percentiles(sorted_values, starts, run_counts, q)
+            results[name] = percentile
+    return results
+
+
+class RasterBinner:
+    """Collect point measurements of a grid chunk by chunk.
+
+    Only the cell index and value of points inside the grid are kept, so
+    the chunks of a long drive test can be added as they are read.
+    """
+
+    def __init__(self, geotransform, rows, cols):
+        self.geotransform = geotransform
+        self.rows = rows
+        self.cols = cols
+        self._cells = []
+        self._values = []
+        self.points = 0
+        self.outside = 0
+
+    def add(self, x, y, values):
+        """Add the measurements of one chunk of points."""
+        flat = cell_indices(x, y, self.geotransform, self.rows, self.cols)
+        values = np.asarray(values, dtype=float)
+        keep = (flat >= 0) & ~np.isnan(values)
+        self._cells.append(flat[keep])
+        self._values.append(values[keep])
+        self.points += int(keep.sum())
+        self.outside += int((flat < 0).sum())
+
+    def statistics(self, statistics=STATISTICS):
+        """``{name: (rows, cols) array}`` of the measurements added so far."""
+        flat = np.concatenate(self._cells) if self._cells else np.empty(0, dtype=np.int64)
+        values = np.concatenate(self._values) if self._values else np.empty(0)
+        results = bin_statistics(flat, values, self.rows * self.cols, statistics)
+        return {name: array.reshape(self.rows, self.cols) for name, array in results.items()}
+
+
+def delta(prediction, measurement, prediction_nodata=None):
+    """``prediction - measurement`` where both are known, NaN elsewhere."""
+    prediction = np.asarray(prediction, dtype=float)
+    difference = prediction - measurement
+    if prediction_nodata is not None:
+        difference[prediction == prediction_nodata] = np.nan
+    return difference
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Propagation model calibration against drive-test measurements.
+
+Each measured point is attributed to its serving cell. :func:`point_features`
+computes the distance, bearing, antenna pattern loss and EIRP of all points
+in one vectorized pass. The measured path loss is
+``EIRP - antenna loss - RSRP``; :func:`fit_profile` fits its difference to
+a model's prediction as ``intercept + slope * log10(d_km)`` with NumPy
+least squares, optionally again per clutter class.
+
+The resulting :class:`CalibrationProfile` is added to the model's path loss
+by the coverage prediction. Profiles are saved as JSON by
+:func:`save_profiles`.
+"""
+
+import json
+
+import numpy as np
+
+from .antenna import angle_difference, horizontal_attenuation
+from .geodesy import local_distance_bearing
+from .propagation import path_loss
+
+PROFILE_VERSION = 1
+
+# Points closer than this are fitted and corrected at this distance
+MIN_DISTANCE_KM = 0.01
+# Fewest points for a clutter class to get its own coefficients
+MIN_CLASS_POINTS = 50
+
+
+class CalibrationProfile:
+    """Correction in dB added to one propagation model's path loss.
+
+    :param clutter: ``{clutter class: (intercept, slope)}`` replacing the
+        global coefficients where the class is known.
+    """
+
+    def __init__(self, model, intercept=0.0, slope=0.0, clutter=None, points=0,
+                 mean_error=None, rmse=None, uncalibrated_rmse=None):
+        self.model = model
+        self.intercept = intercept
+        self.slope = slope
+        self.clutter = clutter or {}
+        self.points = points
+        self.mean_error = mean_error
+        self.rmse = rmse
+        self.uncalibrated_rmse = uncalibrated_rmse
+
+    def correction(self, distance_km, clutter_classes=None):
+        """Correction for every distance, per class where ``clutter_classes`` is given."""
+        log_d = np.log10(np.maximum(np.asarray(distance_km, dtype=float), MIN_DISTANCE_KM))
+        correction = self.intercept + self.slope * log_d
+        if clutter_classes is not None and self.clutter:
+            clutter_classes = np.asarray(clutter_classes)
+            for clutter_class, (intercept, slope) in self.clutter.items():
+                mask = clutter_classes == clutter_class
+                correction = np.where(mask, intercept + slope * log_d, correction)
+        return correction
+
+    def to_dict(self):
+        return {
+            'model': self.model,
+            'intercept': self.intercept,
+            'slope': self.slope,
+            'clutter': {str(name): list(coefficients) for name, coefficients in self.clutter.items()},
+            'points': self.points,
+            'mean_error': self.mean_error,
+            'rmse': self.rmse,
+            'uncalibrated_rmse': self.uncalibrated_rmse,
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        clutter = {name: tuple(coefficients) for name, coefficients in values.get('clutter', {}).items()}
+        return cls(values['model'], values.get('intercept', 0.0), values.get('slope', 0.0), clutter,
+                   values.get('points', 0), values.get('mean_error'), values.get('rmse'),
+                   values.get('uncalibrated_rmse'))
+
+
+def save_profiles(path, profiles):
+    """Write profiles (an iterable of :class:`CalibrationProfile`) to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({'version': PROFILE_VERSION,
+                   'profiles': [profile.to_dict() for profile in profiles]}, handle, indent=2)
+
+
+def load_profiles(path):
+    """``{model name: CalibrationProfile}`` of a file written by :func:`save_profiles`."""
+    with open(path, encoding='utf-8') as handle:
+        data = json.load(handle)
+    if data.get('version') != PROFILE_VERSION:
+        raise ValueError(f'Unsupported calibration profile version: {data.get("version")}')
+    profiles = [CalibrationProfile.from_dict(values) for values in data.get('profiles', [])]
+    return {profile.model: profile for profile in profiles}
+
+
+def point_features(point_x, point_y, serving, cells, geographic=True, unit_to_meters=1.0):
+    """Per-point features against the serving cell.
+
+    :param serving: Row of the serving cell in ``cells`` for every point.
+    :param cells: Dict of cell arrays ``x``, ``y``, ``height``, ``azimuth``,
+        ``beamwidth``, ``power``, ``gain`` and ``frequency``.
+    :returns: Dict of point arrays ``distance_km``, ``bearing``,
+        ``antenna_loss``, ``eirp``, ``height`` and ``frequency``.
+    """
+    serving = np.asarray(serving, dtype=np.int64)
+    distance_m, bearing = local_distance_bearing(
+        cells['x'][serving], cells['y'][serving], point_x, point_y, geographic, unit_to_meters)
+    return {
+        'distance_km': np.maximum(distance_m / 1000.0, MIN_DISTANCE_KM),
+        'bearing': bearing,
+        'antenna_loss': horizontal_attenuation(angle_difference(bearing, cells['azimuth'][serving]),
+                                               cells['beamwidth'][serving]),
+        'eirp': cells['power'][serving] + cells['gain'][serving],
+        'height': cells['height'][serving],
+        'frequency': cells['frequency'][serving],
+    }
+
+
+def _fit_line(log_d, residual):
+    """``(intercept, slope)`` of ``residual ~ intercept + slope * log_d``."""
+    if len(residual) < 2 or np.ptp(log_d) == 0:
+        return float(np.mean(residual)), 0.0
+    design = np.column_stack([np.ones_like(log_d), log_d])
+    (intercept, slope), _, _, _ = np.linalg.lstsq(design, residual, rcond=None)
+    return float(intercept), float(slope)
+
+
+def fit_profile(features, rsrp, model, clutter_classes=None, min_class_points=MIN_CLASS_POINTS):
+    """Fit the correction of ``model`` to measured RSRP.
+
+    :param rsrp: Measured RSRP (dBm) per point.
+    :param clutter_classes: Optional clutter class per point; classes with
+        at least ``min_class_points`` points get their own coefficients.
+    :returns: ``(profile, error)`` where ``error`` is the calibrated
+        predicted minus measured RSRP per point.
+    """
+    rsrp = np.asarray(rsrp, dtype=float)
+    distance_km = features['distance_km']
+    predicted = path_loss(features['frequency'], distance_km, features['height'], model)
+    residual = (features['eirp'] - features['antenna_loss'] - rsrp) - predicted
+    log_d = np.log10(distance_km)
+
+    intercept, slope = _fit_line(log_d, residual)
+    clutter = {}
+    if clutter_classes is not None:
+        clutter_classes = np.asarray(clutter_classes)
+        names, counts = np.unique(clutter_classes, return_counts=True)
+        for name, count in zip(names.tolist(), counts.tolist()):
+            if count >= min_class_points and name not in ('', None):
+                mask = clutter_classes == name
+                clutter[name] = _fit_line(log_d[mask], residual[mask])
+
+    profile = CalibrationProfile(model, intercept, slope, clutter)
+    # Predicted RSRP is too high where the path loss is underestimated
+    error = residual - profile.correction(distance_km, clutter_classes)
+    profile.points = len(error)
+    profile.mean_error = float(np.mean(error)) if len(error) else None
+    profile.rmse = float(np.sqrt(np.mean(error ** 2))) if len(error) else None
+    profile.uncalibrated_rmse = float(np.sqrt(np.mean(residual ** 2))) if len(residual) else None
+    return profile, error
+
+
+def cell_statistics(serving, error, cell_count):
+    """``(points, mean error, RMSE)`` arrays per cell row; NaN for cells without points."""
+    serving = np.asarray(serving, dtype=np.int64)
+    counts = np.bincount(serving, minlength=cell_count)
+    sums = np.bincount(serving, weights=error, minlength=cell_count)
+    squares = np.bincount(serving, weights=error * error, minlength=cell_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts, sums / counts, np.sqrt(squares / counts)
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""Cell inventory access on SQLite/SpatiaLite and PostgreSQL/PostGIS.
+
+Connections are reused through a :class:`ConnectionPool`.
+:func:`stream_rows` reads cells in fixed-size fetches (a server-side named
+cursor on PostgreSQL, incremental ``fetchmany`` on SQLite) with the
+bounding box and band filters in the ``WHERE`` clause. :func:`write_results`
+updates planned values by key in batches: ``executemany`` on SQLite,
+``COPY`` into a temporary table and one ``UPDATE ... FROM`` on PostgreSQL.
+
+The SQL differences live in the :class:`SqliteDialect` and
+:class:`PostgresDialect` objects; any DB-API connection of the matching
+database can be pooled. psycopg2 is only needed for PostgreSQL.
+"""
+
+import contextlib
+import itertools
+import queue
+import sqlite3
+import threading
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+# Rows per fetch when streaming cells
+FETCH_SIZE = 5000
+# Rows per executemany / COPY batch when writing results
+WRITE_BATCH = 10000
+
+_cursor_names = itertools.count(1)
+
+
+class ConnectionPool:
+    """A bounded pool of DB-API connections.
+
+    :param connect: Callable returning a new connection.
+    :param max_size: Connections open at the same time; further callers
+        wait for a connection to be returned.
+    """
+
+    def __init__(self, connect, max_size=4):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection; it is rolled back if the block raises."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                try:
+                    conn.rollback()
+                except Exception:
+                    # A broken connection is not returned to the pool
+                    _close_quietly(conn)
+                    raise
+                self._idle.put(conn)
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections."""
+        while True:
+            try:
+                _close_quietly(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class CellQuery:
+    """Where the cells are in the database.
+
+    Cell positions come either from numeric ``x_column``/``y_column`` or
+    from a ``geometry_column``, which is returned as WKB in a trailing
+    ``geometry_wkb`` column.
+
+    :param columns: Attribute columns to read, all columns when None.
+    :param srid: SRID of the bounding boxes given to :func:`select_sql`.
+    """
+
+    def __init__(self, table, columns=None, x_column=None, y_column=None,
+                 geometry_column=None, band_column=None, srid=4326):
+        self.table = table
+        self.columns = columns
+        self.x_column = x_column
+        self.y_column = y_column
+        self.geometry_column = geometry_column
+        self.band_column = band_column
+        self.srid = srid
+
+
+class SqliteDialect:
+    """SQL for SQLite files, with SpatiaLite functions when the extension loads."""
+
+    name = 'sqlite'
+    placeholder = '?'
+
+    @staticmethod
+    def connect(path, spatialite=True):
+        """Open a SQLite file, loading mod_spatialite when available."""
+        conn = sqlite3.connect(path, check_same_thread=False)
+        if spatialite:
+            try:
+                conn.enable_load_extension(True)
+                conn.load_extension('mod_spatialite')
+            except (AttributeError, sqlite3.OperationalError):
+                pass
+        return conn
+
+    def quote(self, name):
+        return '.'.join('"{}"'.format(part.replace('"', '""')) for part in name.split('.'))
+
+    def geometry_sql(self, column):
+        return f'AsBinary({self.quote(column)})'
+
+    def bbox_geometry_sql(self, column, srid):
+        return f'MbrIntersects({self.quote(column)}, BuildMbr(?, ?, ?, ?))', []
+
+    def band_sql(self, column, count):
+        return f'{self.quote(column)} IN ({", ".join("?" * count)})'
+
+    def cursor(self, conn, fetch_size):
+        cursor = conn.cursor()
+        cursor.arraysize = fetch_size
+        return cursor
+
+    def update(self, conn, table, key_column, columns, rows, batch_size):
+        """Update ``columns`` by ``key_column`` with executemany in batches, one transaction."""
+        assignments = ', '.join(f'{self.quote(column)} = ?' for column in columns)
+        sql = f'UPDATE {self.quote(table)} SET {assignments} WHERE {self.quote(key_column)} = ?'
+        cursor = conn.cursor()
+        updated = 0
+        for batch in _batches(rows, batch_size):
+            # Rows are (key, value, ...); the key goes last in the statement
+            cursor.executemany(sql, [tuple(row[1:]) + (row[0],) for row in batch])
+            updated += len(batch)
+        conn.commit()
+        return updated
+
+
+class PostgresDialect:
+    """SQL for PostgreSQL/PostGIS through psycopg2."""
+
+    name = 'postgresql'
+    placeholder = '%s'
+
+    @staticmethod
+    def connect(**params):
+        """Open a psycopg2 connection (host, port, dbname, user, password...)."""
+        if psycopg2 is None:
+            raise RuntimeError('PostgreSQL connections need the psycopg2 package.')
+        return psycopg2.connect(**params)
+
+    def quote(self, name):
+        return '.'.join('"{}"'.format(part.replace('"', '""')) for part in name.split('.'))
+
+    def geometry_sql(self, column):
+        return f'ST_AsBinary({self.quote(column)})'
+
+    def bbox_geometry_sql(self, column, srid):
+        # && uses the GiST index of the geometry column
+        return f'{self.quote(column)} && ST_MakeEnvelope(%s, %s, %s, %s, %s)', [srid]
+
+    def band_sql(self, column, count):
+        # Band values are entered as text; the cast accepts numeric band columns too
+        return f'CAST({self.quote(column)} AS TEXT) IN ({", ".join(["%s"] * count)})'
+
+    def cursor(self, conn, fetch_size):
+        # A named cursor keeps the result set on the server
+        cursor = conn.cursor(name=f'rftools_cells_{next(_cursor_names)}')
+        cursor.itersize = fetch_size
+        return cursor
+
+    def update(self, conn, table, key_column, columns, rows, batch_size):
+        """COPY the rows into a temporary table and update ``table`` from it in one statement."""
+        quoted = [self.quote(name) for name in [key_column] + list(columns)]
+        cursor = conn.cursor()
+        cursor.execute(f'CREATE TEMP TABLE rftools_results ON COMMIT DROP AS '
+                       f'SELECT {", ".join(quoted)} FROM {self.quote(table)} WITH NO DATA')
+        updated = 0
+        for batch in _batches(rows, batch_size):
+            cursor.copy_expert(f'COPY rftools_results ({", ".join(quoted)}) FROM STDIN',
+                               _CopyBuffer(batch))
+            updated += len(batch)
+        assignments = ', '.join(f'{name} = r.{name}' for name in quoted[1:])
+        cursor.execute(f'UPDATE {self.quote(table)} AS t SET {assignments} '
+                       f'FROM rftools_results AS r WHERE t.{quoted[0]} = r.{quoted[0]}')
+        conn.commit()
+        return updated
+
+
+class _CopyBuffer:
+    """File-like text COPY data of a batch of rows, produced line by line."""
+
+    def __init__(self, rows):
+        self._lines = (copy_line(row) for row in rows)
+        self._pending = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._pending += line
+        if size < 0:
+            data, self._pending = self._pending, ''
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    readline = read
+
+
+def copy_line(row):
+    """One line of PostgreSQL text COPY format, ``\\N`` for None."""
+    values = []
+    for value in row:
+        if value is None:
+            values.append('\\N')
+        else:
+            values.append(str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                          .replace('\n', '\\n').replace('\r', '\\r'))
+    return '\t'.join(values) + '\n'
+
+
+DIALECTS = {
+    SqliteDialect.name: SqliteDialect(),
+    PostgresDialect.name: PostgresDialect(),
+}
+
+
+def _batches(rows, size):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def select_sql(dialect, query, bbox=None, bands=None):
+    """``(sql, params)`` selecting the cells inside ``bbox`` with a band in ``bands``.
+
+    :param bbox: Optional ``(xmin, ymin, xmax, ymax)`` in the query SRID.
+    :param bands: Optional band values; ignored without a band column.
+    """
+    if query.columns:
+        selected = [dialect.quote(column) for column in query.columns]
+    else:
+        selected = ['*']
+    if query.geometry_column:
+        selected.append(f'{dialect.geometry_sql(query.geometry_column)} AS geometry_wkb')
+
+    conditions = []
+    params = []
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        if query.x_column and query.y_column:
+            conditions.append(f'{dialect.quote(query.x_column)} BETWEEN {dialect.placeholder} '
+                              f'AND {dialect.placeholder}')
+            conditions.append(f'{dialect.quote(query.y_column)} BETWEEN {dialect.placeholder} '
+                              f'AND {dialect.placeholder}')
+            params += [xmin, xmax, ymin, ymax]
+        elif query.geometry_column:
+            clause, extra = dialect.bbox_geometry_sql(query.geometry_column, query.srid)
+            conditions.append(clause)
+            params += [xmin, ymin, xmax, ymax] + extra
+    if bands and query.band_column:
+        bands = [str(band) for band in bands]
+        conditions.append(dialect.band_sql(query.band_column, len(bands)))
+        params += bands
+
+    sql = f'SELECT {", ".join(selected)} FROM {dialect.quote(query.table)}'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    return sql, params
+
+
+def stream_rows(pool, dialect, query, bbox=None, bands=None, fetch_size=FETCH_SIZE):
+    """Yield ``(column names, rows)`` for every fetch of at most ``fetch_size`` cells.
+
+    The pooled connection is held until the generator is exhausted or closed.
+    """
+    sql, params = select_sql(dialect, query, bbox, bands)
+    with pool.connection() as conn:
+        cursor = dialect.cursor(conn, fetch_size)
+        try:
+            cursor.execute(sql, params)
+            names = None
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                if names is None:
+                    # Named cursors only describe their columns after the first fetch
+                    names = [column[0] for column in cursor.description]
+                yield names, rows
+        finally:
+            cursor.close()
+        conn.rollback()
+
+
+def write_results(pool, dialect, table, key_column, columns, rows, batch_size=WRITE_BATCH):
+    """Update ``columns`` of ``table`` for every ``(key, value, ...)`` row.
+
+    :returns: Number of rows sent.
+    """
+    with pool.connection() as conn:
+        return dialect.update(conn, table, key_column, columns, rows, batch_size)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Best server RSRP rasters of the Coverage Prediction.
+
+:func:`add_site_coverage` adds the RSRP of one sector to a raster,
+keeping the strongest signal of every pixel. The pixel centers come from
+:func:`raster_grid` and optional per-pixel clutter and terrain losses from
+:func:`clutter_loss_grid` and :func:`terrain_loss_grid`. Rasters are north
+up grids in WGS84 degrees. :func:`sector_rsrp` evaluates a sector only on
+the window of pixels within its reach, see :func:`sector_window`.
+"""
+
+import numpy as np
+
+from .antenna import angle_difference, horizontal_attenuation
+from .geodesy import local_distance, local_distance_bearing, meters_to_degrees
+from .propagation import path_loss
+
+# RSRP (dBm) of pixels without coverage
+NO_SIGNAL = -140.0
+
+# Clutter loss values in dB based on land use type
+CLUTTER_LOSSES = {
+    'water': 0,
+    'forest': 10,
+    'wood': 10,
+    'grass': 3,
+    'meadow': 3,
+    'farmland': 4,
+    'residential': 12,
+    'commercial': 18,
+    'industrial': 20,
+    'retail': 18,
+    'default': 5
+}
+
+# Receiver height (m) above the terrain
+RECEIVER_HEIGHT = 1.5
+
+# Relative margin of the sector windows over the max distance, covering
+# the latitude change of the degree scale across the window
+WINDOW_MARGIN = 0.02
+
+
+def raster_grid(x_min, y_max, resolution, rows, cols):
+    """``(xx, yy)`` pixel center coordinates of a north up raster."""
+    x_coords = x_min + (np.arange(cols) + 0.5) * resolution
+    y_coords = y_max - (np.arange(rows) + 0.5) * resolution
+    return np.meshgrid(x_coords, y_coords)
+
+
+def clutter_loss_grid(xx, yy, clutter_data):
+    """Clutter loss (dB) of every pixel from land use areas and building density.
+
+    :param clutter_data: ``[{'type': land use or 'building', 'coords': [(lon, lat)]}]``.
+    """
+    clutter_loss = np.full_like(xx, CLUTTER_LOSSES['default'])
+    building_density = np.zeros_like(xx)
+
+    for feature in clutter_data:
+        loss_value = CLUTTER_LOSSES.get(feature['type'], CLUTTER_LOSSES['default'])
+        for lon, lat in feature['coords']:
+            # Nearest grid cell
+            col_idx = np.argmin(np.abs(xx[0, :] - lon))
+            row_idx = np.argmin(np.abs(yy[:, 0] - lat))
+            if feature['type'] == 'building':
+                building_density[row_idx, col_idx] += 1
+            else:
+                clutter_loss[row_idx, col_idx] = max(clutter_loss[row_idx, col_idx], loss_value)
+
+    # Building density loss: high +20 dB, medium +12 dB, low +5 dB
+    building_loss = np.where(building_density > 10, 20,
+                    np.where(building_density > 5, 12,
+                    np.where(building_density > 0, 5, 0)))
+    return clutter_loss + building_loss
+
+
+def terrain_loss_grid(xx, yy, elevation_grid, site_x, site_y, site_height, frequency_mhz):
+    """Knife-edge diffraction loss (dB, 0-40) of every pixel seen from a site.
+
+    The clearance is a simplified one using the target elevation as a
+    proxy for the obstacles along the path.
+    """
+    # Site elevation from the nearest grid cell
+    site_row = np.argmin(np.abs(yy[:, 0] - site_y))
+    site_col = np.argmin(np.abs(xx[0, :] - site_x))
+    site_elevation = elevation_grid[site_row, site_col]
+
+    distance_m = np.maximum(local_distance(site_x, site_y, xx, yy) / 1000.0, 0.001) * 1000
+
+    site_agl = site_elevation + site_height
+    target_agl = elevation_grid + RECEIVER_HEIGHT
+
+    # First Fresnel zone radius at the midpoint: F1 = sqrt(lambda * d / 4)
+    wavelength = 3e8 / (frequency_mhz * 1e6)
+    fresnel_radius = np.sqrt(wavelength * distance_m / 4)
+
+    # Positive clearance = clear path, negative = obstruction
+    terrain_clearance = target_agl - (site_agl + target_agl) / 2
+    v = terrain_clearance / np.maximum(fresnel_radius, 0.1)
+
+    # ITU-R P.526 knife-edge loss where the path is obstructed
+    diffraction_loss = np.zeros_like(v)
+    obstructed = v < -0.78
+    diffraction_loss[obstructed] = 6.9 + 20 * np.log10(
+        np.sqrt((v[obstructed] - 0.1)**2 + 1) + v[obstructed] - 0.1
+    )
+    return np.clip(diffraction_loss, 0, 40)
+
+
+def sector_window(xx, yy, site_x, site_y, max_dist_km):
+    """``(row slice, column slice)`` of the pixels within ``max_dist_km`` of a site.
+
+    The window is the bounding box of the reach of the site, clipped to
+    the raster; it is empty when the site is out of reach of the raster.
+    """
+    reach_m = max_dist_km * 1000.0 * (1 + WINDOW_MARGIN)
+    _, reach_y = meters_to_degrees(site_y, 0.0, reach_m)
+    # Degrees of longitude are longest on the poleward edge of the window
+    reach_x, _ = meters_to_degrees(np.clip(abs(site_y) + reach_y, 0.0, 89.9), reach_m, 0.0)
+    x_coords = xx[0, :]
+    # Rows go north to south: search the reversed latitudes
+    y_coords = yy[::-1, 0]
+    col_start = np.searchsorted(x_coords, site_x - reach_x, side='left')
+    col_stop = np.searchsorted(x_coords, site_x + reach_x, side='right')
+    row_stop = len(y_coords) - np.searchsorted(y_coords, site_y - reach_y, side='left')
+    row_start = len(y_coords) - np.searchsorted(y_coords, site_y + reach_y, side='right')
+    return (slice(int(row_start), int(max(row_stop, row_start))),
+            slice(int(col_start), int(max(col_stop, col_start))))
+
+
+def sector_rsrp(xx, yy, site_x, site_y, height, azimuth, beamwidth, power, gain, frequency, model,
+                max_dist_km, clutter_loss=None, elevation_grid=None, calibration=None):
+    """RSRP (dBm) of one sector on the window of pixels within its reach.
+
+    Takes the parameters of :func:`add_site_coverage`.
+
+    :returns: ``(window, rsrp)``, ``window`` being the ``(row slice,
+        column slice)`` of the raster covered by the ``rsrp`` array, with
+        :data:`NO_SIGNAL` beyond ``max_dist_km``; None when the sector
+        reaches no pixel.
+    """
+    window = sector_window(xx, yy, site_x, site_y, max_dist_km)
+    xx = xx[window]
+    yy = yy[window]
+    if xx.size == 0:
+        return None
+
+    distance_m, bearings = local_distance_bearing(site_x, site_y, xx, yy)
+    distance_km = distance_m / 1000.0
+    valid_mask = (distance_km <= max_dist_km) & (distance_km >= 0.001)
+    if not np.any(valid_mask):
+        return None
+
+    # 3GPP/ITU horizontal pattern: A(θ) = -min[12 * (θ/θ_3dB)^2, A_m]
+    antenna_pattern_loss = horizontal_attenuation(angle_difference(bearings, azimuth), beamwidth)
+
+    path_loss_db = np.zeros_like(distance_km)
+    valid_distances = distance_km[valid_mask]
+    path_loss_db[valid_mask] = path_loss(frequency, valid_distances, height, model)
+    if calibration is not None:
+        # Drive-test fitted correction of the model
+        path_loss_db[valid_mask] += calibration.correction(valid_distances)
+
+    rsrp = power + gain - antenna_pattern_loss - path_loss_db
+    if clutter_loss is not None:
+        rsrp = rsrp - clutter_loss[window]
+    if elevation_grid is not None:
+        rsrp = rsrp - terrain_loss_grid(xx, yy, elevation_grid[window], site_x, site_y, height, frequency)
+    return window, np.where(valid_mask, rsrp, NO_SIGNAL)
+
+
+def add_site_coverage(raster, xx, yy, site_x, site_y, height, azimuth, beamwidth, power, gain,
+                      frequency, model, max_dist_km, clutter_loss=None, elevation_grid=None,
+                      calibration=None):
+    """Keep the RSRP of one sector in ``raster`` where it is the strongest.
+
+    :param raster: RSRP raster (dBm) updated in place.
+    :param clutter_loss: Per-pixel clutter loss from :func:`clutter_loss_grid`.
+    :param elevation_grid: Terrain elevation (m) of every pixel.
+    :param calibration: Drive-test :class:`core.calibration.CalibrationProfile`.
+    :returns: True when the sector reaches at least one pixel.
+    """
+    result = sector_rsrp(xx, yy, site_x, site_y, height, azimuth, beamwidth, power, gain, frequency,
+                         model, max_dist_km, clutter_loss, elevation_grid, calibration)
+    if result is None:
+        return False
+    window, rsrp = result
+    # Overlapping coverage keeps the strongest signal
+    np.maximum(raster[window], rsrp, out=raster[window])
+    return True
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Streaming drive-test log parsing into column arrays.
+
+Drive-test exports are read line by line and handed out in chunks of at
+most :data:`CHUNK_ROWS` measurements, so the size of a log never bounds
+memory. Every chunk is a :class:`DriveTestChunk` holding one NumPy array
+per column. CSV logs keep their header columns, typed as numeric or text
+from the first chunk. NMEA logs give one row per ``GGA``/``RMC`` position
+fix. :class:`GridThinner` keeps one point per grid cell across chunks for
+a light display layer.
+"""
+
+import csv
+
+import numpy as np
+
+from .geodesy import meters_to_degrees
+from .text_io import counted_lines, csv_header, float_column, is_numeric, sample_text
+
+FORMAT_CSV = 'csv'
+FORMAT_NMEA = 'nmea'
+
+# Measurements per chunk handed to the caller
+CHUNK_ROWS = 50000
+
+LATITUDE_NAMES = ('lat', 'latitude', 'gps_lat', 'gpslat', 'lat_deg', 'y')
+LONGITUDE_NAMES = ('lon', 'long', 'longitude', 'lng', 'gps_lon', 'gpslon', 'lon_deg', 'x')
+
+NMEA_COLUMNS = ('time', 'date', 'latitude', 'longitude', 'altitude', 'satellites',
+                'hdop', 'speed_kmh', 'course')
+NMEA_TEXT_COLUMNS = ('time', 'date')
+
+KNOTS_TO_KMH = 1.852
+
+
+class DriveTestChunk:
+    """Column arrays of a run of consecutive log rows.
+
+    :ivar columns: Ordered column names.
+    :ivar arrays: Column name to array; numeric columns are float arrays
+        (NaN for missing values), text columns object arrays of str.
+    :ivar latitude: Float array of the position latitudes.
+    :ivar longitude: Float array of the position longitudes.
+    :ivar bytes_read: File position reached after this chunk, for progress.
+    """
+
+    def __init__(self, columns, arrays, latitude, longitude, bytes_read):
+        self.columns = columns
+        self.arrays = arrays
+        self.latitude = latitude
+        self.longitude = longitude
+        self.bytes_read = bytes_read
+
+    def __len__(self):
+        return len(self.latitude)
+
+    @property
+    def positioned(self):
+        """Boolean mask of the rows with valid coordinates."""
+        return (np.isfinite(self.latitude) & np.isfinite(self.longitude) &
+                (np.abs(self.latitude) <= 90.0) & (np.abs(self.longitude) <= 180.0))
+
+    def numeric(self, name):
+        """True when ``name`` is a numeric column."""
+        return self.arrays[name].dtype.kind == 'f'
+
+    def rows(self, indices):
+        """Attribute lists of ``indices`` in column order, None for NaN."""
+        columns = []
+        for name in self.columns:
+            values = self.arrays[name][indices]
+            if values.dtype.kind == 'f':
+                columns.append([None if value != value else value for value in values.tolist()])
+            else:
+                columns.append([value or None for value in values.tolist()])
+        return [list(row) for row in zip(*columns)]
+
+
+def detect_format(path, encoding='utf-8'):
+    """:data:`FORMAT_NMEA` when the log starts with NMEA sentences, else :data:`FORMAT_CSV`."""
+    for line in sample_text(path, encoding=encoding).splitlines():
+        line = line.strip()
+        if line:
+            return FORMAT_NMEA if line.startswith('$') else FORMAT_CSV
+    return FORMAT_CSV
+
+
+def guess_coordinate_columns(columns):
+    """``(latitude, longitude)`` column names by common naming, None when not found."""
+    lowered = {name.lower(): name for name in columns}
+    latitude = next((lowered[name] for name in LATITUDE_NAMES if name in lowered), None)
+    longitude = next((lowered[name] for name in LONGITUDE_NAMES if name in lowered), None)
+    return latitude, longitude
+
+
+def read_csv_chunks(path, latitude_column, longitude_column, chunk_rows=CHUNK_ROWS,
+                    delimiter=None, encoding='utf-8'):
+    """Yield :class:`DriveTestChunk` objects of a delimited log.
+
+    Column types are fixed by the first chunk: a column is numeric when all
+    its non-empty values parse as numbers there; later unparsable values
+    become NaN. Short rows are padded and long rows truncated to the header.
+    """
+    header, sniffed = csv_header(path, encoding)
+    delimiter = delimiter or sniffed
+    width = len(header)
+    lat_idx = header.index(latitude_column)
+    lon_idx = header.index(longitude_column)
+    numeric = None
+    position = [0]
+
+    with open(path, 'rb') as handle:
+        reader = csv.reader(counted_lines(handle, position, encoding), delimiter=delimiter)
+        next(reader, None)
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                row = (row + [''] * width)[:width]
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                columns = list(zip(*rows))
+                if numeric is None:
+                    numeric = [is_numeric(values) for values in columns]
+                yield _csv_chunk(header, columns, numeric, lat_idx, lon_idx, position[0])
+                rows = []
+        if rows:
+            columns = list(zip(*rows))
+            if numeric is None:
+                numeric = [is_numeric(values) for values in columns]
+            yield _csv_chunk(header, columns, numeric, lat_idx, lon_idx, position[0])
+
+
+def _csv_chunk(header, columns, numeric, lat_idx, lon_idx, bytes_read):
+    arrays = {}
+    for name, values, is_numeric in zip(header, columns, numeric):
+        if is_numeric:
+            arrays[name] = float_column(values)
+        else:
+            arrays[name] = np.array([value.strip() for value in values], dtype=object)
+    latitude = arrays[header[lat_idx]] if numeric[lat_idx] else float_column(columns[lat_idx])
+    longitude = arrays[header[lon_idx]] if numeric[lon_idx] else float_column(columns[lon_idx])
+    return DriveTestChunk(list(header), arrays, latitude, longitude, bytes_read)
+
+
+def nmea_checksum_ok(sentence):
+    """True when an NMEA sentence has no checksum or a matching one."""
+    body, star, checksum = sentence.partition('*')
+    if not star:
+        return True
+    value = 0
+    for char in body[1:]:
+        value ^= ord(char)
+    try:
+        return value == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def nmea_coordinate(value, hemisphere):
+    """Decimal degrees of an NMEA ``(d)ddmm.mmmm`` value, NaN when empty."""
+    if not value:
+        return np.nan
+    try:
+        number = float(value)
+    except ValueError:
+        return np.nan
+    degrees = int(number // 100)
+    result = degrees + (number - degrees * 100) / 60.0
+    return -result if hemisphere in ('S', 'W') else result
+
+
+def _nmea_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def _nmea_row(sentence):
+    """Row of :data:`NMEA_COLUMNS` for a GGA or RMC sentence, None otherwise."""
+    fields = sentence.partition('*')[0].split(',')
+    kind = fields[0][3:]
+    if kind == 'GGA' and len(fields) >= 10:
+        return [fields[1], '', nmea_coordinate(fields[2], fields[3]),
+                nmea_coordinate(fields[4], fields[5]), _nmea_float(fields[9]),
+                _nmea_float(fields[7]), _nmea_float(fields[8]), np.nan, np.nan]
+    if kind == 'RMC' and len(fields) >= 10:
+        if fields[2] != 'A':
+            return None
+        return [fields[1], fields[9], nmea_coordinate(fields[3], fields[4]),
+                nmea_coordinate(fields[5], fields[6]), np.nan, np.nan, np.nan,
+                _nmea_float(fields[7]) * KNOTS_TO_KMH, _nmea_float(fields[8])]
+    return None
+
+
+def read_nmea_chunks(path, chunk_rows=CHUNK_ROWS, encoding='ascii'):
+    """Yield :class:`DriveTestChunk` objects of the position fixes of an NMEA log.
+
+    Sentences with a wrong checksum and void RMC fixes are skipped.
+    """
+    position = [0]
+    with open(path, 'rb') as handle:
+        rows = []
+        for line in counted_lines(handle, position, encoding):
+            line = line.strip()
+            if not line.startswith('$') or not nmea_checksum_ok(line):
+                continue
+            row = _nmea_row(line)
+            if row is None:
+                continue
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                yield _nmea_chunk(rows, position[0])
+                rows = []
+        if rows:
+            yield _nmea_chunk(rows, position[0])
+
+
+def _nmea_chunk(rows, bytes_read):
+    arrays = {}
+    for name, values in zip(NMEA_COLUMNS, zip(*rows)):
+        if name in NMEA_TEXT_COLUMNS:
+            arrays[name] = np.array(values, dtype=object)
+        else:
+            arrays[name] = np.array(values, dtype=float)
+    return DriveTestChunk(list(NMEA_COLUMNS), arrays, arrays['latitude'], arrays['longitude'],
+                          bytes_read)
+
+
+class GridThinner:
+    """Keep the first point falling into each grid cell, across chunks.
+
+    The cell size in meters is converted to degrees at the latitude of the
+    first points seen, so the grid is fixed for the whole log.
+    """
+
+    def __init__(self, cell_size_m):
+        self.cell_size_m = float(cell_size_m)
+        self._cell = None
+        self._seen = set()
+
+    def select(self, longitude, latitude):
+        """Indices of the points that fall into cells not seen before."""
+        longitude = np.asarray(longitude, dtype=float)
+        latitude = np.asarray(latitude, dtype=float)
+        if not len(longitude):
+            return np.zeros(0, dtype=np.int64)
+        if self._cell is None:
+            self._cell = meters_to_degrees(float(np.median(latitude)), self.cell_size_m, self.cell_size_m)
+        cell_x = np.floor(longitude / self._cell[0]).astype(np.int64)
+        cell_y = np.floor(latitude / self._cell[1]).astype(np.int64)
+        keys = np.stack((cell_x, cell_y), axis=1)
+        _, first = np.unique(keys, axis=0, return_index=True)
+        first.sort()
+        selected = [index for index, key in zip(first.tolist(), map(tuple, keys[first].tolist()))
+                    if key not in self._seen]
+        self._seen.update(tuple(key) for key in keys[selected].tolist())
+        return np.array(selected, dtype=np.int64)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Co-channel, adjacent channel and PCI conflict detection between sectors.
+
+The checks of the Interference Analysis run on sector arrays. Candidate
+pairs come from :func:`sector_pairs`, computed once with a
+:class:`core.spatial_index.PointIndex` and shared by every check, and
+each check filters them in one array pass. Issues are dicts referring to
+the sectors by their position in the input arrays.
+
+Pairs can also come from a persisted
+:class:`core.interference_matrix.InterferenceMatrix`, with
+:func:`pair_geometry` giving their distances and bearings; the checks
+then flag the pairs with predicted interference (``pair_weights``)
+instead of the beam overlap test.
+"""
+
+import numpy as np
+
+from .geodesy import local_offsets
+from .spatial_index import PointIndex
+
+# Co-channel sectors are at most this far apart in frequency (MHz)
+CO_CHANNEL_TOLERANCE_MHZ = 0.1
+# Frequency spacing (MHz) of adjacent channels
+ADJACENT_CHANNEL_MIN_MHZ = 5.0
+ADJACENT_CHANNEL_MAX_MHZ = 20.0
+
+CO_CHANNEL = 'Co-Channel'
+ADJACENT_CHANNEL = 'Adjacent Channel'
+PCI_CONFLICT = 'PCI Conflict'
+
+
+def beam_overlap(azimuth, beamwidth, bearing):
+    """Overlap (%) of a bearing with a beam: 100 inside the half beamwidth, 0 beyond the beamwidth."""
+    angle_diff = np.abs(np.asarray(azimuth, dtype=float) - bearing)
+    angle_diff = np.where(angle_diff > 180, 360 - angle_diff, angle_diff)
+    half = np.asarray(beamwidth, dtype=float) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = 100.0 * (1 - (angle_diff - half) / half)
+    return np.where(angle_diff <= half, 100.0, np.where(angle_diff <= beamwidth, partial, 0.0))
+
+
+def sector_pairs(x, y, max_distance_km, geographic=True, unit_to_meters=1.0):
+    """Pairs of sectors within ``max_distance_km`` of each other.
+
+    :returns: ``(first, second, distances_km, bearings)`` of every pair
+        ``first < second``, sorted by ``first`` then ``second``; bearings
+        are from the first sector to the second.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    index = PointIndex(x, y, geographic, unit_to_meters)
+    indptr, second, _ = index.neighbor_lists(max_distance_km * 1000.0 * (1 + 1e-9))
+    first = np.repeat(np.arange(len(x)), np.diff(indptr))
+    forward = first < second
+    first, second = first[forward], second[forward]
+
+    distances_km, bearings = pair_geometry(first, second, x, y, geographic, unit_to_meters)
+    inside = distances_km <= max_distance_km
+    return first[inside], second[inside], distances_km[inside], bearings[inside]
+
+
+def pair_geometry(first, second, x, y, geographic=True, unit_to_meters=1.0):
+    """``(distances_km, bearings)`` from the ``first`` to the ``second`` sector of every pair."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    east, north = local_offsets(x[first], y[first], x[second], y[second], geographic, unit_to_meters)
+    return np.hypot(east, north) / 1000.0, np.degrees(np.arctan2(east, north)) % 360.0
+
+
+def _codes(values):
+    """Integer codes of ``values`` so equal values share a code."""
+    return np.unique(np.asarray([str(value) for value in values]), return_inverse=True)[1].reshape(-1)
+
+
+def _overlaps(first, second, bearings, azimuths, beamwidths):
+    azimuths = np.asarray(azimuths, dtype=float)
+    beamwidths = np.asarray(beamwidths, dtype=float)
+    overlap1 = beam_overlap(azimuths[first], beamwidths[first], bearings)
+    overlap2 = beam_overlap(azimuths[second], beamwidths[second], (bearings + 180) % 360)
+    return overlap1, overlap2
+
+
+def _affected(overlap1, overlap2, overlap_threshold, pair_weights):
+    """Pairs to report: predicted interference when weighted, else the beam overlap test."""
+    if pair_weights is not None:
+        return pair_weights > 0
+    return (overlap1 > overlap_threshold) | (overlap2 > overlap_threshold)
+
+
+def _with_interference(issue, pair_weights, k):
+    if pair_weights is not None:
+        issue['interference'] = float(pair_weights[k])
+    return issue
+
+
+def co_channel_issues(pairs, bands, frequencies, azimuths, beamwidths, max_distance_km,
+                      overlap_threshold, pair_weights=None):
+    """Same band, same frequency sectors whose beams face each other.
+
+    :param pairs: Candidate pairs from :func:`sector_pairs`.
+    :param overlap_threshold: Beam overlap (%) one of the sectors must exceed.
+    :param pair_weights: Predicted interference of every pair, e.g. from
+        an interference matrix; pairs with interference are reported
+        whatever their beam overlap, with it as ``'interference'``.
+    """
+    first, second, distances_km, bearings = pairs
+    frequencies = np.asarray(frequencies, dtype=float)
+    band_codes = _codes(bands)
+    keep = ((distances_km <= max_distance_km) & (band_codes[first] == band_codes[second]) &
+            (np.abs(frequencies[first] - frequencies[second]) <= CO_CHANNEL_TOLERANCE_MHZ))
+    first, second, distances_km, bearings = first[keep], second[keep], distances_km[keep], bearings[keep]
+    if pair_weights is not None:
+        pair_weights = np.asarray(pair_weights, dtype=float)[keep]
+    overlap1, overlap2 = _overlaps(first, second, bearings, azimuths, beamwidths)
+
+    issues = []
+    for k in np.nonzero(_affected(overlap1, overlap2, overlap_threshold, pair_weights))[0]:
+        issues.append(_with_interference({
+            'type': CO_CHANNEL,
+            'sector1': int(first[k]),
+            'sector2': int(second[k]),
+            'distance_km': float(distances_km[k]),
+            'overlap1': float(overlap1[k]),
+            'overlap2': float(overlap2[k]),
+            'severity': 'High' if (overlap1[k] > 60 and overlap2[k] > 60) else 'Medium'
+        }, pair_weights, k))
+    return issues
+
+
+def adjacent_channel_issues(pairs, bands, frequencies, azimuths, beamwidths, max_distance_km,
+                            overlap_threshold, pair_weights=None):
+    """Same band sectors on adjacent channels within half of ``max_distance_km``."""
+    first, second, distances_km, bearings = pairs
+    frequencies = np.asarray(frequencies, dtype=float)
+    band_codes = _codes(bands)
+    freq_diff = np.abs(frequencies[first] - frequencies[second])
+    keep = ((distances_km <= max_distance_km * 0.5) & (band_codes[first] == band_codes[second]) &
+            (freq_diff >= ADJACENT_CHANNEL_MIN_MHZ) & (freq_diff <= ADJACENT_CHANNEL_MAX_MHZ))
+    first, second, distances_km, bearings = first[keep], second[keep], distances_km[keep], bearings[keep]
+    if pair_weights is not None:
+        pair_weights = np.asarray(pair_weights, dtype=float)[keep]
+    freq_diff = freq_diff[keep]
+    overlap1, overlap2 = _overlaps(first, second, bearings, azimuths, beamwidths)
+
+    issues = []
+    for k in np.nonzero(_affected(overlap1, overlap2, overlap_threshold, pair_weights))[0]:
+        issues.append(_with_interference({
+            'type': ADJACENT_CHANNEL,
+            'sector1': int(first[k]),
+            'sector2': int(second[k]),
+            'distance_km': float(distances_km[k]),
+            'freq_diff': float(freq_diff[k]),
+            'overlap1': float(overlap1[k]),
+            'overlap2': float(overlap2[k]),
+            'severity': 'Medium' if distances_km[k] < 0.5 else 'Low'
+        }, pair_weights, k))
+    return issues
+
+
+def pci_conflict_issues(pairs, bands, pcis, sector_ids, azimuths, beamwidths, max_distance_km,
+                        overlap_threshold, detect_collision=True, detect_mod3=True, detect_mod6=True,
+                        pair_weights=None):
+    """PCI collisions and mod 3 / mod 6 conflicts within the PCI re-use distance.
+
+    :param pcis: PCI of every sector, negative when unknown.
+    :param sector_ids: Sector identifiers; duplicate features of one
+        sector are not compared.
+    :param pair_weights: Predicted interference of every pair, see
+        :func:`co_channel_issues`.
+    """
+    if not any([detect_collision, detect_mod3, detect_mod6]):
+        return []
+
+    first, second, distances_km, bearings = pairs
+    pcis = np.asarray(pcis, dtype=np.int64)
+    band_codes = _codes(bands)
+    id_codes = _codes(sector_ids)
+    keep = ((distances_km <= max_distance_km) & (pcis[first] >= 0) & (pcis[second] >= 0) &
+            (band_codes[first] == band_codes[second]) & (id_codes[first] != id_codes[second]))
+    first, second, distances_km, bearings = first[keep], second[keep], distances_km[keep], bearings[keep]
+    if pair_weights is not None:
+        pair_weights = np.asarray(pair_weights, dtype=float)[keep]
+
+    pci1, pci2 = pcis[first], pcis[second]
+    same_pci = pci1 == pci2
+    same_mod3 = pci1 % 3 == pci2 % 3
+    same_mod6 = pci1 % 6 == pci2 % 6
+    conflict = ((detect_collision & same_pci) |
+                (detect_mod3 & ~same_pci & same_mod3) |
+                (detect_mod6 & ~same_pci & ~same_mod3 & same_mod6))
+    overlap1, overlap2 = _overlaps(first, second, bearings, azimuths, beamwidths)
+
+    issues = []
+    for k in np.nonzero(conflict & _affected(overlap1, overlap2, overlap_threshold, pair_weights))[0]:
+        # Collision (same PCI) is most severe
+        if same_pci[k]:
+            conflict_type, severity = 'collision', 'Critical'
+        elif same_mod3[k]:
+            conflict_type, severity = 'mod3', 'High'
+        else:
+            conflict_type, severity = 'mod6', 'Medium'
+        issues.append(_with_interference({
+            'type': PCI_CONFLICT,
+            'sector1': int(first[k]),
+            'sector2': int(second[k]),
+            'distance_km': float(distances_km[k]),
+            'conflict_type': conflict_type,
+            'pci1': int(pci1[k]),
+            'pci2': int(pci2[k]),
+            'overlap1': float(overlap1[k]),
+            'overlap2': float(overlap2[k]),
+            'severity': severity
+        }, pair_weights, k))
+    return issues
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Sector to sector interference matrices from predicted RSRP.
+
+Entry ``(victim, interferer)`` of a matrix is the area (km²) served by the
+victim sector where the interferer is received less than the C/I
+threshold below it, or the victim's traffic in that area when sector
+traffic is given. :func:`interference_overlap` accumulates the entries of
+one band from a :class:`core.neighbors.BestServers` pass into a sparse
+:class:`core.sparse.PairCounts`.
+
+:class:`InterferenceMatrix` keeps the CSR matrix with the IDs of its
+sectors and saves it as a compressed ``.npz`` file. PCI planning and the
+Interference Analysis load it by sector ID instead of recomputing the
+coverage.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .coverage import NO_SIGNAL
+from .neighbors import CHUNK_ROWS
+
+# Pixels where the carrier is less than this above an interferer (dB) count for the pair
+DEFAULT_CI_THRESHOLD_DB = 9.0
+
+FORMAT_VERSION = 1
+FILE_EXTENSION = '.npz'
+
+
+def served_areas(servers, pixel_areas, size, chunk_rows=CHUNK_ROWS):
+    """Best server area (km²) of every sector."""
+    areas = np.zeros(size)
+    rows = servers.shape[0]
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        best_server = servers.best_server[start:stop]
+        served = best_server >= 0
+        row_offsets, _ = np.nonzero(served)
+        areas += np.bincount(best_server[served], weights=np.asarray(pixel_areas)[start + row_offsets],
+                             minlength=size)
+    return areas
+
+
+def interference_overlap(servers, sectors, rsrp_window, pixel_areas, counts,
+                         ci_threshold_db=DEFAULT_CI_THRESHOLD_DB, traffic=None):
+    """Add the interfered area of every (victim, interferer) pair of a band to ``counts``.
+
+    The RSRP window of every interferer is compared with the best server
+    of its pixels; pixels where the best server is less than
+    ``ci_threshold_db`` stronger count for the pair (best server,
+    interferer).
+
+    :param servers: :class:`core.neighbors.BestServers` of the band.
+    :param sectors: Sectors of the band, as added to ``servers``.
+    :param rsrp_window: ``callable(sector)`` returning the ``(window,
+        rsrp)`` of :func:`core.coverage.sector_rsrp`, or None.
+    :param pixel_areas: Pixel area (km²) of every raster row.
+    :param counts: :class:`core.sparse.PairCounts` of the sectors.
+    :param traffic: Traffic of every sector, or None. The traffic of a
+        victim is spread evenly over its best server area and the entries
+        hold the interfered traffic instead of the area.
+    :returns: ``counts``.
+    """
+    pixel_areas = np.asarray(pixel_areas)
+    density = None
+    if traffic is not None:
+        areas = served_areas(servers, pixel_areas, counts.size)
+        density = np.zeros(counts.size)
+        np.divide(np.asarray(traffic, dtype=float), areas, out=density, where=areas > 0)
+
+    for sector in sectors:
+        result = rsrp_window(sector)
+        if result is None:
+            continue
+        window, rsrp = result
+        victims = servers.best_server[window]
+        interfered = ((victims >= 0) & (victims != sector) & (rsrp > NO_SIGNAL) &
+                      (servers.best[window] - rsrp < ci_threshold_db))
+        row_offsets, _ = np.nonzero(interfered)
+        victims = victims[interfered]
+        weights = pixel_areas[window[0].start + row_offsets]
+        if density is not None:
+            weights = weights * density[victims]
+        counts.add(victims, np.full(len(victims), sector), weights)
+    return counts
+
+
+class InterferenceMatrix:
+    """Sparse interference matrix with the IDs of its sectors.
+
+    :param sector_ids: ID of every matrix row and column.
+    :param indptr, indices, data: CSR arrays; rows are victims, columns
+        interferers.
+    :param metadata: JSON serializable settings the matrix was built with.
+    """
+
+    def __init__(self, sector_ids, indptr, indices, data, metadata=None):
+        self.sector_ids = [str(sector_id) for sector_id in sector_ids]
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.metadata = dict(metadata or {})
+        if len(self.indptr) != len(self.sector_ids) + 1:
+            raise ValueError('The matrix does not match its sector IDs.')
+        self._positions = None
+
+    @classmethod
+    def from_counts(cls, sector_ids, counts, metadata=None):
+        """Matrix of a :class:`core.sparse.PairCounts` over ``sector_ids``."""
+        return cls(sector_ids, *counts.to_csr(), metadata=metadata)
+
+    def __len__(self):
+        return len(self.sector_ids)
+
+    @property
+    def pair_count(self):
+        """Number of stored (victim, interferer) entries."""
+        return len(self.data)
+
+    def position(self, sector_id):
+        """Matrix position of a sector ID, None when unknown; duplicates map to the first."""
+        if self._positions is None:
+            self._positions = {}
+            for index, value in enumerate(self.sector_ids):
+                self._positions.setdefault(value, index)
+        return self._positions.get(str(sector_id))
+
+    def value(self, victim_id, interferer_id):
+        """Entry of a pair of sector IDs, 0 when they do not interfere."""
+        victim = self.position(victim_id)
+        interferer = self.position(interferer_id)
+        if victim is None or interferer is None:
+            return 0.0
+        start, stop = self.indptr[victim], self.indptr[victim + 1]
+        found = np.nonzero(self.indices[start:stop] == interferer)[0]
+        return float(self.data[start + found[0]]) if len(found) else 0.0
+
+    def symmetric_pairs(self, sector_ids):
+        """Interfering pairs among ``sector_ids``, e.g. the rows of a layer.
+
+        :returns: ``(first, second, values)`` of every pair ``first <
+            second`` of positions in ``sector_ids``, sorted; values sum both
+            directions. Sectors unknown to the matrix have no pairs.
+        """
+        lookup = np.full(len(self), -1, dtype=np.int64)
+        for row, sector_id in enumerate(sector_ids):
+            position = self.position(sector_id)
+            if position is not None and lookup[position] < 0:
+                lookup[position] = row
+        victims = lookup[np.repeat(np.arange(len(self)), np.diff(self.indptr))]
+        interferers = lookup[self.indices]
+        known = (victims >= 0) & (interferers >= 0) & (victims != interferers)
+        first = np.minimum(victims[known], interferers[known])
+        second = np.maximum(victims[known], interferers[known])
+        size = max(len(sector_ids), 1)
+        keys, inverse = np.unique(first * size + second, return_inverse=True)
+        values = np.bincount(inverse.reshape(-1), weights=self.data[known], minlength=len(keys))
+        first, second = np.divmod(keys, size)
+        return first, second, values
+
+    def channel_cost(self, channels):
+        """Interference between sectors on the same channel, the cost of a frequency plan.
+
+        :param channels: Channel of every matrix sector.
+        """
+        channels = np.asarray(channels)
+        victims = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return float(self.data[channels[victims] == channels[self.indices]].sum())
+
+    def save(self, target):
+        """Write the matrix to a compressed ``.npz`` file, given as a path or a binary file."""
+        if isinstance(target, (str, os.PathLike)):
+            # An open file keeps NumPy from appending .npz to other extensions
+            with open(target, 'wb') as matrix_file:
+                self.save(matrix_file)
+            return
+        np.savez_compressed(
+                target,
+                format_version=np.array(FORMAT_VERSION),
+                sector_ids=np.array(self.sector_ids, dtype=str),
+                indptr=self.indptr,
+                indices=self.indices,
+                data=self.data,
+                metadata=np.array(json.dumps(self.metadata)))
+
+    @classmethod
+    def load(cls, source):
+        """Read a matrix written by :meth:`save` from a path or a binary file."""
+        with np.load(source, allow_pickle=False) as arrays:
+            if int(arrays['format_version']) > FORMAT_VERSION:
+                raise ValueError('The matrix was written by a newer version of RF Tools.')
+            return cls(arrays['sector_ids'].tolist(), arrays['indptr'], arrays['indices'],
+                       arrays['data'], json.loads(str(arrays['metadata'])))
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""Cell KPI time series in a local SQLite store with pre-computed rollups.
+
+Hourly KPI exports (one row per cell and hour, one column per KPI) are
+ingested once into ``kpi_hourly``. Daily and weekly rollups (samples, sum,
+minimum, maximum, mean) are recomputed at ingest for the periods the new
+rows touch, so dashboard queries read a few rows instead of rescanning the
+raw exports:
+
+* the tables are ``WITHOUT ROWID`` with ``(kpi, period, cell_id)`` primary
+  keys, so one KPI and period is a contiguous range;
+* ``(kpi, period, mean, cell_id)`` indexes on the rollups answer "worst N
+  cells" by walking the index from one end;
+* ``(cell_id, kpi, period, value/mean)`` indexes cover per-cell series.
+
+Weeks start on Monday 00:00. Timestamps are stored as seconds since the
+epoch of the wall-clock time in the export, without time zone conversion.
+"""
+
+import calendar
+import csv
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from .text_io import counted_lines, csv_header, float_column, is_numeric
+
+HOURLY = 'hourly'
+DAILY = 'daily'
+WEEKLY = 'weekly'
+GRANULARITIES = (HOURLY, DAILY, WEEKLY)
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+# 1970-01-01 was a Thursday; Monday 1970-01-05 starts the first week
+_WEEK_ORIGIN = 4 * DAY
+
+# Export rows per ingest transaction
+CHUNK_ROWS = 100000
+
+TIME_NAMES = ('time', 'datetime', 'timestamp', 'date_time', 'period_start_time',
+              'start_time', 'starttime', 'date', 'hour')
+CELL_NAMES = ('cell', 'cell_id', 'cellid', 'cell_name', 'cellname', 'eutrancell',
+              'eutrancellfdd', 'nrcell', 'nrcellcu', 'sector')
+
+# Fallback formats when a timestamp is not ISO 8601
+TIME_FORMATS = ('%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M',
+                '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y%m%d%H%M', '%Y%m%d%H')
+
+_TABLES = {HOURLY: 'kpi_hourly', DAILY: 'kpi_daily', WEEKLY: 'kpi_weekly'}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS kpi_names (kpi TEXT PRIMARY KEY) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS kpi_hourly (kpi TEXT NOT NULL, period INTEGER NOT NULL, '
+    'cell_id TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (kpi, period, cell_id)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS kpi_hourly_cell ON kpi_hourly (cell_id, kpi, period, value)',
+) + tuple(
+    statement.format(table=_TABLES[granularity])
+    for granularity in (DAILY, WEEKLY)
+    for statement in (
+        'CREATE TABLE IF NOT EXISTS {table} (kpi TEXT NOT NULL, period INTEGER NOT NULL, '
+        'cell_id TEXT NOT NULL, samples INTEGER NOT NULL, total REAL NOT NULL, '
+        'minimum REAL NOT NULL, maximum REAL NOT NULL, mean REAL NOT NULL, '
+        'PRIMARY KEY (kpi, period, cell_id)) WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS {table}_rank ON {table} (kpi, period, mean, cell_id)',
+        'CREATE INDEX IF NOT EXISTS {table}_cell ON {table} (cell_id, kpi, period, mean)',
+    )
+)
+
+# Columns returned by the queries, hourly rows being single samples
+_STATISTICS = {
+    HOURLY: 'value, value, value, 1',
+    DAILY: 'mean, minimum, maximum, samples',
+    WEEKLY: 'mean, minimum, maximum, samples',
+}
+
+
+def period_start(timestamps, granularity):
+    """Start of the hour, day or week (Monday) of epoch ``timestamps``."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if granularity == HOURLY:
+        return timestamps - timestamps % HOUR
+    if granularity == DAILY:
+        return timestamps - timestamps % DAY
+    return timestamps - (timestamps - _WEEK_ORIGIN) % WEEK
+
+
+def _parse_time(text):
+    text = text.strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        parsed = None
+        for time_format in TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(text, time_format)
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            return None
+    if parsed.tzinfo is not None:
+        return calendar.timegm(parsed.utctimetuple())
+    return calendar.timegm(parsed.timetuple())
+
+
+def parse_times(values):
+    """Epoch seconds of timestamp strings, -1 where a value does not parse.
+
+    Exports repeat the same hour for every cell, so each distinct string is
+    parsed once.
+    """
+    unique, inverse = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    parsed = np.array([_parse_time(text) for text in unique.tolist()], dtype=object)
+    parsed[np.equal(parsed, None)] = -1
+    return parsed.astype(np.int64)[inverse]
+
+
+def guess_columns(columns):
+    """``(time column, cell column)`` recognised by name, None when not found."""
+    lowered = {name.lower().replace(' ', '_'): name for name in columns}
+    time_column = next((lowered[name] for name in TIME_NAMES if name in lowered), None)
+    cell_column = next((lowered[name] for name in CELL_NAMES if name in lowered), None)
+    return time_column, cell_column
+
+
+class KpiStore:
+    """SQLite KPI store; see the module documentation for the layout.
+
+    :param path: Database file, created when missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+        # Hour range per KPI ingested since the last rollup refresh
+        self._dirty = {}
+
+    def close(self):
+        self.conn.close()
+
+    def kpis(self):
+        """Names of the stored KPIs."""
+        return [row[0] for row in self.conn.execute('SELECT kpi FROM kpi_names ORDER BY kpi')]
+
+    def periods(self, kpi, granularity=WEEKLY):
+        """Period starts stored for ``kpi``, oldest first."""
+        sql = f'SELECT DISTINCT period FROM {_TABLES[granularity]} WHERE kpi = ? ORDER BY period'
+        return [row[0] for row in self.conn.execute(sql, (kpi,))]
+
+    def ingest(self, timestamps, cells, values):
+        """Store hourly samples; rollups are refreshed by :meth:`refresh_rollups`.
+
+        :param timestamps: Epoch seconds per row, negative when unknown.
+        :param cells: Cell identifier per row.
+        :param values: ``{kpi: float array}`` aligned with the rows; NaN
+            values are skipped.
+        :returns: Number of KPI values stored.
+        """
+        hours = period_start(timestamps, HOURLY)
+        cells = np.asarray(cells, dtype=object)
+        valid_rows = (np.asarray(timestamps) >= 0) & (cells != '')
+        stored = 0
+        with self.conn:
+            for kpi, column in values.items():
+                keep = valid_rows & np.isfinite(column)
+                if not keep.any():
+                    continue
+                kpi_hours = hours[keep]
+                self.conn.execute('INSERT OR IGNORE INTO kpi_names VALUES (?)', (kpi,))
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO kpi_hourly VALUES (?, ?, ?, ?)',
+                    zip([kpi] * len(kpi_hours), kpi_hours.tolist(), cells[keep].tolist(),
+                        column[keep].tolist()))
+                first, last = int(kpi_hours.min()), int(kpi_hours.max())
+                if kpi in self._dirty:
+                    first = min(first, self._dirty[kpi][0])
+                    last = max(last, self._dirty[kpi][1])
+                self._dirty[kpi] = (first, last)
+                stored += len(kpi_hours)
+        return stored
+
+    def refresh_rollups(self):
+        """Recompute the daily and weekly rollups of the hours ingested since the last call."""
+        with self.conn:
+            for kpi, (first, last) in self._dirty.items():
+                day_first, day_last = (int(value) for value in period_start([first, last], DAILY))
+                self.conn.execute('DELETE FROM kpi_daily WHERE kpi = ? AND period BETWEEN ? AND ?',
+                                  (kpi, day_first, day_last))
+                self.conn.execute(
+                    'INSERT INTO kpi_daily '
+                    'SELECT kpi, period - period % ? AS day, cell_id, COUNT(*), SUM(value), '
+                    'MIN(value), MAX(value), AVG(value) FROM kpi_hourly '
+                    'WHERE kpi = ? AND period BETWEEN ? AND ? GROUP BY day, cell_id',
+                    (DAY, kpi, day_first, day_last + DAY - 1))
+
+                week_first, week_last = (int(value) for value in period_start([first, last], WEEKLY))
+                self.conn.execute('DELETE FROM kpi_weekly WHERE kpi = ? AND period BETWEEN ? AND ?',
+                                  (kpi, week_first, week_last))
+                self.conn.execute(
+                    'INSERT INTO kpi_weekly '
+                    'SELECT kpi, period - (period - ?) % ? AS week, cell_id, SUM(samples), '
+                    'SUM(total), MIN(minimum), MAX(maximum), SUM(total) / SUM(samples) '
+                    'FROM kpi_daily WHERE kpi = ? AND period BETWEEN ? AND ? GROUP BY week, cell_id',
+                    (_WEEK_ORIGIN, WEEK, kpi, week_first, week_last + WEEK - 1))
+        self._dirty = {}
+
+    def ingest_csv(self, path, time_column=None, cell_column=None, chunk_rows=CHUNK_ROWS,
+                   progress=None, encoding='utf-8'):
+        """Stream a wide KPI export into the store and refresh the rollups.
+
+        Every column other than the time and cell columns whose values in
+        the first chunk are numeric is a KPI.
+
+        :param progress: Optional ``callback(bytes read, total bytes)``.
+        :returns: Number of KPI values stored.
+        """
+        header, delimiter = csv_header(path, encoding)
+        guessed_time, guessed_cell = guess_columns(header)
+        time_column = time_column or guessed_time
+        cell_column = cell_column or guessed_cell
+        if time_column not in header or cell_column not in header:
+            raise ValueError('The export needs a time column and a cell column.')
+        time_idx = header.index(time_column)
+        cell_idx = header.index(cell_column)
+        width = len(header)
+        kpi_columns = None
+        position = [0]
+        total_bytes = max(os.path.getsize(path), 1)
+        stored = 0
+
+        def store(rows):
+            nonlocal kpi_columns
+            columns = list(zip(*rows))
+            if kpi_columns is None:
+                kpi_columns = [i for i in range(width) if i not in (time_idx, cell_idx)
+                               and is_numeric(columns[i])]
+            timestamps = parse_times(columns[time_idx])
+            cells = np.array([value.strip() for value in columns[cell_idx]], dtype=object)
+            return self.ingest(timestamps, cells,
+                               {header[i]: float_column(columns[i]) for i in kpi_columns})
+
+        try:
+            with open(path, 'rb') as handle:
+                reader = csv.reader(counted_lines(handle, position, encoding), delimiter=delimiter)
+                next(reader, None)
+                rows = []
+                for row in reader:
+                    if not row:
+                        continue
+                    if len(row) != width:
+                        row = (row + [''] * width)[:width]
+                    rows.append(row)
+                    if len(rows) >= chunk_rows:
+                        stored += store(rows)
+                        rows = []
+                        if progress is not None:
+                            progress(position[0], total_bytes)
+                if rows:
+                    stored += store(rows)
+        finally:
+            # Rows of the chunks already committed stay consistent with their rollups
+            self.refresh_rollups()
+        return stored
+
+    def worst_cells(self, kpi, period, granularity=WEEKLY, fraction=0.01, higher_is_worse=False):
+        """Cells with the worst mean ``kpi`` in ``period``.
+
+        :param fraction: Share of the cells reporting in the period, at least one cell.
+        :returns: ``(cell_id, mean, minimum, maximum, samples)`` tuples, worst first.
+        """
+        table = _TABLES[granularity]
+        value = 'value' if granularity == HOURLY else 'mean'
+        count = self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE kpi = ? AND period = ?',
+                                  (kpi, period)).fetchone()[0]
+        if not count:
+            return []
+        limit = max(1, int(math.ceil(count * fraction)))
+        order = 'DESC' if higher_is_worse else 'ASC'
+        sql = (f'SELECT cell_id, {_STATISTICS[granularity]} FROM {table} '
+               f'WHERE kpi = ? AND period = ? ORDER BY {value} {order} LIMIT ?')
+        return self.conn.execute(sql, (kpi, period, limit)).fetchall()
+
+    def cell_values(self, kpi, period, granularity=WEEKLY):
+        """``{cell_id: mean}`` of ``kpi`` in ``period`` for joining to a cell layer."""
+        value = 'value' if granularity == HOURLY else 'mean'
+        sql = f'SELECT cell_id, {value} FROM {_TABLES[granularity]} WHERE kpi = ? AND period = ?'
+        return dict(self.conn.execute(sql, (kpi, period)))
+
+    def series(self, cell_id, kpi, granularity=DAILY):
+        """``(period, mean)`` pairs of one cell, oldest first."""
+        value = 'value' if granularity == HOURLY else 'mean'
+        sql = (f'SELECT period, {value} FROM {_TABLES[granularity]} '
+               f'WHERE cell_id = ? AND kpi = ? ORDER BY period')
+        return self.conn.execute(sql, (cell_id, kpi)).fetchall()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Automatic neighbor relations from best server overlap.
+
+A :class:`BestServers` pass keeps the strongest and second strongest
+sector of every pixel while the RSRP windows of the sectors (see
+:func:`core.coverage.sector_rsrp`) are added one by one. Pixels where the
+second server is within the handover margin of the best one are handover
+boundaries: :func:`handover_overlap` sums their area per (best, second)
+sector pair into a sparse :class:`core.sparse.PairCounts`, and
+:func:`top_neighbors` ranks the neighbors of every sector by that area.
+"""
+
+import numpy as np
+
+from .coverage import NO_SIGNAL
+from .geodesy import meters_per_degree
+
+# Handover margin (dB): second servers at most this much below the best one
+HANDOVER_MARGIN_DB = 6.0
+# Weakest second server RSRP (dBm) taking part in a handover
+MIN_RSRP_DBM = -110.0
+# Neighbors kept per sector, the usual size of an intra-frequency list
+DEFAULT_TOP_N = 32
+# Raster rows of one handover boundary chunk
+CHUNK_ROWS = 256
+
+
+def pixel_areas_km2(yy, resolution):
+    """Pixel area (km²) of every row of a north up raster in degrees."""
+    m_lon, m_lat = meters_per_degree(yy[:, 0])
+    return m_lon * m_lat * resolution * resolution / 1e6
+
+
+class BestServers:
+    """Best and second best server of every pixel of a raster.
+
+    Servers are sector indices, -1 where no sector reaches the pixel; RSRP
+    values are in dBm, :data:`core.coverage.NO_SIGNAL` without a server.
+    """
+
+    def __init__(self, rows, cols):
+        self.best = np.full((rows, cols), NO_SIGNAL, dtype=np.float32)
+        self.second = np.full((rows, cols), NO_SIGNAL, dtype=np.float32)
+        self.best_server = np.full((rows, cols), -1, dtype=np.int32)
+        self.second_server = np.full((rows, cols), -1, dtype=np.int32)
+
+    @property
+    def shape(self):
+        return self.best.shape
+
+    def add(self, sector, window, rsrp):
+        """Add the RSRP window of ``sector`` from :func:`core.coverage.sector_rsrp`."""
+        best = self.best[window]
+        second = self.second[window]
+        best_server = self.best_server[window]
+        second_server = self.second_server[window]
+        rsrp = np.asarray(rsrp, dtype=np.float32)
+
+        stronger = rsrp > best
+        # The displaced best server, or else the new sector, competes for second
+        runner_up = np.where(stronger, best, rsrp)
+        runner_up_server = np.where(stronger, best_server, sector)
+        better = runner_up > second
+        second[better] = runner_up[better]
+        second_server[better] = runner_up_server[better]
+        best[stronger] = rsrp[stronger]
+        best_server[stronger] = sector
+
+
+def handover_overlap(servers, pixel_areas, counts, margin_db=HANDOVER_MARGIN_DB,
+                     min_rsrp=MIN_RSRP_DBM, mutual=True, chunk_rows=CHUNK_ROWS):
+    """Add the handover boundary area of every sector pair to ``counts``.
+
+    A pixel counts for the pair (best server, second server) when the
+    second server is at least ``min_rsrp`` and within ``margin_db`` of the
+    best one. The raster is read in chunks of ``chunk_rows`` rows.
+
+    :param servers: :class:`BestServers` of the raster.
+    :param pixel_areas: Pixel area (km²) of every raster row, see :func:`pixel_areas_km2`.
+    :param counts: :class:`core.sparse.PairCounts` of the sectors.
+    :param mutual: Count every pixel for the reverse pair too, so that
+        relations are symmetric.
+    :returns: ``counts``.
+    """
+    rows = servers.shape[0]
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        best = servers.best[start:stop]
+        second = servers.second[start:stop]
+        second_server = servers.second_server[start:stop]
+        boundary = (second_server >= 0) & (second >= min_rsrp) & (best - second <= margin_db)
+        row_offsets, _ = np.nonzero(boundary)
+        source = servers.best_server[start:stop][boundary]
+        target = second_server[boundary]
+        area = np.asarray(pixel_areas)[start + row_offsets]
+        counts.add(source, target, area)
+        if mutual:
+            counts.add(target, source, area)
+    return counts
+
+
+def top_neighbors(indptr, indices, data, top_n=DEFAULT_TOP_N):
+    """The ``top_n`` neighbors of every sector with the largest overlap.
+
+    :param indptr, indices, data: CSR overlap matrix, e.g. from
+        :meth:`core.sparse.PairCounts.to_csr`.
+    :returns: ``(sources, targets, ranks, overlaps)`` sorted by source then
+        rank; rank 1 is the largest overlap, ties go to the lower target.
+    """
+    counts = np.diff(indptr)
+    sources = np.repeat(np.arange(len(counts)), counts)
+    order = np.lexsort((indices, -np.asarray(data), sources))
+    # Sorting keeps every source's entries in its own CSR range
+    ranks = np.arange(len(order)) - np.repeat(indptr[:-1], counts) + 1
+    keep = ranks <= top_n
+    return sources[keep], indices[order][keep], ranks[keep], np.asarray(data)[order][keep]
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""PCI and RSI planning of LTE/NR cells.
+
+:func:`plan_group` assigns PCIs, then RSI ranges, to the cells of one
+technology and band, greedily in cell order. A PCI is not reused within
+the reuse distance and, optionally, mod 3 / mod 6 equal PCIs are kept
+apart; an RSI range is not reused within 0.6 times the reuse distance.
+Locked cells keep their existing values and constrain the others. The
+PCIs of cells interfering with each other according to an interference
+matrix are planned as if the cells were within the reuse distance.
+"""
+
+import math
+
+import numpy as np
+
+from .geodesy import local_distance
+
+# 3GPP TS 36.211 Table 5.7.2-2, "not high speed" set:
+# {ncs_config: (Ncs value, max cell range km, RSIs needed at max range)}
+NCS_TABLE = {
+    0: (0, 118.93, 64),
+    1: (13, 0.79, 1),
+    2: (15, 1.08, 2),
+    3: (18, 1.51, 2),
+    4: (22, 2.08, 2),
+    5: (26, 2.65, 2),
+    6: (32, 3.51, 3),
+    7: (38, 4.37, 3),
+    8: (46, 5.51, 4),
+    9: (59, 7.37, 5),
+    10: (76, 9.80, 6),
+    11: (93, 12.23, 8),
+    12: (119, 15.95, 10),
+    13: (167, 22.82, 13),   # Unrestricted set, suitable for most deployments
+    14: (279, 38.84, 22),
+    15: (419, 58.86, 32),
+}
+DEFAULT_NCS_CONFIG = 13
+
+# Max cell range multiplier of the PRACH preamble formats
+PRACH_FORMAT_MULTIPLIERS = {
+    0: 1.0,    # Format 0: 1.4 ms (FDD)
+    1: 1.15,   # Format 1: 2 ms (FDD)
+    2: 0.85,   # Format 2: 2 ms short sequence (FDD)
+    3: 1.3,    # Format 3: 3 ms (FDD)
+    4: 0.95,   # Format 4: 1.6 ms (TDD, sequence length 139)
+}
+
+# 3GPP maximum number of root sequences of a cell
+MAX_RSI_COUNT = 64
+
+# RSI reuse distance relative to the PCI reuse distance
+RSI_REUSE_FACTOR = 0.6
+# Cell range assumed without a cell range field, relative to the reuse distance
+DEFAULT_RANGE_FACTOR = 1 / 2.5
+
+LOCKED_TEXT = ('true', '1', 'yes', 'locked')
+
+
+def rsi_count(cell_range_km, ncs_config=DEFAULT_NCS_CONFIG, prach_format=0):
+    """Number of root sequences needed by a cell of ``cell_range_km``.
+
+    The count of the Ncs configuration scales linearly with the cell range
+    up to the max range of the configuration and PRACH format.
+    """
+    if ncs_config not in NCS_TABLE:
+        ncs_config = DEFAULT_NCS_CONFIG
+    _, max_range, max_rsi_count = NCS_TABLE[ncs_config]
+    adjusted_max_range = max_range * PRACH_FORMAT_MULTIPLIERS.get(prach_format, 1.0)
+
+    if cell_range_km <= adjusted_max_range:
+        num_rsi = max(1, math.ceil(cell_range_km / adjusted_max_range * max_rsi_count))
+    else:
+        # Beyond the range of this Ncs: conservative max count
+        num_rsi = max_rsi_count
+    return min(num_rsi, MAX_RSI_COUNT)
+
+
+def is_locked(value):
+    """Truth of a locked attribute: bool, 0/1 or 'true'/'yes'/'locked' text."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        return value.lower() in LOCKED_TEXT
+    return False
+
+
+def _code(value):
+    """Integer PCI/RSI of an attribute value, None when invalid."""
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def planning_groups(techs, bands):
+    """Rows of every ``(tech, band)`` group, in row order; missing bands are 'Unknown'."""
+    groups = {}
+    for row, (tech, band) in enumerate(zip(techs, bands)):
+        key = (str(tech), str(band if band is not None else 'Unknown'))
+        groups.setdefault(key, []).append(row)
+    return groups
+
+
+def _wrap(value, low, high):
+    return low + (value - high - 1) if value > high else value
+
+
+def plan_group(rows, x, y, has_point, locked, existing_pcis=None, existing_rsis=None,
+               cell_ranges=None, pci_range=(0, 503), rsi_range=(0, 837), reuse_distance_km=5.0,
+               plan_pci=True, plan_rsi=True, check_pci_mod=True, prach_format=0,
+               geographic=True, unit_to_meters=1.0, interferers=None):
+    """Plan the PCIs and RSIs of the cells ``rows`` of one group.
+
+    :param x: Cell x coordinates of all rows.
+    :param has_point: True for rows with a location.
+    :param locked: True for rows keeping their existing values.
+    :param existing_pcis: Existing PCI attribute of all rows, or None.
+    :param existing_rsis: Existing RSI attribute of all rows, or None.
+    :param cell_ranges: Cell range (km) attribute of all rows, or None.
+    :param interferers: ``{row: set of rows}`` of the cells interfering
+        with every cell, e.g. from
+        :meth:`core.interference_matrix.InterferenceMatrix.symmetric_pairs`.
+    :returns: ``{row: (pci, rsi, rsi count)}``; values that were not
+        planned are None.
+    """
+    pci_min, pci_max = pci_range
+    rsi_min, rsi_max = rsi_range
+    assignments = {}
+    used_pcis = set()
+    used_rsis = set()
+
+    # Locked cells keep their existing values
+    for row in rows:
+        if not locked[row]:
+            continue
+        pci_val = _code(existing_pcis[row]) if plan_pci and existing_pcis is not None else None
+        rsi_val = _code(existing_rsis[row]) if plan_rsi and existing_rsis is not None else None
+        if pci_val is not None:
+            used_pcis.add(pci_val)
+        if rsi_val is not None:
+            used_rsis.add(rsi_val)
+        assignments[row] = (pci_val, rsi_val, None)
+
+    # Located cells of the group: {row: position in the coordinate arrays}
+    located = [row for row in rows if has_point[row]]
+    position = {row: i for i, row in enumerate(located)}
+    group_x = np.asarray(x, dtype=float)[located]
+    group_y = np.asarray(y, dtype=float)[located]
+
+    def distances_km(row):
+        return local_distance(x[row], y[row], group_x, group_y, geographic, unit_to_meters) / 1000.0
+
+    # Located cells per PCI, seeded with the locked PCIs
+    pci_cells = {}
+    if existing_pcis is not None:
+        for row in rows:
+            pci_val = _code(existing_pcis[row]) if locked[row] else None
+            if pci_val is not None:
+                pci_cells.setdefault(pci_val, [])
+                if row in position:
+                    pci_cells[pci_val].append(position[row])
+
+    if plan_pci:
+        next_pci = pci_min
+        for row in rows:
+            if locked[row]:
+                continue
+            located_row = row in position
+            if located_row:
+                row_distances = distances_km(row)
+                # Interfering cells count as within every distance
+                if interferers and interferers.get(row):
+                    row_distances[[position[other] for other in interferers[row] if other in position]] = 0.0
+
+            # First free PCI from the last assigned one, respecting reuse and mod 3/6 distances
+            candidate = next_pci
+            assigned = False
+            attempts = 0
+            while not assigned and attempts < pci_max - pci_min + 1:
+                if candidate not in used_pcis:
+                    reuse_ok = True
+                    if located_row and candidate in pci_cells:
+                        reuse_ok = not any(row_distances[other] < reuse_distance_km
+                                           for other in pci_cells[candidate])
+                    mod_ok = True
+                    if reuse_ok and check_pci_mod and located_row:
+                        for other_pci, others in pci_cells.items():
+                            # Mod 3 equal PCIs within twice, mod 6 equal PCIs within the reuse distance
+                            if other_pci % 3 == candidate % 3:
+                                limit = reuse_distance_km * 2
+                            elif other_pci % 6 == candidate % 6:
+                                limit = reuse_distance_km
+                            else:
+                                continue
+                            if any(row_distances[other] < limit for other in others):
+                                mod_ok = False
+                                break
+                    assigned = reuse_ok and mod_ok
+                if not assigned:
+                    candidate = candidate + 1 if candidate < pci_max else pci_min
+                    attempts += 1
+
+            if not assigned:
+                # No PCI meets the distances: next unused one, or next in sequence when all are used
+                candidate = next_pci
+                for _ in range(pci_max - pci_min + 1):
+                    if candidate not in used_pcis:
+                        break
+                    candidate = candidate + 1 if candidate < pci_max else pci_min
+                if candidate in used_pcis:
+                    candidate = next_pci
+
+            used_pcis.add(candidate)
+            pci_cells.setdefault(candidate, [])
+            if located_row:
+                pci_cells[candidate].append(position[row])
+            assignments[row] = (candidate,) + assignments.get(row, (None, None, None))[1:]
+            next_pci = candidate + 1 if candidate < pci_max else pci_min
+
+    if plan_rsi:
+        rsi_reuse_distance_km = reuse_distance_km * RSI_REUSE_FACTOR
+        default_cell_range_km = reuse_distance_km * DEFAULT_RANGE_FACTOR
+        # Located cells per RSI
+        rsi_cells = {}
+        next_rsi = rsi_min
+        for row in rows:
+            if locked[row]:
+                continue
+            located_row = row in position
+            if located_row:
+                row_distances = distances_km(row)
+
+            cell_range_km = default_cell_range_km
+            if cell_ranges is not None and cell_ranges[row] is not None:
+                try:
+                    cell_range_km = float(cell_ranges[row])
+                except (ValueError, TypeError):
+                    pass
+            count = rsi_count(cell_range_km, DEFAULT_NCS_CONFIG, prach_format)
+
+            # First free range of ``count`` RSIs, wrapping around, not reused nearby
+            candidate = next_rsi
+            assigned = False
+            attempts = 0
+            while not assigned and attempts < rsi_max - rsi_min + 1:
+                span = [_wrap(rsi, rsi_min, rsi_max) for rsi in range(candidate, candidate + count)]
+                if not any(rsi in used_rsis for rsi in span):
+                    assigned = not located_row or not any(
+                        row_distances[other] < rsi_reuse_distance_km
+                        for rsi in span for other in rsi_cells.get(rsi, ()))
+                if not assigned:
+                    candidate = candidate + 1 if candidate < rsi_max else rsi_min
+                    attempts += 1
+
+            if not assigned:
+                # No range meets the distance: next unused range, or reuse from next_rsi
+                candidate = next_rsi
+                available = False
+                for _ in range((rsi_max - rsi_min + 1) // count):
+                    span = [_wrap(candidate + i, rsi_min, rsi_max) for i in range(count)]
+                    available = not any(rsi in used_rsis for rsi in span)
+                    if available:
+                        break
+                    candidate += count
+                    if candidate > rsi_max:
+                        candidate = rsi_min
+                if not available:
+                    candidate = next_rsi
+                    span = [_wrap(candidate + i, rsi_min, rsi_max) for i in range(count)]
+
+            for rsi in span:
+                used_rsis.add(rsi)
+                rsi_cells.setdefault(rsi, [])
+                if located_row:
+                    rsi_cells[rsi].append(position[row])
+            assignments[row] = (assignments.get(row, (None, None, None))[0], candidate, count)
+            next_rsi = _wrap(candidate + count, rsi_min, rsi_max)
+
+    return assignments
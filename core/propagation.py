@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Empirical path loss models evaluated on scalars or NumPy arrays."""
+
+import numpy as np
+
+FREE_SPACE = 'Free Space Path Loss'
+OKUMURA_HATA_URBAN = 'Okumura-Hata (Urban)'
+OKUMURA_HATA_SUBURBAN = 'Okumura-Hata (Suburban)'
+OKUMURA_HATA_RURAL = 'Okumura-Hata (Rural)'
+COST231_HATA = 'COST-231 Hata'
+COST231_HATA_URBAN = 'COST-231 Hata (Urban)'
+COST231_HATA_SUBURBAN = 'COST-231 Hata (Suburban)'
+ERICSSON_9999 = 'Ericsson 9999'
+SUI_SUBURBAN = 'SUI (Suburban)'
+SUI_URBAN = 'SUI (Urban)'
+ECC33_URBAN = 'ECC-33 (Urban)'
+ECC33_SUBURBAN = 'ECC-33 (Suburban)'
+
+MODELS = [FREE_SPACE, OKUMURA_HATA_URBAN, OKUMURA_HATA_SUBURBAN, OKUMURA_HATA_RURAL,
+          COST231_HATA, COST231_HATA_URBAN, COST231_HATA_SUBURBAN, ERICSSON_9999,
+          SUI_SUBURBAN, SUI_URBAN, ECC33_URBAN, ECC33_SUBURBAN]
+
+# SUI reference distance (km) and path loss exponents of terrain types B and C
+SUI_REFERENCE_KM = 0.1
+SUI_EXPONENTS = {SUI_SUBURBAN: 4.0, SUI_URBAN: 4.6}
+
+
+def free_space_loss(frequency_mhz, distance_km):
+    """FSPL = 20*log10(d) + 20*log10(f) + 32.45 with d in km and f in MHz."""
+    return 20 * np.log10(distance_km) + 20 * np.log10(frequency_mhz) + 32.45
+
+
+def _mobile_antenna_correction(log_f):
+    """Hata a(hm) for a 1.5 m mobile antenna in a small/medium city."""
+    return (1.1 * log_f - 0.7) * 1.5 - (1.56 * log_f - 0.8)
+
+
+def path_loss(frequency_mhz, distance_km, height_m, model):
+    """Path loss in dB for the named model; unknown names use free space.
+
+    :param frequency_mhz: Carrier frequency in MHz.
+    :param distance_km: Distance from the site in kilometers.
+    :param height_m: Base station antenna height in meters.
+    :param model: One of :data:`MODELS`.
+    """
+    frequency_mhz = np.asarray(frequency_mhz, dtype=float)
+    distance_km = np.asarray(distance_km, dtype=float)
+    height_m = np.asarray(height_m, dtype=float)
+
+    log_f = np.log10(frequency_mhz)
+    log_h = np.log10(height_m)
+    log_d = np.log10(distance_km)
+    # Okumura-Hata urban loss without the mobile antenna correction
+    hata = 69.55 + 26.16 * log_f - 13.82 * log_h + (44.9 - 6.55 * log_h) * log_d
+
+    if model == OKUMURA_HATA_URBAN:
+        # Valid for: 150-1500 MHz, 1-20 km, 30-200m BS height
+        return hata - _mobile_antenna_correction(log_f)
+
+    if model in (OKUMURA_HATA_SUBURBAN, ECC33_SUBURBAN):
+        return hata - (2 * np.log10(frequency_mhz / 28.0) ** 2 + 5.4)
+
+    if model == OKUMURA_HATA_RURAL:
+        return hata - (4.78 * log_f ** 2 - 18.33 * log_f + 40.94)
+
+    if model == ECC33_URBAN:
+        return hata
+
+    if model in (COST231_HATA, COST231_HATA_URBAN, COST231_HATA_SUBURBAN):
+        # COST-231 Hata extension (for 1500-2000 MHz), C_m = 3 in urban areas
+        c_m = 0 if model == COST231_HATA_SUBURBAN else 3
+        return (46.3 + 33.9 * log_f - 13.82 * log_h - _mobile_antenna_correction(log_f) +
+                (44.9 - 6.55 * log_h) * log_d + c_m)
+
+    if model == ERICSSON_9999:
+        # The coverage raster's Ericsson 9999 form, kept so predictions match earlier releases
+        return 36.2 + 30.2 * log_f + 12.0 * log_h + (43.2 - 3.1 * log_h) * log_d
+
+    if model in SUI_EXPONENTS:
+        # Stanford University Interim model for terrain types B/C and a 2 m reference mobile
+        intercept = 20 * np.log10(4 * np.pi * SUI_REFERENCE_KM * 1000 * frequency_mhz / 300)
+        return (intercept + 10 * SUI_EXPONENTS[model] * np.log10(distance_km / SUI_REFERENCE_KM) +
+                6 * np.log10(frequency_mhz / 2000) - 10.8 * np.log10(1.5 / 2))
+
+    return free_space_loss(frequency_mhz, distance_km)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Per-phase timing and memory statistics of one tool run.
+
+:meth:`RunStats.phase` is a context manager timing one named phase of a
+run (feature loading, path loss, layer writing...). With ``trace_memory``
+the tracemalloc peak of every phase is recorded too, and with a
+``profile_dir`` the whole run is profiled with cProfile and dumped there.
+Phases are timed one after the other; they are not meant to be nested.
+"""
+
+import cProfile
+import json
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def _megabytes(size):
+    return size / (1024.0 * 1024.0)
+
+
+class RunStats:
+    """Statistics of one run of a tool.
+
+    :param tool: Tool name, used in the log and the profile file name.
+    :param trace_memory: Record the tracemalloc peak of every phase.
+    :param profile_dir: Folder receiving a cProfile dump of the run.
+    """
+
+    def __init__(self, tool, trace_memory=False, profile_dir=None):
+        self.tool = tool
+        self.trace_memory = trace_memory
+        self.started = datetime.now()
+        self.phases = []
+        self.counts = {}
+        self.seconds = None
+        self.peak_bytes = None
+        self.profile_path = None
+        self._start = time.perf_counter()
+
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._profile_dir = profile_dir
+        self._profiler = None
+        if profile_dir:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self._profiler = profiler
+            except ValueError:
+                # Another profiler is already active
+                pass
+
+    @contextmanager
+    def phase(self, name):
+        """Time the ``with`` block as phase ``name``."""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'name': name, 'seconds': round(time.perf_counter() - start, 6)}
+            if tracing:
+                record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            self.phases.append(record)
+
+    def count(self, name, value):
+        """Record a size of the run, e.g. the number of sectors."""
+        self.counts[name] = value
+
+    def finish(self):
+        """Stop the clock, the memory tracing and the profiler; safe to call twice."""
+        if self.seconds is not None:
+            return self
+        self.seconds = round(time.perf_counter() - self._start, 6)
+        if self.trace_memory and tracemalloc.is_tracing():
+            peaks = [phase['peak_bytes'] for phase in self.phases if 'peak_bytes' in phase]
+            self.peak_bytes = max(peaks + [tracemalloc.get_traced_memory()[1]])
+            if self._started_tracing:
+                tracemalloc.stop()
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self._profile_dir, exist_ok=True)
+            name = re.sub(r'\W+', '_', self.tool).strip('_').lower()
+            self.profile_path = os.path.join(
+                self._profile_dir, f'{name}_{self.started:%Y%m%d_%H%M%S}.prof')
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+        return self
+
+    def to_dict(self):
+        timed = sum(phase['seconds'] for phase in self.phases)
+        return {
+            'tool': self.tool,
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': self.seconds,
+            'other_seconds': round(self.seconds - timed, 6) if self.seconds is not None else None,
+            'phases': self.phases,
+            'counts': self.counts,
+            'peak_bytes': self.peak_bytes,
+            'profile': self.profile_path,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def summary(self):
+        """Human readable statistics, one phase per line."""
+        total = self.seconds if self.seconds is not None else time.perf_counter() - self._start
+        lines = [f'{self.tool}: {total:.3f} s']
+        for phase in self.phases:
+            share = 100.0 * phase['seconds'] / total if total else 0.0
+            line = f"  {phase['name']:<20} {phase['seconds']:9.3f} s  {share:5.1f}%"
+            if 'peak_bytes' in phase:
+                line += f"  peak {_megabytes(phase['peak_bytes']):.1f} MB"
+            lines.append(line)
+        if self.counts:
+            lines.append('  ' + ', '.join(f'{name}: {value:,}' if isinstance(value, int) else f'{name}: {value}'
+                                          for name, value in self.counts.items()))
+        if self.peak_bytes is not None:
+            lines.append(f'  Peak traced memory: {_megabytes(self.peak_bytes):.1f} MB')
+        if self.profile_path:
+            lines.append(f'  Profile: {self.profile_path}')
+        return '\n'.join(lines)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Vectorized sector footprint construction for Site See."""
+
+import numpy as np
+
+# Arc resolution: one vertex every 5 degrees with at least 10 segments
+ARC_STEP_DEG = 5.0
+MIN_ARC_SEGMENTS = 10
+
+# Nested multi-band sectors: each band is 15% smaller, never below 40%
+BAND_SCALE_STEP = 0.15
+BAND_SCALE_MIN = 0.4
+
+# Azimuth color bins used by Site See: (lower, upper, label), upper bound of
+# the last bin is inclusive
+AZIMUTH_BINS = [
+    (0.0, 60.0, '0-60'),
+    (60.0, 180.0, '60-180'),
+    (180.0, 300.0, '180-300'),
+    (300.0, 360.0, '300-360'),
+]
+
+_WKB_LITTLE_ENDIAN = 1
+_WKB_POLYGON = 3
+
+
+def arc_segment_counts(beamwidth):
+    """Return the number of arc segments used for each sector."""
+    beamwidth = np.asarray(beamwidth, dtype=float)
+    return np.maximum((beamwidth / ARC_STEP_DEG).astype(int), MIN_ARC_SEGMENTS)
+
+
+def nested_band_scale(band_index, num_bands):
+    """Return the radius scale factor of each sector in a multi-band group.
+
+    The lowest band (index 0) keeps its full size and every following band
+    is drawn progressively smaller so all bands stay visible.
+    """
+    band_index = np.asarray(band_index, dtype=float)
+    num_bands = np.asarray(num_bands)
+    scale = np.maximum(BAND_SCALE_MIN, 1.0 - band_index * BAND_SCALE_STEP)
+    return np.where(num_bands > 1, scale, 1.0)
+
+
+def sector_rings(x, y, azimuth, beamwidth, radius_x, radius_y):
+    """Compute closed sector rings for many sectors in one pass.
+
+    Sectors are grouped by arc segment count so that each group is built
+    with a single broadcasted sin/cos evaluation.
+
+    :returns: List of ``(indices, coords)`` tuples where ``coords`` has the
+        shape ``(len(indices), segments + 3, 2)``: the center, the arc
+        vertices and the center again to close the ring.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    azimuth = np.asarray(azimuth, dtype=float)
+    beamwidth = np.asarray(beamwidth, dtype=float)
+    radius_x = np.broadcast_to(np.asarray(radius_x, dtype=float), x.shape)
+    radius_y = np.broadcast_to(np.asarray(radius_y, dtype=float), x.shape)
+
+    segments = arc_segment_counts(beamwidth)
+    groups = []
+    for num_segments in np.unique(segments):
+        indices = np.nonzero(segments == num_segments)[0]
+        start = azimuth[indices] - beamwidth[indices] / 2.0
+        span = beamwidth[indices]
+        steps = np.arange(num_segments + 1, dtype=float)
+        angles = np.radians(start[:, None] + span[:, None] * steps[None, :] / num_segments)
+
+        cx = x[indices][:, None]
+        cy = y[indices][:, None]
+        coords = np.empty((len(indices), num_segments + 3, 2), dtype=float)
+        coords[:, 0, 0] = x[indices]
+        coords[:, 0, 1] = y[indices]
+        coords[:, 1:-1, 0] = cx + radius_x[indices][:, None] * np.sin(angles)
+        coords[:, 1:-1, 1] = cy + radius_y[indices][:, None] * np.cos(angles)
+        coords[:, -1, :] = coords[:, 0, :]
+        groups.append((indices, coords))
+    return groups
+
+
+def polygon_wkb(coords):
+    """Encode single-ring polygons as little-endian WKB.
+
+    :param coords: Array of shape ``(n, points, 2)``.
+    :returns: List of ``n`` WKB byte strings.
+    """
+    count, num_points = coords.shape[0], coords.shape[1]
+    record = np.dtype([
+        ('order', 'u1'),
+        ('type', '<u4'),
+        ('rings', '<u4'),
+        ('points', '<u4'),
+        ('xy', '<f8', (num_points, 2)),
+    ])
+    records = np.empty(count, dtype=record)
+    records['order'] = _WKB_LITTLE_ENDIAN
+    records['type'] = _WKB_POLYGON
+    records['rings'] = 1
+    records['points'] = num_points
+    records['xy'] = coords
+
+    buffer = records.tobytes()
+    size = record.itemsize
+    return [buffer[i * size:(i + 1) * size] for i in range(count)]
+
+
+def sector_polygons_wkb(x, y, azimuth, beamwidth, radius_x, radius_y):
+    """Build WKB polygons for all sectors, returned in input order."""
+    x = np.asarray(x, dtype=float)
+    wkbs = [None] * len(x)
+    for indices, coords in sector_rings(x, y, azimuth, beamwidth, radius_x, radius_y):
+        for index, wkb in zip(indices, polygon_wkb(coords)):
+            wkbs[index] = wkb
+    return wkbs
+
+
+def band_ranks(site_lat, site_lon, azimuth, band):
+    """Rank sectors by band within each co-located (lat, lon, azimuth) group.
+
+    Groups use the same rounding as Site See (6 decimals for coordinates,
+    1 decimal for azimuth). Within a group the lowest band gets rank 0 and
+    ties keep their input order.
+
+    :returns: Tuple ``(rank, group_size)`` of integer arrays.
+    """
+    keys = np.column_stack([
+        np.round(np.asarray(site_lat, dtype=float), 6),
+        np.round(np.asarray(site_lon, dtype=float), 6),
+        np.round(np.asarray(azimuth, dtype=float), 1),
+    ])
+    if len(keys) == 0:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty
+
+    _, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.ravel()
+    group_size = np.bincount(group)
+
+    order = np.lexsort((np.asarray(band, dtype=float), group))
+    group_start = np.concatenate(([0], np.cumsum(group_size)[:-1]))
+    rank = np.empty(len(group), dtype=int)
+    rank[order] = np.arange(len(group)) - group_start[group[order]]
+    return rank, group_size[group]
+
+
+def unique_sites(site_lat, site_lon):
+    """Return indices of the first sector seen at each distinct site."""
+    keys = np.column_stack([
+        np.round(np.asarray(site_lat, dtype=float), 6),
+        np.round(np.asarray(site_lon, dtype=float), 6),
+    ])
+    if len(keys) == 0:
+        return np.zeros(0, dtype=int)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return np.sort(first)
+
+
+def azimuth_bin_labels(azimuth):
+    """Return the labels of the azimuth bins that contain at least one sector."""
+    azimuth = np.asarray(azimuth, dtype=float)
+    labels = []
+    for i, (lower, upper, label) in enumerate(AZIMUTH_BINS):
+        if i == len(AZIMUTH_BINS) - 1:
+            inside = (azimuth >= lower) & (azimuth <= upper)
+        else:
+            inside = (azimuth >= lower) & (azimuth < upper)
+        if inside.any():
+            labels.append(label)
+    return labels
+
+
+def band_label(value):
+    """Format a band attribute value as a category label.
+
+    Whole numbers lose their decimal part (``1800.0`` -> ``'1800'``); values
+    that are empty or missing return None.
+    """
+    if value is None or not str(value).strip():
+        return None
+    try:
+        band_float = float(value)
+    except (ValueError, TypeError):
+        return str(value)
+    if band_float.is_integer():
+        return str(int(band_float))
+    return str(band_float)
+
+
+def band_labels(values):
+    """Return the sorted distinct band labels of the given attribute values.
+
+    Numeric labels sort by value; anything else is placed after them.
+    """
+    labels = {band_label(value) for value in values}
+    labels.discard(None)
+
+    def sort_key(label):
+        return float(label) if label.replace('.', '', 1).isdigit() else float('inf')
+
+    return sorted(labels, key=sort_key)
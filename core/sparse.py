@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Sparse sector x sector matrices accumulated from pixel pairs.
+
+:class:`PairCounts` sums weights of ``(row, column)`` pairs given in
+batches, COO style, and hands the result out in CSR form. Pending batches
+are merged into the distinct pairs every ``compact_every`` entries, so the
+memory stays proportional to the number of distinct pairs, not to the
+number of pixels that produced them, and no dense matrix is ever built.
+"""
+
+import numpy as np
+
+# Pending pair entries merged into the distinct pairs at once
+COMPACT_EVERY = 1 << 21
+
+
+class PairCounts:
+    """Summed weights of the pairs of a ``size`` x ``size`` matrix.
+
+    :param size: Number of rows and columns (sectors).
+    :param compact_every: Pending entries that trigger a merge.
+    """
+
+    def __init__(self, size, compact_every=COMPACT_EVERY):
+        self.size = int(size)
+        self.compact_every = compact_every
+        self._keys = np.empty(0, dtype=np.int64)
+        self._totals = np.empty(0, dtype=float)
+        self._pending_keys = []
+        self._pending_weights = []
+        self._pending = 0
+
+    def add(self, rows, cols, weights=None):
+        """Add ``weights`` (1 per pair by default) to the pairs ``(rows[k], cols[k])``."""
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        cols = np.asarray(cols, dtype=np.int64).reshape(-1)
+        if not len(rows):
+            return
+        if weights is None:
+            weights = np.ones(len(rows))
+        else:
+            weights = np.broadcast_to(np.asarray(weights, dtype=float), rows.shape).copy()
+        self._pending_keys.append(rows * self.size + cols)
+        self._pending_weights.append(weights)
+        self._pending += len(rows)
+        if self._pending >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys] + self._pending_keys)
+        weights = np.concatenate([self._totals] + self._pending_weights)
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._totals = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(self._keys))
+        self._pending_keys = []
+        self._pending_weights = []
+        self._pending = 0
+
+    def __len__(self):
+        """Number of distinct pairs."""
+        self._compact()
+        return len(self._keys)
+
+    def to_coo(self):
+        """``(rows, cols, totals)`` of the distinct pairs, sorted by row then column."""
+        self._compact()
+        rows, cols = np.divmod(self._keys, self.size)
+        return rows, cols, self._totals.copy()
+
+    def to_csr(self):
+        """``(indptr, indices, data)`` CSR arrays of the matrix, columns sorted within rows."""
+        rows, cols, totals = self.to_coo()
+        indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.size), out=indptr[1:])
+        return indptr, cols, totals
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Radius queries over sector points in a local metric projection.
+
+Points are projected once around their centroid with
+:func:`core.geodesy.project_local` and indexed with SciPy's ``cKDTree``
+when SciPy is available, or with a uniform NumPy grid otherwise. A single
+projection scale over a wide area stretches distances slightly, so
+queries search a slightly larger radius and the candidates are refined
+with :func:`core.geodesy.local_distance`.
+"""
+
+import numpy as np
+
+from .geodesy import local_distance, meters_per_degree, project_local
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+class PointIndex:
+    """Spatial index answering "all points within r meters" queries.
+
+    :param x: Point x coordinates (longitude or map units).
+    :param y: Point y coordinates (latitude or map units).
+    :param geographic: True when ``x``/``y`` are degrees.
+    :param unit_to_meters: Map unit to meter factor for planar coordinates.
+    :param use_scipy: Use ``cKDTree`` when SciPy is installed.
+    """
+
+    def __init__(self, x, y, geographic=True, unit_to_meters=1.0, use_scipy=True):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.geographic = geographic
+        self.unit_to_meters = unit_to_meters
+
+        if len(self.x):
+            self._x0 = float(np.mean(self.x))
+            self._y0 = float(np.mean(self.y))
+        else:
+            self._x0 = self._y0 = 0.0
+        px, py = project_local(self.x, self.y, self._x0, self._y0, geographic, unit_to_meters)
+        self._points = np.column_stack([px, py]) if len(self.x) else np.zeros((0, 2))
+        self._stretch = self._projection_stretch()
+
+        self._tree = None
+        self._cells = None
+        if use_scipy and cKDTree is not None:
+            self._tree = cKDTree(self._points)
+        else:
+            self._build_grid()
+
+    def __len__(self):
+        return len(self.x)
+
+    def _projection_stretch(self):
+        """Largest ratio of projected to true distance over the point extent."""
+        if not self.geographic or not len(self.y):
+            return 1.0
+        m_lon0, m_lat0 = meters_per_degree(self._y0)
+        m_lon, m_lat = meters_per_degree(np.array([self.y.min(), self.y.max()]))
+        ratio = max(np.max(m_lon0 / np.maximum(m_lon, 1e-9)), np.max(m_lat0 / m_lat), 1.0)
+        return float(ratio) * 1.001
+
+    def _build_grid(self):
+        """Bucket the projected points into square cells."""
+        count = len(self._points)
+        if count == 0:
+            self._cell_size = 1.0
+            self._cells = {}
+            return
+        span = np.ptp(self._points, axis=0)
+        area = max(span[0], 1.0) * max(span[1], 1.0)
+        # About four points per cell on average
+        self._cell_size = float(np.sqrt(area * 4.0 / count))
+        keys = np.floor(self._points / self._cell_size).astype(np.int64)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        sorted_keys = keys[order]
+        boundaries = np.nonzero(np.any(np.diff(sorted_keys, axis=0) != 0, axis=1))[0] + 1
+        self._cells = {
+            (int(group_keys[0, 0]), int(group_keys[0, 1])): group
+            for group_keys, group in zip(np.split(sorted_keys, boundaries), np.split(order, boundaries))
+        }
+
+    def _candidates(self, px, py, radius):
+        """Indices of points within ``radius`` of a projected location."""
+        if self._tree is not None:
+            return np.asarray(self._tree.query_ball_point([px, py], radius), dtype=np.int64)
+
+        c0x = int(np.floor((px - radius) / self._cell_size))
+        c1x = int(np.floor((px + radius) / self._cell_size))
+        c0y = int(np.floor((py - radius) / self._cell_size))
+        c1y = int(np.floor((py + radius) / self._cell_size))
+        if (c1x - c0x + 1) * (c1y - c0y + 1) > len(self._cells):
+            # The window covers more cells than are occupied: scan everything
+            candidates = np.arange(len(self._points))
+        else:
+            groups = [self._cells[(cx, cy)]
+                      for cx in range(c0x, c1x + 1) for cy in range(c0y, c1y + 1)
+                      if (cx, cy) in self._cells]
+            if not groups:
+                return np.zeros(0, dtype=np.int64)
+            candidates = np.concatenate(groups)
+        d = np.hypot(self._points[candidates, 0] - px, self._points[candidates, 1] - py)
+        return candidates[d <= radius]
+
+    def query_radius(self, x, y, radius_m):
+        """Return ``(indices, distances_m)`` of all points within ``radius_m``.
+
+        Indices are sorted ascending and distances are local ellipsoidal
+        distances from ``(x, y)``.
+        """
+        if not len(self.x):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        px, py = project_local(x, y, self._x0, self._y0, self.geographic, self.unit_to_meters)
+        candidates = np.sort(self._candidates(float(px), float(py), radius_m * self._stretch))
+        distances = local_distance(x, y, self.x[candidates], self.y[candidates],
+                                   self.geographic, self.unit_to_meters)
+        inside = distances <= radius_m
+        return candidates[inside], distances[inside]
+
+    def neighbor_lists(self, radius_m):
+        """Radius neighbors of every indexed point, excluding the point itself.
+
+        :returns: CSR style ``(indptr, indices, distances_m)`` where the
+            neighbors of point ``i`` are ``indices[indptr[i]:indptr[i + 1]]``,
+            sorted by index.
+        """
+        count = len(self.x)
+        if count == 0:
+            return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        search_radius = radius_m * self._stretch
+        if self._tree is not None:
+            candidate_lists = self._tree.query_ball_point(self._points, search_radius)
+        else:
+            candidate_lists = [self._candidates(px, py, search_radius) for px, py in self._points]
+
+        lengths = np.fromiter((len(c) for c in candidate_lists), dtype=np.int64, count=count)
+        rows = np.repeat(np.arange(count), lengths)
+        cols = (np.concatenate([np.asarray(c, dtype=np.int64) for c in candidate_lists])
+                if lengths.sum() else np.zeros(0, dtype=np.int64))
+
+        # Refine with the true local distance and drop the self pairs
+        distances = local_distance(self.x[rows], self.y[rows], self.x[cols], self.y[cols],
+                                   self.geographic, self.unit_to_meters)
+        keep = (rows != cols) & (distances <= radius_m)
+        rows, cols, distances = rows[keep], cols[keep], distances[keep]
+        order = np.lexsort((cols, rows))
+        rows, cols, distances = rows[order], cols[order], distances[order]
+
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=count))
+        return indptr, cols, distances
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Helpers for streaming delimited text exports into column arrays.
+
+Shared by the drive-test, vendor CM and KPI importers: the CSV header and
+delimiter are sniffed from the start of a file, lines are decoded while
+the bytes read are counted for progress, and text columns are converted
+to float arrays with NaN for values that do not parse.
+"""
+
+import csv
+import io
+
+import numpy as np
+
+# Bytes read to detect the file format and the CSV dialect
+SNIFF_BYTES = 64 * 1024
+
+
+def sample_text(path, size=SNIFF_BYTES, encoding='utf-8'):
+    """The first ``size`` bytes of a file, decoded."""
+    with open(path, 'rb') as handle:
+        return handle.read(size).decode(encoding, errors='replace')
+
+
+def csv_header(path, encoding='utf-8'):
+    """Header columns and delimiter of a delimited text file."""
+    sample = sample_text(path, encoding=encoding)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = ','
+    header = next(csv.reader(io.StringIO(sample), delimiter=delimiter), [])
+    return [name.strip().lstrip('\ufeff') for name in header], delimiter
+
+
+def float_column(values):
+    """Float array of string values, NaN where a value does not parse."""
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        pass
+    column = np.empty(len(values))
+    for i, value in enumerate(values):
+        try:
+            column[i] = float(value)
+        except ValueError:
+            column[i] = np.nan
+    return column
+
+
+def is_numeric(values):
+    """True when every non-empty value parses as a float (and one exists)."""
+    present = [value for value in values if value.strip()]
+    if not present:
+        return False
+    return not np.isnan(float_column(present)).any()
+
+
+def counted_lines(handle, position, encoding):
+    """Decoded lines of a binary file, adding the bytes read to ``position[0]``."""
+    for raw in handle:
+        position[0] += len(raw)
+        yield raw.decode(encoding, errors='replace')
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Electrical tilt optimization for one sector or a whole network at once.
+
+:func:`optimal_tilt` is the reference per-sector rule used by the Tilt
+Optimizer. :func:`optimal_tilts` applies the same rule to arrays of
+sectors with neighbor aggregates from :func:`neighbor_aggregates`, and
+must stay numerically identical to the scalar version.
+"""
+
+import math
+
+import numpy as np
+
+from .propagation import (COST231_HATA, FREE_SPACE, OKUMURA_HATA_SUBURBAN, OKUMURA_HATA_URBAN,
+                          path_loss)
+
+# Default sector parameters used when a field is missing or invalid
+DEFAULT_HEIGHT = 30.0
+DEFAULT_V_BEAMWIDTH = 10.0
+DEFAULT_H_BEAMWIDTH = 65.0
+DEFAULT_PMAX = 43.0
+DEFAULT_ANTENNA_GAIN = 18.0
+DEFAULT_FREQUENCY = 2100.0
+
+# Models the tilt rule has always evaluated; other choices keep the original free space loss
+TILT_MODELS = (FREE_SPACE, OKUMURA_HATA_URBAN, OKUMURA_HATA_SUBURBAN, COST231_HATA)
+
+# Tilt limits for macro cells (degrees)
+MIN_TILT = 0.0
+MAX_TILT = 15.0
+
+
+def tilt_path_loss(frequency_mhz, distance_km, height_m, model):
+    """Path loss of the tilt optimizers: free space for models outside :data:`TILT_MODELS`."""
+    return path_loss(frequency_mhz, distance_km, height_m, model if model in TILT_MODELS else FREE_SPACE)
+
+
+def optimal_tilt(height, v_beamwidth, h_beamwidth, pmax, antenna_gain, frequency,
+                 propagation_model, target_distance, neighbor_distances=(), neighbor_heights=()):
+    """Optimal electrical downtilt (degrees) of one sector.
+
+    :param target_distance: Coverage target distance in km.
+    :param neighbor_distances: Distances (km) of the neighboring sectors.
+    :param neighbor_heights: Antenna heights (m) of the neighboring sectors.
+    """
+    # Geometric tilt: angle from horizontal to the target point
+    geometric_tilt = math.degrees(math.atan(height / (target_distance * 1000.0)))
+
+    # Received power at target distance
+    rx_power = pmax + antenna_gain - float(tilt_path_loss(frequency, target_distance, height, propagation_model))
+
+    # Strong signal: tilt down to limit overshoot; weak signal: tilt up to extend coverage
+    signal_adjustment = 0.0
+    if rx_power > -70:
+        signal_adjustment += 1.0
+    elif rx_power < -100:
+        signal_adjustment -= 0.5
+
+    # Narrow beams (< 45°) can use higher tilt, wide beams (> 90°) lower tilt
+    beamwidth_adjustment = 0.0
+    if h_beamwidth < 45:
+        beamwidth_adjustment += 0.5
+    elif h_beamwidth > 90:
+        beamwidth_adjustment -= 0.5
+
+    # Close neighbors add tilt; higher/lower neighbors shift it
+    neighbor_adjustment = 0.0
+    if len(neighbor_distances):
+        avg_distance = sum(neighbor_distances) / len(neighbor_distances)
+        avg_height_diff = sum(abs(h - height) for h in neighbor_heights) / len(neighbor_heights)
+
+        if avg_distance < target_distance * 0.5:
+            neighbor_adjustment += 1.0
+
+        if avg_height_diff > 10:
+            if sum(neighbor_heights) / len(neighbor_heights) > height:
+                neighbor_adjustment -= 0.5
+            else:
+                neighbor_adjustment += 0.5
+
+    # Main beam towards the target plus a third of the vertical beamwidth so the
+    # target sits between the beam peak and the 3 dB point of the 3GPP pattern
+    tilt = (geometric_tilt + (v_beamwidth / 3.0) + signal_adjustment +
+            beamwidth_adjustment + neighbor_adjustment)
+    return max(MIN_TILT, min(MAX_TILT, tilt))
+
+
+def neighbor_aggregates(indptr, neighbor_index, distances_km, heights):
+    """Per-sector neighbor statistics from a sparse (CSR) neighbor matrix.
+
+    :param indptr: Row pointers; the neighbors of sector ``i`` are
+        ``neighbor_index[indptr[i]:indptr[i + 1]]``.
+    :param neighbor_index: Column index of every neighbor entry.
+    :param distances_km: Distance of every neighbor entry in km.
+    :param heights: Antenna height of every sector.
+    :returns: ``(count, mean_distance, mean_height_diff, mean_height)``;
+        the means are 0 for sectors without neighbors.
+    """
+    heights = np.asarray(heights, dtype=float)
+    indptr = np.asarray(indptr, dtype=np.int64)
+    count = np.diff(indptr)
+    rows = np.repeat(np.arange(len(count)), count)
+    neighbor_heights = heights[np.asarray(neighbor_index, dtype=np.int64)]
+
+    size = len(count)
+    safe_count = np.maximum(count, 1)
+    mean_distance = np.bincount(rows, weights=distances_km, minlength=size) / safe_count
+    mean_height_diff = np.bincount(rows, weights=np.abs(neighbor_heights - heights[rows]),
+                                   minlength=size) / safe_count
+    mean_height = np.bincount(rows, weights=neighbor_heights, minlength=size) / safe_count
+    return count, mean_distance, mean_height_diff, mean_height
+
+
+def optimal_tilts(height, v_beamwidth, h_beamwidth, pmax, antenna_gain, frequency,
+                  propagation_model, target_distance, neighbor_count=None,
+                  mean_distance=None, mean_height_diff=None, mean_height=None):
+    """Vectorized :func:`optimal_tilt` over arrays of sectors.
+
+    Neighbor inputs are the per-sector aggregates returned by
+    :func:`neighbor_aggregates`; sectors without neighbors get no
+    neighbor adjustment.
+    """
+    height = np.asarray(height, dtype=float)
+    v_beamwidth = np.asarray(v_beamwidth, dtype=float)
+    h_beamwidth = np.asarray(h_beamwidth, dtype=float)
+
+    geometric_tilt = np.degrees(np.arctan(height / (target_distance * 1000.0)))
+    rx_power = (np.asarray(pmax, dtype=float) + np.asarray(antenna_gain, dtype=float) -
+                tilt_path_loss(frequency, target_distance, height, propagation_model))
+
+    signal_adjustment = np.where(rx_power > -70, 1.0, np.where(rx_power < -100, -0.5, 0.0))
+    beamwidth_adjustment = np.where(h_beamwidth < 45, 0.5, np.where(h_beamwidth > 90, -0.5, 0.0))
+
+    neighbor_adjustment = np.zeros(height.shape)
+    if neighbor_count is not None:
+        has_neighbors = np.asarray(neighbor_count) > 0
+        close = has_neighbors & (np.asarray(mean_distance) < target_distance * 0.5)
+        uneven = has_neighbors & (np.asarray(mean_height_diff) > 10)
+        higher = np.asarray(mean_height) > height
+        neighbor_adjustment = (np.where(close, 1.0, 0.0) +
+                               np.where(uneven, np.where(higher, -0.5, 0.5), 0.0))
+
+    tilt = (geometric_tilt + (v_beamwidth / 3.0) + signal_adjustment +
+            beamwidth_adjustment + neighbor_adjustment)
+    return np.clip(tilt, MIN_TILT, MAX_TILT)
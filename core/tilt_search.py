@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""Coverage-driven electrical tilt search on a coarse RSRP/SINR surrogate.
+
+The network is rasterized once onto a low resolution metric grid. Every
+sector keeps a sparse footprint (the grid cells within its radius) with
+its tilt independent terms precomputed: EIRP minus path loss, horizontal
+pattern attenuation and elevation angle. Changing one sector's tilt only
+touches its footprint, so candidate tilts are scored from per-cell running
+totals (total received power and the two strongest servers) without
+recomputing the network.
+
+Received power uses the same EIRP - path loss convention as the tilt
+heuristics and the coverage prediction.
+"""
+
+import numpy as np
+
+from .antenna import angle_difference, combined_attenuation, horizontal_attenuation, vertical_attenuation
+from .geodesy import project_local
+from .tilt import tilt_path_loss
+
+# A cell is covered when its best server reaches this level (dBm)
+RX_POWER_THRESHOLD = -100.0
+# ... and served with good quality above this SINR (dB)
+SINR_THRESHOLD = -3.0
+# Thermal noise over 20 MHz with a 7 dB noise figure (dBm)
+NOISE_DBM = -94.4
+# Mobile antenna height (m) for the elevation angle
+UE_HEIGHT = 1.5
+# Covered cells also score their SINR in this range, scaled by SINR_WEIGHT
+SINR_SCORE_RANGE = (-10.0, 30.0)
+SINR_WEIGHT = 0.1
+
+# Tilt moves tried for each sector per sweep (degrees)
+TILT_STEPS = (-2.0, -1.0, 1.0, 2.0)
+MIN_TILT = 0.0
+MAX_TILT = 15.0
+
+
+def _mw(dbm):
+    return 10.0 ** (np.asarray(dbm, dtype=float) / 10.0)
+
+
+def _dbm(mw):
+    return 10.0 * np.log10(np.maximum(mw, 1e-30))
+
+
+class CoverageSurrogate:
+    """Sparse coarse-grid received power model of a network.
+
+    :param x: Sector x coordinates (longitude or map units).
+    :param y: Sector y coordinates (latitude or map units).
+    :param height: Antenna heights in meters.
+    :param azimuth: Antenna azimuths in degrees.
+    :param h_beamwidth: Horizontal 3 dB beamwidths in degrees.
+    :param v_beamwidth: Vertical 3 dB beamwidths in degrees.
+    :param eirp: EIRP (Pmax + antenna gain) in dBm.
+    :param frequency: Frequencies in MHz.
+    :param propagation_model: Path loss model name, see :func:`core.tilt.tilt_path_loss`.
+    :param radius_km: Footprint radius of every sector.
+    :param resolution_m: Grid cell size in meters.
+    """
+
+    def __init__(self, x, y, height, azimuth, h_beamwidth, v_beamwidth, eirp, frequency,
+                 propagation_model, radius_km, resolution_m, geographic=True, unit_to_meters=1.0,
+                 rx_power_threshold=RX_POWER_THRESHOLD, sinr_threshold=SINR_THRESHOLD,
+                 noise_dbm=NOISE_DBM):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        height = np.asarray(height, dtype=float)
+        self.count = len(x)
+        self.rx_power_threshold = rx_power_threshold
+        self.sinr_threshold = sinr_threshold
+        self.noise_mw = float(_mw(noise_dbm))
+
+        if self.count:
+            px, py = project_local(x, y, float(np.mean(x)), float(np.mean(y)), geographic, unit_to_meters)
+        else:
+            px = py = np.zeros(0)
+        radius_m = radius_km * 1000.0
+        x_min = (px.min() if self.count else 0.0) - radius_m
+        y_min = (py.min() if self.count else 0.0) - radius_m
+        nx = int(np.ceil(((px.max() if self.count else 0.0) + radius_m - x_min) / resolution_m)) + 1
+        ny = int(np.ceil(((py.max() if self.count else 0.0) + radius_m - y_min) / resolution_m)) + 1
+        self.grid_shape = (ny, nx)
+        self.resolution_m = resolution_m
+
+        # Footprint of every sector, stored sector by sector
+        cells = []
+        distances = []
+        bearings = []
+        sector_ptr = np.zeros(self.count + 1, dtype=np.int64)
+        reach = int(np.ceil(radius_m / resolution_m))
+        for s in range(self.count):
+            ci = int((px[s] - x_min) / resolution_m)
+            cj = int((py[s] - y_min) / resolution_m)
+            ii = np.arange(max(ci - reach, 0), min(ci + reach, nx - 1) + 1)
+            jj = np.arange(max(cj - reach, 0), min(cj + reach, ny - 1) + 1)
+            gi, gj = np.meshgrid(ii, jj)
+            dx = x_min + (gi + 0.5) * resolution_m - px[s]
+            dy = y_min + (gj + 0.5) * resolution_m - py[s]
+            d = np.hypot(dx, dy)
+            inside = (d <= radius_m) & (d >= 1.0)
+            cells.append((gj * nx + gi)[inside])
+            distances.append(d[inside])
+            bearings.append(np.degrees(np.arctan2(dx[inside], dy[inside])) % 360.0)
+            sector_ptr[s + 1] = sector_ptr[s] + int(np.count_nonzero(inside))
+
+        self.sector_ptr = sector_ptr
+        entry_sector = np.repeat(np.arange(self.count), np.diff(sector_ptr))
+        self.entry_sector = entry_sector
+        self.entry_cell = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+        distance_m = np.concatenate(distances) if distances else np.zeros(0)
+        bearing = np.concatenate(bearings) if bearings else np.zeros(0)
+
+        # Tilt independent terms of every footprint entry
+        eirp = np.asarray(eirp, dtype=float)
+        frequency = np.asarray(frequency, dtype=float)
+        self._base_db = eirp[entry_sector] - tilt_path_loss(
+            frequency[entry_sector], distance_m / 1000.0, height[entry_sector], propagation_model)
+        self._horizontal = horizontal_attenuation(
+            angle_difference(bearing, np.asarray(azimuth, dtype=float)[entry_sector]),
+            np.asarray(h_beamwidth, dtype=float)[entry_sector])
+        self._elevation = np.degrees(np.arctan2(height[entry_sector] - UE_HEIGHT, distance_m))
+        self._v_beamwidth = np.asarray(v_beamwidth, dtype=float)
+
+        # Cell-major view of the entries for best server updates
+        num_cells = nx * ny
+        self._cell_order = np.argsort(self.entry_cell, kind='stable')
+        self._cell_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.entry_cell, minlength=num_cells))))
+        self.served_cells = np.nonzero(np.diff(self._cell_ptr))[0]
+
+        self.tilts = np.zeros(self.count)
+        self._entry_mw = np.zeros(len(self.entry_cell))
+        self._total_mw = np.zeros(num_cells)
+        self._top1_mw = np.zeros(num_cells)
+        self._top1_sector = np.full(num_cells, -1, dtype=np.int64)
+        self._top2_mw = np.zeros(num_cells)
+        self._score = np.zeros(num_cells)
+
+    def _entries(self, sector):
+        return slice(self.sector_ptr[sector], self.sector_ptr[sector + 1])
+
+    def _sector_rx_dbm(self, sector, tilts):
+        """Received power of the sector footprint for one or more tilts."""
+        entries = self._entries(sector)
+        tilts = np.atleast_1d(np.asarray(tilts, dtype=float))[:, None]
+        vertical = vertical_attenuation(self._elevation[entries], tilts, self._v_beamwidth[sector])
+        return self._base_db[entries] - combined_attenuation(self._horizontal[entries], vertical)
+
+    def _cell_scores(self, best_mw, total_mw):
+        """Objective contribution of cells given best server and total power."""
+        rx_dbm = _dbm(best_mw)
+        sinr_db = _dbm(best_mw / (total_mw - best_mw + self.noise_mw))
+        covered = rx_dbm >= self.rx_power_threshold
+        good = covered & (sinr_db >= self.sinr_threshold)
+        low, high = SINR_SCORE_RANGE
+        sinr_score = np.clip((sinr_db - low) / (high - low), 0.0, 1.0)
+        return good + SINR_WEIGHT * covered * sinr_score
+
+    def _refresh_cells(self, cells):
+        """Recompute the two strongest servers and the score of some cells."""
+        starts = self._cell_ptr[cells]
+        counts = self._cell_ptr[cells + 1] - starts
+        segment = np.repeat(np.arange(len(cells)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = self._cell_order[np.repeat(starts, counts) + offsets]
+        values = self._entry_mw[entries]
+
+        order = np.lexsort((-values, segment))
+        first = np.cumsum(counts) - counts
+        ranked = entries[order]
+        self._top1_mw[cells] = self._entry_mw[ranked[first]]
+        self._top1_sector[cells] = self.entry_sector[ranked[first]]
+        has_second = counts > 1
+        top2 = np.zeros(len(cells))
+        top2[has_second] = self._entry_mw[ranked[first[has_second] + 1]]
+        self._top2_mw[cells] = top2
+        self._score[cells] = self._cell_scores(self._top1_mw[cells], self._total_mw[cells])
+
+    def set_tilts(self, tilts):
+        """Evaluate the whole network for the given tilts."""
+        self.tilts = np.array(tilts, dtype=float)
+        for s in range(self.count):
+            self._entry_mw[self._entries(s)] = _mw(self._sector_rx_dbm(s, self.tilts[s])[0])
+        self._total_mw = np.bincount(self.entry_cell, weights=self._entry_mw,
+                                     minlength=len(self._total_mw))
+        if len(self.served_cells):
+            self._refresh_cells(self.served_cells)
+
+    def evaluate(self, sector, candidate_tilts):
+        """Objective change for moving ``sector`` to each candidate tilt."""
+        entries = self._entries(sector)
+        cells = self.entry_cell[entries]
+        new_mw = _mw(self._sector_rx_dbm(sector, candidate_tilts))
+        others_total = self._total_mw[cells] - self._entry_mw[entries]
+        others_best = np.where(self._top1_sector[cells] == sector, self._top2_mw[cells], self._top1_mw[cells])
+        best = np.maximum(new_mw, others_best)
+        scores = self._cell_scores(best, others_total + new_mw)
+        return scores.sum(axis=1) - self._score[cells].sum()
+
+    def apply(self, sector, tilt):
+        """Move one sector to a new tilt and update its footprint cells."""
+        entries = self._entries(sector)
+        cells = self.entry_cell[entries]
+        new_mw = _mw(self._sector_rx_dbm(sector, tilt)[0])
+        # Footprint cells are unique, so plain fancy indexing is safe
+        self._total_mw[cells] = np.maximum(self._total_mw[cells] + new_mw - self._entry_mw[entries], 0.0)
+        self._entry_mw[entries] = new_mw
+        self.tilts[sector] = tilt
+        self._refresh_cells(cells)
+
+    def objective(self):
+        """Total objective over all cells."""
+        return float(self._score.sum())
+
+    def metrics(self):
+        """Coverage and quality over the cells reached by any sector.
+
+        :returns: dict with ``coverage`` and ``good`` fractions and the
+            ``mean_sinr`` (dB) of covered cells.
+        """
+        cells = self.served_cells
+        if not len(cells):
+            return {'coverage': 0.0, 'good': 0.0, 'mean_sinr': 0.0}
+        best = self._top1_mw[cells]
+        total = self._total_mw[cells]
+        rx_dbm = _dbm(best)
+        sinr_db = _dbm(best / (total - best + self.noise_mw))
+        covered = rx_dbm >= self.rx_power_threshold
+        good = covered & (sinr_db >= self.sinr_threshold)
+        return {
+            'coverage': float(np.mean(covered)),
+            'good': float(np.mean(good)),
+            'mean_sinr': float(np.mean(sinr_db[covered])) if covered.any() else 0.0,
+        }
+
+
+def optimize_tilts(surrogate, initial_tilts, locked=None, steps=TILT_STEPS,
+                   min_tilt=MIN_TILT, max_tilt=MAX_TILT, max_sweeps=10, progress=None):
+    """Coordinate descent over sector tilts.
+
+    Each sweep visits every unlocked sector, scores the tilt moves in
+    ``steps`` on its footprint only and keeps the best improving one. The
+    search stops after a sweep without improvement or ``max_sweeps``.
+
+    :param progress: Optional ``callable(sweep, max_sweeps)`` called after
+        every sweep.
+    :returns: Array of optimized tilts.
+    """
+    tilts = np.clip(np.array(initial_tilts, dtype=float), min_tilt, max_tilt)
+    locked = np.zeros(len(tilts), dtype=bool) if locked is None else np.asarray(locked, dtype=bool)
+    steps = np.asarray(steps, dtype=float)
+    surrogate.set_tilts(tilts)
+
+    for sweep in range(max_sweeps):
+        moved = 0
+        for sector in range(len(tilts)):
+            if locked[sector]:
+                continue
+            candidates = np.unique(np.clip(tilts[sector] + steps, min_tilt, max_tilt))
+            candidates = candidates[candidates != tilts[sector]]
+            if not len(candidates):
+                continue
+            deltas = surrogate.evaluate(sector, candidates)
+            best = int(np.argmax(deltas))
+            if deltas[best] > 1e-9:
+                tilts[sector] = candidates[best]
+                surrogate.apply(sector, candidates[best])
+                moved += 1
+        if progress is not None:
+            progress(sweep + 1, max_sweeps)
+        if not moved:
+            break
+    return tilts
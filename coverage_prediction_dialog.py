@@ -1,42 +1,31 @@
 # -*- coding: utf-8 -*-
 
 import os
-import math
 import numpy as np
 import requests
 import json
 
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtGui import QColor
-from qgis.core import (QgsProject, QgsVectorLayer, QgsRasterLayer, 
+from qgis.core import (QgsProject, QgsRasterLayer, 
                        QgsRasterFileWriter, QgsRasterPipe, QgsRasterShader,
                        QgsColorRampShader, QgsSingleBandPseudoColorRenderer,
                        QgsPointXY, QgsRectangle, QgsCoordinateReferenceSystem,
-                       QgsCoordinateTransform, QgsWkbTypes)
+                       QgsCoordinateTransform)
 from qgis.gui import QgsMapToolExtent
 from osgeo import gdal, osr
 import tempfile
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'coverage_prediction_dialog_base.ui'))
-
-# Clutter loss values in dB based on land use type
-CLUTTER_LOSSES = {
-    'water': 0,
-    'forest': 10,
-    'wood': 10,
-    'grass': 3,
-    'meadow': 3,
-    'farmland': 4,
-    'residential': 12,
-    'commercial': 18,
-    'industrial': 20,
-    'retail': 18,
-    'default': 5
-}
+from .core.calibration import load_profiles
+from .core.coverage import (CLUTTER_LOSSES, NO_SIGNAL, add_site_coverage, clutter_loss_grid,
+                            raster_grid)
+from .dialog_state import FieldMappings, LayerList
+from .network_model import network_model
+from .run_statistics import finish_run, setup_panel, timed_run
+from .ui_loader import load_form
 
+FORM_CLASS = load_form('coverage_prediction_dialog_base.ui')
 
 class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
     def __init__(self, iface, parent=None):
@@ -59,6 +48,9 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         self.generateButton.clicked.connect(self._run_prediction)
         
         # Check if there's a draw button (new UI) or radio button (old UI)
+        if hasattr(self, 'calibrationFileButton'):
+            self.calibrationFileButton.clicked.connect(self._browse_calibration_file)
+
         if hasattr(self, 'drawExtentButton'):
             self.drawExtentButton.clicked.connect(self._draw_custom_extent)
         elif hasattr(self, 'useCustomExtentRadio'):
@@ -66,6 +58,7 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         
         # Initialize progress bar
         self.progressBar.setValue(0)
+        setup_panel(self)
         
         # Initialize extent info label
         if hasattr(self, 'extentInfoLabel'):
@@ -73,24 +66,6 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
 
         self._populate_layers()
     
-    def _safe_float(self, value, default=0.0):
-        """Safely convert a value to float, returning default if conversion fails."""
-        if value is None:
-            return default
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return default
-    
-    def _get_point_from_geometry(self, geom):
-        """Extract a point from any geometry type."""
-        if geom.type() == QgsWkbTypes.PointGeometry:
-            return geom.asPoint()
-        else:
-            # For LineString, Polygon, or other geometries, use centroid
-            centroid = geom.centroid()
-            return centroid.asPoint() if centroid else None
-    
     def _draw_custom_extent(self):
         """Start drawing custom extent on map."""
         reply = QtWidgets.QMessageBox.information(
@@ -209,16 +184,46 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
             duration=5
         )
 
+    def _browse_calibration_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Calibration Profile', self.calibrationFileLineEdit.text(),
+            'Calibration profiles (*.json);;All files (*)')
+        if path:
+            self.calibrationFileLineEdit.setText(path)
+
+    def _calibration_profile(self, model):
+        """Calibration profile of ``model`` from the selected file, None when not calibrated."""
+        if not hasattr(self, 'calibrationFileLineEdit'):
+            return None
+        path = self.calibrationFileLineEdit.text().strip()
+        if not path:
+            return None
+        profile = load_profiles(path).get(model)
+        if profile is None:
+            self.iface.messageBar().pushWarning(
+                'Coverage Prediction', f'No calibration for {model} in {os.path.basename(path)}; '
+                'using the uncalibrated model.')
+        return profile
+
     def _populate_layers(self):
-        self.layerComboBox.clear()
+        # Created first: selecting the first layer restores its fields
+        self._field_mappings = FieldMappings('CoveragePrediction', [
+            self.heightFieldComboBox,
+            self.azimuthFieldComboBox,
+            self.beamwidthFieldComboBox,
+            self.powerFieldComboBox,
+            self.gainFieldComboBox,
+            self.frequencyFieldComboBox,
+            self.bandFieldComboBox,
+        ])
         self._layers = []
-        for layer in QgsProject.instance().mapLayers().values():
-            if isinstance(layer, QgsVectorLayer):
-                self.layerComboBox.addItem(layer.name())
-                self._layers.append(layer)
+        self._layer_list = LayerList(self.layerComboBox, self._layers)
+        self._layer_list.fieldsChanged.connect(self._on_fields_changed)
 
-        if self._layers:
-            self._on_layer_changed(0)
+    def _on_fields_changed(self):
+        """Rebuild the field combos when fields of the selected layer change."""
+        with self._field_mappings.kept():
+            self._on_layer_changed(self.layerComboBox.currentIndex())
 
     def _on_layer_changed(self, index):
         for combo in [
@@ -249,7 +254,9 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
             self.gainFieldComboBox.addItem(name)
             self.frequencyFieldComboBox.addItem(name)
             self.bandFieldComboBox.addItem(name)
-    
+
+        self._field_mappings.restore(layer)
+
     def _on_band_field_changed(self, index):
         """Update band filter when band field selection changes."""
         layer_index = self.layerComboBox.currentIndex()
@@ -278,8 +285,7 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
             return
         
         unique_bands = set()
-        for feature in layer.getFeatures():
-            band_value = feature[band_idx]
+        for band_value in network_model(layer).values(band_field):
             if band_value is not None and band_value != '':
                 unique_bands.add(str(band_value))
         
@@ -287,6 +293,7 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         for band in sorted(unique_bands):
             self.bandFilterComboBox.addItem(band, band)
 
+    @timed_run('Coverage Prediction')
     def _run_prediction(self):
         if not self._layers:
             QtWidgets.QMessageBox.warning(self, 'Coverage Prediction', 'No vector layers available.')
@@ -298,6 +305,7 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
             return
 
         layer = self._layers[layer_index]
+        self._field_mappings.save(layer)
 
         # Get parameters
         height_field = self.heightFieldComboBox.currentText()
@@ -319,6 +327,12 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         output_name = self.outputNameLineEdit.text().strip() or 'Coverage_Prediction'
         use_clutter = self.useClutterCheckBox.isChecked()
         use_terrain = self.useTerrainCheckBox.isChecked()
+        try:
+            calibration = self._calibration_profile(propagation_model)
+        except (OSError, ValueError, KeyError) as e:
+            QtWidgets.QMessageBox.warning(self, 'Coverage Prediction',
+                                          f'Could not read the calibration profile: {e}')
+            return
         
         # Add band to output name
         if band_filter:
@@ -348,11 +362,13 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
                 layer, height_field, azimuth_field, beamwidth_field,
                 power_field, gain_field, frequency_field, band_field, band_filter,
                 propagation_model, max_distance_km, resolution_m,
-                output_name, extent, use_clutter, use_terrain, progress
+                output_name, extent, use_clutter, use_terrain, progress, calibration
             )
 
             if raster_layer:
-                QgsProject.instance().addMapLayer(raster_layer)
+                with self.run_stats.phase('add layer'):
+                    QgsProject.instance().addMapLayer(raster_layer)
+                finish_run(self, self.run_stats)
                 
                 # Show completion message with styling tip
                 msg = f'Coverage prediction complete: {output_name}\n\n'
@@ -372,8 +388,10 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
 
     def _generate_coverage_raster(self, layer, height_field, azimuth_field, beamwidth_field,
                                   power_field, gain_field, frequency_field, band_field, band_filter,
-                                  model, max_dist_km, resolution_m, output_name, extent, use_clutter, use_terrain, progress):
+                                  model, max_dist_km, resolution_m, output_name, extent, use_clutter, use_terrain, progress,
+                                  calibration=None):
         """Generate coverage prediction raster."""
+        run_stats = self.run_stats
         
         # Transform extent to WGS84 (EPSG:4326) if needed
         canvas_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
@@ -388,7 +406,8 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         if use_clutter:
             progress.setLabelText("Querying OpenStreetMap for clutter data...")
             progress.setValue(5)
-            clutter_data = self._query_osm_clutter(extent)
+            with run_stats.phase('osm clutter'):
+                clutter_data = self._query_osm_clutter(extent)
             if clutter_data:
                 progress.setLabelText("Processing clutter data...")
                 progress.setValue(10)
@@ -411,305 +430,113 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         if use_terrain:
             progress.setLabelText("Querying elevation data (SRTM)...")
             progress.setValue(8 if not use_clutter else 12)
-            elevation_grid = self._get_elevation_grid(extent, resolution_deg, rows, cols)
+            with run_stats.phase('elevation'):
+                elevation_grid = self._get_elevation_grid(extent, resolution_deg, rows, cols)
             if elevation_grid is not None:
                 progress.setLabelText("Processing terrain data...")
                 progress.setValue(15)
         
         # Initialize raster array with very low signal (-140 dBm)
-        raster_data = np.full((rows, cols), -140.0, dtype=np.float32)
-        
-        # Get field indices
-        fields = layer.fields()
-        height_idx = fields.indexFromName(height_field) if height_field else -1
-        azimuth_idx = fields.indexFromName(azimuth_field) if azimuth_field else -1
-        beamwidth_idx = fields.indexFromName(beamwidth_field) if beamwidth_field else -1
-        power_idx = fields.indexFromName(power_field) if power_field else -1
-        gain_idx = fields.indexFromName(gain_field) if gain_field else -1
-        frequency_idx = fields.indexFromName(frequency_field) if frequency_field else -1
-        band_idx = fields.indexFromName(band_field) if band_field else -1
+        raster_data = np.full((rows, cols), NO_SIGNAL, dtype=np.float32)
+        
+        # Site parameters from the shared network model of the layer
+        with run_stats.phase('load features'):
+            network = network_model(layer)
+            network.load([height_field, azimuth_field, beamwidth_field, power_field, gain_field,
+                          frequency_field, band_field])
+            heights = network.floats(height_field, 30.0)
+            azimuths = network.floats(azimuth_field, 0.0)
+            beamwidths = network.floats(beamwidth_field, 65.0)
+            powers = network.floats(power_field, 43.0)
+            gains = network.floats(gain_field, 18.0)
+            frequencies = network.floats(frequency_field, 2100.0)
         
         # Process each site (filter by band if specified)
-        features = list(layer.getFeatures())
-        if band_filter and band_idx != -1:
-            features = [f for f in features if str(f[band_idx]) == band_filter]
-            if not features:
+        rows_to_predict = network.positioned
+        if band_filter and band_field and layer.fields().indexFromName(band_field) != -1:
+            band_values = network.values(band_field)
+            rows_to_predict = [row for row in rows_to_predict if str(band_values[row]) == band_filter]
+            if not rows_to_predict:
                 QtWidgets.QMessageBox.warning(None, 'Coverage Prediction', 
                                             f'No features found with band = "{band_filter}"')
                 return None
         
-        for feat_idx, feat in enumerate(features):
-            if progress.wasCanceled():
-                return None
-            
-            progress.setValue(int(50 * feat_idx / len(features)))
-            
-            geom = feat.geometry()
-            if not geom or geom.isEmpty():
-                continue
-            
-            # Extract point from geometry (handles Point, LineString, Polygon, etc.)
-            site_point = self._get_point_from_geometry(geom)
-            if site_point is None:
-                continue
-            
-            # Get parameters (with safe conversion from field values)
-            height = self._safe_float(feat[height_idx], 30.0) if height_idx != -1 else 30.0
-            azimuth = self._safe_float(feat[azimuth_idx], 0.0) if azimuth_idx != -1 else 0.0
-            beamwidth = self._safe_float(feat[beamwidth_idx], 65.0) if beamwidth_idx != -1 else 65.0
-            power = self._safe_float(feat[power_idx], 43.0) if power_idx != -1 else 43.0
-            gain = self._safe_float(feat[gain_idx], 18.0) if gain_idx != -1 else 18.0
-            frequency = self._safe_float(feat[frequency_idx], 2100.0) if frequency_idx != -1 else 2100.0
-            
-            # Calculate coverage for this site
-            self._calculate_site_coverage(
-                raster_data, extent, resolution_deg, rows, cols,
-                site_point, height, azimuth, beamwidth, power, gain, frequency,
-                model, max_dist_km, clutter_data, elevation_grid
-            )
+        run_stats.count('sites', len(rows_to_predict))
+        run_stats.count('pixels', rows * cols)
+        with run_stats.phase('path loss'):
+            # Pixel centers and clutter losses are shared by every site
+            xx, yy = raster_grid(extent.xMinimum(), extent.yMaximum(), resolution_deg, rows, cols)
+            clutter_loss = clutter_loss_grid(xx, yy, clutter_data) if clutter_data else None
+
+            for site_idx, row in enumerate(rows_to_predict):
+                if progress.wasCanceled():
+                    return None
+
+                progress.setValue(int(50 * site_idx / len(rows_to_predict)))
+
+                # Calculate coverage for this site
+                add_site_coverage(
+                    raster_data, xx, yy, network.x[row], network.y[row], heights[row], azimuths[row],
+                    beamwidths[row], powers[row], gains[row], frequencies[row],
+                    model, max_dist_km, clutter_loss, elevation_grid, calibration
+                )
         
         progress.setValue(75)
         
-        # Create temporary GeoTIFF file with unique name to avoid permission issues
-        import time
-        temp_dir = tempfile.gettempdir()
-        timestamp = int(time.time() * 1000)  # milliseconds
-        output_file = os.path.join(temp_dir, f'{output_name}_{timestamp}.tif')
-        
-        # Write raster
-        driver = gdal.GetDriverByName('GTiff')
-        out_raster = driver.Create(output_file, cols, rows, 1, gdal.GDT_Float32)
-        
-        # Set geotransform
-        geotransform = (
-            extent.xMinimum(),
-            resolution_deg,
-            0,
-            extent.yMaximum(),
-            0,
-            -resolution_deg
-        )
-        out_raster.SetGeoTransform(geotransform)
-        
-        # Set projection (WGS84)
-        srs = osr.SpatialReference()
-        srs.ImportFromEPSG(4326)
-        out_raster.SetProjection(srs.ExportToWkt())
-        
-        # Write data
-        out_band = out_raster.GetRasterBand(1)
-        out_band.WriteArray(raster_data)
-        out_band.SetNoDataValue(-140)
-        
-        # Calculate and set statistics for proper rendering
-        stats = out_band.ComputeStatistics(False)
-        out_band.FlushCache()
-        
-        out_raster = None  # Close file
+        with run_stats.phase('write raster'):
+            # Create temporary GeoTIFF file with unique name to avoid permission issues
+            import time
+            temp_dir = tempfile.gettempdir()
+            timestamp = int(time.time() * 1000)  # milliseconds
+            output_file = os.path.join(temp_dir, f'{output_name}_{timestamp}.tif')
+
+            # Write raster
+            driver = gdal.GetDriverByName('GTiff')
+            out_raster = driver.Create(output_file, cols, rows, 1, gdal.GDT_Float32)
+
+            # Set geotransform
+            geotransform = (
+                extent.xMinimum(),
+                resolution_deg,
+                0,
+                extent.yMaximum(),
+                0,
+                -resolution_deg
+            )
+            out_raster.SetGeoTransform(geotransform)
+
+            # Set projection (WGS84)
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(4326)
+            out_raster.SetProjection(srs.ExportToWkt())
+
+            # Write data
+            out_band = out_raster.GetRasterBand(1)
+            out_band.WriteArray(raster_data)
+            out_band.SetNoDataValue(-140)
+
+            # Calculate and set statistics for proper rendering
+            stats = out_band.ComputeStatistics(False)
+            out_band.FlushCache()
+
+            out_raster = None  # Close file
         
         progress.setValue(90)
         
-        # Load raster layer
-        raster_layer = QgsRasterLayer(output_file, output_name)
-        
-        if raster_layer.isValid():
-            # Apply color ramp
-            self._apply_color_ramp(raster_layer)
-            # Refresh layer
-            raster_layer.triggerRepaint()
+        with run_stats.phase('style layer'):
+            # Load raster layer
+            raster_layer = QgsRasterLayer(output_file, output_name)
+
+            if raster_layer.isValid():
+                # Apply color ramp
+                self._apply_color_ramp(raster_layer)
+                # Refresh layer
+                raster_layer.triggerRepaint()
         
         progress.setValue(100)
         
         return raster_layer if raster_layer.isValid() else None
     
-    def _calculate_site_coverage(self, raster_data, extent, resolution_deg, rows, cols,
-                                 site_point, height, azimuth, beamwidth, power, gain, frequency,
-                                 model, max_dist_km, clutter_data=None, elevation_grid=None):
-        """Calculate coverage contribution from one site using vectorized operations."""
-        
-        # Create coordinate grids (vectorized)
-        x_coords = extent.xMinimum() + (np.arange(cols) + 0.5) * resolution_deg
-        y_coords = extent.yMaximum() - (np.arange(rows) + 0.5) * resolution_deg
-        
-        # Create meshgrid
-        xx, yy = np.meshgrid(x_coords, y_coords)
-        
-        # Calculate clutter loss grid if clutter data available
-        clutter_loss_grid = None
-        if clutter_data:
-            clutter_loss_grid = self._calculate_clutter_loss_grid(xx, yy, clutter_data)
-        
-        # Calculate terrain loss grid if elevation data available
-        terrain_loss_grid = None
-        if elevation_grid is not None:
-            terrain_loss_grid = self._calculate_terrain_loss_grid(
-                xx, yy, elevation_grid, site_point, height, frequency
-            )
-        
-        # Calculate distances (vectorized)
-        dx = xx - site_point.x()
-        dy = yy - site_point.y()
-        distance_deg = np.sqrt(dx*dx + dy*dy)
-        distance_km = distance_deg * 111.0
-        
-        # Create mask for valid distances
-        valid_mask = (distance_km <= max_dist_km) & (distance_km >= 0.001)
-        
-        # Only process valid pixels
-        if not np.any(valid_mask):
-            return
-        
-        # Calculate bearings (vectorized)
-        bearings = np.degrees(np.arctan2(dx, dy))
-        bearings[bearings < 0] += 360
-        
-        # Calculate angle differences from azimuth
-        angle_diff = np.abs(bearings - azimuth)
-        angle_diff = np.where(angle_diff > 180, 360 - angle_diff, angle_diff)
-        
-        # Calculate antenna pattern loss using 3GPP/ITU standard horizontal pattern (vectorized)
-        # A(θ) = -min[12 * (θ/θ_3dB)^2, A_m]
-        # where θ_3dB is the 3dB beamwidth and A_m is the maximum attenuation (typically 20-30 dB)
-        theta_3dB = beamwidth
-        A_m = 25  # Maximum attenuation in dB (front-to-back ratio)
-        
-        # Standard 3GPP horizontal pattern
-        antenna_pattern_loss = np.minimum(
-            12 * (angle_diff / theta_3dB) ** 2,
-            A_m
-        )
-        
-        # Calculate path loss for all valid pixels
-        path_loss = np.zeros_like(distance_km)
-        valid_distances = distance_km[valid_mask]
-        
-        if model == "Free Space Path Loss":
-            path_loss[valid_mask] = 20 * np.log10(valid_distances) + 20 * np.log10(frequency) + 32.45
-        elif model == "Okumura-Hata (Urban)":
-            a_hm = (1.1 * np.log10(frequency) - 0.7) * 1.5 - (1.56 * np.log10(frequency) - 0.8)
-            path_loss[valid_mask] = (69.55 + 26.16 * np.log10(frequency) - 13.82 * np.log10(height) - a_hm +
-                                     (44.9 - 6.55 * np.log10(height)) * np.log10(valid_distances))
-        elif model == "COST-231 Hata":
-            a_hm = (1.1 * np.log10(frequency) - 0.7) * 1.5 - (1.56 * np.log10(frequency) - 0.8)
-            path_loss[valid_mask] = (46.3 + 33.9 * np.log10(frequency) - 13.82 * np.log10(height) - a_hm +
-                                     (44.9 - 6.55 * np.log10(height)) * np.log10(valid_distances) + 3)
-        else:  # Ericsson 9999
-            path_loss[valid_mask] = (36.2 + 30.2 * np.log10(frequency) + 12 * np.log10(height) +
-                                     (43.2 - 3.1 * np.log10(height)) * np.log10(valid_distances))
-        
-        # Calculate RSRP (vectorized)
-        rsrp = power + gain - antenna_pattern_loss - path_loss
-        
-        # Apply clutter loss if available
-        if clutter_loss_grid is not None:
-            rsrp = rsrp - clutter_loss_grid
-        
-        # Apply terrain loss if available
-        if terrain_loss_grid is not None:
-            rsrp = rsrp - terrain_loss_grid
-        
-        # Apply valid mask (set invalid pixels to -140 dBm)
-        rsrp = np.where(valid_mask, rsrp, -140)
-        
-        # Update raster with best signal only (maximum RSRP across all sites)
-        # This ensures overlapping coverage uses the strongest signal
-        raster_data[:] = np.maximum(raster_data, rsrp)
-    
-    def _calculate_path_loss(self, frequency_mhz, distance_km, height_m, model):
-        """Calculate path loss using selected propagation model."""
-        
-        if distance_km < 0.001:
-            return 0
-        
-        if model == "Free Space Path Loss":
-            fspl = 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz) + 32.45
-            return fspl
-            
-        elif model == "Okumura-Hata (Urban)":
-            a_hm = (1.1 * math.log10(frequency_mhz) - 0.7) * 1.5 - (1.56 * math.log10(frequency_mhz) - 0.8)
-            path_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) - a_hm +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            return path_loss
-            
-        elif model == "Okumura-Hata (Suburban)":
-            urban_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) +
-                         (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            suburban_correction = 2 * (math.log10(frequency_mhz / 28.0)) ** 2 + 5.4
-            path_loss = urban_loss - suburban_correction
-            return path_loss
-            
-        elif model == "Okumura-Hata (Rural)":
-            urban_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) +
-                         (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            rural_correction = 4.78 * (math.log10(frequency_mhz)) ** 2 - 18.33 * math.log10(frequency_mhz) + 40.94
-            path_loss = urban_loss - rural_correction
-            return path_loss
-            
-        elif model == "COST-231 Hata (Urban)" or model == "COST-231 Hata":
-            a_hm = (1.1 * math.log10(frequency_mhz) - 0.7) * 1.5 - (1.56 * math.log10(frequency_mhz) - 0.8)
-            C_m = 3  # Urban
-            path_loss = (46.3 + 33.9 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) - a_hm +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km) + C_m)
-            return path_loss
-            
-        elif model == "COST-231 Hata (Suburban)":
-            a_hm = (1.1 * math.log10(frequency_mhz) - 0.7) * 1.5 - (1.56 * math.log10(frequency_mhz) - 0.8)
-            C_m = 0  # Suburban
-            path_loss = (46.3 + 33.9 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) - a_hm +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km) + C_m)
-            return path_loss
-            
-        elif model == "Ericsson 9999":
-            # Ericsson 9999 model (empirical model for urban/suburban)
-            a0 = 36.2
-            a1 = 30.2
-            a2 = 12.0
-            a3 = 0.1
-            path_loss = (a0 + a1 * math.log10(distance_km) + a2 * math.log10(frequency_mhz) + 
-                        a3 * math.log10(height_m) * math.log10(distance_km) - 
-                        3.2 * (math.log10(11.75 * 1.5)) ** 2)
-            return path_loss
-            
-        elif model == "SUI (Suburban)":
-            # Stanford University Interim (SUI) model - Terrain Type B (Suburban)
-            d0 = 0.1  # Reference distance in km
-            A = 20 * math.log10(4 * math.pi * d0 * 1000 * frequency_mhz / 300)
-            gamma = 4.0  # Path loss exponent for suburban (Terrain B)
-            Xf = 6 * math.log10(frequency_mhz / 2000)  # Frequency correction
-            Xh = -10.8 * math.log10(1.5 / 2)  # Height correction for 1.5m mobile
-            s = 8.2  # Shadowing std deviation
-            path_loss = A + 10 * gamma * math.log10(distance_km / d0) + Xf + Xh
-            return path_loss
-            
-        elif model == "SUI (Urban)":
-            # Stanford University Interim (SUI) model - Terrain Type C (Urban)
-            d0 = 0.1  # Reference distance in km
-            A = 20 * math.log10(4 * math.pi * d0 * 1000 * frequency_mhz / 300)
-            gamma = 4.6  # Path loss exponent for urban (Terrain C)
-            Xf = 6 * math.log10(frequency_mhz / 2000)  # Frequency correction
-            Xh = -10.8 * math.log10(1.5 / 2)  # Height correction for 1.5m mobile
-            path_loss = A + 10 * gamma * math.log10(distance_km / d0) + Xf + Xh
-            return path_loss
-            
-        elif model == "ECC-33 (Urban)":
-            # ECC-33 model (CEPT) for urban areas
-            path_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            return path_loss
-            
-        elif model == "ECC-33 (Suburban)":
-            # ECC-33 model (CEPT) for suburban areas
-            urban_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) +
-                         (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            suburban_correction = 2 * (math.log10(frequency_mhz / 28.0)) ** 2 + 5.4
-            path_loss = urban_loss - suburban_correction
-            return path_loss
-        
-        else:
-            # Default to Free Space Path Loss
-            fspl = 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz) + 32.45
-            return fspl
-    
     def _apply_color_ramp(self, raster_layer):
         """Apply color ramp to raster layer for signal strength visualization."""
         
@@ -818,43 +645,6 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
         
         return clutter_features
     
-    def _calculate_clutter_loss_grid(self, xx, yy, clutter_data):
-        """Calculate clutter loss for each pixel in the grid."""
-        # Initialize with default loss
-        clutter_loss = np.full_like(xx, CLUTTER_LOSSES['default'])
-        
-        # Calculate building density in grid cells
-        building_density = np.zeros_like(xx)
-        
-        for feature in clutter_data:
-            if feature['type'] == 'building':
-                # Count buildings in each grid cell
-                for lon, lat in feature['coords']:
-                    # Find nearest grid cell
-                    col_idx = np.argmin(np.abs(xx[0, :] - lon))
-                    row_idx = np.argmin(np.abs(yy[:, 0] - lat))
-                    if 0 <= row_idx < xx.shape[0] and 0 <= col_idx < xx.shape[1]:
-                        building_density[row_idx, col_idx] += 1
-            else:
-                # Apply land use loss
-                loss_value = CLUTTER_LOSSES.get(feature['type'], CLUTTER_LOSSES['default'])
-                for lon, lat in feature['coords']:
-                    col_idx = np.argmin(np.abs(xx[0, :] - lon))
-                    row_idx = np.argmin(np.abs(yy[:, 0] - lat))
-                    if 0 <= row_idx < xx.shape[0] and 0 <= col_idx < xx.shape[1]:
-                        clutter_loss[row_idx, col_idx] = max(clutter_loss[row_idx, col_idx], loss_value)
-        
-        # Apply building density loss (additional loss based on density)
-        # High density: +20 dB, Medium: +12 dB, Low: +5 dB
-        building_loss = np.where(building_density > 10, 20,
-                        np.where(building_density > 5, 12,
-                        np.where(building_density > 0, 5, 0)))
-        
-        # Combine land use and building losses
-        total_clutter_loss = clutter_loss + building_loss
-        
-        return total_clutter_loss
-    
     def _get_elevation_grid(self, extent, resolution_deg, target_rows, target_cols):
         """Get elevation grid for entire extent with caching and interpolation."""
         # Check cache first
@@ -981,69 +771,3 @@ class CoveragePredictionDialog(QtWidgets.QDialog, FORM_CLASS):
                 ])
         
         return elevation_grid
-    
-    def _calculate_terrain_loss_grid(self, xx, yy, elevation_grid, site_point, site_height, frequency_mhz):
-        """Calculate terrain diffraction loss for all pixels using knife-edge diffraction."""
-        # Get site elevation (interpolate from grid)
-        site_row = np.argmin(np.abs(yy[:, 0] - site_point.y()))
-        site_col = np.argmin(np.abs(xx[0, :] - site_point.x()))
-        site_elevation = elevation_grid[site_row, site_col] if 0 <= site_row < elevation_grid.shape[0] and 0 <= site_col < elevation_grid.shape[1] else 0
-        
-        # Calculate distances from site
-        dx = xx - site_point.x()
-        dy = yy - site_point.y()
-        distance_deg = np.sqrt(dx*dx + dy*dy)
-        distance_km = distance_deg * 111.0
-        
-        # Avoid division by zero
-        distance_km = np.maximum(distance_km, 0.001)
-        
-        # Calculate line-of-sight elevation at each pixel
-        # Simplified: assume linear path from site to pixel
-        site_agl = site_elevation + site_height  # Site antenna height above ground level
-        target_agl = elevation_grid + 1.5  # Assume 1.5m receiver height
-        
-        # Calculate elevation angle from site to target
-        elevation_diff = target_agl - site_agl
-        distance_m = distance_km * 1000
-        
-        # Line of sight angle (radians)
-        los_angle = np.arctan2(elevation_diff, distance_m)
-        
-        # Calculate Fresnel zone radius at midpoint
-        # F1 = sqrt(lambda * d1 * d2 / (d1 + d2))
-        # For simplification, use d1 = d2 = distance/2
-        wavelength = 3e8 / (frequency_mhz * 1e6)  # meters
-        fresnel_radius = np.sqrt(wavelength * distance_m / 4)  # meters
-        
-        # Calculate clearance (simplified)
-        # Positive clearance = clear path, negative = obstruction
-        midpoint_elevation = (site_agl + target_agl) / 2
-        midpoint_row = (site_row + np.clip(np.round((yy - site_point.y()) / (yy[1, 0] - yy[0, 0]) + site_row).astype(int), 0, elevation_grid.shape[0] - 1))
-        midpoint_col = (site_col + np.clip(np.round((xx - site_point.x()) / (xx[0, 1] - xx[0, 0]) + site_col).astype(int), 0, elevation_grid.shape[1] - 1))
-        
-        # Simplified terrain clearance (using target elevation as proxy for obstacles)
-        # In reality, would need to sample along path
-        terrain_clearance = target_agl - midpoint_elevation
-        
-        # Calculate Fresnel clearance parameter
-        # v = h * sqrt(2 * (d1 + d2) / (lambda * d1 * d2))
-        # Simplified: v = clearance / fresnel_radius
-        v = terrain_clearance / np.maximum(fresnel_radius, 0.1)
-        
-        # Knife-edge diffraction loss (ITU-R P.526)
-        # For v > -0.78: Loss = 6.9 + 20*log10(sqrt((v-0.1)^2 + 1) + v - 0.1)
-        # For v <= -0.78: Loss = 0 (no obstruction)
-        
-        diffraction_loss = np.zeros_like(v)
-        
-        # Calculate loss where there's obstruction (v < 0)
-        obstructed = v < -0.78
-        diffraction_loss[obstructed] = 6.9 + 20 * np.log10(
-            np.sqrt((v[obstructed] - 0.1)**2 + 1) + v[obstructed] - 0.1
-        )
-        
-        # Clamp to reasonable values (0 to 40 dB)
-        diffraction_loss = np.clip(diffraction_loss, 0, 40)
-        
-        return diffraction_loss
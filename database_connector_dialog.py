@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (NULL, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFeature,
+                       QgsField, QgsGeometry, QgsPointXY, QgsProject, QgsVectorLayer, QgsWkbTypes)
+
+from .core.cell_database import (DIALECTS, FETCH_SIZE, CellQuery, ConnectionPool,
+                                 PostgresDialect, SqliteDialect, stream_rows, write_results)
+from .dialog_state import LayerList
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('database_connector_dialog_base.ui')
+
+# Backend combo box order
+_BACKENDS = [SqliteDialect.name, PostgresDialect.name]
+
+
+class DatabaseConnectorDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Load cells from SpatiaLite/PostGIS and write planned values back.
+
+    Connections are pooled per database for the life of the dialog. Cells
+    are read in fixed-size fetches with the canvas extent and band filters
+    applied in SQL; results are written back by key in batches.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(DatabaseConnectorDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self._pools = {}
+        self.fetchSizeSpinBox.setValue(FETCH_SIZE)
+        self.progressBar.setValue(0)
+
+        self._layers = []
+        self._layer_list = LayerList(self.layerComboBox, self._layers)
+        self._layer_list.fieldsChanged.connect(self._on_fields_changed)
+        self.layerComboBox.currentIndexChanged.connect(self._on_layer_changed)
+        self._on_layer_changed()
+
+        self.backendComboBox.currentIndexChanged.connect(self._on_backend_changed)
+        self._on_backend_changed()
+        self.databaseFileButton.clicked.connect(self._browse_database_file)
+        self.loadButton.clicked.connect(self._load_cells)
+        self.writeButton.clicked.connect(self._write_results)
+
+    def close_connections(self):
+        """Close the pooled connections."""
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+    def _on_backend_changed(self, index=None):
+        is_sqlite = self._backend() == SqliteDialect.name
+        self.databaseFileLineEdit.setEnabled(is_sqlite)
+        self.databaseFileButton.setEnabled(is_sqlite)
+        for widget in (self.hostLineEdit, self.portSpinBox, self.databaseNameLineEdit,
+                       self.userLineEdit, self.passwordLineEdit):
+            widget.setEnabled(not is_sqlite)
+
+    def _on_fields_changed(self):
+        """Rebuild the field combo when fields of the selected layer change."""
+        field_name = self.keyFieldComboBox.currentText()
+        self._on_layer_changed()
+        self.keyFieldComboBox.setCurrentText(field_name)
+
+    def _on_layer_changed(self, index=None):
+        self.keyFieldComboBox.clear()
+        layer = self._layer_list.current()
+        if layer is None:
+            return
+        self.keyFieldComboBox.addItems([field.name() for field in layer.fields()])
+
+    def _browse_database_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'SpatiaLite Database', self.databaseFileLineEdit.text(),
+            'SQLite databases (*.sqlite *.db *.gpkg);;All files (*)')
+        if path:
+            self.databaseFileLineEdit.setText(path)
+
+    def _backend(self):
+        return _BACKENDS[max(self.backendComboBox.currentIndex(), 0)]
+
+    def _pool(self):
+        """Pool of the configured database, created on first use."""
+        backend = self._backend()
+        if backend == SqliteDialect.name:
+            path = self.databaseFileLineEdit.text().strip()
+            if not os.path.isfile(path):
+                raise ValueError('Please select a SpatiaLite database file.')
+            key = (backend, path)
+
+            def connect():
+                return SqliteDialect.connect(path)
+        else:
+            params = {
+                'host': self.hostLineEdit.text().strip() or 'localhost',
+                'port': self.portSpinBox.value(),
+                'dbname': self.databaseNameLineEdit.text().strip(),
+                'user': self.userLineEdit.text().strip(),
+                'password': self.passwordLineEdit.text(),
+            }
+            key = (backend,) + tuple(sorted(params.items()))
+
+            def connect():
+                return PostgresDialect.connect(**params)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(connect)
+            self._pools[key] = pool
+        return pool, DIALECTS[backend]
+
+    def _query(self):
+        table = self.tableLineEdit.text().strip()
+        if not table:
+            raise ValueError('Please enter the cell table.')
+        geometry_column = self.geometryColumnLineEdit.text().strip() or None
+        x_column = self.xColumnLineEdit.text().strip() or None
+        y_column = self.yColumnLineEdit.text().strip() or None
+        if not geometry_column and not (x_column and y_column):
+            raise ValueError('Please enter a geometry column or the X and Y columns.')
+        return CellQuery(table, x_column=x_column, y_column=y_column,
+                         geometry_column=geometry_column,
+                         band_column=self.bandColumnLineEdit.text().strip() or None,
+                         srid=self.sridSpinBox.value())
+
+    def _canvas_bbox(self, srid):
+        """Canvas extent in the database SRID."""
+        canvas = self.iface.mapCanvas()
+        transform = QgsCoordinateTransform(canvas.mapSettings().destinationCrs(),
+                                           QgsCoordinateReferenceSystem(f'EPSG:{srid}'),
+                                           QgsProject.instance())
+        extent = transform.transformBoundingBox(canvas.extent())
+        return extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()
+
+    def _show_progress(self, text):
+        self.progressBar.setFormat(text)
+        QtWidgets.QApplication.processEvents()
+
+    def _load_cells(self):
+        try:
+            pool, dialect = self._pool()
+            query = self._query()
+        except (ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.warning(self, 'Database Connector', str(e))
+            return
+
+        bbox = self._canvas_bbox(query.srid) if self.canvasExtentCheckBox.isChecked() else None
+        bands = [band.strip() for band in self.bandsLineEdit.text().split(',') if band.strip()]
+        layer_name = self.layerNameLineEdit.text().strip() or query.table
+
+        self.loadButton.setEnabled(False)
+        self.progressBar.setRange(0, 0)
+        layer = None
+        loaded = 0
+        try:
+            for names, rows in stream_rows(pool, dialect, query, bbox, bands,
+                                           self.fetchSizeSpinBox.value()):
+                if layer is None:
+                    layer, attribute_count = self._create_layer(layer_name, names, rows, query)
+                    xy = None
+                    if not query.geometry_column:
+                        xy = (names.index(query.x_column), names.index(query.y_column))
+                layer.dataProvider().addFeatures(
+                    [self._feature(row, attribute_count, xy) for row in rows])
+                loaded += len(rows)
+                self._show_progress(f'{loaded:,} cells loaded...')
+        except Exception as e:
+            # Driver errors have no common base class beyond the DB-API module
+            QtWidgets.QMessageBox.critical(self, 'Database Connector', f'Loading cells failed: {e}')
+            return
+        finally:
+            self.progressBar.setRange(0, 100)
+            self.loadButton.setEnabled(True)
+
+        if layer is None:
+            self.progressBar.setFormat('%p%')
+            QtWidgets.QMessageBox.warning(self, 'Database Connector', 'No cells matched the filters.')
+            return
+        layer.updateExtents()
+        QgsProject.instance().addMapLayer(layer)
+        self.progressBar.setValue(100)
+        self.progressBar.setFormat(f'{loaded:,} cells loaded')
+
+    def _create_layer(self, layer_name, names, rows, query):
+        """Memory layer with fields typed from the first fetch."""
+        attribute_names = names[:-1] if query.geometry_column else names
+        geometry_type = 'Point'
+        if query.geometry_column:
+            wkb = next((row[-1] for row in rows if row[-1] is not None), None)
+            if wkb is not None:
+                geometry = QgsGeometry()
+                geometry.fromWkb(bytes(wkb))
+                geometry_type = QgsWkbTypes.displayString(geometry.wkbType())
+        layer = QgsVectorLayer(f'{geometry_type}?crs=EPSG:{query.srid}', layer_name, 'memory')
+
+        fields = []
+        for column, name in enumerate(attribute_names):
+            value = next((row[column] for row in rows if row[column] is not None), None)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                field_type = QVariant.String
+            elif isinstance(value, int):
+                field_type = QVariant.LongLong
+            else:
+                field_type = QVariant.Double
+            fields.append(QgsField(name, field_type))
+        layer.dataProvider().addAttributes(fields)
+        layer.updateFields()
+        return layer, len(attribute_names)
+
+    def _feature(self, row, attribute_count, xy):
+        """Feature of a fetched row; ``xy`` holds the X/Y column indices, None for WKB rows."""
+        feature = QgsFeature()
+        if xy is None:
+            if row[-1] is not None:
+                geometry = QgsGeometry()
+                geometry.fromWkb(bytes(row[-1]))
+                feature.setGeometry(geometry)
+        else:
+            x, y = row[xy[0]], row[xy[1]]
+            if x is not None and y is not None:
+                feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(float(x), float(y))))
+        feature.setAttributes(list(row[:attribute_count]))
+        return feature
+
+    def _result_columns(self, layer):
+        """``(layer field, database column)`` pairs present on ``layer``."""
+        names = layer.fields().names()
+        pairs = []
+        for item in self.resultColumnsLineEdit.text().split(','):
+            if '=' not in item:
+                continue
+            field, column = (part.strip() for part in item.split('=', 1))
+            if field in names and column:
+                pairs.append((field, column))
+        return pairs
+
+    def _write_results(self):
+        layer = self._layer_list.current()
+        if layer is None:
+            QtWidgets.QMessageBox.warning(self, 'Database Connector', 'Please select a result layer.')
+            return
+        key_field = self.keyFieldComboBox.currentText()
+        pairs = self._result_columns(layer)
+        if not key_field or not pairs:
+            QtWidgets.QMessageBox.warning(
+                self, 'Database Connector',
+                'The layer has none of the result fields listed in "Result fields".')
+            return
+        try:
+            pool, dialect = self._pool()
+            table = self.tableLineEdit.text().strip()
+            if not table:
+                raise ValueError('Please enter the cell table.')
+        except (ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.warning(self, 'Database Connector', str(e))
+            return
+
+        key_column = self.keyColumnLineEdit.text().strip() or key_field
+        field_indices = [layer.fields().indexOf(name) for name in [key_field] + [f for f, _ in pairs]]
+
+        def rows():
+            for feature in layer.getFeatures():
+                values = feature.attributes()
+                row = [values[index] for index in field_indices]
+                # NULL attributes arrive as QVariant; the drivers expect None
+                yield tuple(None if value is None or value == NULL else value for value in row)
+
+        self.writeButton.setEnabled(False)
+        self._show_progress('Writing results...')
+        try:
+            written = write_results(pool, dialect, table, key_column,
+                                    [column for _, column in pairs], rows())
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, 'Database Connector', f'Writing results failed: {e}')
+            return
+        finally:
+            self.writeButton.setEnabled(True)
+        self.progressBar.setFormat(f'{written:,} cells written')
+        QtWidgets.QMessageBox.information(
+            self, 'Database Connector',
+            f'{written:,} cells written to {table} '
+            f'({", ".join(column for _, column in pairs)} by {key_column}).')
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""State kept by the RF Tools dialogs between openings.
+
+:class:`LayerList` keeps a layer combo box in step with the vector layers
+of the project through the project's layer signals instead of rebuilding
+it every time a dialog opens, and reports field changes of the selected
+layer so that cached dialogs can rebuild their field combo boxes.
+:class:`FieldMappings` remembers the field chosen in each field combo box
+per layer in QSettings.
+"""
+
+from contextlib import contextmanager
+
+from qgis.PyQt.QtCore import QObject, QSettings, pyqtSignal
+from qgis.core import QgsProject, QgsVectorLayer
+
+SETTINGS_GROUP = 'RFTools/fieldMappings'
+
+
+class LayerList(QObject):
+    """Layers of the project, vector layers by default, listed in a combo box.
+
+    :attr:`layers` holds the layers in combo box order and is updated in
+    place, so dialogs can keep indexing it with the combo box index. New
+    layers are appended; removing a layer other than the selected one does
+    not emit ``currentIndexChanged``. :attr:`fieldsChanged` is emitted when
+    fields of the selected layer are added, removed or renamed.
+    """
+
+    fieldsChanged = pyqtSignal()
+
+    def __init__(self, combo, layers=None, layer_class=QgsVectorLayer):
+        """Constructor.
+
+        :param combo: Layer combo box, filled with the current layers.
+        :param layers: Optional list to keep in step with the combo box; it
+            is filled before the first ``currentIndexChanged`` is emitted.
+        :param layer_class: Class of the layers to list.
+        """
+        super(LayerList, self).__init__(combo)
+        self.combo = combo
+        self.layers = layers if layers is not None else []
+        self._layer_class = layer_class
+        self._layer_ids = []
+
+        project = QgsProject.instance()
+        self._add_layers(project.mapLayers().values())
+        project.layersAdded.connect(self._add_layers)
+        project.layersRemoved.connect(self._remove_layers)
+
+    def current(self):
+        """The selected layer, None when the project has no vector layer."""
+        index = self.combo.currentIndex()
+        if 0 <= index < len(self.layers):
+            return self.layers[index]
+        return None
+
+    def _add_layers(self, layers):
+        for layer in layers:
+            if not isinstance(layer, self._layer_class) or layer.id() in self._layer_ids:
+                continue
+            # The list is extended first: adding the first item selects it
+            self.layers.append(layer)
+            self._layer_ids.append(layer.id())
+            self.combo.addItem(layer.name())
+            layer.nameChanged.connect(self._rename)
+            if hasattr(layer, 'updatedFields'):
+                layer.updatedFields.connect(self._fields_updated)
+
+    def _remove_layers(self, layer_ids):
+        for layer_id in layer_ids:
+            if layer_id not in self._layer_ids:
+                continue
+            index = self._layer_ids.index(layer_id)
+            del self.layers[index]
+            del self._layer_ids[index]
+            keep_selection = index != self.combo.currentIndex()
+            blocked = self.combo.blockSignals(keep_selection)
+            self.combo.removeItem(index)
+            self.combo.blockSignals(blocked)
+
+    def _rename(self):
+        layer = self.sender()
+        if layer in self.layers:
+            index = self.layers.index(layer)
+            self.combo.setItemText(index, layer.name())
+
+    def _fields_updated(self):
+        if self.sender() is self.current():
+            self.fieldsChanged.emit()
+
+
+class FieldMappings:
+    """Field combo box selections of one dialog, remembered per layer.
+
+    Layers are identified by their data source, memory layers by their
+    name, so a mapping applies again when the same data is reloaded in
+    another project.
+    """
+
+    def __init__(self, dialog_name, combos):
+        """Constructor.
+
+        :param dialog_name: Settings group of the dialog.
+        :param combos: Field combo boxes; their object names are the keys.
+        """
+        self.dialog_name = dialog_name
+        self.combos = [combo for combo in combos if combo is not None]
+
+    def _group(self, layer):
+        source = layer.name() if layer.providerType() == 'memory' else layer.source()
+        # Keys must not contain the settings path separator
+        return '{}/{}/{}'.format(SETTINGS_GROUP, self.dialog_name, source.replace('/', '|').replace('\\', '|'))
+
+    def restore(self, layer):
+        """Select the fields last used with ``layer`` where they still exist."""
+        settings = QSettings()
+        settings.beginGroup(self._group(layer))
+        for combo in self.combos:
+            index = combo.findText(settings.value(combo.objectName(), '', type=str))
+            if index >= 0:
+                combo.setCurrentIndex(index)
+        settings.endGroup()
+
+    @contextmanager
+    def kept(self):
+        """Keep the selected fields across a rebuild of the combo boxes.
+
+        Fields that no longer exist after the rebuild keep the selection
+        the rebuild made.
+        """
+        selection = [combo.currentText() for combo in self.combos]
+        yield
+        for combo, text in zip(self.combos, selection):
+            index = combo.findText(text)
+            if index >= 0:
+                combo.setCurrentIndex(index)
+
+    def save(self, layer):
+        """Remember the selected fields for ``layer``."""
+        settings = QSettings()
+        settings.beginGroup(self._group(layer))
+        for combo in self.combos:
+            settings.setValue(combo.objectName(), combo.currentText())
+        settings.endGroup()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+import numpy as np
+
+from osgeo import gdal
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtGui import QColor
+from qgis.core import (QgsColorRampShader, QgsCoordinateReferenceSystem, QgsCoordinateTransform,
+                       QgsFeatureRequest, QgsProject, QgsRasterLayer, QgsRasterShader,
+                       QgsSingleBandPseudoColorRenderer)
+
+from .core.binning import RasterBinner, delta
+from .core.drive_test import CHUNK_ROWS
+from .dialog_state import FieldMappings, LayerList
+from .network_model import feature_point, to_float
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('drive_test_binning_dialog_base.ui')
+
+# Statistic combo box order
+_STATISTICS = ['mean', 'median', 'count', 'min', 'max', 'p10', 'p90']
+
+OUTPUT_NODATA = -9999.0
+
+
+class DriveTestBinningDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Bin drive-test measurements onto a coverage prediction raster.
+
+    Points are read in chunks and binned on the grid of the prediction. A
+    measurement raster of the chosen statistic and a prediction minus
+    measurement delta raster are written from the same binning pass.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(DriveTestBinningDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self.progressBar.setValue(0)
+        self.outputDirLineEdit.setText(tempfile.gettempdir())
+
+        # Created first: selecting the first layer restores its fields
+        self._field_mappings = FieldMappings('DriveTestBinning', [self.valueFieldComboBox])
+        self._point_layers = LayerList(self.pointsLayerComboBox)
+        self._point_layers.fieldsChanged.connect(self._on_point_fields_changed)
+        self._raster_layers = LayerList(self.rasterLayerComboBox, layer_class=QgsRasterLayer)
+        self.pointsLayerComboBox.currentIndexChanged.connect(self._on_points_layer_changed)
+        self._on_points_layer_changed()
+
+        self.outputDirButton.clicked.connect(self._browse_output_dir)
+        self.runButton.clicked.connect(self._run_binning)
+
+    def _on_point_fields_changed(self):
+        """Rebuild the field combo when fields of the selected points layer change."""
+        with self._field_mappings.kept():
+            self._on_points_layer_changed()
+
+    def _on_points_layer_changed(self, index=None):
+        self.valueFieldComboBox.clear()
+        layer = self._point_layers.current()
+        if layer is None:
+            return
+        self.valueFieldComboBox.addItems([field.name() for field in layer.fields()])
+        self._field_mappings.restore(layer)
+
+    def _browse_output_dir(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(
+            self, 'Output Folder', self.outputDirLineEdit.text())
+        if path:
+            self.outputDirLineEdit.setText(path)
+
+    def _show_progress(self, value, text):
+        self.progressBar.setValue(value)
+        self.progressBar.setFormat(text)
+        QtWidgets.QApplication.processEvents()
+
+    def _bin_points(self, layer, value_field, binner, crs):
+        """Add the points of ``layer`` to ``binner`` in chunks, in the raster CRS."""
+        transform = None
+        if layer.crs() != crs:
+            transform = QgsCoordinateTransform(layer.crs(), crs, QgsProject.instance())
+        field_index = layer.fields().indexOf(value_field)
+        request = QgsFeatureRequest().setSubsetOfAttributes([field_index])
+        total = max(layer.featureCount(), 1)
+        xs, ys, values = [], [], []
+        read = 0
+        for feature in layer.getFeatures(request):
+            point = feature_point(feature.geometry())
+            if point is not None:
+                if transform is not None:
+                    point = transform.transform(point)
+                xs.append(point.x())
+                ys.append(point.y())
+                values.append(to_float(feature[field_index], np.nan))
+            read += 1
+            if len(values) >= CHUNK_ROWS:
+                binner.add(xs, ys, values)
+                xs, ys, values = [], [], []
+                self._show_progress(int(80 * read / total), f'Binning {read:,} points...')
+        if values:
+            binner.add(xs, ys, values)
+
+    def _write_raster(self, path, array, geotransform, projection):
+        driver = gdal.GetDriverByName('GTiff')
+        raster = driver.Create(path, array.shape[1], array.shape[0], 1, gdal.GDT_Float32,
+                               ['COMPRESS=DEFLATE'])
+        raster.SetGeoTransform(geotransform)
+        raster.SetProjection(projection)
+        band = raster.GetRasterBand(1)
+        band.WriteArray(np.where(np.isnan(array), OUTPUT_NODATA, array).astype(np.float32))
+        band.SetNoDataValue(OUTPUT_NODATA)
+        band.FlushCache()
+        raster = None
+
+    def _apply_delta_ramp(self, raster_layer):
+        """Diverging ramp: blue where the prediction is low, red where it is high."""
+        items = [
+            QgsColorRampShader.ColorRampItem(-20, QColor(5, 48, 97), '-20 dB (under-predicted)'),
+            QgsColorRampShader.ColorRampItem(-6, QColor(103, 169, 207), '-6 dB'),
+            QgsColorRampShader.ColorRampItem(0, QColor(247, 247, 247), '0 dB'),
+            QgsColorRampShader.ColorRampItem(6, QColor(239, 138, 98), '+6 dB'),
+            QgsColorRampShader.ColorRampItem(20, QColor(103, 0, 31), '+20 dB (over-predicted)'),
+        ]
+        color_ramp_shader = QgsColorRampShader()
+        color_ramp_shader.setColorRampType(QgsColorRampShader.Interpolated)
+        color_ramp_shader.setColorRampItemList(items)
+        shader = QgsRasterShader()
+        shader.setRasterShaderFunction(color_ramp_shader)
+        raster_layer.setRenderer(QgsSingleBandPseudoColorRenderer(raster_layer.dataProvider(), 1, shader))
+        raster_layer.triggerRepaint()
+
+    def _run_binning(self):
+        points_layer = self._point_layers.current()
+        raster_layer = self._raster_layers.current()
+        if points_layer is None or raster_layer is None:
+            QtWidgets.QMessageBox.warning(self, 'Drive Test Binning',
+                                          'Please select a drive test layer and a prediction raster.')
+            return
+        value_field = self.valueFieldComboBox.currentText()
+        if not value_field:
+            QtWidgets.QMessageBox.warning(self, 'Drive Test Binning', 'Please select the measured field.')
+            return
+        self._field_mappings.save(points_layer)
+
+        source = gdal.Open(raster_layer.source())
+        if source is None:
+            QtWidgets.QMessageBox.warning(self, 'Drive Test Binning',
+                                          'The prediction raster could not be opened with GDAL.')
+            return
+        geotransform = source.GetGeoTransform()
+        projection = source.GetProjection()
+        band = source.GetRasterBand(1)
+        prediction = band.ReadAsArray().astype(float)
+        prediction_nodata = band.GetNoDataValue()
+        source = None
+
+        statistic = _STATISTICS[max(self.statisticComboBox.currentIndex(), 0)]
+        output_name = self.outputNameLineEdit.text().strip() or 'DT_Binned'
+        output_dir = self.outputDirLineEdit.text().strip() or tempfile.gettempdir()
+
+        self.runButton.setEnabled(False)
+        try:
+            binner = RasterBinner(geotransform, prediction.shape[0], prediction.shape[1])
+            self._bin_points(points_layer, value_field, binner,
+                             QgsCoordinateReferenceSystem.fromWkt(projection))
+            self._show_progress(85, 'Computing bin statistics...')
+            results = binner.statistics(dict.fromkeys([statistic, 'count', 'mean']))
+            measurement = results[statistic].astype(float)
+            sparse = results['count'] < self.minCountSpinBox.value()
+            measurement[sparse] = np.nan
+            # Delta against the bin mean of the measured signal
+            mean = np.where(sparse, np.nan, results['mean'])
+            difference = delta(prediction, mean, prediction_nodata)
+
+            measurement_path = os.path.join(output_dir, f'{output_name}_{statistic}.tif')
+            delta_path = os.path.join(output_dir, f'{output_name}_delta.tif')
+            self._write_raster(measurement_path, measurement, geotransform, projection)
+            self._write_raster(delta_path, difference, geotransform, projection)
+        except (OSError, RuntimeError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Drive Test Binning', f'Binning failed: {e}')
+            return
+        finally:
+            self.runButton.setEnabled(True)
+
+        measurement_layer = QgsRasterLayer(measurement_path, f'{output_name}_{statistic}')
+        delta_layer = QgsRasterLayer(delta_path, f'{output_name}_delta')
+        if delta_layer.isValid():
+            self._apply_delta_ramp(delta_layer)
+        QgsProject.instance().addMapLayers([layer for layer in (measurement_layer, delta_layer)
+                                            if layer.isValid()])
+
+        bins = int(np.count_nonzero(~np.isnan(measurement)))
+        compared = np.isfinite(difference)
+        summary = f'{binner.points:,} points in {bins:,} bins'
+        if binner.outside:
+            summary += f', {binner.outside:,} outside the raster'
+        if compared.any():
+            summary += (f'. Prediction - measurement: mean {np.mean(difference[compared]):.1f} dB, '
+                        f'RMSE {np.sqrt(np.mean(difference[compared] ** 2)):.1f} dB')
+        self._show_progress(100, 'Binning complete')
+        QtWidgets.QMessageBox.information(self, 'Drive Test Binning', summary + '.')
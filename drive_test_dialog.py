@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsCoordinateReferenceSystem, QgsField, QgsFields, QgsProject
+
+from .core.drive_test import (FORMAT_NMEA, GridThinner, detect_format, guess_coordinate_columns,
+                              read_csv_chunks, read_nmea_chunks)
+from .core.text_io import csv_header
+from .layer_writers import FORMAT_GPKG, OgrLayerWriter, point_wkb
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('drive_test_dialog_base.ui')
+
+
+class DriveTestDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Import CSV or NMEA drive-test logs into a GeoPackage.
+
+    Logs are parsed in chunks, written in one transaction per chunk and
+    indexed once at the end. The map gets a grid-sampled display layer so
+    day-long logs stay responsive to draw.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(DriveTestDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self._cancelled = False
+        self.progressBar.setValue(0)
+
+        self.inputFileButton.clicked.connect(self._browse_input_file)
+        self.inputFileLineEdit.editingFinished.connect(self._on_input_changed)
+        self.outputFileButton.clicked.connect(self._browse_output_file)
+        self.runButton.clicked.connect(self._run_import)
+        self.cancelButton.clicked.connect(self._cancel)
+
+    def _browse_input_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Drive Test Log', self.inputFileLineEdit.text(),
+            'Drive test logs (*.csv *.txt *.tsv *.nmea *.nme *.log);;All files (*)')
+        if path:
+            self.inputFileLineEdit.setText(path)
+            self._on_input_changed()
+
+    def _browse_output_file(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Output File', self.outputFileLineEdit.text(), 'GeoPackage (*.gpkg)')
+        if path:
+            if not path.lower().endswith('.gpkg'):
+                path += '.gpkg'
+            self.outputFileLineEdit.setText(path)
+
+    def _on_input_changed(self):
+        """Detect the log format and offer the CSV columns as coordinates."""
+        path = self.inputFileLineEdit.text().strip()
+        self.latitudeComboBox.clear()
+        self.longitudeComboBox.clear()
+        if not os.path.isfile(path):
+            self.formatValueLabel.setText('-')
+            return
+
+        if not self.outputFileLineEdit.text().strip():
+            self.outputFileLineEdit.setText(os.path.splitext(path)[0] + '.gpkg')
+
+        log_format = detect_format(path)
+        is_csv = log_format != FORMAT_NMEA
+        self.latitudeComboBox.setEnabled(is_csv)
+        self.longitudeComboBox.setEnabled(is_csv)
+        if not is_csv:
+            self.formatValueLabel.setText('NMEA (GGA / RMC position fixes)')
+            return
+
+        columns, delimiter = csv_header(path)
+        self.formatValueLabel.setText(f'CSV, {len(columns)} columns, delimiter {delimiter!r}')
+        self.latitudeComboBox.addItems(columns)
+        self.longitudeComboBox.addItems(columns)
+        latitude, longitude = guess_coordinate_columns(columns)
+        if latitude:
+            self.latitudeComboBox.setCurrentText(latitude)
+        if longitude:
+            self.longitudeComboBox.setCurrentText(longitude)
+
+    def _cancel(self):
+        self._cancelled = True
+
+    def _output_fields(self, chunk):
+        fields = QgsFields()
+        for name in chunk.columns:
+            fields.append(QgsField(name, QVariant.Double if chunk.numeric(name) else QVariant.String))
+        return fields
+
+    def _run_import(self):
+        path = self.inputFileLineEdit.text().strip()
+        if not os.path.isfile(path):
+            QtWidgets.QMessageBox.warning(self, 'Drive Test', 'Please select a drive test log.')
+            return
+        output_path = self.outputFileLineEdit.text().strip()
+        if not output_path:
+            QtWidgets.QMessageBox.warning(self, 'Drive Test', 'Please choose an output GeoPackage.')
+            return
+        if not output_path.lower().endswith('.gpkg'):
+            output_path += '.gpkg'
+        layer_name = self.layerNameLineEdit.text().strip() or 'DriveTest'
+        display_name = f'{layer_name}_Display'
+        cell_size = self.displayCellSpinBox.value()
+
+        if detect_format(path) == FORMAT_NMEA:
+            chunks = read_nmea_chunks(path)
+        else:
+            latitude_column = self.latitudeComboBox.currentText()
+            longitude_column = self.longitudeComboBox.currentText()
+            if not latitude_column or not longitude_column:
+                QtWidgets.QMessageBox.warning(self, 'Drive Test', 'Please select the coordinate columns.')
+                return
+            chunks = read_csv_chunks(path, latitude_column, longitude_column)
+
+        total_bytes = max(os.path.getsize(path), 1)
+        thinner = GridThinner(cell_size) if cell_size > 0 else None
+        writer = None
+        imported = 0
+        displayed = 0
+        skipped = 0
+
+        self._cancelled = False
+        self.runButton.setEnabled(False)
+        self.cancelButton.setEnabled(True)
+        self.progressBar.setValue(0)
+        self.progressBar.setFormat('Reading log...')
+        QtWidgets.QApplication.processEvents()
+
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    fields = self._output_fields(chunk)
+                    writer = OgrLayerWriter(output_path, FORMAT_GPKG,
+                                            QgsCoordinateReferenceSystem('EPSG:4326'))
+                    writer.create_layer(layer_name, 'Point', fields)
+                    if thinner is not None:
+                        writer.create_layer(display_name, 'Point', fields)
+
+                rows = np.nonzero(chunk.positioned)[0]
+                skipped += len(chunk) - len(rows)
+                attributes = chunk.rows(rows)
+                lons = chunk.longitude[rows]
+                lats = chunk.latitude[rows]
+                for lon, lat, values in zip(lons.tolist(), lats.tolist(), attributes):
+                    writer.write(layer_name, point_wkb(lon, lat), values)
+                if thinner is not None:
+                    for index in thinner.select(lons, lats).tolist():
+                        writer.write(display_name, point_wkb(lons[index], lats[index]), attributes[index])
+                        displayed += 1
+                imported += len(rows)
+                # One transaction per chunk keeps the journal small on multi-GB logs
+                writer.commit()
+
+                self.progressBar.setValue(int(100 * chunk.bytes_read / total_bytes))
+                self.progressBar.setFormat(f'{imported:,} points imported - %p%')
+                QtWidgets.QApplication.processEvents()
+                if self._cancelled:
+                    break
+        except (OSError, ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Drive Test', f'Import failed: {e}')
+            return
+        finally:
+            if writer is not None:
+                self.progressBar.setFormat('Building spatial index...')
+                QtWidgets.QApplication.processEvents()
+                writer.close()
+            self.runButton.setEnabled(True)
+            self.cancelButton.setEnabled(False)
+
+        if writer is None or not imported:
+            self.progressBar.setFormat('%p%')
+            QtWidgets.QMessageBox.warning(self, 'Drive Test', 'No positioned measurements found in the log.')
+            return
+
+        layers = dict(zip([layer_name, display_name], writer.load_layers()))
+        if thinner is None or self.addFullLayerCheckBox.isChecked():
+            QgsProject.instance().addMapLayer(layers[layer_name])
+        if thinner is not None:
+            QgsProject.instance().addMapLayer(layers[display_name])
+
+        self.progressBar.setValue(100)
+        self.progressBar.setFormat('Import complete')
+        status = 'cancelled' if self._cancelled else 'complete'
+        message = (f'Import {status}.\n\n'
+                   f'{imported:,} measurements written to {output_path}.')
+        if thinner is not None:
+            message += f'\n{displayed:,} points shown in "{display_name}" ({cell_size} m grid).'
+        if skipped:
+            message += f'\n{skipped:,} rows without valid coordinates were skipped.'
+        QtWidgets.QMessageBox.information(self, 'Drive Test', message)
@@ -1,9 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import os
-import math
-
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (QgsProject, QgsVectorLayer, QgsFeature, QgsGeometry, 
@@ -12,8 +8,15 @@ from qgis.core import (QgsProject, QgsVectorLayer, QgsFeature, QgsGeometry,
                        QgsSimpleLineSymbolLayer)
 from qgis.PyQt.QtGui import QColor
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'interference_analysis_dialog_base.ui'))
+from .core.interference import (adjacent_channel_issues, co_channel_issues, pair_geometry,
+                                pci_conflict_issues, sector_pairs)
+from .core.interference_matrix import FILE_EXTENSION, InterferenceMatrix
+from .dialog_state import FieldMappings, LayerList
+from .network_model import network_model
+from .run_statistics import finish_run, setup_panel, timed_run
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('interference_analysis_dialog_base.ui')
 
 
 class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
@@ -25,28 +28,55 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
 
         self.layerComboBox.currentIndexChanged.connect(self._on_layer_changed)
         self.runButton.clicked.connect(self._run_analysis)
+        if hasattr(self, 'matrixFileButton'):
+            self.matrixFileButton.clicked.connect(self._browse_matrix_file)
+        setup_panel(self)
 
         self._populate_layers()
     
-    def _get_point_from_geometry(self, geom):
-        """Extract a point from any geometry type."""
-        if geom.type() == QgsWkbTypes.PointGeometry:
-            return geom.asPoint()
-        else:
-            # For LineString, Polygon, or other geometries, use centroid
-            centroid = geom.centroid()
-            return centroid.asPoint() if centroid else None
+    def _safe_int(self, value, default=-1):
+        """Safely convert a value to int, returning default if conversion fails."""
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return default
+
+    def _with_sectors(self, issues, sectors):
+        """Replace the sector positions of engine issues with the sector dicts."""
+        for issue in issues:
+            issue['sector1'] = sectors[issue['sector1']]
+            issue['sector2'] = sectors[issue['sector2']]
+        return issues
+
+    def _browse_matrix_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Interference Matrix', self.matrixFileLineEdit.text(),
+            f'Interference matrices (*{FILE_EXTENSION});;All files (*)')
+        if path:
+            self.matrixFileLineEdit.setText(path)
 
     def _populate_layers(self):
-        self.layerComboBox.clear()
+        # Created first: selecting the first layer restores its fields
+        self._field_mappings = FieldMappings('InterferenceAnalysis', [
+            self.frequencyFieldComboBox,
+            self.pciFieldComboBox,
+            self.bandFieldComboBox,
+            self.azimuthFieldComboBox,
+            self.beamwidthFieldComboBox,
+            self.siteIdFieldComboBox,
+            self.sectorFieldComboBox,
+            getattr(self, 'matrixIdFieldComboBox', None),
+        ])
         self._layers = []
-        for layer in QgsProject.instance().mapLayers().values():
-            if isinstance(layer, QgsVectorLayer):
-                self.layerComboBox.addItem(layer.name())
-                self._layers.append(layer)
+        self._layer_list = LayerList(self.layerComboBox, self._layers)
+        self._layer_list.fieldsChanged.connect(self._on_fields_changed)
 
-        if self._layers:
-            self._on_layer_changed(0)
+    def _on_fields_changed(self):
+        """Rebuild the field combos when fields of the selected layer change."""
+        with self._field_mappings.kept():
+            self._on_layer_changed(self.layerComboBox.currentIndex())
 
     def _on_layer_changed(self, index):
         for combo in [
@@ -55,6 +85,8 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
             self.bandFieldComboBox,
             self.azimuthFieldComboBox,
             self.beamwidthFieldComboBox,
+            self.siteIdFieldComboBox,
+            self.sectorFieldComboBox,
         ]:
             combo.clear()
 
@@ -73,6 +105,13 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
             self.siteIdFieldComboBox.addItem(name)
             self.sectorFieldComboBox.addItem(name)
 
+        if hasattr(self, 'matrixIdFieldComboBox'):
+            self.matrixIdFieldComboBox.clear()
+            self.matrixIdFieldComboBox.addItems(field_names)
+
+        self._field_mappings.restore(layer)
+
+    @timed_run('Interference Analysis')
     def _run_analysis(self):
         if not self._layers:
             QtWidgets.QMessageBox.warning(self, 'Interference Analysis', 'No vector layers available.')
@@ -84,6 +123,7 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
             return
 
         layer = self._layers[layer_index]
+        self._field_mappings.save(layer)
 
         # Get parameters
         frequency_field = self.frequencyFieldComboBox.currentText()
@@ -103,71 +143,98 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
         detect_pci_mod3 = self.pciMod3CheckBox.isChecked() if hasattr(self, 'pciMod3CheckBox') else True
         detect_pci_mod6 = self.pciMod6CheckBox.isChecked() if hasattr(self, 'pciMod6CheckBox') else True
 
-        # Get field indices
-        fields = layer.fields()
-        freq_idx = fields.indexFromName(frequency_field) if frequency_field else -1
-        pci_idx = fields.indexFromName(pci_field) if pci_field else -1
-        band_idx = fields.indexFromName(band_field) if band_field else -1
-        azimuth_idx = fields.indexFromName(azimuth_field) if azimuth_field else -1
-        beamwidth_idx = fields.indexFromName(beamwidth_field) if beamwidth_field else -1
-        site_id_idx = fields.indexFromName(site_id_field) if site_id_field else -1
-        sector_idx = fields.indexFromName(sector_field) if sector_field else -1
-
-        # Collect sector data
-        sectors = []
-        for feat in layer.getFeatures():
-            geom = feat.geometry()
-            if not geom or geom.isEmpty():
-                continue
-            
-            # Extract point from geometry (handles Point, LineString, Polygon, etc.)
-            point = self._get_point_from_geometry(geom)
-            if point is None:
-                continue
-            
-            # Create sector identifier from site_id + sector + band
-            site_id = str(feat[site_id_idx]) if site_id_idx != -1 and feat[site_id_idx] is not None else ''
-            sector = str(feat[sector_idx]) if sector_idx != -1 and feat[sector_idx] is not None else ''
-            band = str(feat[band_idx]) if band_idx != -1 and feat[band_idx] is not None else ''
-            sector_id = f"{site_id}_{sector}_{band}" if site_id and sector and band else f"Sector_{feat.id()}"
-            
-            # Helper function to safely convert QVariant to Python type
-            def safe_float(value):
-                if value is None:
-                    return 0
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return 0
-            
-            def safe_int(value):
-                if value is None:
-                    return -1
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return -1
-            
-            sectors.append({
-                'feature': feat,
-                'point': point,
-                'frequency': safe_float(feat[freq_idx]) if freq_idx != -1 else 0,
-                'pci': safe_int(feat[pci_idx]) if pci_idx != -1 else -1,
-                'band': str(feat[band_idx]) if band_idx != -1 else 'unknown',
-                'azimuth': safe_float(feat[azimuth_idx]) if azimuth_idx != -1 else 0,
-                'beamwidth': safe_float(feat[beamwidth_idx]) if beamwidth_idx != -1 else 65,
-                'sector_id': sector_id,
-            })
+        # Optional interference matrix saved by the Neighbor Planner
+        matrix = None
+        matrix_id_field = None
+        if hasattr(self, 'matrixGroupBox') and self.matrixGroupBox.isChecked():
+            matrix_path = self.matrixFileLineEdit.text().strip()
+            matrix_id_field = self.matrixIdFieldComboBox.currentText()
+            if not matrix_path or not matrix_id_field:
+                QtWidgets.QMessageBox.warning(self, 'Interference Analysis',
+                                              'Please choose the interference matrix file and its sector ID field.')
+                return
+            try:
+                with self.run_stats.phase('load matrix'):
+                    matrix = InterferenceMatrix.load(matrix_path)
+            except (OSError, ValueError, KeyError) as e:
+                QtWidgets.QMessageBox.warning(self, 'Interference Analysis',
+                                              f'Could not read the interference matrix: {e}')
+                return
+
+        with self.run_stats.phase('load features'):
+            # Collect sector data from the shared network model of the layer
+            model = network_model(layer)
+            model.load([frequency_field, pci_field, band_field, azimuth_field, beamwidth_field,
+                        site_id_field, sector_field, matrix_id_field])
+            frequencies = model.floats(frequency_field, 0)
+            azimuths = model.floats(azimuth_field, 0)
+            beamwidths = model.floats(beamwidth_field, 65)
+            pcis = model.values(pci_field)
+            band_values = model.values(band_field)
+            site_ids = model.values(site_id_field)
+            sector_values = model.values(sector_field)
+            has_band = bool(band_field) and layer.fields().indexFromName(band_field) != -1
+
+            sectors = []
+            for row in model.positioned:
+                fid = int(model.fids[row])
+                # Create sector identifier from site_id + sector + band
+                site_id = str(site_ids[row]) if site_ids[row] is not None else ''
+                sector = str(sector_values[row]) if sector_values[row] is not None else ''
+                band = str(band_values[row]) if band_values[row] is not None else ''
+                sector_id = f"{site_id}_{sector}_{band}" if site_id and sector and band else f"Sector_{fid}"
+
+                sectors.append({
+                    'fid': fid,
+                    'point': QgsPointXY(model.x[row], model.y[row]),
+                    'frequency': float(frequencies[row]),
+                    'pci': self._safe_int(pcis[row]),
+                    'band': str(band_values[row]) if has_band else 'unknown',
+                    'azimuth': float(azimuths[row]),
+                    'beamwidth': float(beamwidths[row]),
+                    'sector_id': sector_id,
+                })
+
+            # Engine columns of the located sectors
+            positioned = model.positioned
+            sector_frequencies = frequencies[positioned]
+            sector_azimuths = azimuths[positioned]
+            sector_beamwidths = beamwidths[positioned]
+            sector_bands = [sector['band'] for sector in sectors]
+
+        self.run_stats.count('sectors', len(sectors))
+
+        # Sector pairs within the interference distance, shared by every check
+        pair_weights = None
+        check_distance = interference_distance
+        with self.run_stats.phase('sector pairs'):
+            if matrix is not None:
+                # Pairs with predicted interference instead, at any distance and beam overlap
+                matrix_ids = model.texts(matrix_id_field)
+                first, second, pair_weights = matrix.symmetric_pairs([matrix_ids[row] for row in positioned])
+                pairs = (first, second) + pair_geometry(first, second, model.x[positioned],
+                                                        model.y[positioned], **model.distance_args)
+                check_distance = float('inf')
+            else:
+                pairs = sector_pairs(model.x[positioned], model.y[positioned], interference_distance,
+                                     **model.distance_args)
+        self.run_stats.count('pairs', len(pairs[0]))
 
         # Run analyses
         interference_issues = []
         
         if self.coChannelCheckBox.isChecked():
-            co_channel = self._detect_co_channel_interference(sectors, interference_distance, overlap_threshold)
+            with self.run_stats.phase('co-channel'):
+                co_channel = self._with_sectors(co_channel_issues(
+                    pairs, sector_bands, sector_frequencies, sector_azimuths, sector_beamwidths,
+                    check_distance, overlap_threshold, pair_weights), sectors)
             interference_issues.extend(co_channel)
         
         if self.adjacentChannelCheckBox.isChecked():
-            adjacent_channel = self._detect_adjacent_channel_interference(sectors, interference_distance, overlap_threshold)
+            with self.run_stats.phase('adjacent channel'):
+                adjacent_channel = self._with_sectors(adjacent_channel_issues(
+                    pairs, sector_bands, sector_frequencies, sector_azimuths, sector_beamwidths,
+                    check_distance, overlap_threshold, pair_weights), sectors)
             interference_issues.extend(adjacent_channel)
         
         if self.pciConflictCheckBox.isChecked():
@@ -176,32 +243,48 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
             detect_pci_mod3 = self.pciMod3CheckBox.isChecked() if hasattr(self, 'pciMod3CheckBox') else True
             detect_pci_mod6 = self.pciMod6CheckBox.isChecked() if hasattr(self, 'pciMod6CheckBox') else True
             
-            pci_conflicts = self._detect_pci_conflicts(
-                sectors, 
-                interference_distance, 
-                overlap_threshold,
-                detect_pci_collision=detect_pci_collision,
-                detect_pci_mod3=detect_pci_mod3,
-                detect_pci_mod6=detect_pci_mod6
-            )
+            with self.run_stats.phase('pci conflicts'):
+                pci_conflicts = self._with_sectors(pci_conflict_issues(
+                    pairs,
+                    sector_bands,
+                    [sector['pci'] for sector in sectors],
+                    [sector['sector_id'] for sector in sectors],
+                    sector_azimuths,
+                    sector_beamwidths,
+                    check_distance,
+                    overlap_threshold,
+                    detect_collision=detect_pci_collision,
+                    detect_mod3=detect_pci_mod3,
+                    detect_mod6=detect_pci_mod6,
+                    pair_weights=pair_weights
+                ), sectors)
             interference_issues.extend(pci_conflicts)
 
+        self.run_stats.count('issues', len(interference_issues))
         if not interference_issues:
+            finish_run(self, self.run_stats)
             QtWidgets.QMessageBox.information(self, 'Interference Analysis', 
                                             'No interference issues detected.')
             return
 
         # Create visualization layer
-        interference_layer = self._create_interference_layer(interference_issues, output_prefix, layer.crs())
-        QgsProject.instance().addMapLayer(interference_layer)
+        with self.run_stats.phase('write layer'):
+            interference_layer = self._create_interference_layer(interference_issues, output_prefix, layer.crs())
+            QgsProject.instance().addMapLayer(interference_layer)
 
         # Generate mitigation report
-        mitigation_report = self._generate_mitigation_report(interference_issues)
+        with self.run_stats.phase('report'):
+            mitigation_report = self._generate_mitigation_report(interference_issues)
         
         # Show results
+        finish_run(self, self.run_stats)
+        if matrix is not None:
+            scope = f'Interference matrix: {len(pairs[0]):,} interfering sector pairs'
+        else:
+            scope = f'Interference distance: {interference_distance:.1f} km'
         QtWidgets.QMessageBox.information(self, 'Interference Analysis', 
                                         f'Analysis complete.\n\n'
-                                        f'Interference distance: {interference_distance:.1f} km\n\n'
+                                        f'{scope}\n\n'
                                         f'Total interference issues: {len(interference_issues)}\n'
                                         f'- Co-channel: {sum(1 for i in interference_issues if i["type"] == "Co-Channel")}\n'
                                         f'- Adjacent channel: {sum(1 for i in interference_issues if i["type"] == "Adjacent Channel")}\n'
@@ -209,206 +292,6 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
                                         f'Visualization layer created: {output_prefix}_Issues\n\n'
                                         f'{mitigation_report}')
 
-    def _detect_co_channel_interference(self, sectors, max_distance_km, overlap_threshold):
-        """Detect co-channel interference (same frequency)."""
-        issues = []
-        max_distance_deg = max_distance_km / 111.0
-        
-        for i, sector1 in enumerate(sectors):
-            for sector2 in sectors[i+1:]:
-                # Same band and frequency
-                if sector1['band'] != sector2['band']:
-                    continue
-                if abs(sector1['frequency'] - sector2['frequency']) > 0.1:
-                    continue
-                
-                # Check distance
-                dx = sector2['point'].x() - sector1['point'].x()
-                dy = sector2['point'].y() - sector1['point'].y()
-                distance = math.sqrt(dx*dx + dy*dy)
-                
-                if distance > max_distance_deg:
-                    continue
-                
-                # Check beam overlap
-                bearing = math.degrees(math.atan2(dx, dy)) % 360
-                reverse_bearing = (bearing + 180) % 360
-                
-                overlap1 = self._calculate_beam_overlap(sector1['azimuth'], sector1['beamwidth'], bearing)
-                overlap2 = self._calculate_beam_overlap(sector2['azimuth'], sector2['beamwidth'], reverse_bearing)
-                
-                if overlap1 > overlap_threshold or overlap2 > overlap_threshold:
-                    issues.append({
-                        'type': 'Co-Channel',
-                        'sector1': sector1,
-                        'sector2': sector2,
-                        'distance_km': distance * 111.0,
-                        'overlap1': overlap1,
-                        'overlap2': overlap2,
-                        'severity': 'High' if (overlap1 > 60 and overlap2 > 60) else 'Medium'
-                    })
-        
-        return issues
-
-    def _detect_adjacent_channel_interference(self, sectors, max_distance_km, overlap_threshold):
-        """Detect adjacent channel interference."""
-        issues = []
-        max_distance_deg = max_distance_km / 111.0
-        
-        for i, sector1 in enumerate(sectors):
-            for sector2 in sectors[i+1:]:
-                # Same band, adjacent frequency
-                if sector1['band'] != sector2['band']:
-                    continue
-                
-                freq_diff = abs(sector1['frequency'] - sector2['frequency'])
-                # Check if adjacent (typically 5-20 MHz spacing)
-                if freq_diff < 5 or freq_diff > 20:
-                    continue
-                
-                # Check distance (must be very close for adjacent channel interference)
-                dx = sector2['point'].x() - sector1['point'].x()
-                dy = sector2['point'].y() - sector1['point'].y()
-                distance = math.sqrt(dx*dx + dy*dy)
-                
-                if distance > max_distance_deg * 0.5:  # Half the distance for adjacent channel
-                    continue
-                
-                # Check beam overlap
-                bearing = math.degrees(math.atan2(dx, dy)) % 360
-                reverse_bearing = (bearing + 180) % 360
-                
-                overlap1 = self._calculate_beam_overlap(sector1['azimuth'], sector1['beamwidth'], bearing)
-                overlap2 = self._calculate_beam_overlap(sector2['azimuth'], sector2['beamwidth'], reverse_bearing)
-                
-                if overlap1 > overlap_threshold or overlap2 > overlap_threshold:
-                    issues.append({
-                        'type': 'Adjacent Channel',
-                        'sector1': sector1,
-                        'sector2': sector2,
-                        'distance_km': distance * 111.0,
-                        'freq_diff': freq_diff,
-                        'overlap1': overlap1,
-                        'overlap2': overlap2,
-                        'severity': 'Medium' if distance * 111.0 < 0.5 else 'Low'
-                    })
-        
-        return issues
-
-    def _detect_pci_conflicts(self, sectors, max_distance_km, overlap_threshold, detect_pci_collision=True, detect_pci_mod3=True, detect_pci_mod6=True):
-        """Detect PCI mod 3 and mod 6 conflicts.
-        
-        Args:
-            sectors: List of sector dictionaries
-            max_distance_km: Maximum distance in km to check for conflicts
-            overlap_threshold: Minimum beam overlap percentage to consider
-            detect_pci_collision: Whether to detect exact PCI collisions
-            detect_pci_mod3: Whether to detect mod 3 conflicts
-            detect_pci_mod6: Whether to detect mod 6 conflicts
-            
-        Returns:
-            List of detected PCI conflict issues
-        """
-        if not any([detect_pci_collision, detect_pci_mod3, detect_pci_mod6]):
-            return []
-            
-        issues = []
-        
-        # PCI re-use distance = interference distance (user input)
-        pci_reuse_distance_km = max_distance_km
-        pci_reuse_distance_deg = pci_reuse_distance_km / 111.0
-        
-        for i, sector1 in enumerate(sectors):
-            if sector1['pci'] < 0:
-                continue
-            
-            for sector2 in sectors[i+1:]:
-                if sector2['pci'] < 0:
-                    continue
-                
-                # Same band
-                if sector1['band'] != sector2['band']:
-                    continue
-                
-                # Skip if same site-sector-band combination (duplicate features)
-                if sector1['sector_id'] == sector2['sector_id']:
-                    continue
-                
-                # Check for PCI collision (same PCI) or mod 3/6 conflict
-                same_pci = (sector1['pci'] == sector2['pci'])
-                pci1_mod3 = sector1['pci'] % 3
-                pci2_mod3 = sector2['pci'] % 3
-                pci1_mod6 = sector1['pci'] % 6
-                pci2_mod6 = sector2['pci'] % 6
-                
-                # Skip if no conflict at all based on enabled detection types
-                has_conflict = (
-                    (detect_pci_collision and same_pci) or
-                    (detect_pci_mod3 and not same_pci and pci1_mod3 == pci2_mod3) or
-                    (detect_pci_mod6 and not same_pci and not pci1_mod3 == pci2_mod3 and pci1_mod6 == pci2_mod6)
-                )
-                
-                if not has_conflict:
-                    continue
-                
-                # Check distance against PCI re-use distance (not max_distance)
-                dx = sector2['point'].x() - sector1['point'].x()
-                dy = sector2['point'].y() - sector1['point'].y()
-                distance = math.sqrt(dx*dx + dy*dy)
-                
-                # Only flag PCI conflicts within re-use distance
-                if distance > pci_reuse_distance_deg:
-                    continue
-                
-                # Check beam overlap
-                bearing = math.degrees(math.atan2(dx, dy)) % 360
-                reverse_bearing = (bearing + 180) % 360
-                
-                overlap1 = self._calculate_beam_overlap(sector1['azimuth'], sector1['beamwidth'], bearing)
-                overlap2 = self._calculate_beam_overlap(sector2['azimuth'], sector2['beamwidth'], reverse_bearing)
-                
-                if overlap1 > overlap_threshold or overlap2 > overlap_threshold:
-                    # Determine conflict type: collision (same PCI) is most severe
-                    if same_pci:
-                        conflict_type = 'collision'
-                        severity = 'Critical'
-                    elif pci1_mod3 == pci2_mod3:
-                        conflict_type = 'mod3'
-                        severity = 'High'
-                    else:
-                        conflict_type = 'mod6'
-                        severity = 'Medium'
-                    
-                    issues.append({
-                        'type': 'PCI Conflict',
-                        'sector1': sector1,
-                        'sector2': sector2,
-                        'distance_km': distance * 111.0,
-                        'conflict_type': conflict_type,
-                        'pci1': sector1['pci'],
-                        'pci2': sector2['pci'],
-                        'overlap1': overlap1,
-                        'overlap2': overlap2,
-                        'severity': severity
-                    })
-        
-        return issues
-
-    def _calculate_beam_overlap(self, azimuth, beamwidth, bearing):
-        """Calculate how much a bearing overlaps with a beam."""
-        angle_diff = abs(azimuth - bearing)
-        if angle_diff > 180:
-            angle_diff = 360 - angle_diff
-        
-        if angle_diff <= beamwidth / 2:
-            # Full overlap
-            return 100.0
-        elif angle_diff <= beamwidth:
-            # Partial overlap
-            return 100.0 * (1 - (angle_diff - beamwidth/2) / (beamwidth/2))
-        else:
-            return 0.0
-
     def _create_interference_layer(self, issues, prefix, crs):
         """Create visualization layer for interference issues."""
         layer = QgsVectorLayer(f'LineString?crs={crs.authid()}', f'{prefix}_Issues', 'memory')
@@ -488,6 +371,9 @@ class InterferenceAnalysisDialog(QtWidgets.QDialog, FORM_CLASS):
                 details += f" ({issue['conflict_type']}: {issue['pci1']} vs {issue['pci2']})"
             elif issue['type'] == 'Adjacent Channel':
                 details += f" (Δf={issue['freq_diff']:.1f} MHz)"
+            if 'interference' in issue:
+                # Interfered area (km²) or traffic from the interference matrix
+                details += f", matrix interference {issue['interference']:.3f}"
             
             # Get sector identifiers and additional info
             source_id = issue['sector1']['sector_id']
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Small QGIS helpers shared by the RF Tools dialogs."""
+
+from qgis.core import QgsUnitTypes
+
+
+def distance_args(crs):
+    """Keyword arguments for the :mod:`core.geodesy` distance functions.
+
+    Geographic layers are measured with the local ellipsoidal scaling,
+    projected layers in their map units converted to meters.
+
+    :param crs: Coordinate reference system of the layer coordinates.
+    :type crs: QgsCoordinateReferenceSystem
+    """
+    if crs.isGeographic():
+        return {'geographic': True, 'unit_to_meters': 1.0}
+    factor = QgsUnitTypes.fromUnitToUnitFactor(crs.mapUnits(), QgsUnitTypes.DistanceMeters)
+    return {'geographic': False, 'unit_to_meters': factor}
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""Streaming writers for persistent RF Tools output layers.
+
+Features are written straight through OGR instead of being accumulated in
+memory-provider layers. GeoPackage outputs are written in one transaction,
+or in batches with :meth:`OgrLayerWriter.commit`, with the spatial index
+created once at the end; FlatGeobuf outputs (one
+file per layer) get their packed Hilbert R-tree when the file is closed.
+
+:class:`FeatureColumnWriter` appends computed columns to the features of
+an existing layer, either as a new memory layer filled in chunks or in
+place through bulk attribute updates.
+"""
+
+import os
+import struct
+
+from osgeo import gdal, ogr, osr
+from qgis.PyQt.QtCore import QDate, QDateTime, QTime, QVariant, Qt
+from qgis.core import QgsFeature, QgsVectorDataProvider, QgsVectorLayer, QgsWkbTypes
+
+from .network_model import invalidate as invalidate_network_model
+
+FORMAT_MEMORY = 'Memory layer'
+FORMAT_GPKG = 'GeoPackage'
+FORMAT_FLATGEOBUF = 'FlatGeobuf'
+
+OUTPUT_FORMATS = [FORMAT_MEMORY, FORMAT_GPKG, FORMAT_FLATGEOBUF]
+
+FORMAT_EXTENSIONS = {
+    FORMAT_GPKG: '.gpkg',
+    FORMAT_FLATGEOBUF: '.fgb',
+}
+
+# Features handed to the data provider per call
+OUTPUT_CHUNK_SIZE = 5000
+
+_DRIVER_NAMES = {
+    FORMAT_GPKG: 'GPKG',
+    FORMAT_FLATGEOBUF: 'FlatGeobuf',
+}
+
+_OGR_FIELD_TYPES = {
+    QVariant.Int: ogr.OFTInteger,
+    QVariant.UInt: ogr.OFTInteger64,
+    QVariant.LongLong: ogr.OFTInteger64,
+    QVariant.ULongLong: ogr.OFTInteger64,
+    QVariant.Double: ogr.OFTReal,
+    QVariant.Bool: ogr.OFTInteger,
+    QVariant.Date: ogr.OFTDate,
+    QVariant.Time: ogr.OFTTime,
+    QVariant.DateTime: ogr.OFTDateTime,
+}
+
+_OGR_GEOMETRY_TYPES = {
+    'Point': ogr.wkbPoint,
+    'LineString': ogr.wkbLineString,
+    'Polygon': ogr.wkbPolygon,
+}
+
+
+def point_wkb(x, y):
+    """Little-endian WKB for a 2D point."""
+    return struct.pack('<BIdd', 1, 1, x, y)
+
+
+def line_wkb(x1, y1, x2, y2):
+    """Little-endian WKB for a two-vertex 2D line string."""
+    return struct.pack('<BII4d', 1, 2, 2, x1, y1, x2, y2)
+
+
+def _ogr_error(action):
+    """RuntimeError for a failed OGR call, with GDAL's last error message."""
+    message = gdal.GetLastErrorMsg()
+    return RuntimeError(f'{action}: {message}' if message else f'{action}.')
+
+
+def _provider_error(provider, action):
+    """RuntimeError for a write the data provider rejected, with its last error."""
+    message = provider.lastError()
+    return RuntimeError(f'{action}: {message}' if message else f'{action}.')
+
+
+def _ogr_value(value):
+    """Convert a QGIS attribute value to something OGR accepts."""
+    if value is None:
+        return None
+    if isinstance(value, QVariant):
+        return None if value.isNull() else value.value()
+    if isinstance(value, (QDate, QTime, QDateTime)):
+        return value.toString(Qt.ISODate) if value.isValid() else None
+    return value
+
+
+class OgrLayerWriter:
+    """Write several output layers to a GeoPackage or FlatGeobuf target.
+
+    Usage::
+
+        writer = OgrLayerWriter(path, FORMAT_GPKG, crs)
+        writer.create_layer('Sectors', 'Polygon', fields)
+        writer.write('Sectors', wkb, attributes)
+        writer.close()
+        layers = writer.load_layers()
+
+    OGR calls that fail raise RuntimeError with GDAL's last error message.
+    """
+
+    def __init__(self, path, output_format, crs):
+        if output_format not in _DRIVER_NAMES:
+            raise ValueError(f'Unsupported output format: {output_format}')
+        self.output_format = output_format
+        self.path = path
+        self._srs = osr.SpatialReference()
+        self._srs.ImportFromWkt(crs.toWkt())
+        self._srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        self._driver = ogr.GetDriverByName(_DRIVER_NAMES[output_format])
+        if self._driver is None:
+            raise RuntimeError(f'OGR driver {_DRIVER_NAMES[output_format]} is not available.')
+
+        self._datasets = {}
+        self._layers = {}
+        self._paths = {}
+        self._counts = {}
+
+        if output_format == FORMAT_GPKG:
+            if os.path.exists(path):
+                self._driver.DeleteDataSource(path)
+            self._gpkg = self._driver.CreateDataSource(path)
+            if self._gpkg is None:
+                raise _ogr_error(f'Could not create {path}')
+            if self._gpkg.StartTransaction() != ogr.OGRERR_NONE:
+                raise _ogr_error(f'Could not start a transaction in {path}')
+
+    def _flatgeobuf_path(self, name):
+        """FlatGeobuf holds one layer per file: <stem>_<name>.fgb."""
+        stem, _ = os.path.splitext(self.path)
+        return f'{stem}_{name}.fgb'
+
+    def create_layer(self, name, geometry_type, fields):
+        """Create an output layer.
+
+        :param geometry_type: 'Point', 'LineString' or 'Polygon'.
+        :param fields: QgsFields of the output attributes.
+        """
+        ogr_type = _OGR_GEOMETRY_TYPES[geometry_type]
+        if self.output_format == FORMAT_GPKG:
+            dataset = self._gpkg
+            path = self.path
+            options = ['SPATIAL_INDEX=NO']
+            if any(field.name().lower() == 'fid' for field in fields):
+                # Keep a source 'fid' attribute from clashing with the GeoPackage key
+                options.append('FID=ogr_fid')
+        else:
+            path = self._flatgeobuf_path(name)
+            if os.path.exists(path):
+                self._driver.DeleteDataSource(path)
+            dataset = self._driver.CreateDataSource(path)
+            if dataset is None:
+                raise _ogr_error(f'Could not create {path}')
+            options = ['SPATIAL_INDEX=YES']
+
+        layer = dataset.CreateLayer(name, self._srs, ogr_type, options)
+        if layer is None:
+            raise _ogr_error(f'Could not create layer {name} in {path}')
+        for field in fields:
+            field_defn = ogr.FieldDefn(field.name(), _OGR_FIELD_TYPES.get(field.type(), ogr.OFTString))
+            if field.type() == QVariant.Bool:
+                field_defn.SetSubType(ogr.OFSTBoolean)
+            if field.type() == QVariant.Double and field.length() > 0:
+                field_defn.SetWidth(field.length())
+                field_defn.SetPrecision(max(field.precision(), 0))
+            if layer.CreateField(field_defn) != ogr.OGRERR_NONE:
+                raise _ogr_error(f'Could not create field {field.name()} in layer {name}')
+
+        self._datasets[name] = dataset
+        self._layers[name] = layer
+        self._paths[name] = path
+        self._counts[name] = 0
+
+    def write(self, name, wkb, attributes):
+        """Append one feature given as WKB bytes (None for no geometry) and an attribute list."""
+        layer = self._layers[name]
+        feature = ogr.Feature(layer.GetLayerDefn())
+        if wkb is not None:
+            geometry = ogr.CreateGeometryFromWkb(wkb)
+            if geometry is None:
+                raise _ogr_error(f'Invalid geometry for layer {name}')
+            feature.SetGeometryDirectly(geometry)
+        for index, value in enumerate(attributes):
+            value = _ogr_value(value)
+            if value is None:
+                feature.SetFieldNull(index)
+            else:
+                feature.SetField(index, value)
+        if layer.CreateFeature(feature) != ogr.OGRERR_NONE:
+            raise _ogr_error(f'Could not write a feature to layer {name}')
+        self._counts[name] += 1
+
+    def commit(self):
+        """Commit the GeoPackage features written so far and open a new transaction.
+
+        Long imports call this between batches so that a single transaction
+        does not grow with the whole input.
+        """
+        if self.output_format == FORMAT_GPKG:
+            self._commit_transaction()
+            if self._gpkg.StartTransaction() != ogr.OGRERR_NONE:
+                raise _ogr_error(f'Could not start a transaction in {self.path}')
+
+    def _commit_transaction(self):
+        if self._gpkg.CommitTransaction() != ogr.OGRERR_NONE:
+            raise _ogr_error(f'Could not commit the features written to {self.path}')
+
+    def count(self, name):
+        """Number of features written to a layer."""
+        return self._counts.get(name, 0)
+
+    def close(self):
+        """Commit, build spatial indexes and release the datasets."""
+        if self.output_format == FORMAT_GPKG:
+            self._commit_transaction()
+            for name, layer in self._layers.items():
+                # Layer names are typed by the user; quotes are doubled inside SQL literals
+                table = name.replace("'", "''")
+                column = layer.GetGeometryColumn().replace("'", "''")
+                result = self._gpkg.ExecuteSQL(f"SELECT CreateSpatialIndex('{table}', '{column}')")
+                if result is None:
+                    raise _ogr_error(f'Could not create the spatial index of layer {name}')
+                self._gpkg.ReleaseResultSet(result)
+            self._gpkg = None
+        # Dereferencing the datasets flushes them (and writes the FlatGeobuf index)
+        self._layers = {}
+        self._datasets = {}
+
+    def load_layers(self):
+        """Return a QgsVectorLayer for every written layer, in creation order."""
+        layers = []
+        for name, path in self._paths.items():
+            if self.output_format == FORMAT_GPKG:
+                uri = f'{path}|layername={name}'
+            else:
+                uri = path
+            layers.append(QgsVectorLayer(uri, name, 'ogr'))
+        return layers
+
+
+class FeatureColumnWriter:
+    """Append computed columns to the features of a source layer.
+
+    Source attributes are carried over by extending ``feat.attributes()``
+    and features are flushed to the provider every ``chunk_size`` features,
+    so neither the source nor the output features are held in memory.
+
+    :param source_layer: Layer whose features receive the new columns.
+    :param new_fields: QgsField list of the appended columns.
+    """
+
+    def __init__(self, source_layer, new_fields):
+        self.source_layer = source_layer
+        self.new_fields = list(new_fields)
+
+    def to_memory_layer(self, layer_name, values, chunk_size=OUTPUT_CHUNK_SIZE, progress=None):
+        """Create a memory layer with all source fields plus the new columns.
+
+        :param values: ``{feature_id: [value, ...]}`` in ``new_fields``
+            order; features without an entry get NULL.
+        :param progress: Optional callable ``progress(done, total)``.
+        :raises RuntimeError: When the memory provider rejects the fields
+            or a chunk of features.
+        :returns: ``(layer, feature_count)``.
+        """
+        source = self.source_layer
+        geometry = QgsWkbTypes.displayString(source.wkbType())
+        layer = QgsVectorLayer(f'{geometry}?crs={source.crs().authid()}', layer_name, 'memory')
+        provider = layer.dataProvider()
+        if not provider.addAttributes(source.fields().toList() + self.new_fields):
+            raise _provider_error(provider, f'Could not add fields to {layer_name}')
+        layer.updateFields()
+        fields = layer.fields()
+
+        nulls = [None] * len(self.new_fields)
+        total = source.featureCount()
+        written = 0
+        chunk = []
+
+        def flush():
+            ok, _ = provider.addFeatures(chunk)
+            if not ok:
+                raise _provider_error(provider, f'Could not write features to {layer_name}')
+            if progress:
+                progress(written + len(chunk), total)
+            return len(chunk)
+
+        for feat in source.getFeatures():
+            new_feat = QgsFeature(fields)
+            new_feat.setGeometry(feat.geometry())
+            new_feat.setAttributes(feat.attributes() + list(values.get(feat.id(), nulls)))
+            chunk.append(new_feat)
+            if len(chunk) >= chunk_size:
+                written += flush()
+                chunk = []
+        if chunk:
+            written += flush()
+        layer.updateExtents()
+        return layer, written
+
+    def update_in_place(self, values, chunk_size=OUTPUT_CHUNK_SIZE, progress=None):
+        """Write the new columns into the source layer itself.
+
+        Missing columns are added to the provider; existing columns of the
+        same name are overwritten. Only features with an entry in ``values``
+        are updated. The cached network model of the layer is dropped.
+
+        :raises RuntimeError: When the layer is being edited or its provider
+            cannot add fields or change attribute values, or rejects a write.
+        :returns: Number of updated features.
+        """
+        layer = self.source_layer
+        provider = layer.dataProvider()
+        if layer.isEditable():
+            raise RuntimeError(f'Layer {layer.name()} is in edit mode; save or discard the edits first.')
+        capabilities = provider.capabilities()
+        if not capabilities & QgsVectorDataProvider.ChangeAttributeValues:
+            raise RuntimeError(f'The data provider of {layer.name()} cannot change attribute values.')
+
+        missing = [field for field in self.new_fields if layer.fields().indexFromName(field.name()) == -1]
+        if missing:
+            if not capabilities & QgsVectorDataProvider.AddAttributes:
+                raise RuntimeError(f'The data provider of {layer.name()} cannot add fields.')
+            if not provider.addAttributes(missing):
+                raise RuntimeError(f'Could not add fields to {layer.name()}.')
+            layer.updateFields()
+        indexes = [layer.fields().indexFromName(field.name()) for field in self.new_fields]
+
+        total = len(values)
+        written = 0
+        chunk = {}
+
+        def flush():
+            if not provider.changeAttributeValues(chunk):
+                raise _provider_error(provider, f'Could not update the features of {layer.name()}')
+            if progress:
+                progress(written + len(chunk), total)
+            return len(chunk)
+
+        try:
+            for fid, row in values.items():
+                chunk[fid] = dict(zip(indexes, row))
+                if len(chunk) >= chunk_size:
+                    written += flush()
+                    chunk = {}
+            if chunk:
+                written += flush()
+        finally:
+            # Provider writes to existing columns emit no layer signal the model watches,
+            # and earlier chunks of a failed update are already written
+            invalidate_network_model(layer.id())
+            layer.triggerRepaint()
+        return written
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+
+import csv
+
+import numpy as np
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFeature, QgsField,
+                       QgsGeometry, QgsPointXY, QgsProject, QgsVectorLayer)
+
+from .core.coverage import raster_grid, sector_rsrp
+from .core.geodesy import meters_to_degrees
+from .core.interference_matrix import FILE_EXTENSION, InterferenceMatrix, interference_overlap
+from .core.neighbors import BestServers, handover_overlap, pixel_areas_km2, top_neighbors
+from .core.propagation import MODELS
+from .core.sparse import PairCounts
+from .dialog_state import FieldMappings, LayerList
+from .layer_writers import OUTPUT_CHUNK_SIZE
+from .network_model import network_model
+from .run_statistics import finish_run, setup_panel, timed_run
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('neighbor_planner_dialog_base.ui')
+
+NO_FIELD = '(none)'
+
+# Largest side (pixels) of a best server raster; larger areas get coarser pixels
+MAX_RASTER_SIZE = 3000
+
+
+class NeighborPlannerDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Plan neighbor relations from the best server overlap of the sectors.
+
+    Every band gets a best and second best server raster, built from the
+    RSRP window of each sector. Handover boundary pixels are summed per
+    sector pair into a sparse matrix and the neighbors of every sector are
+    ranked by boundary area. The top neighbors are written as a relation
+    line layer and, optionally, a CSV file.
+
+    The same best server rasters optionally give the interference matrix
+    of the sectors, saved for the PCI/RSI Planner and the Interference
+    Analysis.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(NeighborPlannerDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self.progressBar.setValue(0)
+        self.propagationModelComboBox.addItems(MODELS)
+        setup_panel(self)
+
+        self._field_combos = [
+            self.sectorIdFieldComboBox,
+            self.bandFieldComboBox,
+            self.heightFieldComboBox,
+            self.azimuthFieldComboBox,
+            self.beamwidthFieldComboBox,
+            self.powerFieldComboBox,
+            self.gainFieldComboBox,
+            self.frequencyFieldComboBox,
+            self.trafficFieldComboBox,
+        ]
+        # Created first: selecting the first layer restores its fields
+        self._field_mappings = FieldMappings('NeighborPlanner', self._field_combos)
+        self._layers = LayerList(self.layerComboBox)
+        self._layers.fieldsChanged.connect(self._on_fields_changed)
+        self.layerComboBox.currentIndexChanged.connect(self._on_layer_changed)
+        self._on_layer_changed()
+
+        self.csvFileButton.clicked.connect(self._browse_csv_file)
+        self.matrixFileButton.clicked.connect(self._browse_matrix_file)
+        self.runButton.clicked.connect(self._run_planning)
+
+    def _on_fields_changed(self):
+        """Rebuild the field combos when fields of the selected layer change."""
+        with self._field_mappings.kept():
+            self._on_layer_changed()
+
+    def _on_layer_changed(self, index=None):
+        for combo in self._field_combos:
+            combo.clear()
+        self.bandFieldComboBox.addItem(NO_FIELD)
+        self.trafficFieldComboBox.addItem(NO_FIELD)
+        layer = self._layers.current()
+        if layer is None:
+            return
+        names = [field.name() for field in layer.fields()]
+        for combo in self._field_combos:
+            combo.addItems(names)
+        self._field_mappings.restore(layer)
+
+    def _browse_csv_file(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Neighbor Lists', self.csvFileLineEdit.text(), 'CSV files (*.csv);;All files (*)')
+        if path:
+            self.csvFileLineEdit.setText(path)
+
+    def _browse_matrix_file(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Interference Matrix', self.matrixFileLineEdit.text(),
+            f'Interference matrices (*{FILE_EXTENSION});;All files (*)')
+        if path:
+            if not path.lower().endswith(FILE_EXTENSION):
+                path += FILE_EXTENSION
+            self.matrixFileLineEdit.setText(path)
+
+    def _show_progress(self, value, text):
+        self.progressBar.setValue(value)
+        self.progressBar.setFormat(text)
+        QtWidgets.QApplication.processEvents()
+
+    def _geographic_coordinates(self, network):
+        """Sector longitudes and latitudes (WGS84) of every row."""
+        wgs84 = QgsCoordinateReferenceSystem('EPSG:4326')
+        if network.crs == wgs84:
+            return network.x, network.y
+        transform = QgsCoordinateTransform(network.crs, wgs84, QgsProject.instance())
+        lon = np.full(len(network), np.nan)
+        lat = np.full(len(network), np.nan)
+        for row in network.positioned:
+            point = transform.transform(QgsPointXY(network.x[row], network.y[row]))
+            lon[row] = point.x()
+            lat[row] = point.y()
+        return lon, lat
+
+    def _band_raster(self, lon, lat, max_distance_km, resolution_m):
+        """``(xx, yy, resolution)`` of a raster covering the reach of the sectors at ``lon, lat``."""
+        mean_lat = float(np.mean(lat))
+        margin_x, margin_y = meters_to_degrees(mean_lat, max_distance_km * 1000.0, max_distance_km * 1000.0)
+        _, resolution = meters_to_degrees(mean_lat, 0.0, resolution_m)
+        x_min = lon.min() - margin_x
+        y_max = lat.max() + margin_y
+        width = lon.max() + margin_x - x_min
+        height = y_max - lat.min() + margin_y
+        resolution = max(float(resolution), max(width, height) / MAX_RASTER_SIZE)
+        cols = int(np.ceil(width / resolution))
+        rows = int(np.ceil(height / resolution))
+        xx, yy = raster_grid(x_min, y_max, resolution, rows, cols)
+        return xx, yy, resolution
+
+    def _relation_layer(self, name, crs, network, sector_ids, relations):
+        """Line layer from every sector to its ranked neighbors."""
+        layer = QgsVectorLayer(f'LineString?crs={crs.authid()}', name, 'memory')
+        provider = layer.dataProvider()
+        provider.addAttributes([
+            QgsField('source_id', QVariant.String),
+            QgsField('target_id', QVariant.String),
+            QgsField('rank', QVariant.Int),
+            QgsField('overlap_km2', QVariant.Double),
+        ])
+        layer.updateFields()
+
+        sources, targets, ranks, overlaps = relations
+        features = []
+        for source, target, rank, overlap in zip(sources, targets, ranks, overlaps):
+            feature = QgsFeature()
+            feature.setGeometry(QgsGeometry.fromPolylineXY([
+                QgsPointXY(network.x[source], network.y[source]),
+                QgsPointXY(network.x[target], network.y[target]),
+            ]))
+            feature.setAttributes([sector_ids[source], sector_ids[target], int(rank),
+                                   round(float(overlap), 6)])
+            features.append(feature)
+            if len(features) >= OUTPUT_CHUNK_SIZE:
+                provider.addFeatures(features)
+                features = []
+        if features:
+            provider.addFeatures(features)
+        layer.updateExtents()
+        return layer
+
+    def _write_csv(self, path, sector_ids, relations):
+        sources, targets, ranks, overlaps = relations
+        with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['source_id', 'target_id', 'rank', 'overlap_km2'])
+            for source, target, rank, overlap in zip(sources, targets, ranks, overlaps):
+                writer.writerow([sector_ids[source], sector_ids[target], int(rank), f'{overlap:.6f}'])
+
+    @timed_run('Neighbor Planner')
+    def _run_planning(self):
+        layer = self._layers.current()
+        if layer is None:
+            QtWidgets.QMessageBox.warning(self, 'Neighbor Planner', 'Please select a sector layer.')
+            return
+        sector_id_field = self.sectorIdFieldComboBox.currentText()
+        if not sector_id_field:
+            QtWidgets.QMessageBox.warning(self, 'Neighbor Planner', 'Please select the sector ID field.')
+            return
+        self._field_mappings.save(layer)
+
+        band_field = self.bandFieldComboBox.currentText()
+        if band_field == NO_FIELD:
+            band_field = ''
+        height_field = self.heightFieldComboBox.currentText()
+        azimuth_field = self.azimuthFieldComboBox.currentText()
+        beamwidth_field = self.beamwidthFieldComboBox.currentText()
+        power_field = self.powerFieldComboBox.currentText()
+        gain_field = self.gainFieldComboBox.currentText()
+        frequency_field = self.frequencyFieldComboBox.currentText()
+        model = self.propagationModelComboBox.currentText()
+        max_distance_km = self.maxDistanceSpinBox.value()
+        resolution_m = self.resolutionSpinBox.value()
+        margin_db = self.marginSpinBox.value()
+        min_rsrp = self.minRsrpSpinBox.value()
+        top_n = self.topNSpinBox.value()
+        mutual = self.mutualCheckBox.isChecked()
+        output_name = self.outputNameLineEdit.text().strip() or 'Neighbors'
+        csv_path = self.csvFileLineEdit.text().strip()
+        matrix_path = ''
+        if self.matrixGroupBox.isChecked():
+            matrix_path = self.matrixFileLineEdit.text().strip()
+            if not matrix_path:
+                QtWidgets.QMessageBox.warning(self, 'Neighbor Planner',
+                                              'Please choose the interference matrix file.')
+                return
+        ci_threshold_db = self.ciThresholdSpinBox.value()
+        traffic_field = self.trafficFieldComboBox.currentText()
+        if traffic_field == NO_FIELD:
+            traffic_field = ''
+        run_stats = self.run_stats
+
+        self.runButton.setEnabled(False)
+        try:
+            self._show_progress(0, 'Loading sectors...')
+            with run_stats.phase('load features'):
+                network = network_model(layer)
+                network.load([sector_id_field, band_field, height_field, azimuth_field, beamwidth_field,
+                              power_field, gain_field, frequency_field, traffic_field])
+                sector_ids = network.texts(sector_id_field)
+                heights = network.floats(height_field, 30.0)
+                azimuths = network.floats(azimuth_field, 0.0)
+                beamwidths = network.floats(beamwidth_field, 65.0)
+                powers = network.floats(power_field, 43.0)
+                gains = network.floats(gain_field, 18.0)
+                frequencies = network.floats(frequency_field, 2100.0)
+                traffic = network.floats(traffic_field, 0.0) if traffic_field else None
+                lon, lat = self._geographic_coordinates(network)
+
+                # Sectors of a band only hand over to sectors of the same band
+                positioned = network.positioned[~np.isnan(lon[network.positioned])]
+                band_values = network.texts(band_field) if band_field else None
+                bands = {}
+                for row in positioned:
+                    bands.setdefault(band_values[row] if band_values is not None else '', []).append(row)
+            if not len(positioned):
+                QtWidgets.QMessageBox.warning(self, 'Neighbor Planner', 'The layer has no located sectors.')
+                return
+            run_stats.count('sectors', len(positioned))
+            run_stats.count('bands', len(bands))
+
+            counts = PairCounts(len(network))
+            matrix_counts = PairCounts(len(network)) if matrix_path else None
+            pixels = 0
+            done = 0
+            with run_stats.phase('best servers'):
+                for band, rows in bands.items():
+                    rows = np.asarray(rows)
+                    xx, yy, resolution = self._band_raster(lon[rows], lat[rows], max_distance_km,
+                                                           resolution_m)
+                    pixels += xx.size
+                    pixel_areas = pixel_areas_km2(yy, resolution)
+
+                    def rsrp_window(row):
+                        return sector_rsrp(xx, yy, lon[row], lat[row], heights[row], azimuths[row],
+                                           beamwidths[row], powers[row], gains[row], frequencies[row],
+                                           model, max_distance_km)
+
+                    servers = BestServers(*xx.shape)
+                    for row in rows:
+                        result = rsrp_window(row)
+                        if result is not None:
+                            servers.add(row, *result)
+                        done += 1
+                        if done % 500 == 0:
+                            self._show_progress(int(80 * done / len(positioned)),
+                                                f'Best servers: {done:,} of {len(positioned):,} sectors...')
+                    handover_overlap(servers, pixel_areas, counts, margin_db, min_rsrp, mutual)
+                    if matrix_counts is not None:
+                        # Second pass over the windows: C/I of every interferer against the best server
+                        self._show_progress(int(80 * done / len(positioned)),
+                                            f'Interference matrix: band {band or "all"}...')
+                        interference_overlap(servers, rows, rsrp_window, pixel_areas, matrix_counts,
+                                             ci_threshold_db, traffic)
+                    # Release the rasters of the band before the next one
+                    del servers, xx, yy
+            run_stats.count('pixels', pixels)
+
+            self._show_progress(85, 'Ranking neighbors...')
+            with run_stats.phase('ranking'):
+                relations = top_neighbors(*counts.to_csr(), top_n=top_n)
+            run_stats.count('pairs', len(counts))
+            run_stats.count('relations', len(relations[0]))
+
+            self._show_progress(90, 'Writing neighbor lists...')
+            with run_stats.phase('write layer'):
+                relation_layer = self._relation_layer(output_name, layer.crs(), network, sector_ids,
+                                                      relations)
+                QgsProject.instance().addMapLayer(relation_layer)
+            if csv_path:
+                with run_stats.phase('write csv'):
+                    self._write_csv(csv_path, sector_ids, relations)
+            if matrix_counts is not None:
+                with run_stats.phase('save matrix'):
+                    matrix = InterferenceMatrix.from_counts(sector_ids, matrix_counts, {
+                        'layer': layer.name(),
+                        'model': model,
+                        'max_distance_km': max_distance_km,
+                        'resolution_m': resolution_m,
+                        'ci_threshold_db': ci_threshold_db,
+                        'traffic_field': traffic_field or None,
+                    })
+                    matrix.save(matrix_path)
+                run_stats.count('matrix pairs', matrix.pair_count)
+        except (OSError, MemoryError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Neighbor Planner', f'Neighbor planning failed: {e}')
+            return
+        finally:
+            self.runButton.setEnabled(True)
+
+        self._show_progress(100, 'Neighbor planning complete')
+        finish_run(self, self.run_stats)
+        with_neighbors = len(np.unique(relations[0]))
+        summary = (f'{len(relations[0]):,} neighbor relations for {with_neighbors:,} of '
+                   f'{len(positioned):,} sectors, from {len(counts):,} overlapping sector pairs.\n\n'
+                   f'Relation layer created: {output_name}')
+        if csv_path:
+            summary += f'\nNeighbor lists saved to: {csv_path}'
+        if matrix_counts is not None:
+            summary += (f'\nInterference matrix of {matrix.pair_count:,} sector pairs saved to: '
+                        f'{matrix_path}')
+        QtWidgets.QMessageBox.information(self, 'Neighbor Planner', summary)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Columnar network model of a sector layer shared by the RF Tools dialogs.
+
+:func:`network_model` returns one cached :class:`NetworkModel` per layer.
+The model reads feature ids and sector points once, loads attribute
+columns on first use and builds the spatial index lazily, so switching
+between tools on the same layer does not reload it. The cache entry is
+dropped as soon as the layer reports a change to its features, fields or
+CRS. Writers that change attribute values through the data provider, which
+emits none of these signals, call :func:`invalidate` themselves.
+"""
+
+import numpy as np
+
+from qgis.core import QgsFeatureRequest, QgsWkbTypes
+
+from .core.spatial_index import PointIndex
+from .layer_utils import distance_args
+
+# Layer signals after which a cached model no longer matches the layer
+_INVALIDATING_SIGNALS = (
+    'dataChanged',
+    'featureAdded',
+    'featuresDeleted',
+    'geometryChanged',
+    'attributeValueChanged',
+    'updatedFields',
+    'crsChanged',
+    'subsetStringChanged',
+)
+
+_models = {}
+_connected = set()
+
+
+def to_float(value, default=0.0):
+    """Convert a field value to float, returning default if conversion fails."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def feature_point(geom):
+    """Sector location of a geometry: the point itself or the centroid."""
+    if not geom or geom.isEmpty():
+        return None
+    if geom.type() == QgsWkbTypes.PointGeometry:
+        return geom.asPoint()
+    centroid = geom.centroid()
+    return centroid.asPoint() if centroid else None
+
+
+class NetworkModel:
+    """Feature ids, sector points and attribute columns of one layer.
+
+    Rows follow the layer's feature iteration order. Features without a
+    usable geometry keep their row with NaN coordinates.
+    """
+
+    def __init__(self, layer):
+        self.layer_id = layer.id()
+        self.crs = layer.crs()
+        self.distance_args = distance_args(self.crs)
+        self._layer = layer
+        self._fields = layer.fields()
+
+        fids = []
+        xs = []
+        ys = []
+        request = QgsFeatureRequest().setSubsetOfAttributes([])
+        for feat in layer.getFeatures(request):
+            fids.append(feat.id())
+            point = feature_point(feat.geometry())
+            if point is None:
+                xs.append(np.nan)
+                ys.append(np.nan)
+            else:
+                xs.append(point.x())
+                ys.append(point.y())
+
+        self.fids = np.array(fids, dtype=np.int64)
+        self.x = np.array(xs, dtype=float)
+        self.y = np.array(ys, dtype=float)
+        self.has_point = ~np.isnan(self.x)
+        self._rows = {fid: row for row, fid in enumerate(fids)}
+        self._values = {}
+        self._floats = {}
+        self._index = None
+
+    def __len__(self):
+        return len(self.fids)
+
+    @property
+    def positioned(self):
+        """Rows of the features with a sector point."""
+        return np.nonzero(self.has_point)[0]
+
+    def row(self, fid):
+        """Row of a feature id."""
+        return self._rows[fid]
+
+    def load(self, field_names):
+        """Read the missing columns of ``field_names`` in one pass over the layer."""
+        missing = [name for name in dict.fromkeys(field_names)
+                   if name and name not in self._values and self._fields.indexFromName(name) != -1]
+        if not missing:
+            return
+        indices = [self._fields.indexFromName(name) for name in missing]
+        columns = [[None] * len(self.fids) for _ in missing]
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes(indices)
+        for feat in self._layer.getFeatures(request):
+            row = self._rows.get(feat.id())
+            if row is None:
+                continue
+            attributes = feat.attributes()
+            for column, field_idx in zip(columns, indices):
+                column[row] = attributes[field_idx]
+        self._values.update(zip(missing, columns))
+
+    def values(self, field_name):
+        """Raw values of a field in row order; None for every row when the field is missing."""
+        self.load([field_name])
+        return self._values.get(field_name, [None] * len(self.fids))
+
+    def floats(self, field_name, default=0.0):
+        """Field values as a float array, default when missing or invalid.
+
+        The array is cached and shared between callers; do not modify it.
+        """
+        key = (field_name, default)
+        if key not in self._floats:
+            self._floats[key] = np.array([to_float(value, default) for value in self.values(field_name)],
+                                         dtype=float)
+        return self._floats[key]
+
+    def texts(self, field_name, default=''):
+        """Field values as strings, default for NULL values."""
+        return [default if value is None else str(value) for value in self.values(field_name)]
+
+    def point_index(self):
+        """:class:`PointIndex` over the positioned rows (indices refer to :attr:`positioned`)."""
+        if self._index is None:
+            positioned = self.positioned
+            self._index = PointIndex(self.x[positioned], self.y[positioned], **self.distance_args)
+        return self._index
+
+
+def network_model(layer):
+    """Cached :class:`NetworkModel` of a layer, built on first use."""
+    model = _models.get(layer.id())
+    if model is None:
+        model = NetworkModel(layer)
+        _models[layer.id()] = model
+        _watch(layer)
+    return model
+
+
+def invalidate(layer_id):
+    """Drop the cached model of a layer."""
+    _models.pop(layer_id, None)
+
+
+def clear():
+    """Drop every cached model."""
+    _models.clear()
+
+
+def _watch(layer):
+    """Invalidate the layer's model whenever the layer changes."""
+    layer_id = layer.id()
+    if layer_id in _connected:
+        return
+    _connected.add(layer_id)
+    for name in _INVALIDATING_SIGNALS:
+        getattr(layer, name).connect(lambda *args, layer_id=layer_id: invalidate(layer_id))
+
+    def forget():
+        invalidate(layer_id)
+        _connected.discard(layer_id)
+
+    layer.willBeDeleted.connect(forget)
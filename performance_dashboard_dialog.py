@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import os
+from datetime import datetime, timezone
+
+from qgis.PyQt import QtWidgets
+from qgis.core import QgsFeatureRequest
+
+from .core.text_io import csv_header
+from .core.kpi_store import DAILY, GRANULARITIES, HOURLY, KpiStore, guess_columns
+from .dialog_state import LayerList
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('performance_dashboard_dialog_base.ui')
+
+_PERIOD_FORMATS = {
+    HOURLY: '%Y-%m-%d %H:00',
+    DAILY: '%Y-%m-%d',
+}
+
+
+def _period_label(period, granularity):
+    start = datetime.fromtimestamp(period, timezone.utc)
+    return start.strftime(_PERIOD_FORMATS.get(granularity, 'Week of %Y-%m-%d'))
+
+
+class PerformanceDashboardDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Cell KPI dashboard backed by a local :class:`KpiStore`.
+
+    KPI exports are ingested once; the worst cells of an hour, day or week
+    are then read from the pre-computed rollups and can be selected on a
+    cell layer.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(PerformanceDashboardDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self._store = None
+        self._worst = []
+        self.progressBar.setValue(0)
+        self.resultsTableWidget.setHorizontalHeaderLabels(
+            ['Cell', 'Mean', 'Minimum', 'Maximum', 'Samples'])
+
+        self._layers = []
+        self._layer_list = LayerList(self.layerComboBox, self._layers)
+        self._layer_list.fieldsChanged.connect(self._on_fields_changed)
+        self.layerComboBox.currentIndexChanged.connect(self._on_layer_changed)
+        self._on_layer_changed()
+
+        self.storeFileButton.clicked.connect(self._browse_store_file)
+        self.storeFileLineEdit.editingFinished.connect(self._open_store)
+        self.exportFileButton.clicked.connect(self._browse_export_file)
+        self.importButton.clicked.connect(self._import_export)
+        self.kpiComboBox.currentIndexChanged.connect(self._populate_periods)
+        self.granularityComboBox.currentIndexChanged.connect(self._populate_periods)
+        self.showButton.clicked.connect(self._show_worst_cells)
+        self.selectButton.clicked.connect(self._select_worst_cells)
+
+    def close_connections(self):
+        """Close the KPI store."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def _on_fields_changed(self):
+        """Rebuild the field combo when fields of the selected layer change."""
+        field_name = self.cellFieldComboBox.currentText()
+        self._on_layer_changed()
+        self.cellFieldComboBox.setCurrentText(field_name)
+
+    def _on_layer_changed(self, index=None):
+        self.cellFieldComboBox.clear()
+        layer = self._layer_list.current()
+        if layer is None:
+            return
+        self.cellFieldComboBox.addItems([field.name() for field in layer.fields()])
+
+    def _browse_store_file(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'KPI Store', self.storeFileLineEdit.text(), 'KPI store (*.sqlite)',
+            options=QtWidgets.QFileDialog.DontConfirmOverwrite)
+        if path:
+            if not path.lower().endswith('.sqlite'):
+                path += '.sqlite'
+            self.storeFileLineEdit.setText(path)
+            self._open_store()
+
+    def _browse_export_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'KPI Export', self.exportFileLineEdit.text(),
+            'KPI exports (*.csv *.txt);;All files (*)')
+        if not path:
+            return
+        self.exportFileLineEdit.setText(path)
+        columns, _ = csv_header(path)
+        time_column, cell_column = guess_columns(columns)
+        for combo, guess in ((self.timeColumnComboBox, time_column),
+                             (self.cellColumnComboBox, cell_column)):
+            combo.clear()
+            combo.addItems(columns)
+            if guess:
+                combo.setCurrentIndex(columns.index(guess))
+
+    def _open_store(self):
+        """Open the store named in the dialog, keeping it open while the path is unchanged."""
+        path = self.storeFileLineEdit.text().strip()
+        if not path:
+            return None
+        if self._store is None or self._store.path != path:
+            self.close_connections()
+            self._store = KpiStore(path)
+            self.kpiComboBox.clear()
+            self.kpiComboBox.addItems(self._store.kpis())
+        return self._store
+
+    def _granularity(self):
+        return GRANULARITIES[max(self.granularityComboBox.currentIndex(), 0)]
+
+    def _populate_periods(self, index=None):
+        self.periodComboBox.clear()
+        if self._store is None or not self.kpiComboBox.currentText():
+            return
+        granularity = self._granularity()
+        # Latest period first: the usual question is about the current week
+        for period in reversed(self._store.periods(self.kpiComboBox.currentText(), granularity)):
+            self.periodComboBox.addItem(_period_label(period, granularity), period)
+
+    def _show_progress(self, value, text):
+        self.progressBar.setValue(value)
+        self.progressBar.setFormat(text)
+        QtWidgets.QApplication.processEvents()
+
+    def _import_export(self):
+        store = self._open_store()
+        if store is None:
+            QtWidgets.QMessageBox.warning(self, 'Performance Dashboard', 'Please choose a KPI store file.')
+            return
+        path = self.exportFileLineEdit.text().strip()
+        if not os.path.isfile(path):
+            QtWidgets.QMessageBox.warning(self, 'Performance Dashboard', 'Please select a KPI export.')
+            return
+
+        def show_ingest_progress(done, total):
+            self._show_progress(int(95 * done / total), 'Importing... %p%')
+
+        self.importButton.setEnabled(False)
+        try:
+            stored = store.ingest_csv(path, self.timeColumnComboBox.currentText(),
+                                      self.cellColumnComboBox.currentText(),
+                                      progress=show_ingest_progress)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Performance Dashboard', f'Import failed: {e}')
+            return
+        finally:
+            self.importButton.setEnabled(True)
+
+        selected = self.kpiComboBox.currentText()
+        self.kpiComboBox.clear()
+        self.kpiComboBox.addItems(store.kpis())
+        if selected:
+            self.kpiComboBox.setCurrentText(selected)
+        self._show_progress(100, f'{stored:,} KPI values imported')
+
+    def _show_worst_cells(self):
+        if self._store is None or self.periodComboBox.currentIndex() < 0:
+            QtWidgets.QMessageBox.warning(self, 'Performance Dashboard', 'Please select a KPI and a period.')
+            return
+        self._worst = self._store.worst_cells(
+            self.kpiComboBox.currentText(), self.periodComboBox.currentData(),
+            self._granularity(), self.worstPercentSpinBox.value() / 100.0,
+            self.higherIsWorseCheckBox.isChecked())
+
+        self.resultsTableWidget.setRowCount(len(self._worst))
+        for row, values in enumerate(self._worst):
+            for column, value in enumerate(values):
+                text = f'{value:.3f}' if isinstance(value, float) else str(value)
+                self.resultsTableWidget.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+        self.resultsTableWidget.resizeColumnsToContents()
+
+    def _select_worst_cells(self):
+        layer = self._layer_list.current()
+        cell_field = self.cellFieldComboBox.currentText()
+        if layer is None or not cell_field or not self._worst:
+            QtWidgets.QMessageBox.warning(
+                self, 'Performance Dashboard', 'Please list the worst cells and select a cell layer.')
+            return
+        worst = {row[0] for row in self._worst}
+        field_index = layer.fields().indexOf(cell_field)
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([field_index])
+        ids = [feature.id() for feature in layer.getFeatures(request)
+               if str(feature[field_index]) in worst]
+        layer.selectByIds(ids)
+        if ids:
+            self.iface.mapCanvas().zoomToSelected(layer)
+        self.progressBar.setFormat(f'{len(ids):,} of {len(worst):,} cells selected on {layer.name()}')
@@ -26,22 +26,18 @@ from qgis.PyQt.QtWidgets import QAction, QMessageBox
 from qgis.core import (QgsProject, QgsApplication, QgsVectorLayer, QgsFeature, 
                        QgsGeometry, QgsPointXY, QgsField, QgsFields, QgsWkbTypes,
                        QgsSymbol, QgsRendererCategory, QgsCategorizedSymbolRenderer,
-                       QgsFillSymbol, QgsMarkerSymbol, QgsSingleSymbolRenderer)
+                       QgsFillSymbol, QgsMarkerSymbol, QgsSingleSymbolRenderer,
+                       QgsFeatureRequest)
 from qgis.gui import QgsMapToolEmitPoint
 from qgis.PyQt.QtCore import QVariant
-import math
 # Initialize Qt resources from file resources.py
 from . import resources
-# Import the code for the dialog
-from .rf_tools_dialog import RFToolsDialog
-from .pci_rsi_planner_dialog import PciRsiPlannerDialog
-from .tilt_optimizer_dialog import TiltOptimizerDialog
-from .azimuth_optimizer_dialog import AzimuthOptimizerDialog
-from .coverage_prediction_dialog import CoveragePredictionDialog
-from .interference_analysis_dialog import InterferenceAnalysisDialog
-from .about_dialog import AboutRFToolsDialog
+from .run_statistics import finish_run, timed_run
 import os.path
 
+# The dialog modules, their forms and NumPy are imported on first use so
+# that loading the plugin only registers the actions.
+
 
 class RFTools:
     """QGIS Plugin Implementation."""
@@ -79,6 +75,13 @@ class RFTools:
         # TODO: We are going to let the user set this up in a future iteration
         self.toolbar = self.iface.addToolBar(u'RFTools')
         self.toolbar.setObjectName(u'RFTools')
+        
+        # Renderers and symbols reused across Site See runs
+        self._style_cache = {}
+        # Site See dialog, created on first run
+        self.dlg = None
+        # Tool dialogs by class, created on first use and reused afterwards
+        self._dialogs = {}
 
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
@@ -146,9 +149,6 @@ class RFTools:
         :rtype: QAction
         """
 
-        # Create the dialog (after translation) and keep reference
-        self.dlg = RFToolsDialog()
-
         # Allow passing either a QIcon instance or a path
         if isinstance(icon_path, QIcon):
             icon = icon_path
@@ -262,6 +262,97 @@ class RFTools:
         self.iface.addPluginToMenu(self.menu, interference_action)
         self.actions.append(interference_action)
 
+        # Model calibration icon
+        calibration_icon_path = os.path.join(self.plugin_dir, 'icon_calibration.svg')
+        if not os.path.exists(calibration_icon_path):
+            calibration_icon_path = os.path.join(self.plugin_dir, 'icon_calibration.png')
+        if not os.path.exists(calibration_icon_path):
+            calibration_icon_path = default_icon_path
+        calibration_icon = QIcon(calibration_icon_path)
+        calibration_action = QAction(calibration_icon, self.tr(u'Model Calibration'), self.iface.mainWindow())
+        calibration_action.triggered.connect(self.run_calibration)
+        self.toolbar.addAction(calibration_action)
+        self.iface.addPluginToMenu(self.menu, calibration_action)
+        self.actions.append(calibration_action)
+
+        # Vendor CM import icon
+        vendor_import_icon_path = os.path.join(self.plugin_dir, 'icon_vendorimport.svg')
+        if not os.path.exists(vendor_import_icon_path):
+            vendor_import_icon_path = os.path.join(self.plugin_dir, 'icon_vendorimport.png')
+        if not os.path.exists(vendor_import_icon_path):
+            vendor_import_icon_path = default_icon_path
+        vendor_import_icon = QIcon(vendor_import_icon_path)
+        vendor_import_action = QAction(vendor_import_icon, self.tr(u'Vendor CM Import'), self.iface.mainWindow())
+        vendor_import_action.triggered.connect(self.run_vendor_import)
+        self.toolbar.addAction(vendor_import_action)
+        self.iface.addPluginToMenu(self.menu, vendor_import_action)
+        self.actions.append(vendor_import_action)
+
+        # Drive Test import icon
+        drive_test_icon_path = os.path.join(self.plugin_dir, 'icon_drivetest.svg')
+        if not os.path.exists(drive_test_icon_path):
+            drive_test_icon_path = os.path.join(self.plugin_dir, 'icon_drivetest.png')
+        if not os.path.exists(drive_test_icon_path):
+            drive_test_icon_path = default_icon_path
+        drive_test_icon = QIcon(drive_test_icon_path)
+        drive_test_action = QAction(drive_test_icon, self.tr(u'Drive Test Import'), self.iface.mainWindow())
+        drive_test_action.triggered.connect(self.run_drive_test)
+        self.toolbar.addAction(drive_test_action)
+        self.iface.addPluginToMenu(self.menu, drive_test_action)
+        self.actions.append(drive_test_action)
+
+        # Drive test binning icon
+        binning_icon_path = os.path.join(self.plugin_dir, 'icon_binning.svg')
+        if not os.path.exists(binning_icon_path):
+            binning_icon_path = os.path.join(self.plugin_dir, 'icon_binning.png')
+        if not os.path.exists(binning_icon_path):
+            binning_icon_path = default_icon_path
+        binning_icon = QIcon(binning_icon_path)
+        binning_action = QAction(binning_icon, self.tr(u'Drive Test Binning'), self.iface.mainWindow())
+        binning_action.triggered.connect(self.run_drive_test_binning)
+        self.toolbar.addAction(binning_action)
+        self.iface.addPluginToMenu(self.menu, binning_action)
+        self.actions.append(binning_action)
+
+        # Neighbor planner icon
+        neighbor_icon_path = os.path.join(self.plugin_dir, 'icon_neighbors.svg')
+        if not os.path.exists(neighbor_icon_path):
+            neighbor_icon_path = os.path.join(self.plugin_dir, 'icon_neighbors.png')
+        if not os.path.exists(neighbor_icon_path):
+            neighbor_icon_path = default_icon_path
+        neighbor_icon = QIcon(neighbor_icon_path)
+        neighbor_action = QAction(neighbor_icon, self.tr(u'Neighbor Planner'), self.iface.mainWindow())
+        neighbor_action.triggered.connect(self.run_neighbor_planner)
+        self.toolbar.addAction(neighbor_action)
+        self.iface.addPluginToMenu(self.menu, neighbor_action)
+        self.actions.append(neighbor_action)
+
+        # Database connector icon
+        database_icon_path = os.path.join(self.plugin_dir, 'icon_database.svg')
+        if not os.path.exists(database_icon_path):
+            database_icon_path = os.path.join(self.plugin_dir, 'icon_database.png')
+        if not os.path.exists(database_icon_path):
+            database_icon_path = default_icon_path
+        database_icon = QIcon(database_icon_path)
+        database_action = QAction(database_icon, self.tr(u'Database Connector'), self.iface.mainWindow())
+        database_action.triggered.connect(self.run_database_connector)
+        self.toolbar.addAction(database_action)
+        self.iface.addPluginToMenu(self.menu, database_action)
+        self.actions.append(database_action)
+
+        # Performance dashboard icon
+        dashboard_icon_path = os.path.join(self.plugin_dir, 'icon_dashboard.svg')
+        if not os.path.exists(dashboard_icon_path):
+            dashboard_icon_path = os.path.join(self.plugin_dir, 'icon_dashboard.png')
+        if not os.path.exists(dashboard_icon_path):
+            dashboard_icon_path = default_icon_path
+        dashboard_icon = QIcon(dashboard_icon_path)
+        dashboard_action = QAction(dashboard_icon, self.tr(u'Performance Dashboard'), self.iface.mainWindow())
+        dashboard_action.triggered.connect(self.run_performance_dashboard)
+        self.toolbar.addAction(dashboard_action)
+        self.iface.addPluginToMenu(self.menu, dashboard_action)
+        self.actions.append(dashboard_action)
+
         # About RF Tools icon (orange)
         about_icon_path = os.path.join(self.plugin_dir, 'icon_about.svg')
         if not os.path.exists(about_icon_path):
@@ -283,54 +374,62 @@ class RFTools:
                 self.menu,
                 action)
             self.iface.removeToolBarIcon(action)
+        # Release the cached dialogs and their project connections
+        for dlg in list(self._dialogs.values()) + [self.dlg]:
+            if dlg is not None:
+                if hasattr(dlg, 'close_connections'):
+                    dlg.close_connections()
+                dlg.close()
+                dlg.deleteLater()
+        self._dialogs.clear()
+        self.dlg = None
         # remove the toolbar
         del self.toolbar
 
 
     def run(self):
         """Run method that performs all the real work"""
-        layers = list(QgsProject.instance().mapLayers().values())
-        layer_list = []
-        self._layer_map = {}
-        
-        for layer in layers:
-            if isinstance(layer, QgsVectorLayer):
-                layer_list.append(layer.name())
-                self._layer_map[layer.name()] = layer
-
-        self.dlg.selectLayerComboBox.clear()
-        self.dlg.selectLayerComboBox.addItems(layer_list)
-        
-        # Disconnect any existing connections to avoid duplicates
-        try:
-            self.dlg.selectLayerComboBox.currentTextChanged.disconnect(self._populate_fields)
-        except:
-            pass
-        
-        try:
-            self.dlg.runButton.clicked.disconnect(self._create_sectors)
-        except:
-            pass
-        
-        # Populate field combo boxes when layer is selected
-        self.dlg.selectLayerComboBox.currentTextChanged.connect(self._populate_fields)
-        if layer_list:
-            self._populate_fields(layer_list[0])
-        
-        # Connect the run button to create sectors
-        self.dlg.runButton.clicked.connect(self._create_sectors)
+        if self.dlg is None:
+            from .dialog_state import FieldMappings, LayerList
+            from .rf_tools_dialog import RFToolsDialog
+            self.dlg = RFToolsDialog()
+            self._site_see_fields = FieldMappings('SiteSee', [
+                self.dlg.hubXComboBox,
+                self.dlg.hubYComboBox,
+                self.dlg.azimuthComboBox,
+                self.dlg.beamwidthComboBox,
+                self.dlg.sectorSizeComboBox,
+                self.dlg.sectorXComboBox,
+                self.dlg.sectorYComboBox,
+                self.dlg.bandComboBox,
+            ])
+            # The layer list follows the project from now on
+            self._site_see_layers = LayerList(self.dlg.selectLayerComboBox)
+            self._site_see_layers.fieldsChanged.connect(self._on_site_see_fields_changed)
+
+            # Populate field combo boxes when layer is selected
+            self.dlg.selectLayerComboBox.currentIndexChanged.connect(self._populate_fields)
+            self._populate_fields()
+
+            # Connect the run button to create sectors
+            self.dlg.runButton.clicked.connect(self._create_sectors)
 
         # show the dialog
         self.dlg.show()
         # Run the dialog event loop
         self.dlg.exec_()
     
-    def _populate_fields(self, layer_name):
+    def _on_site_see_fields_changed(self):
+        """Rebuild the field combos when fields of the selected layer change."""
+        with self._site_see_fields.kept():
+            self._populate_fields()
+
+    def _populate_fields(self, index=None):
         """Populate field combo boxes based on selected layer"""
-        if not layer_name or layer_name not in self._layer_map:
+        layer = self._site_see_layers.current()
+        if layer is None:
             return
         
-        layer = self._layer_map[layer_name]
         field_names = [field.name() for field in layer.fields()]
         
         self.dlg.hubXComboBox.clear()
@@ -363,15 +462,25 @@ class RFTools:
         self.dlg.bandComboBox.clear()
         self.dlg.bandComboBox.addItem('(No Band Field)')
         self.dlg.bandComboBox.addItems(field_names)
+
+        self._site_see_fields.restore(layer)
     
+    @timed_run('Site See', panel='dlg')
     def _create_sectors(self):
         """Create sector polygons and connection lines for remote sectors"""
-        layer_name = self.dlg.selectLayerComboBox.currentText()
-        if not layer_name or layer_name not in self._layer_map:
+        import numpy as np
+        from .core.geodesy import meters_to_degrees
+        from .core.site_see import (azimuth_bin_labels, band_labels, band_ranks,
+                                    nested_band_scale, sector_polygons_wkb, unique_sites)
+        from .layer_writers import FORMAT_MEMORY
+        from .network_model import to_float
+
+        source_layer = self._site_see_layers.current()
+        if source_layer is None:
             QMessageBox.warning(self.iface.mainWindow(), 'RF Tools', 'Please select a valid layer.')
             return
+        self._site_see_fields.save(source_layer)
         
-        source_layer = self._layer_map[layer_name]
         site_lat_field = self.dlg.hubYComboBox.currentText()
         site_lon_field = self.dlg.hubXComboBox.currentText()
         azimuth_field = self.dlg.azimuthComboBox.currentText()
@@ -382,23 +491,21 @@ class RFTools:
         band_field = self.dlg.bandComboBox.currentText()
         if band_field == '(No Band Field)':
             band_field = None
-        new_layer_name = 'Sectors'  # Default layer name
-        
-        # Create output layers
-        crs = source_layer.crs().authid()
-        sector_layer = QgsVectorLayer(f'Polygon?crs={crs}', new_layer_name, 'memory')
-        line_layer = QgsVectorLayer(f'LineString?crs={crs}', f'{new_layer_name}_Links', 'memory')
-        site_layer = QgsVectorLayer(f'Point?crs={crs}', f'{new_layer_name}_Sites', 'memory')
-        
-        # Add fields
-        sector_provider = sector_layer.dataProvider()
-        line_provider = line_layer.dataProvider()
-        
+        new_layer_name = self.dlg.outputLayerLineEdit.text().strip() or 'Sectors'
+        
+        output_format = FORMAT_MEMORY
+        output_path = ''
+        if hasattr(self.dlg, 'outputFormatComboBox'):
+            output_format = self.dlg.outputFormatComboBox.currentText()
+            output_path = self.dlg.outputFileLineEdit.text().strip()
+            if output_format != FORMAT_MEMORY and not output_path:
+                QMessageBox.warning(self.iface.mainWindow(), 'RF Tools', 'Please choose an output file.')
+                return
+        
+        # Output fields
         sector_fields = QgsFields()
         for field in source_layer.fields():
             sector_fields.append(field)
-        sector_provider.addAttributes(sector_fields)
-        sector_layer.updateFields()
         
         line_fields = QgsFields()
         site_id_field = QgsField('site_id', QVariant.String)
@@ -407,10 +514,7 @@ class RFTools:
         sector_id_field = QgsField('sector_id', QVariant.String)
         sector_id_field.setLength(255)
         line_fields.append(sector_id_field)
-        line_provider.addAttributes(line_fields)
-        line_layer.updateFields()
         
-        site_provider = site_layer.dataProvider()
         site_fields = QgsFields()
         site_lat_field_obj = QgsField('site_lat', QVariant.Double)
         site_lat_field_obj.setLength(20)
@@ -420,195 +524,196 @@ class RFTools:
         site_lon_field_obj.setLength(20)
         site_lon_field_obj.setPrecision(6)
         site_fields.append(site_lon_field_obj)
-        site_provider.addAttributes(site_fields)
-        site_layer.updateFields()
-        
-        sector_features = []
-        line_features = []
-        site_points = {}  # Track unique site locations
         
-        # First pass: collect all features and group by site+azimuth to find bands
-        site_sectors = {}  # Key: (site_lat, site_lon, azimuth), Value: list of (feat, band_value)
+        # Resolve field indices once so attributes are read by position
+        source_fields = source_layer.fields()
+        lat_idx = source_fields.indexFromName(site_lat_field)
+        lon_idx = source_fields.indexFromName(site_lon_field)
+        azimuth_idx = source_fields.indexFromName(azimuth_field) if azimuth_field else -1
+        beamwidth_idx = -1
+        if beamwidth_field and beamwidth_field != '(Use Manual Value)':
+            beamwidth_idx = source_fields.indexFromName(beamwidth_field)
+        sectorsize_idx = -1
+        if sectorsize_field and sectorsize_field != '(Use Manual Value)':
+            sectorsize_idx = source_fields.indexFromName(sectorsize_field)
+        sector_x_idx = -1
+        sector_y_idx = -1
+        if sector_x_field and sector_y_field and \
+           sector_x_field != '(Use Hub Position)' and sector_y_field != '(Use Hub Position)':
+            sector_x_idx = source_fields.indexFromName(sector_x_field)
+            sector_y_idx = source_fields.indexFromName(sector_y_field)
+        band_idx = source_fields.indexFromName(band_field) if band_field else -1
+        
+        if lat_idx == -1 or lon_idx == -1:
+            QMessageBox.warning(self.iface.mainWindow(), 'RF Tools', 'Please select the site latitude and longitude fields.')
+            return
         
-        for feat in source_layer.getFeatures():
-            geom = feat.geometry()
-            
-            # Get site coordinates
-            if not site_lat_field or not site_lon_field:
-                continue
-            
-            try:
-                site_lat = float(feat[site_lat_field])
-                site_lon = float(feat[site_lon_field])
-            except (ValueError, KeyError, TypeError):
-                continue
-            
-            # Get azimuth
-            try:
-                azimuth = float(feat[azimuth_field]) if azimuth_field else 0
-            except:
-                azimuth = 0
-            
-            # Get band value
-            band_value = None
-            if band_field:
-                try:
-                    band_value = float(feat[band_field])
-                except:
-                    band_value = 0
-            
-            # Group by site and azimuth
-            key = (round(site_lat, 6), round(site_lon, 6), round(azimuth, 1))
-            if key not in site_sectors:
-                site_sectors[key] = []
-            site_sectors[key].append((feat, band_value))
-        
-        # Determine band ordering for each site+azimuth group
-        # Sort bands: lowest frequency (largest sector) first
-        for key in site_sectors:
-            site_sectors[key].sort(key=lambda x: x[1] if x[1] else 0)
-        
-        # Second pass: create sectors with proper sizing and z-order
-        # First, collect all features with their calculated radius for sorting
-        sector_data = []
-        
-        for feat in source_layer.getFeatures():
-            geom = feat.geometry()
-            
-            # Get site coordinates first (required)
-            if not site_lat_field or not site_lon_field:
-                continue
-            
-            try:
-                site_lat = float(feat[site_lat_field])
-                site_lon = float(feat[site_lon_field])
-                site_point = QgsPointXY(site_lon, site_lat)
-                
-                # Track unique site locations for site markers
-                site_key = (round(site_lat, 6), round(site_lon, 6))
-                if site_key not in site_points:
-                    site_points[site_key] = (site_lat, site_lon)
-            except (ValueError, KeyError, TypeError):
-                # Skip if site coordinates are invalid
-                continue
-            
-            # Check if sector has remote position
-            if sector_x_field and sector_y_field and \
-               sector_x_field != '(Use Hub Position)' and sector_y_field != '(Use Hub Position)':
-                try:
-                    sector_lon = float(feat[sector_x_field])
-                    sector_lat = float(feat[sector_y_field])
-                    sector_point = QgsPointXY(sector_lon, sector_lat)
-                    # Create connection line for remote sector
-                    line_geom = QgsGeometry.fromPolylineXY([site_point, sector_point])
-                    line_feat = QgsFeature()
-                    line_feat.setGeometry(line_geom)
-                    line_feat.setAttributes([str(feat.id()), str(feat.id())])
-                    line_features.append(line_feat)
-                except (ValueError, KeyError, TypeError):
-                    # If remote coordinates invalid, use site location
-                    sector_point = site_point
-            else:
-                # Co-located sector
-                sector_point = site_point
-            
-            # Get azimuth
-            try:
-                azimuth = float(feat[azimuth_field]) if azimuth_field else 0
-            except:
-                azimuth = 0
-            
-            # Get beamwidth - check if using manual value or field
-            if beamwidth_field == '(Use Manual Value)' or not beamwidth_field:
-                # Use manual value from spin box
-                beamwidth = self.dlg.beamwidthSpinBox.value()
-            else:
-                # Use value from field
-                try:
-                    beamwidth = float(feat[beamwidth_field])
-                except:
-                    beamwidth = 65
-            
-            # Get sector size - check if using manual value or field
-            if sectorsize_field == '(Use Manual Value)' or not sectorsize_field:
-                # Use manual value from spin box
-                radius_meters = self.dlg.sectorSizeSpinBox.value()
+        manual_beamwidth = self.dlg.beamwidthSpinBox.value()
+        manual_radius = self.dlg.sectorSizeSpinBox.value()
+        
+        # Single pass over the source layer: geometry is not needed, only the
+        # attribute values that drive the sector layout
+        with self.run_stats.phase('load features'):
+            request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+            feature_ids = []
+            feature_attributes = []
+            for feat in source_layer.getFeatures(request):
+                feature_ids.append(feat.id())
+                feature_attributes.append(feat.attributes())
+
+            def column(field_idx, default):
+                return np.array([to_float(attrs[field_idx], default) for attrs in feature_attributes],
+                                dtype=float)
+
+            # Site coordinates are required
+            site_lats = column(lat_idx, np.nan)
+            site_lons = column(lon_idx, np.nan)
+            valid = np.nonzero(~(np.isnan(site_lats) | np.isnan(site_lons)))[0]
+            count = len(valid)
+            feature_ids = [feature_ids[row] for row in valid]
+            feature_attributes = [feature_attributes[row] for row in valid]
+            site_lats = site_lats[valid]
+            site_lons = site_lons[valid]
+        
+            # Remote sector position (falls back to hub position when invalid)
+            if sector_x_idx != -1 and sector_y_idx != -1:
+                sector_lons = column(sector_x_idx, np.nan)
+                sector_lats = column(sector_y_idx, np.nan)
             else:
-                # Use value from field
-                try:
-                    radius_meters = float(feat[sectorsize_field])
-                except:
-                    radius_meters = 1000
-            
-            # Get band value if band field is specified
-            band_value = None
+                sector_lons = np.full(count, np.nan)
+                sector_lats = np.full(count, np.nan)
+            azimuths = column(azimuth_idx, 0) if azimuth_idx != -1 else np.zeros(count)
+            beamwidths = (column(beamwidth_idx, 65) if beamwidth_idx != -1
+                          else np.full(count, float(manual_beamwidth)))
+            radii_meters = (column(sectorsize_idx, 1000) if sectorsize_idx != -1
+                            else np.full(count, float(manual_radius)))
+            band_values = column(band_idx, 0) if band_idx != -1 else np.zeros(count)
+        
+        # Remote sectors are drawn at their own position with a link to the hub
+        with self.run_stats.phase('sector geometry'):
+            remote = ~(np.isnan(sector_lons) | np.isnan(sector_lats))
+            sector_lons = np.where(remote, sector_lons, site_lons)
+            sector_lats = np.where(remote, sector_lats, site_lats)
+        
+            # Rank bands within each site+azimuth group: lowest frequency (rank 0)
+            # gets full size and each following band is drawn as a nested sector
+            radius_meters = np.asarray(radii_meters, dtype=float)
             if band_field:
-                try:
-                    band_value = float(feat[band_field])
-                except:
-                    band_value = 0
-            
-            # Determine sector size based on band position in group
-            # Find this sector's position in its site+azimuth group
-            key = (round(site_lat, 6), round(site_lon, 6), round(azimuth, 1))
-            band_index = 0
-            num_bands = 1
-            
-            if key in site_sectors and band_field:
-                group = site_sectors[key]
-                num_bands = len(group)
-                # Find this feature's index in the sorted group
-                for idx, (f, b) in enumerate(group):
-                    if f.id() == feat.id():
-                        band_index = idx
-                        break
-            
-            # Calculate sector size with offset for multiple bands
-            # Lowest frequency (index 0) gets full size
-            # Each subsequent band gets progressively smaller
-            if num_bands > 1 and band_field:
-                # Create visible offset: each band is 15% smaller than the previous
-                # This ensures all bands are visible as nested sectors
-                scale_factor = 1.0 - (band_index * 0.15)
-                scale_factor = max(0.4, scale_factor)  # Minimum 40% of original size
-                adjusted_radius_meters = radius_meters * scale_factor
+                band_index, num_bands = band_ranks(site_lats, site_lons, azimuths, band_values)
+                radius_meters = radius_meters * nested_band_scale(band_index, num_bands)
+        
+            # Convert meters to degrees with the local longitude/latitude scale of each sector
+            radius_lon, radius_lat = meters_to_degrees(sector_lats, radius_meters, radius_meters)
+        
+            # Build all sector polygons in one vectorized pass
+            sector_wkbs = sector_polygons_wkb(sector_lons, sector_lats, azimuths,
+                                              beamwidths, radius_lon, radius_lat)
+        
+            # Sort sectors by radius in descending order (largest first) so smaller sectors are drawn on top
+            draw_order = np.lexsort((band_values, -radius_meters))
+            remote_indices = np.nonzero(remote)[0]
+            site_indices = unique_sites(site_lats, site_lons)
+        self.run_stats.count('sectors', count)
+        
+        with self.run_stats.phase('write layers'):
+            if output_format == FORMAT_MEMORY:
+                sector_layer, line_layer, site_layer = self._write_memory_layers(
+                    source_layer.crs().authid(), new_layer_name,
+                    sector_fields, line_fields, site_fields,
+                    sector_wkbs, feature_attributes, feature_ids, draw_order,
+                    remote_indices, site_indices, site_lons, site_lats, sector_lons, sector_lats)
             else:
-                adjusted_radius_meters = radius_meters
-            
-            # Convert meters to degrees (rough approximation: 1 degree ≈ 111,000 meters at equator)
-            radius_deg = adjusted_radius_meters / 111000.0
-            
-            # Create sector polygon and store with calculated radius for sorting
-            sector_geom = self._create_sector_polygon(sector_point, azimuth, beamwidth, radius_deg)
-            
-            # Store feature data with radius for sorting
-            sector_data.append({
-                'feature': feat,
-                'geometry': sector_geom,
-                'radius': radius_deg,
-                'band_value': band_value if band_field else 0
-            })
+                try:
+                    sector_layer, line_layer, site_layer = self._write_file_layers(
+                        output_path, output_format, source_layer.crs(), new_layer_name,
+                        sector_fields, line_fields, site_fields,
+                        sector_wkbs, feature_attributes, feature_ids, draw_order,
+                        remote_indices, site_indices, site_lons, site_lats, sector_lons, sector_lats)
+                except RuntimeError as e:
+                    QMessageBox.critical(self.iface.mainWindow(), 'RF Tools', f'Could not write output: {str(e)}')
+                    return
+        
+        num_sectors = len(draw_order)
+        num_lines = len(remote_indices)
+        num_sites = len(site_indices)
+        
+        with self.run_stats.phase('style layers'):
+            # Add layers to project
+            QgsProject.instance().addMapLayer(sector_layer)
+        
+            # Apply color coding to sectors from the values already read
+            if self.dlg.colorCodeByBandCheckBox.isChecked() and band_field:
+                self._apply_band_colors(sector_layer, band_field,
+                                        band_labels(attrs[band_idx] for attrs in feature_attributes))
+            elif self.dlg.colorCodeCheckBox.isChecked():
+                self._apply_sector_colors(sector_layer, azimuth_field, azimuth_bin_labels(azimuths))
+        
+            if num_lines:
+                QgsProject.instance().addMapLayer(line_layer)
+        
+            # Add and style site markers
+            if num_sites:
+                QgsProject.instance().addMapLayer(site_layer)
+                self._apply_site_marker_style(site_layer)
+        
+        # Show completion message
+        message_parts = [f'Created {num_sectors} sectors']
+        if num_sites:
+            message_parts.append(f'{num_sites} sites')
+        if num_lines:
+            message_parts.append(f'{num_lines} connection lines')
         
-        # Sort sectors by radius in descending order (largest first) so smaller sectors are drawn on top
-        sector_data.sort(key=lambda x: (-x['radius'], x['band_value']))
+        finish_run(self.dlg, self.run_stats)
+        QMessageBox.information(self.iface.mainWindow(), 'RF Tools', 
+                              ' and '.join(message_parts) + '.')
+    
+    def _write_memory_layers(self, crs, layer_name, sector_fields, line_fields, site_fields,
+                             sector_wkbs, feature_attributes, feature_ids, draw_order,
+                             remote_indices, site_indices, site_lons, site_lats, sector_lons, sector_lats):
+        """Build the sector, link and site output as memory layers"""
+        sector_layer = QgsVectorLayer(f'Polygon?crs={crs}', layer_name, 'memory')
+        line_layer = QgsVectorLayer(f'LineString?crs={crs}', f'{layer_name}_Links', 'memory')
+        site_layer = QgsVectorLayer(f'Point?crs={crs}', f'{layer_name}_Sites', 'memory')
         
-        # Create features in sorted order
-        for data in sector_data:
+        sector_provider = sector_layer.dataProvider()
+        sector_provider.addAttributes(sector_fields)
+        sector_layer.updateFields()
+        line_provider = line_layer.dataProvider()
+        line_provider.addAttributes(line_fields)
+        line_layer.updateFields()
+        site_provider = site_layer.dataProvider()
+        site_provider.addAttributes(site_fields)
+        site_layer.updateFields()
+        
+        sector_features = []
+        for idx in draw_order:
             sector_feat = QgsFeature()
-            sector_feat.setGeometry(data['geometry'])
-            sector_feat.setAttributes(data['feature'].attributes())
+            sector_feat.setGeometry(self._geometry_from_wkb(sector_wkbs[idx]))
+            sector_feat.setAttributes(feature_attributes[idx])
             sector_features.append(sector_feat)
         
-        # Create site point features
+        # Connection lines for remote sectors
+        line_features = []
+        for idx in remote_indices:
+            line_geom = QgsGeometry.fromPolylineXY([
+                QgsPointXY(site_lons[idx], site_lats[idx]),
+                QgsPointXY(sector_lons[idx], sector_lats[idx])
+            ])
+            line_feat = QgsFeature()
+            line_feat.setGeometry(line_geom)
+            line_feat.setAttributes([str(feature_ids[idx]), str(feature_ids[idx])])
+            line_features.append(line_feat)
+        
+        # Site point features, one per distinct hub location
         site_features = []
-        for site_key, (lat, lon) in site_points.items():
+        for idx in site_indices:
+            lat = float(site_lats[idx])
+            lon = float(site_lons[idx])
             site_feat = QgsFeature()
-            site_geom = QgsGeometry.fromPointXY(QgsPointXY(lon, lat))
-            site_feat.setGeometry(site_geom)
+            site_feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(lon, lat)))
             site_feat.setAttributes([lat, lon])
             site_features.append(site_feat)
         
-        # Add features to layers
         sector_provider.addFeatures(sector_features)
         sector_layer.updateExtents()
         
@@ -620,54 +725,43 @@ class RFTools:
             site_provider.addFeatures(site_features)
             site_layer.updateExtents()
         
-        # Add layers to project
-        QgsProject.instance().addMapLayer(sector_layer)
-        
-        # Apply color coding to sectors
-        if self.dlg.colorCodeByBandCheckBox.isChecked() and band_field:
-            self._apply_band_colors(sector_layer, band_field)
-        elif self.dlg.colorCodeCheckBox.isChecked():
-            self._apply_sector_colors(sector_layer, azimuth_field)
-        
-        if line_features:
-            QgsProject.instance().addMapLayer(line_layer)
-        
-        # Add and style site markers
-        if site_features:
-            QgsProject.instance().addMapLayer(site_layer)
-            self._apply_site_marker_style(site_layer)
-        
-        # Show completion message
-        message_parts = [f'Created {len(sector_features)} sectors']
-        if site_features:
-            message_parts.append(f'{len(site_features)} sites')
-        if line_features:
-            message_parts.append(f'{len(line_features)} connection lines')
-        
-        QMessageBox.information(self.iface.mainWindow(), 'RF Tools', 
-                              ' and '.join(message_parts) + '.')
+        return sector_layer, line_layer, site_layer
     
-    def _create_sector_polygon(self, center, azimuth, beamwidth, radius):
-        """Create a sector polygon geometry"""
-        points = [center]
-        
-        # Calculate start and end angles
-        start_angle = azimuth - beamwidth / 2.0
-        end_angle = azimuth + beamwidth / 2.0
-        
-        # Create arc points
-        num_points = max(int(beamwidth / 5), 10)  # At least 10 points
-        for i in range(num_points + 1):
-            angle = start_angle + (end_angle - start_angle) * i / num_points
-            angle_rad = math.radians(angle)
-            
-            x = center.x() + radius * math.sin(angle_rad)
-            y = center.y() + radius * math.cos(angle_rad)
-            points.append(QgsPointXY(x, y))
-        
-        points.append(center)  # Close the polygon
-        
-        return QgsGeometry.fromPolygonXY([points])
+    def _write_file_layers(self, path, output_format, crs, layer_name, sector_fields, line_fields, site_fields,
+                           sector_wkbs, feature_attributes, feature_ids, draw_order,
+                           remote_indices, site_indices, site_lons, site_lats, sector_lons, sector_lats):
+        """Stream the sector, link and site output to a GeoPackage or FlatGeobuf file"""
+        from .layer_writers import OgrLayerWriter, line_wkb, point_wkb
+
+        link_name = f'{layer_name}_Links'
+        site_name = f'{layer_name}_Sites'
+        
+        writer = OgrLayerWriter(path, output_format, crs)
+        writer.create_layer(layer_name, 'Polygon', sector_fields)
+        for idx in draw_order:
+            writer.write(layer_name, sector_wkbs[idx], feature_attributes[idx])
+        
+        writer.create_layer(link_name, 'LineString', line_fields)
+        for idx in remote_indices:
+            writer.write(link_name,
+                         line_wkb(site_lons[idx], site_lats[idx], sector_lons[idx], sector_lats[idx]),
+                         [str(feature_ids[idx]), str(feature_ids[idx])])
+        
+        writer.create_layer(site_name, 'Point', site_fields)
+        for idx in site_indices:
+            lat = float(site_lats[idx])
+            lon = float(site_lons[idx])
+            writer.write(site_name, point_wkb(lon, lat), [lat, lon])
+        
+        writer.close()
+        sector_layer, line_layer, site_layer = writer.load_layers()
+        return sector_layer, line_layer, site_layer
+    
+    def _geometry_from_wkb(self, wkb):
+        """Create a geometry from a WKB byte string"""
+        geom = QgsGeometry()
+        geom.fromWkb(wkb)
+        return geom
     
     def _apply_site_marker_style(self, layer):
         """Apply styling to site marker points - small filled circles"""
@@ -684,98 +778,68 @@ class RFTools:
         layer.setRenderer(renderer)
         layer.triggerRepaint()
     
-    def _apply_sector_colors(self, layer, azimuth_field):
-        """Apply color coding to sectors based on azimuth ranges"""
+    def _apply_sector_colors(self, layer, azimuth_field, azimuth_labels=None):
+        """Apply color coding to sectors based on azimuth ranges
+
+        :param azimuth_labels: Labels of the azimuth bins present in the layer,
+            as computed during sector generation. All bins are used when None.
+        """
         if not azimuth_field:
             return
         
-        # Define azimuth ranges and colors (typical sector configurations)
-        # Colors chosen to be distinct and visually appealing
-        categories = []
-        
-        # Sector 1: 315-45° (North) - Red
-        cat1 = QgsRendererCategory(
-            '0-60',
-            QgsFillSymbol.createSimple({'color': '231,76,60,180', 'outline_color': '192,57,43', 'outline_width': '0.5'}),
-            'Sector 1 (0-60°)'
-        )
-        categories.append(cat1)
-        
-        # Sector 2: 60-180° (East/Southeast) - Green
-        cat2 = QgsRendererCategory(
-            '60-180',
-            QgsFillSymbol.createSimple({'color': '46,204,113,180', 'outline_color': '39,174,96', 'outline_width': '0.5'}),
-            'Sector 2 (60-180°)'
-        )
-        categories.append(cat2)
-        
-        # Sector 3: 180-300° (South/Southwest) - Blue
-        cat3 = QgsRendererCategory(
-            '180-300',
-            QgsFillSymbol.createSimple({'color': '52,152,219,180', 'outline_color': '41,128,185', 'outline_width': '0.5'}),
-            'Sector 3 (180-300°)'
-        )
-        categories.append(cat3)
-        
-        # Sector 4: 300-360° (West/Northwest) - Orange
-        cat4 = QgsRendererCategory(
-            '300-360',
-            QgsFillSymbol.createSimple({'color': '230,126,34,180', 'outline_color': '211,84,0', 'outline_width': '0.5'}),
-            'Sector 4 (300-360°)'
-        )
-        categories.append(cat4)
-        
-        # Create expression to categorize azimuths
-        expression = f'''
-        CASE 
-            WHEN "{azimuth_field}" >= 0 AND "{azimuth_field}" < 60 THEN '0-60'
-            WHEN "{azimuth_field}" >= 60 AND "{azimuth_field}" < 180 THEN '60-180'
-            WHEN "{azimuth_field}" >= 180 AND "{azimuth_field}" < 300 THEN '180-300'
-            WHEN "{azimuth_field}" >= 300 AND "{azimuth_field}" <= 360 THEN '300-360'
-            ELSE 'Other'
-        END
-        '''
-        
-        renderer = QgsCategorizedSymbolRenderer(expression, categories)
-        layer.setRenderer(renderer)
-        layer.triggerRepaint()
-    
-    def _apply_band_colors(self, layer, band_field):
-        """Apply color coding to sectors based on unique band values"""
-        if not band_field:
-            return
-        
-        # Get unique band values from the layer
-        unique_bands = set()
-        for feature in layer.getFeatures():
-            band_value = feature[band_field]
-            if band_value is not None and str(band_value).strip():
-                try:
-                    # Try to convert to float for numeric bands, otherwise use as string
-                    band_float = float(band_value)
-                    # If conversion succeeds and it's a whole number, use as int string
-                    if band_float.is_integer():
-                        band_str = str(int(band_float))
-                    else:
-                        band_str = str(band_float)
-                except (ValueError, TypeError):
-                    # If conversion fails, use as string
-                    band_str = str(band_value)
-                unique_bands.add(band_str)
-        
-        if not unique_bands:
-            return
+        if azimuth_labels is None:
+            from .core.site_see import AZIMUTH_BINS
+            azimuth_labels = [label for _, _, label in AZIMUTH_BINS]
         
-        # Sort the bands for consistent ordering
-        try:
-            # Try to sort numerically if all bands can be converted to numbers
-            sorted_bands = sorted(unique_bands, key=lambda x: float(x) if x.replace('.', '', 1).isdigit() else float('inf'))
-        except (ValueError, TypeError):
-            # Fall back to string sort if any band can't be converted to a number
-            sorted_bands = sorted(unique_bands)
+        cache_key = ('azimuth', azimuth_field, tuple(azimuth_labels))
+        renderer = self._style_cache.get(cache_key)
+        if renderer is None:
+            categories = [QgsRendererCategory(label, symbol.clone(), legend)
+                          for label, (symbol, legend) in self._azimuth_symbols().items()
+                          if label in azimuth_labels]
+            
+            # Create expression to categorize azimuths
+            expression = f'''
+            CASE 
+                WHEN "{azimuth_field}" >= 0 AND "{azimuth_field}" < 60 THEN '0-60'
+                WHEN "{azimuth_field}" >= 60 AND "{azimuth_field}" < 180 THEN '60-180'
+                WHEN "{azimuth_field}" >= 180 AND "{azimuth_field}" < 300 THEN '180-300'
+                WHEN "{azimuth_field}" >= 300 AND "{azimuth_field}" <= 360 THEN '300-360'
+                ELSE 'Other'
+            END
+            '''
+            
+            renderer = QgsCategorizedSymbolRenderer(expression, categories)
+            self._style_cache[cache_key] = renderer
         
-        # Define a color palette with enough distinct colors
-        # Using a perceptually distinct color palette
+        layer.setRenderer(renderer.clone())
+        layer.triggerRepaint()
+    
+    def _azimuth_symbols(self):
+        """Prebuilt fill symbols for the azimuth bins: {label: (symbol, legend)}"""
+        symbols = self._style_cache.get('azimuth_symbols')
+        if symbols is None:
+            # Colors chosen to be distinct and visually appealing
+            symbols = {
+                # Sector 1: 0-60° (North) - Red
+                '0-60': (QgsFillSymbol.createSimple({'color': '231,76,60,180', 'outline_color': '192,57,43', 'outline_width': '0.5'}),
+                         'Sector 1 (0-60°)'),
+                # Sector 2: 60-180° (East/Southeast) - Green
+                '60-180': (QgsFillSymbol.createSimple({'color': '46,204,113,180', 'outline_color': '39,174,96', 'outline_width': '0.5'}),
+                           'Sector 2 (60-180°)'),
+                # Sector 3: 180-300° (South/Southwest) - Blue
+                '180-300': (QgsFillSymbol.createSimple({'color': '52,152,219,180', 'outline_color': '41,128,185', 'outline_width': '0.5'}),
+                            'Sector 3 (180-300°)'),
+                # Sector 4: 300-360° (West/Northwest) - Orange
+                '300-360': (QgsFillSymbol.createSimple({'color': '230,126,34,180', 'outline_color': '211,84,0', 'outline_width': '0.5'}),
+                            'Sector 4 (300-360°)'),
+            }
+            self._style_cache['azimuth_symbols'] = symbols
+        return symbols
+    
+    def _band_symbol(self, index):
+        """Prebuilt fill symbol for the band at position ``index`` in the legend"""
+        # Perceptually distinct palette, cycled when there are more bands than colors
         color_palette = [
             (192, 57, 43),    # Dark Red
             (52, 152, 219),   # Blue
@@ -793,98 +857,147 @@ class RFTools:
             (44, 62, 80),     # Dark Gray
             (127, 140, 141)   # Gray
         ]
-        
-        # Create categories for each unique band
-        categories = []
-        for i, band in enumerate(sorted_bands):
-            # Cycle through the color palette if we have more bands than colors
-            color_idx = i % len(color_palette)
+        color_idx = index % len(color_palette)
+        cache_key = ('band_symbol', color_idx)
+        symbol = self._style_cache.get(cache_key)
+        if symbol is None:
             r, g, b = color_palette[color_idx]
-            
-            # Create a slightly darker version for the outline
-            outline_r = max(0, r - 40)
-            outline_g = max(0, g - 40)
-            outline_b = max(0, b - 40)
-            
-            # Create the symbol with semi-transparent fill
+            # Slightly darker outline around a semi-transparent fill
             symbol = QgsFillSymbol.createSimple({
                 'color': f'{r},{g},{b},180',
-                'outline_color': f'{outline_r},{outline_g},{outline_b}',
+                'outline_color': f'{max(0, r - 40)},{max(0, g - 40)},{max(0, b - 40)}',
                 'outline_width': '0.5'
             })
+            self._style_cache[cache_key] = symbol
+        return symbol
+    
+    def _apply_band_colors(self, layer, band_field, sorted_bands=None):
+        """Apply color coding to sectors based on unique band values
+
+        :param sorted_bands: Sorted band labels computed during sector
+            generation. The layer is scanned for them only when None.
+        """
+        if not band_field:
+            return
+        
+        if sorted_bands is None:
+            from .core.site_see import band_labels
+            sorted_bands = band_labels(feature[band_field] for feature in layer.getFeatures(
+                QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([band_field], layer.fields())))
+        
+        if not sorted_bands:
+            return
+        
+        cache_key = ('band', band_field, tuple(sorted_bands))
+        renderer = self._style_cache.get(cache_key)
+        if renderer is None:
+            categories = [QgsRendererCategory(band, self._band_symbol(i).clone(), f'Band {band}')
+                          for i, band in enumerate(sorted_bands)]
             
-            # Create the category
-            cat = QgsRendererCategory(
-                band,
-                symbol,
-                f'Band {band}'
-            )
-            categories.append(cat)
-        
-        # Use the band field directly for rendering
-        expression = f'"{band_field}"'
-        
-        renderer = QgsCategorizedSymbolRenderer(expression, categories)
-        layer.setRenderer(renderer)
+            # Use the band field directly for rendering
+            renderer = QgsCategorizedSymbolRenderer(f'"{band_field}"', categories)
+            self._style_cache[cache_key] = renderer
+        
+        layer.setRenderer(renderer.clone())
         layer.triggerRepaint()
 
 
+    def _dialog(self, dialog_class, *args):
+        """Instance of ``dialog_class``, created on first use and then reused."""
+        dlg = self._dialogs.get(dialog_class)
+        if dlg is None:
+            dlg = dialog_class(*args)
+            self._dialogs[dialog_class] = dlg
+        return dlg
+
+
     def run_planner(self):
         """Open the PCI/RSI planner dialog."""
-        dlg = PciRsiPlannerDialog(self.iface, self.iface.mainWindow())
+        from .pci_rsi_planner_dialog import PciRsiPlannerDialog
+        dlg = self._dialog(PciRsiPlannerDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_tilt_optimizer(self):
         """Open the Tilt Optimizer dialog."""
-        dlg = TiltOptimizerDialog(self.iface, self.iface.mainWindow())
+        from .tilt_optimizer_dialog import TiltOptimizerDialog
+        dlg = self._dialog(TiltOptimizerDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_azimuth_optimizer(self):
         """Open the Azimuth Optimizer dialog."""
-        dlg = AzimuthOptimizerDialog(self.iface, self.iface.mainWindow())
+        from .azimuth_optimizer_dialog import AzimuthOptimizerDialog
+        dlg = self._dialog(AzimuthOptimizerDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_coverage_prediction(self):
         """Open the Coverage Prediction dialog."""
-        # Store as instance variable to prevent garbage collection when using show()
-        self.coverage_prediction_dlg = CoveragePredictionDialog(self.iface, self.iface.mainWindow())
-        self.coverage_prediction_dlg.show()  # Use show() instead of exec_() to allow hide/show cycle for extent drawing
+        from .coverage_prediction_dialog import CoveragePredictionDialog
+        dlg = self._dialog(CoveragePredictionDialog, self.iface, self.iface.mainWindow())
+        dlg.show()  # Use show() instead of exec_() to allow hide/show cycle for extent drawing
+        dlg.raise_()
 
 
     def run_interference_analysis(self):
         """Open the Interference Analysis dialog."""
-        dlg = InterferenceAnalysisDialog(self.iface, self.iface.mainWindow())
+        from .interference_analysis_dialog import InterferenceAnalysisDialog
+        dlg = self._dialog(InterferenceAnalysisDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_vendor_import(self):
         """Open the Vendor Import/Export dialog."""
-        dlg = VendorImportDialog(self.iface, self.iface.mainWindow())
+        from .vendor_import_dialog import VendorImportDialog
+        dlg = self._dialog(VendorImportDialog, self.iface, self.iface.mainWindow())
+        dlg.exec_()
+
+
+    def run_calibration(self):
+        """Open the Model Calibration dialog."""
+        from .calibration_dialog import CalibrationDialog
+        dlg = self._dialog(CalibrationDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_database_connector(self):
         """Open the Database Connector dialog."""
-        dlg = DatabaseConnectorDialog(self.iface, self.iface.mainWindow())
+        from .database_connector_dialog import DatabaseConnectorDialog
+        dlg = self._dialog(DatabaseConnectorDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_drive_test(self):
         """Open the Drive Test Import/Analysis dialog."""
-        dlg = DriveTestDialog(self.iface, self.iface.mainWindow())
+        from .drive_test_dialog import DriveTestDialog
+        dlg = self._dialog(DriveTestDialog, self.iface, self.iface.mainWindow())
+        dlg.exec_()
+
+
+    def run_drive_test_binning(self):
+        """Open the Drive Test Binning dialog."""
+        from .drive_test_binning_dialog import DriveTestBinningDialog
+        dlg = self._dialog(DriveTestBinningDialog, self.iface, self.iface.mainWindow())
+        dlg.exec_()
+
+
+    def run_neighbor_planner(self):
+        """Open the Neighbor Planner dialog."""
+        from .neighbor_planner_dialog import NeighborPlannerDialog
+        dlg = self._dialog(NeighborPlannerDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_performance_dashboard(self):
         """Open the Network Performance Dashboard dialog."""
-        dlg = PerformanceDashboardDialog(self.iface, self.iface.mainWindow())
+        from .performance_dashboard_dialog import PerformanceDashboardDialog
+        dlg = self._dialog(PerformanceDashboardDialog, self.iface, self.iface.mainWindow())
         dlg.exec_()
 
 
     def run_about(self):
         """Open the About RF Tools dialog."""
-        dlg = AboutRFToolsDialog(self.iface.mainWindow())
+        from .about_dialog import AboutRFToolsDialog
+        dlg = self._dialog(AboutRFToolsDialog, self.iface.mainWindow())
         dlg.exec_()
@@ -23,11 +23,13 @@
 
 import os
 
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'rf_tools_dialog_base.ui'))
+from .layer_writers import FORMAT_EXTENSIONS, FORMAT_MEMORY, OUTPUT_FORMATS
+from .run_statistics import setup_panel
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('rf_tools_dialog_base.ui')
 
 
 class RFToolsDialog(QtWidgets.QDialog, FORM_CLASS):
@@ -43,3 +45,33 @@ class RFToolsDialog(QtWidgets.QDialog, FORM_CLASS):
         
         # Initialize progress bar
         self.progressBar.setValue(0)
+        setup_panel(self)
+
+        # Output format: memory layers or a file written through OGR
+        if hasattr(self, 'outputFormatComboBox'):
+            self.outputFormatComboBox.addItems(OUTPUT_FORMATS)
+            self.outputFormatComboBox.currentTextChanged.connect(self._on_output_format_changed)
+            self.outputFileButton.clicked.connect(self._browse_output_file)
+
+    def _on_output_format_changed(self, output_format):
+        """Enable the output file only for file based formats."""
+        to_file = output_format != FORMAT_MEMORY
+        self.outputFileLineEdit.setEnabled(to_file)
+        self.outputFileButton.setEnabled(to_file)
+        path = self.outputFileLineEdit.text().strip()
+        if to_file and path:
+            # Keep the chosen file name but switch its extension
+            stem, _ = os.path.splitext(path)
+            self.outputFileLineEdit.setText(stem + FORMAT_EXTENSIONS[output_format])
+
+    def _browse_output_file(self):
+        """Choose the output file for the selected format."""
+        output_format = self.outputFormatComboBox.currentText()
+        extension = FORMAT_EXTENSIONS[output_format]
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Output File', self.outputFileLineEdit.text(),
+            f'{output_format} (*{extension})')
+        if path:
+            if not path.lower().endswith(extension):
+                path += extension
+            self.outputFileLineEdit.setText(path)
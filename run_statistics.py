@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Run statistics of the dialogs.
+
+A run method decorated with :func:`timed_run` times its phases with
+``self.run_stats.phase(name)``. Every run logs its
+:class:`core.run_stats.RunStats` as JSON to the "RF Tools" tab of the QGIS
+message log and shows them in the dialog's "Run statistics" panel when it
+has one. Setting the ``RFTOOLS_PROFILE_DIR`` environment variable to a
+folder writes a cProfile dump of every run there.
+"""
+
+import functools
+import os
+
+from qgis.core import Qgis, QgsMessageLog
+
+from .core.run_stats import RunStats
+
+LOG_TAG = 'RF Tools'
+PROFILE_DIR_ENV = 'RFTOOLS_PROFILE_DIR'
+
+
+def setup_panel(dialog):
+    """Collapse the Run statistics panel of ``dialog`` while it is unchecked."""
+    if not hasattr(dialog, 'runStatisticsGroupBox'):
+        return
+
+    def show_contents(checked):
+        dialog.traceMemoryCheckBox.setVisible(checked)
+        dialog.runStatisticsTextEdit.setVisible(checked)
+
+    dialog.runStatisticsGroupBox.toggled.connect(show_contents)
+    show_contents(dialog.runStatisticsGroupBox.isChecked())
+
+
+def start_run(dialog, tool):
+    """Statistics of a new run of ``tool`` started from ``dialog``."""
+    trace_memory = hasattr(dialog, 'traceMemoryCheckBox') and dialog.traceMemoryCheckBox.isChecked()
+    return RunStats(tool, trace_memory, os.environ.get(PROFILE_DIR_ENV) or None)
+
+
+def finish_run(dialog, stats):
+    """Finish ``stats``, log them and show them in the panel of ``dialog``.
+
+    Only the first call of a run publishes it, so a run can be finished
+    before its result message and again in a ``finally`` clause. Runs
+    without any phase, stopped by the input checks, are not published.
+    """
+    if stats.seconds is not None:
+        return
+    stats.finish()
+    if not stats.phases:
+        return
+    QgsMessageLog.logMessage(stats.to_json(), LOG_TAG, Qgis.Info)
+    if hasattr(dialog, 'runStatisticsTextEdit'):
+        dialog.runStatisticsTextEdit.setPlainText(stats.summary())
+
+
+def timed_run(tool, panel=None):
+    """Decorator running a method as one run of ``tool``.
+
+    The method finds the statistics of the run in ``self.run_stats``; they
+    are published when it returns or raises.
+
+    :param panel: Attribute of ``self`` holding the dialog with the panel,
+        when the method does not belong to the dialog itself.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def run(owner):
+            dialog = getattr(owner, panel) if panel else owner
+            owner.run_stats = start_run(dialog, tool)
+            try:
+                return method(owner)
+            finally:
+                finish_run(dialog, owner.run_stats)
+        return run
+    return decorate
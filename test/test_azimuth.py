@@ -0,0 +1,75 @@
+# coding=utf-8
+"""Azimuth optimizer engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+from core.azimuth import (BALANCED, MAXIMIZE_COVERAGE, coverage_gap, group_sites,
+                          interference_adjustment, sector_azimuths, site_neighbors)
+
+
+class AzimuthEngineTest(unittest.TestCase):
+    """Test the array-based azimuth optimizer."""
+
+    def test_group_sites(self):
+        """Sectors are grouped by key in input order."""
+        site_index, site_indptr, site_sectors, keys = group_sites(['A_1', 'B_1', 'A_1', 'A_2', 'B_1'])
+        self.assertEqual(keys, ['A_1', 'B_1', 'A_2'])
+        self.assertEqual(site_index.tolist(), [0, 1, 0, 2, 1])
+        self.assertEqual(site_indptr.tolist(), [0, 2, 4, 5])
+        self.assertEqual(site_sectors.tolist(), [0, 2, 1, 4, 3])
+
+    def test_site_neighbors(self):
+        """Neighbors exclude the site's own sectors and respect the radius."""
+        x = [10.0, 10.0, 10.01, 10.5]
+        y = [50.0, 50.0, 50.0, 50.0]
+        site_index, site_indptr, site_sectors, _ = group_sites(['A', 'A', 'B', 'C'])
+        indptr, sectors, distances, bearings = site_neighbors(x, y, site_index, site_indptr, site_sectors, 5.0)
+        self.assertEqual(sectors[indptr[0]:indptr[1]].tolist(), [2])
+        self.assertEqual(sectors[indptr[1]:indptr[2]].tolist(), [0, 1])
+        self.assertEqual(indptr[3] - indptr[2], 0)
+        self.assertAlmostEqual(bearings[0], 90.0, places=1)
+        self.assertAlmostEqual(distances[0], 0.716, places=2)
+
+    def test_interference_adjustment(self):
+        """A neighbor just clockwise of the beam pushes it counter-clockwise."""
+        self.assertLess(interference_adjustment(0.0, 65.0, [10.0], [1.0]), 0)
+        self.assertGreater(interference_adjustment(0.0, 65.0, [350.0], [1.0]), 0)
+        self.assertEqual(interference_adjustment(0.0, 65.0, [180.0], [1.0]), 0)
+        batch = interference_adjustment([0.0, 180.0], 65.0, [10.0, 170.0], [1.0, 2.0])
+        self.assertEqual(batch.shape, (2,))
+
+    def test_coverage_gap(self):
+        """The gap is the center of the first empty bearing bin."""
+        self.assertIsNone(coverage_gap([]))
+        self.assertEqual(coverage_gap([5.0, 40.0, 70.0]), 105.0)
+
+    def test_sector_azimuths(self):
+        """Single sectors face away from the nearest neighbor; locked sectors are kept."""
+        x = [10.0, 10.01, 10.01, 10.01]
+        y = [50.0, 50.0, 50.0, 50.0]
+        azimuth = [45.0, 10.0, 130.0, 250.0]
+        locked = [False, False, True, False]
+        site_index, site_indptr, site_sectors, _ = group_sites(['A', 'B', 'B', 'B'])
+        indptr, _, distances, bearings = site_neighbors(x, y, site_index, site_indptr, site_sectors, 5.0)
+        for mode in (BALANCED, MAXIMIZE_COVERAGE):
+            result = sector_azimuths(azimuth, [65.0] * 4, locked, site_indptr, site_sectors,
+                                     indptr, distances, bearings, mode)
+            self.assertAlmostEqual(result[0], 270.0, places=0)
+            self.assertEqual(result[2], 130.0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AzimuthEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Azimuth network search test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.azimuth import group_sites, site_neighbors
+from core.azimuth_search import OverlapCost, optimize_azimuths
+
+
+class AzimuthSearchTest(unittest.TestCase):
+    """Test the network overlap cost and its local search."""
+
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        sites = 60
+        x = np.repeat(10.0 + rng.rand(sites) * 0.15, 3)
+        y = np.repeat(50.0 + rng.rand(sites) * 0.1, 3)
+        site_index, self.site_indptr, self.site_sectors, _ = group_sites(np.repeat(np.arange(sites), 3).tolist())
+        neighbors = site_neighbors(x, y, site_index, self.site_indptr, self.site_sectors, 3.0)
+        self.cost = OverlapCost(np.full(len(x), 65.0), site_index, self.site_indptr, self.site_sectors,
+                                *neighbors)
+        self.azimuths = rng.rand(len(x)) * 360.0
+        self.locked = rng.rand(len(x)) < 0.2
+
+    def test_evaluate_matches_cost(self):
+        """Scored moves equal the change of the full network cost."""
+        self.cost.set_azimuths(self.azimuths)
+        colors = self.cost.site_colors()
+        sites = np.nonzero(colors == 0)[0]
+        for position in range(3):
+            sectors = self.site_sectors[self.site_indptr[sites] + position]
+            candidates = (self.azimuths[sectors][:, np.newaxis] + [-20.0, 10.0, 45.0]) % 360
+            deltas = self.cost.evaluate(sectors, candidates)
+            base = self.cost.cost(self.azimuths)
+            for row in range(0, len(sectors), 5):
+                for column in range(3):
+                    moved = self.azimuths.copy()
+                    moved[sectors[row]] = candidates[row, column]
+                    self.assertAlmostEqual(self.cost.cost(moved) - base, deltas[row, column], places=9)
+
+    def test_site_colors(self):
+        """No pair connects two sites of the same color."""
+        colors = self.cost.site_colors()
+        sites_a = self.cost.site_index[self.cost.pair_a]
+        sites_b = self.cost.site_index[self.cost.pair_b]
+        apart = sites_a != sites_b
+        self.assertFalse(np.any(colors[sites_a[apart]] == colors[sites_b[apart]]))
+
+    def test_optimize_azimuths(self):
+        """The search lowers the cost and never moves locked sectors."""
+        result = optimize_azimuths(self.cost, self.azimuths, self.locked)
+        self.assertLess(self.cost.cost(result), self.cost.cost(self.azimuths))
+        np.testing.assert_array_equal(result[self.locked], self.azimuths[self.locked])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AzimuthSearchTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
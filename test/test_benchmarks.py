@@ -0,0 +1,54 @@
+# coding=utf-8
+"""Synthetic network and benchmark runner test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import json
+import unittest
+
+import numpy as np
+
+from benchmarks.suite import run_suite
+from benchmarks.synthetic import BANDS, hex_network
+
+
+class BenchmarksTest(unittest.TestCase):
+    """Test the synthetic networks and a small benchmark run."""
+
+    def test_hex_network(self):
+        """Networks have the requested size, valid plans and co-located bands."""
+        network = hex_network(1000, seed=4)
+        self.assertTrue(all(len(values) == 1000 for values in network.values()))
+        self.assertTrue(np.all((network['pci'] >= 0) & (network['pci'] < 504)))
+        self.assertTrue(np.all((network['rsi'] >= 0) & (network['rsi'] < 838)))
+        self.assertEqual(set(network['frequency'].tolist()), set(BANDS))
+
+        # Sectors of a site at the same position point the same way on every band
+        first_site = network['site'] == 0
+        azimuths = network['azimuth'][first_site].reshape(len(BANDS), 3)
+        np.testing.assert_array_equal(azimuths, np.tile(azimuths[0], (len(BANDS), 1)))
+        np.testing.assert_array_equal(hex_network(1000, seed=4)['x'], network['x'])
+
+    def test_run_suite(self):
+        """Selected cases run within their limits and the results are JSON."""
+        results = run_suite(sizes=[90, 180], raster_sizes=[16], repeat=1,
+                            names={'site_see', 'tilt_rules', 'coverage'})
+        runs = [(result['case'], result['sectors']) for result in results['results']]
+        self.assertEqual(runs, [('tilt_rules', 90), ('site_see', 90), ('coverage_16', 90),
+                                ('tilt_rules', 180), ('site_see', 180), ('coverage_16', 180)])
+        json.loads(json.dumps(results))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(BenchmarksTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Raster binning test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.binning import RasterBinner, bin_statistics, cell_indices, delta
+
+# 3 x 4 grid of 10 m cells with its top left corner at (100, 230)
+GEOTRANSFORM = (100.0, 10.0, 0.0, 230.0, 0.0, -10.0)
+
+
+class BinningTest(unittest.TestCase):
+    """Test the binning of measurements onto a raster grid."""
+
+    def test_cell_indices(self):
+        """Points map to row-major cells; points outside the grid get -1."""
+        x = [100.0, 139.9, 125.0, 99.9, 140.0, 105.0]
+        y = [230.0, 200.1, 215.0, 225.0, 225.0, 200.0]
+        self.assertEqual(cell_indices(x, y, GEOTRANSFORM, 3, 4).tolist(), [0, 11, 6, -1, -1, -1])
+
+    def test_statistics_match_numpy(self):
+        """Sort-based percentiles and bincount reductions match NumPy per cell."""
+        rng = np.random.default_rng(3)
+        flat = rng.integers(-1, 12, 5000)
+        values = rng.normal(-95.0, 8.0, 5000)
+        values[::97] = np.nan
+        results = bin_statistics(flat, values, 12, ('count', 'mean', 'median', 'p10', 'max'))
+        for cell in range(12):
+            cell_values = values[(flat == cell) & ~np.isnan(values)]
+            self.assertEqual(results['count'][cell], len(cell_values))
+            self.assertAlmostEqual(results['mean'][cell], cell_values.mean())
+            self.assertAlmostEqual(results['median'][cell], np.median(cell_values))
+            self.assertAlmostEqual(results['p10'][cell], np.percentile(cell_values, 10))
+            self.assertAlmostEqual(results['max'][cell], cell_values.max())
+        with self.assertRaises(ValueError):
+            bin_statistics(flat, values, 12, ('p101',))
+
+    def test_binner_chunks_and_delta(self):
+        """Chunks accumulate on the grid and the delta skips unknown cells."""
+        binner = RasterBinner(GEOTRANSFORM, 3, 4)
+        binner.add([105.0, 106.0], [225.0, 224.0], [-90.0, -100.0])
+        binner.add([105.0, 500.0], [225.0, 500.0], [-80.0, -70.0])
+        results = binner.statistics(('mean', 'count'))
+        self.assertEqual((binner.points, binner.outside), (3, 1))
+        self.assertEqual(results['count'].shape, (3, 4))
+        self.assertEqual(results['mean'][0, 0], -90.0)
+        self.assertTrue(np.isnan(results['mean'][1, 1]))
+
+        prediction = np.full((3, 4), -140.0)
+        prediction[0, 0] = -85.0
+        difference = delta(prediction, results['mean'], prediction_nodata=-140.0)
+        self.assertEqual(difference[0, 0], 5.0)
+        self.assertEqual(int(np.isfinite(difference).sum()), 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(BinningTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
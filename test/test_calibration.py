@@ -0,0 +1,90 @@
+# coding=utf-8
+"""Propagation model calibration test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.calibration import (cell_statistics, fit_profile, load_profiles, point_features,
+                              save_profiles)
+from core.propagation import COST231_HATA_URBAN, path_loss
+
+
+class CalibrationTest(unittest.TestCase):
+    """Test the least-squares model calibration."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.cells = {
+            'x': np.array([0.0, 1000.0]), 'y': np.array([0.0, 0.0]),
+            'height': np.array([30.0, 25.0]), 'azimuth': np.array([0.0, 180.0]),
+            'beamwidth': np.array([65.0, 65.0]), 'power': np.array([43.0, 40.0]),
+            'gain': np.array([18.0, 17.0]), 'frequency': np.array([1800.0, 1800.0]),
+        }
+        count = 400
+        self.serving = rng.integers(0, 2, count)
+        distance = rng.uniform(100.0, 3000.0, count)
+        bearing = np.radians(rng.uniform(-60.0, 60.0, count) + self.cells['azimuth'][self.serving])
+        self.x = self.cells['x'][self.serving] + distance * np.sin(bearing)
+        self.y = self.cells['y'][self.serving] + distance * np.cos(bearing)
+        self.clutter = np.where(self.x > 500.0, 'urban', 'open').astype(object)
+
+        self.features = point_features(self.x, self.y, self.serving, self.cells, geographic=False)
+        model_loss = path_loss(1800.0, self.features['distance_km'], self.features['height'],
+                               COST231_HATA_URBAN)
+        # The market loses 6 dB more at 1 km and 5 dB/decade more, urban points another 4 dB
+        true_loss = model_loss + 6.0 + 5.0 * np.log10(self.features['distance_km'])
+        true_loss = true_loss + np.where(self.clutter == 'urban', 4.0, 0.0)
+        self.rsrp = self.features['eirp'] - self.features['antenna_loss'] - true_loss
+
+    def test_fit_recovers_corrections(self):
+        """Global and per-clutter coefficients match the simulated market."""
+        profile, error = fit_profile(self.features, self.rsrp, COST231_HATA_URBAN)
+        self.assertGreater(profile.uncalibrated_rmse, 5.0)
+        self.assertGreater(profile.rmse, 0.5)
+
+        profile, error = fit_profile(self.features, self.rsrp, COST231_HATA_URBAN, self.clutter)
+        self.assertAlmostEqual(profile.clutter['open'][0], 6.0, places=6)
+        self.assertAlmostEqual(profile.clutter['urban'][0], 10.0, places=6)
+        self.assertAlmostEqual(profile.clutter['urban'][1], 5.0, places=6)
+        self.assertAlmostEqual(profile.rmse, 0.0, places=6)
+
+        counts, mean_errors, rmses = cell_statistics(self.serving, error, 3)
+        self.assertEqual(counts.tolist()[:2], np.bincount(self.serving).tolist())
+        self.assertTrue(np.isnan(rmses[2]))
+
+    def test_profiles_round_trip(self):
+        """Saved profiles load with the same corrections."""
+        profile, _ = fit_profile(self.features, self.rsrp, COST231_HATA_URBAN, self.clutter)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'profiles.json')
+            save_profiles(path, [profile])
+            loaded = load_profiles(path)[COST231_HATA_URBAN]
+        finally:
+            shutil.rmtree(directory)
+        distances = np.array([0.2, 1.0, 3.0])
+        classes = np.array(['urban', 'open', 'water'], dtype=object)
+        np.testing.assert_allclose(loaded.correction(distances, classes),
+                                   profile.correction(distances, classes))
+        self.assertEqual(loaded.rmse, profile.rmse)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CalibrationTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""Cell database connector test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from core.cell_database import (DIALECTS, CellQuery, ConnectionPool, PostgresDialect,
+                                SqliteDialect, stream_rows, write_results)
+
+
+class RecordingCursor:
+    """psycopg2 cursor stand-in that records statements and COPY data."""
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.name = name
+        self.itersize = None
+        self.description = None
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append((self.name, sql, params))
+        self._rows = list(self.connection.rows)
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        self.description = [(name,) for name in self.connection.columns]
+        return rows
+
+    def copy_expert(self, sql, buffer):
+        self.connection.statements.append((self.name, sql, None))
+        self.connection.copied.append(buffer.read())
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    """psycopg2 connection stand-in."""
+
+    def __init__(self, columns=(), rows=()):
+        self.columns = columns
+        self.rows = rows
+        self.statements = []
+        self.copied = []
+        self.commits = 0
+
+    def cursor(self, name=None):
+        return RecordingCursor(self, name)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CellDatabaseTest(unittest.TestCase):
+    """Test the pooled cell database access."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cells.sqlite')
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE cells (cell_id TEXT PRIMARY KEY, band INTEGER, '
+                     'x REAL, y REAL, pci INTEGER, etilt REAL)')
+        conn.executemany('INSERT INTO cells VALUES (?, ?, ?, ?, NULL, NULL)',
+                         [(f'C{i}', 1800 if i % 2 else 800, 13.0 + i * 0.1, 52.0)
+                          for i in range(10)])
+        conn.commit()
+        conn.close()
+        self.pool = ConnectionPool(lambda: SqliteDialect.connect(self.path, spatialite=False))
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.directory)
+
+    def test_sqlite_stream_and_write_back(self):
+        """Filters run in SQL, rows arrive in fetches and results are written by key."""
+        dialect = DIALECTS['sqlite']
+        query = CellQuery('cells', columns=['cell_id', 'band', 'x', 'y'],
+                          x_column='x', y_column='y', band_column='band')
+        fetches = list(stream_rows(self.pool, dialect, query, bbox=(13.05, 51.0, 13.75, 53.0),
+                                   bands=['1800'], fetch_size=2))
+        self.assertEqual([len(rows) for _, rows in fetches], [2, 2])
+        self.assertEqual(fetches[0][0], ['cell_id', 'band', 'x', 'y'])
+        self.assertEqual([row[0] for _, rows in fetches for row in rows], ['C1', 'C3', 'C5', 'C7'])
+
+        written = write_results(self.pool, dialect, 'cells', 'cell_id', ['pci', 'etilt'],
+                                [('C1', 101, 4.0), ('C3', None, 6.0)], batch_size=1)
+        self.assertEqual(written, 2)
+        with self.pool.connection() as conn:
+            values = conn.execute('SELECT cell_id, pci, etilt FROM cells '
+                                  'WHERE etilt IS NOT NULL ORDER BY cell_id').fetchall()
+        self.assertEqual(values, [('C1', 101, 4.0), ('C3', None, 6.0)])
+
+    def test_postgres_named_cursor_and_copy(self):
+        """PostgreSQL reads through a named cursor and writes through COPY."""
+        dialect = PostgresDialect()
+        conn = RecordingConnection(['cell_id', 'geometry_wkb'], [('A', b'\x01'), ('B', None)])
+        pool = ConnectionPool(lambda: conn, max_size=1)
+        query = CellQuery('ran.cells', columns=['cell_id'], geometry_column='geom',
+                          band_column='band', srid=3857)
+
+        fetches = list(stream_rows(pool, dialect, query, bbox=(0, 1, 2, 3), bands=[700],
+                                   fetch_size=1))
+        self.assertEqual(len(fetches), 2)
+        name, sql, params = conn.statements[0]
+        self.assertTrue(name.startswith('rftools_cells_'))
+        self.assertIn('"geom" && ST_MakeEnvelope(%s, %s, %s, %s, %s)', sql)
+        self.assertIn('FROM "ran"."cells"', sql)
+        self.assertEqual(params, [0, 1, 2, 3, 3857, '700'])
+
+        write_results(pool, dialect, 'ran.cells', 'cell_id', ['pci'],
+                      [('A', 7), ('B\tx', None)])
+        self.assertEqual(conn.copied, ['A\t7\nB\\tx\t\\N\n'])
+        self.assertTrue(conn.statements[-1][1].startswith('UPDATE "ran"."cells" AS t SET "pci" = r."pci"'))
+        self.assertEqual(conn.commits, 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CellDatabaseTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,65 @@
+# coding=utf-8
+"""Coverage prediction engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+
+import unittest
+
+import numpy as np
+
+from core.coverage import NO_SIGNAL, add_site_coverage, clutter_loss_grid, raster_grid
+from core.propagation import COST231_HATA, ERICSSON_9999, path_loss
+
+
+class CoverageEngineTest(unittest.TestCase):
+    """Test the best server RSRP raster kernel."""
+
+    def setUp(self):
+        self.xx, self.yy = raster_grid(10.0, 50.02, 0.001, 40, 60)
+
+    def test_best_server(self):
+        """Pixels keep the strongest sector; pixels out of reach keep no signal."""
+        raster = np.full(self.xx.shape, NO_SIGNAL, dtype=np.float32)
+        self.assertTrue(add_site_coverage(raster, self.xx, self.yy, 10.02, 50.0, 30.0, 0.0, 65.0,
+                                          43.0, 18.0, 1800.0, COST231_HATA, 1.0))
+        single = raster.copy()
+        self.assertTrue(add_site_coverage(raster, self.xx, self.yy, 10.04, 50.0, 30.0, 0.0, 65.0,
+                                          43.0, 18.0, 1800.0, COST231_HATA, 1.0))
+        self.assertTrue(np.all(raster >= single))
+        self.assertEqual(raster[-1, -1], NO_SIGNAL)
+        # The sector facing north is stronger north than south of the site at the same distance
+        row, col = np.unravel_index(np.argmin(np.hypot(self.xx - 10.02, self.yy - 50.0)), self.xx.shape)
+        self.assertGreater(single[row - 5, col], single[row + 5, col])
+        self.assertFalse(add_site_coverage(raster, self.xx, self.yy, 12.0, 50.0, 30.0, 0.0, 65.0,
+                                           43.0, 18.0, 1800.0, COST231_HATA, 1.0))
+
+    def test_clutter(self):
+        """Land use and building density add losses to the nearest pixels."""
+        loss = clutter_loss_grid(self.xx, self.yy, [
+            {'type': 'building', 'coords': [(10.0105, 50.0105)] * 6},
+            {'type': 'industrial', 'coords': [(10.0305, 50.0105)]},
+        ])
+        self.assertEqual(loss[9, 10], 5 + 12)
+        self.assertEqual(loss[9, 30], 20)
+        self.assertEqual(loss[0, 0], 5)
+
+    def test_ericsson_parity(self):
+        """Ericsson 9999 keeps the loss of the original coverage raster formula."""
+        self.assertAlmostEqual(float(path_loss(1800.0, 1.0, 30.0, ERICSSON_9999)), 152.235, places=3)
+        self.assertAlmostEqual(float(path_loss(900.0, 2.0, 40.0, ERICSSON_9999)), 156.152, places=3)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CoverageEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
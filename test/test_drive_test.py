@@ -0,0 +1,102 @@
+# coding=utf-8
+"""Drive test log parsing test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.drive_test import (FORMAT_CSV, FORMAT_NMEA, GridThinner, detect_format,
+                             guess_coordinate_columns, read_csv_chunks, read_nmea_chunks)
+from core.text_io import csv_header
+
+
+def nmea_sentence(body):
+    """NMEA sentence with its checksum."""
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    return '$%s*%02X' % (body, checksum)
+
+
+class DriveTestParsingTest(unittest.TestCase):
+    """Test the streaming drive test parsers."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_csv_chunks(self):
+        """CSV logs are split into typed column chunks covering every row."""
+        lines = ['Time;Lat;Lon;RSRP;Cell']
+        for i in range(25):
+            lines.append(f'10:00:{i:02d};{52 + i * 1e-4};{13 + i * 1e-4};{-80 - i};{"A" if i % 2 else ""}')
+        lines.append('10:01:00;;;-120;B')
+        path = self.write('log.csv', lines)
+
+        self.assertEqual(detect_format(path), FORMAT_CSV)
+        columns, delimiter = csv_header(path)
+        self.assertEqual(delimiter, ';')
+        self.assertEqual(guess_coordinate_columns(columns), ('Lat', 'Lon'))
+
+        chunks = list(read_csv_chunks(path, 'Lat', 'Lon', chunk_rows=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 6])
+        self.assertEqual(chunks[-1].bytes_read, os.path.getsize(path))
+        self.assertTrue(chunks[0].numeric('RSRP'))
+        self.assertFalse(chunks[0].numeric('Cell'))
+        self.assertEqual(chunks[0].rows([0, 1]), [['10:00:00', 52.0, 13.0, -80.0, None],
+                                                  ['10:00:01', 52.0001, 13.0001, -81.0, 'A']])
+        self.assertEqual(int(chunks[-1].positioned.sum()), 5)
+
+    def test_nmea_fixes(self):
+        """GGA and valid RMC fixes become rows; bad checksums are skipped."""
+        path = self.write('log.nmea', [
+            nmea_sentence('GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,'),
+            nmea_sentence('GPRMC,123519,A,4807.038,N,01131.000,W,022.4,084.4,230394,003.1,W'),
+            nmea_sentence('GPRMC,123520,V,4807.038,N,01131.000,W,022.4,084.4,230394,003.1,W'),
+            '$GPGGA,123521,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*00',
+        ])
+        self.assertEqual(detect_format(path), FORMAT_NMEA)
+
+        chunk = next(read_nmea_chunks(path))
+        self.assertEqual(len(chunk), 2)
+        np.testing.assert_allclose(chunk.latitude, [48.1173, 48.1173])
+        np.testing.assert_allclose(chunk.longitude, [11.516667, -11.516667], rtol=1e-6)
+        self.assertAlmostEqual(chunk.arrays['altitude'][0], 545.4)
+        self.assertAlmostEqual(chunk.arrays['speed_kmh'][1], 22.4 * 1.852)
+
+    def test_grid_thinning_across_chunks(self):
+        """A grid cell keeps its first point, also across chunks."""
+        thinner = GridThinner(100.0)
+        lon = np.array([13.0, 13.0001, 13.01])
+        lat = np.array([52.0, 52.0001, 52.0])
+        np.testing.assert_array_equal(thinner.select(lon, lat), [0, 2])
+        np.testing.assert_array_equal(thinner.select(lon[::-1], lat[::-1]), [])
+        np.testing.assert_array_equal(thinner.select([13.02], [52.0]), [0])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(DriveTestParsingTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Local projection and distance helpers test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.geodesy import (destination, geodesic_inverse, local_distance,
+                          local_distance_bearing, meters_to_degrees)
+
+
+class GeodesyTest(unittest.TestCase):
+    """Test the fast local distances against the exact geodesic."""
+
+    def test_vincenty_reference(self):
+        """Flinders Peak to Buninyong matches the published distance."""
+        lon1 = 144 + 25 / 60.0 + 29.52440 / 3600.0
+        lat1 = -(37 + 57 / 60.0 + 3.72030 / 3600.0)
+        lon2 = 143 + 55 / 60.0 + 35.38390 / 3600.0
+        lat2 = -(37 + 39 / 60.0 + 10.15610 / 3600.0)
+        distance, bearing = geodesic_inverse(lon1, lat1, lon2, lat2)
+        self.assertAlmostEqual(float(distance), 54972.271, places=2)
+        self.assertAlmostEqual(float(bearing), 306.868159, places=4)
+
+    def test_local_distance_accuracy(self):
+        """Local distances stay within 0.05% of the geodesic up to 50 km."""
+        rng = np.random.RandomState(1)
+        for lat0 in (0.0, 30.0, 60.0, 70.0):
+            lon = 10.0 + rng.uniform(-0.5, 0.5, 200)
+            lat = lat0 + rng.uniform(-0.3, 0.3, 200)
+            local = local_distance(10.0, lat0, lon, lat)
+            exact, _ = geodesic_inverse(10.0, lat0, lon, lat)
+            self.assertLess(np.max(np.abs(local - exact) / exact), 5e-4)
+
+    def test_bearing_and_destination(self):
+        """Destination and distance/bearing are inverse operations."""
+        x, y = destination(-95.0, 29.5, [0.0, 90.0, 225.0], [1000.0, 2500.0, 800.0])
+        distance, bearing = local_distance_bearing(-95.0, 29.5, x, y)
+        np.testing.assert_allclose(distance, [1000.0, 2500.0, 800.0], rtol=1e-6)
+        np.testing.assert_allclose(bearing, [0.0, 90.0, 225.0], atol=1e-4)
+
+    def test_projected_units(self):
+        """Planar coordinates are scaled by the unit factor."""
+        distance, bearing = local_distance_bearing(0.0, 0.0, 3.0, 4.0, geographic=False,
+                                                   unit_to_meters=0.3048)
+        self.assertAlmostEqual(float(distance), 5.0 * 0.3048)
+        self.assertAlmostEqual(float(bearing), np.degrees(np.arctan2(3.0, 4.0)))
+
+    def test_meters_to_degrees(self):
+        """One degree of latitude is about 110.6 km at the equator."""
+        dlon, dlat = meters_to_degrees(0.0, 111319.49, 110574.39)
+        self.assertAlmostEqual(float(dlon), 1.0, places=5)
+        self.assertAlmostEqual(float(dlat), 1.0, places=5)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(GeodesyTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,71 @@
+# coding=utf-8
+"""Interference detection engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.interference import (adjacent_channel_issues, beam_overlap, co_channel_issues,
+                               pci_conflict_issues, sector_pairs)
+
+# Three sectors along a parallel, 0.72 km apart, and a far one
+X = [10.0, 10.01, 10.02, 11.0]
+Y = [50.0, 50.0, 50.0, 50.0]
+
+
+class InterferenceEngineTest(unittest.TestCase):
+    """Test the array-based interference checks."""
+
+    def test_beam_overlap(self):
+        """Full overlap inside the half beamwidth, linear down to the beamwidth."""
+        overlap = beam_overlap(350.0, 60.0, [0.0, 20.0, 40.0, 90.0])
+        np.testing.assert_allclose(overlap, [100.0, 100.0, 1 / 3 * 100.0, 0.0])
+
+    def test_sector_pairs(self):
+        """Pairs are ordered, within the distance and carry forward bearings."""
+        first, second, distances_km, bearings = sector_pairs(X, Y, 1.0)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 1), (1, 2)])
+        self.assertAlmostEqual(distances_km[0], 0.716, places=2)
+        np.testing.assert_allclose(bearings, [90.0, 90.0], atol=0.01)
+
+    def test_checks(self):
+        """Facing co-channel, adjacent channel and PCI conflicting sectors are flagged."""
+        pairs = sector_pairs(X, Y, 2.0)
+        bands = ['B3', 'B3', 'B3', 'B3']
+        azimuths = [90.0, 270.0, 270.0, 0.0]
+        beamwidths = [65.0] * 4
+
+        issues = co_channel_issues(pairs, bands, [1800.0, 1800.0, 1800.0, 1800.0], azimuths,
+                                   beamwidths, 2.0, 50.0)
+        self.assertEqual([(i['sector1'], i['sector2'], i['severity']) for i in issues],
+                         [(0, 1, 'High'), (0, 2, 'High'), (1, 2, 'Medium')])
+
+        issues = adjacent_channel_issues(pairs, bands, [1800.0, 1810.0, 1800.0, 1800.0], azimuths,
+                                         beamwidths, 2.0, 50.0)
+        self.assertEqual([(i['sector1'], i['sector2'], i['freq_diff']) for i in issues],
+                         [(0, 1, 10.0), (1, 2, 10.0)])
+
+        issues = pci_conflict_issues(pairs, bands, [4, 1, 4, 4], ['a', 'b', 'c', 'd'], azimuths, beamwidths,
+                                     2.0, 50.0)
+        self.assertEqual([(i['sector1'], i['sector2'], i['conflict_type']) for i in issues],
+                         [(0, 1, 'mod3'), (0, 2, 'collision'), (1, 2, 'mod3')])
+        issues = pci_conflict_issues(pairs, bands, [4, 4, -1, 4], ['a', 'a', 'c', 'd'], azimuths,
+                                     beamwidths, 2.0, 50.0)
+        self.assertEqual(issues, [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(InterferenceEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
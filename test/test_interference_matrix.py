@@ -0,0 +1,101 @@
+# coding=utf-8
+"""Interference matrix test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.coverage import NO_SIGNAL, raster_grid, sector_rsrp
+from core.interference_matrix import InterferenceMatrix, interference_overlap, served_areas
+from core.neighbors import BestServers, pixel_areas_km2
+from core.propagation import COST231_HATA
+from core.sparse import PairCounts
+
+
+class InterferenceMatrixTest(unittest.TestCase):
+    """Test the C/I overlap, the traffic weights and the matrix file."""
+
+    def test_interference_overlap(self):
+        """Interferers within the C/I threshold of the best server count per victim."""
+        servers = BestServers(1, 4)
+        windows = {
+            0: ((slice(0, 1), slice(0, 4)), np.array([[-70.0, -80.0, -75.0, NO_SIGNAL]])),
+            1: ((slice(0, 1), slice(0, 4)), np.array([[-75.0, -85.0, -70.0, -80.0]])),
+            2: ((slice(0, 1), slice(2, 4)), np.array([[-95.0, NO_SIGNAL]])),
+        }
+        for sector, (window, rsrp) in windows.items():
+            servers.add(sector, window, rsrp)
+        pixel_areas = np.array([2.0])
+        counts = interference_overlap(servers, [0, 1, 2], windows.get, pixel_areas, PairCounts(3),
+                                      ci_threshold_db=9.0)
+        rows, cols, totals = counts.to_coo()
+        # 1 interferes with 0 on two pixels, 0 with 1 on one; 2 is 25 dB down
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist(), totals.tolist())),
+                         [(0, 1, 4.0), (1, 0, 2.0)])
+
+        self.assertEqual(served_areas(servers, pixel_areas, 3).tolist(), [4.0, 4.0, 0.0])
+        traffic = interference_overlap(servers, [0, 1, 2], windows.get, pixel_areas, PairCounts(3),
+                                       traffic=[10.0, 4.0, 7.0])
+        # A victim's traffic is spread over its best server area
+        self.assertEqual(traffic.to_coo()[2].tolist(), [10.0, 2.0])
+
+    def test_matrix_file(self):
+        """The matrix survives a save and load and is matched to layers by sector ID."""
+        xx, yy = raster_grid(10.0, 50.02, 0.0005, 80, 120)
+        sites = [(10.02, 50.0, 90.0), (10.035, 50.0, 270.0), (12.0, 50.0, 0.0)]
+        rsrp = [sector_rsrp(xx, yy, x, y, 30.0, azimuth, 65.0, 43.0, 18.0, 1800.0, COST231_HATA, 2.0)
+                for x, y, azimuth in sites]
+        servers = BestServers(*xx.shape)
+        for sector, result in enumerate(rsrp):
+            if result is not None:
+                servers.add(sector, *result)
+        counts = interference_overlap(servers, range(len(sites)), rsrp.__getitem__,
+                                      pixel_areas_km2(yy, 0.0005), PairCounts(len(sites)))
+        matrix = InterferenceMatrix.from_counts(['A1', 'B1', 'C1'], counts, {'ci_threshold_db': 9.0})
+        self.assertGreater(matrix.value('A1', 'B1'), 0.0)
+        self.assertEqual(matrix.value('A1', 'C1'), 0.0)
+        self.assertEqual(matrix.value('A1', 'X9'), 0.0)
+
+        handle, path = tempfile.mkstemp(suffix='.npz')
+        os.close(handle)
+        try:
+            matrix.save(path)
+            loaded = InterferenceMatrix.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.sector_ids, matrix.sector_ids)
+        self.assertEqual(loaded.metadata, {'ci_threshold_db': 9.0})
+        self.assertTrue(np.array_equal(loaded.data, matrix.data))
+
+        # Layer rows in another order, with an unknown sector
+        first, second, values = loaded.symmetric_pairs(['X9', 'B1', 'A1'])
+        self.assertEqual((first.tolist(), second.tolist()), ([1], [2]))
+        self.assertAlmostEqual(values[0], matrix.value('A1', 'B1') + matrix.value('B1', 'A1'))
+        self.assertEqual(loaded.channel_cost([1, 1, 1]), float(matrix.data.sum()))
+        self.assertEqual(loaded.channel_cost([1, 2, 1]), 0.0)
+
+        buffer = io.BytesIO()
+        loaded.save(buffer)
+        buffer.seek(0)
+        self.assertEqual(InterferenceMatrix.load(buffer).pair_count, matrix.pair_count)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(InterferenceMatrixTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,77 @@
+# coding=utf-8
+"""KPI store test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.kpi_store import DAILY, HOURLY, WEEKLY, KpiStore, parse_times, period_start
+
+# Monday 2024-01-08 00:00 UTC
+MONDAY = 1704672000
+
+
+class KpiStoreTest(unittest.TestCase):
+    """Test the KPI store rollups and queries."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = KpiStore(os.path.join(self.directory, 'kpi.sqlite'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def write_export(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('Period Start Time,Cell Name,Region,Drop Rate\n')
+            handle.writelines(f'{time},{cell},North,{value}\n' for time, cell, value in rows)
+        return path
+
+    def test_time_parsing_and_periods(self):
+        """Timestamps parse in several formats and periods start on hours, days and Mondays."""
+        times = parse_times(['2024-01-08 13:45:00', '01/08/2024 13:00', 'n/a', '2024-01-08T13:00:00'])
+        self.assertEqual(times.tolist(), [MONDAY + 13 * 3600 + 2700, MONDAY + 13 * 3600, -1,
+                                          MONDAY + 13 * 3600])
+        sunday_evening = MONDAY + 6 * 86400 + 23 * 3600
+        self.assertEqual(period_start([sunday_evening], HOURLY).tolist(), [sunday_evening])
+        self.assertEqual(period_start([sunday_evening], DAILY).tolist(), [MONDAY + 6 * 86400])
+        self.assertEqual(period_start([sunday_evening], WEEKLY).tolist(), [MONDAY])
+
+    def test_rollups_and_worst_cells(self):
+        """Rollups are rebuilt for re-imported hours and rank the worst cells."""
+        rows = [(f'2024-01-{day:02d} {hour:02d}:00', f'C{cell}', cell + hour)
+                for day in (8, 9, 15) for hour in (0, 1) for cell in range(10)]
+        rows.append(('2024-01-08 02:00', 'C0', ''))
+        stored = self.store.ingest_csv(self.write_export('first.csv', rows), chunk_rows=7)
+        self.assertEqual(stored, 60)
+        self.assertEqual(self.store.kpis(), ['Drop Rate'])
+        self.assertEqual(self.store.periods('Drop Rate', WEEKLY), [MONDAY, MONDAY + 7 * 86400])
+
+        # A corrected hour replaces the stored value
+        self.store.ingest_csv(self.write_export('fix.csv', [('2024-01-09 01:00', 'C0', 41)]))
+        self.assertEqual(self.store.series('C0', 'Drop Rate', DAILY),
+                         [(MONDAY, 0.5), (MONDAY + 86400, 20.5), (MONDAY + 7 * 86400, 0.5)])
+        worst = self.store.worst_cells('Drop Rate', MONDAY, WEEKLY, fraction=0.15, higher_is_worse=True)
+        self.assertEqual(worst, [('C0', 10.5, 0.0, 41.0, 4), ('C9', 9.5, 9.0, 10.0, 4)])
+        self.assertEqual(self.store.worst_cells('Drop Rate', MONDAY, WEEKLY)[0][0], 'C1')
+        self.assertEqual(self.store.cell_values('Drop Rate', MONDAY + 86400 + 3600, HOURLY)['C0'], 41.0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(KpiStoreTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,86 @@
+# coding=utf-8
+"""Neighbor planning engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+
+import unittest
+
+import numpy as np
+
+from core.coverage import NO_SIGNAL, raster_grid, sector_rsrp
+from core.neighbors import BestServers, handover_overlap, pixel_areas_km2, top_neighbors
+from core.propagation import COST231_HATA
+from core.sparse import PairCounts
+
+
+class NeighborPlanningTest(unittest.TestCase):
+    """Test the sparse pair counts, the best server pass, the handover overlap and the ranking."""
+
+    def test_pair_counts(self):
+        """Batches sum per pair across merges and come out as sorted CSR."""
+        counts = PairCounts(50000, compact_every=4)
+        counts.add([3, 0, 3], [7, 49999, 7])
+        counts.add([0, 3], [49999, 1], [0.5, 2.0])
+        counts.add([], [])
+        self.assertEqual(len(counts), 3)
+        indptr, indices, data = counts.to_csr()
+        self.assertEqual(len(indptr), 50001)
+        self.assertEqual(indptr[-1], 3)
+        self.assertEqual(list(indices[indptr[0]:indptr[1]]), [49999])
+        self.assertEqual(list(indices[indptr[3]:indptr[4]]), [1, 7])
+        self.assertEqual(list(data), [1.5, 2.0, 2.0])
+
+    def test_best_servers(self):
+        """The second server is the runner up of every pixel."""
+        servers = BestServers(1, 4)
+        window = (slice(0, 1), slice(0, 4))
+        servers.add(0, window, np.array([[-80.0, -90.0, NO_SIGNAL, -100.0]]))
+        servers.add(1, window, np.array([[-85.0, -70.0, -95.0, NO_SIGNAL]]))
+        servers.add(2, (slice(0, 1), slice(0, 2)), np.array([[-82.0, -75.0]]))
+        self.assertEqual(servers.best_server.tolist(), [[0, 1, 1, 0]])
+        self.assertEqual(servers.second_server.tolist(), [[2, 2, -1, -1]])
+        self.assertEqual(servers.second.tolist(), [[-82.0, -75.0, NO_SIGNAL, NO_SIGNAL]])
+
+    def test_neighbor_lists(self):
+        """Facing sectors become neighbors; the far sector has none."""
+        xx, yy = raster_grid(10.0, 50.02, 0.0005, 80, 120)
+        sites = [(10.02, 50.0, 90.0), (10.035, 50.0, 270.0), (10.05, 50.01, 0.0), (12.0, 50.0, 0.0)]
+        servers = BestServers(*xx.shape)
+        for sector, (x, y, azimuth) in enumerate(sites):
+            result = sector_rsrp(xx, yy, x, y, 30.0, azimuth, 65.0, 43.0, 18.0, 1800.0,
+                                 COST231_HATA, 2.0)
+            if result is not None:
+                self.assertLess(result[1].size, xx.size)
+                servers.add(sector, *result)
+        counts = handover_overlap(servers, pixel_areas_km2(yy, 0.0005), PairCounts(len(sites)),
+                                  chunk_rows=16)
+        indptr, indices, data = counts.to_csr()
+        self.assertIn(1, indices[indptr[0]:indptr[1]])
+        self.assertEqual(indptr[4] - indptr[3], 0)
+        # Mutual relations: the matrix is symmetric
+        dense = np.zeros((4, 4))
+        dense[np.repeat(np.arange(4), np.diff(indptr)), indices] = data
+        self.assertTrue(np.allclose(dense, dense.T))
+
+        sources, targets, ranks, overlaps = top_neighbors(indptr, indices, data, top_n=1)
+        self.assertEqual(len(set(sources.tolist())), len(sources))
+        self.assertTrue(np.all(ranks == 1))
+        for source, target, overlap in zip(sources, targets, overlaps):
+            self.assertEqual(overlap, dense[source].max())
+            self.assertEqual(dense[source, target], overlap)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(NeighborPlanningTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
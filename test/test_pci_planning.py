@@ -0,0 +1,79 @@
+# coding=utf-8
+"""PCI and RSI planning engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+
+import unittest
+
+import numpy as np
+
+from core.pci_planning import is_locked, plan_group, planning_groups, rsi_count
+
+
+class PciPlanningEngineTest(unittest.TestCase):
+    """Test the PCI and RSI planning engine."""
+
+    def test_rsi_count(self):
+        """RSIs scale with the cell range up to the Ncs max range, capped at 64."""
+        self.assertEqual(rsi_count(0.1), 1)
+        self.assertEqual(rsi_count(22.82), 13)
+        self.assertEqual(rsi_count(100.0), 13)
+        self.assertEqual(rsi_count(22.82, prach_format=3), 10)
+        self.assertEqual(rsi_count(200.0, ncs_config=0), 64)
+
+    def test_groups_and_locks(self):
+        """Cells are grouped per tech and band; locked values are parsed leniently."""
+        groups = planning_groups(['LTE', 'LTE', 'NR', 'LTE'], ['B3', None, 'n78', 'B3'])
+        self.assertEqual(groups, {('LTE', 'B3'): [0, 3], ('LTE', 'Unknown'): [1], ('NR', 'n78'): [2]})
+        self.assertEqual([is_locked(v) for v in [True, 0, 1.0, 'Yes', 'no', None]],
+                         [True, False, True, True, False, False])
+
+    def test_plan_group(self):
+        """Nearby cells get distinct PCIs and RSI ranges; locked cells keep theirs."""
+        x = np.array([10.0, 10.001, 10.002, 10.5])
+        y = np.full(4, 50.0)
+        has_point = np.ones(4, dtype=bool)
+        locked = [True, False, False, False]
+        plan = plan_group([0, 1, 2, 3], x, y, has_point, locked, existing_pcis=['3', None, None, None],
+                          existing_rsis=[None] * 4, pci_range=(0, 20), rsi_range=(0, 100),
+                          reuse_distance_km=5.0)
+        self.assertEqual(plan[0], (3, None, None))
+        pcis = [plan[row][0] for row in (1, 2, 3)]
+        self.assertEqual(len(set(pcis + [3])), 4)
+        # Mod 3 equal PCIs are kept apart near the locked cell
+        self.assertNotEqual(pcis[0] % 3, 3 % 3)
+        self.assertNotEqual(pcis[0] % 3, pcis[1] % 3)
+
+        starts = [plan[row][1] for row in (1, 2)]
+        counts = [plan[row][2] for row in (1, 2)]
+        self.assertEqual(counts, [rsi_count(2.0)] * 2)
+        self.assertGreaterEqual(abs(starts[1] - starts[0]), counts[0])
+
+    def test_interferers(self):
+        """Cells interfering through the matrix keep mod 3 apart whatever their distance."""
+        x = np.array([10.0, 11.0, 12.0, 13.0])
+        y = np.full(4, 50.0)
+        has_point = np.ones(4, dtype=bool)
+        locked = [True, True, True, False]
+        kwargs = dict(existing_pcis=['0', '1', '2', None], pci_range=(0, 5), plan_rsi=False,
+                      reuse_distance_km=5.0)
+        plan = plan_group([0, 1, 2, 3], x, y, has_point, locked, **kwargs)
+        self.assertEqual(plan[3][0], 3)
+        plan = plan_group([0, 1, 2, 3], x, y, has_point, locked, interferers={3: {0}}, **kwargs)
+        self.assertEqual(plan[3][0], 4)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PciPlanningEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Run statistics test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+from core.run_stats import RunStats
+
+
+class RunStatsTest(unittest.TestCase):
+    """Test the phase timing, memory peaks and profile dumps of a run."""
+
+    def test_phases(self):
+        """Phases are recorded in order with their memory peaks."""
+        stats = RunStats('Coverage Prediction', trace_memory=True)
+        with stats.phase('load features'):
+            values = list(range(10000))
+        with stats.phase('path loss'):
+            buffer = bytearray(4 * 1024 * 1024)
+        stats.count('sites', len(values))
+        stats.finish()
+        del buffer
+
+        self.assertEqual([phase['name'] for phase in stats.phases], ['load features', 'path loss'])
+        self.assertGreaterEqual(stats.phases[1]['peak_bytes'], 4 * 1024 * 1024)
+        self.assertGreaterEqual(stats.peak_bytes, stats.phases[1]['peak_bytes'])
+        result = json.loads(stats.to_json())
+        self.assertEqual(result['counts'], {'sites': 10000})
+        self.assertGreaterEqual(result['seconds'], sum(phase['seconds'] for phase in result['phases']))
+        self.assertIn('path loss', stats.summary())
+
+        # A phase interrupted by an error is still recorded
+        stats = RunStats('Tilt Optimizer')
+        with self.assertRaises(ValueError):
+            with stats.phase('tilt search'):
+                raise ValueError('no sectors')
+        self.assertEqual(stats.phases[0]['name'], 'tilt search')
+        self.assertNotIn('peak_bytes', stats.phases[0])
+
+    def test_profile(self):
+        """A run profiled to a folder leaves a readable cProfile dump."""
+        with tempfile.TemporaryDirectory() as folder:
+            stats = RunStats('PCI/RSI Planner', profile_dir=folder)
+            with stats.phase('assign pci/rsi'):
+                sorted(range(1000), key=lambda value: -value)
+            stats.finish().finish()
+            if stats.profile_path is None:
+                self.skipTest('another profiler is active')
+            self.assertTrue(os.path.basename(stats.profile_path).startswith('pci_rsi_planner_'))
+            self.assertGreater(pstats.Stats(stats.profile_path).total_calls, 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RunStatsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,104 @@
+# coding=utf-8
+"""Site See sector geometry test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import math
+import struct
+import unittest
+
+from core.site_see import (azimuth_bin_labels, band_labels, band_ranks,
+                           nested_band_scale, sector_polygons_wkb,
+                           sector_rings, unique_sites)
+
+
+def reference_sector(cx, cy, azimuth, beamwidth, radius):
+    """Point-by-point sector ring as originally built by Site See."""
+    points = [(cx, cy)]
+    start_angle = azimuth - beamwidth / 2.0
+    end_angle = azimuth + beamwidth / 2.0
+    num_points = max(int(beamwidth / 5), 10)
+    for i in range(num_points + 1):
+        angle = math.radians(start_angle + (end_angle - start_angle) * i / num_points)
+        points.append((cx + radius * math.sin(angle), cy + radius * math.cos(angle)))
+    points.append((cx, cy))
+    return points
+
+
+class SiteSeeGeometryTest(unittest.TestCase):
+    """Test batched sector polygons match the per-point construction."""
+
+    def test_rings_match_reference(self):
+        """Each batched ring matches the scalar construction."""
+        x = [-95.1, -95.2, 10.5]
+        y = [29.4, 29.5, -3.2]
+        azimuth = [0.0, 120.0, 355.0]
+        beamwidth = [65.0, 33.0, 90.0]
+        radius = [0.01, 0.02, 0.005]
+
+        rings = {}
+        for indices, coords in sector_rings(x, y, azimuth, beamwidth, radius, radius):
+            for index, ring in zip(indices, coords):
+                rings[index] = ring
+
+        for i in range(len(x)):
+            expected = reference_sector(x[i], y[i], azimuth[i], beamwidth[i], radius[i])
+            self.assertEqual(len(rings[i]), len(expected))
+            for (ex, ey), (gx, gy) in zip(expected, rings[i]):
+                self.assertAlmostEqual(ex, gx, places=12)
+                self.assertAlmostEqual(ey, gy, places=12)
+
+    def test_wkb_layout(self):
+        """WKB output is a little-endian single-ring polygon."""
+        wkb = sector_polygons_wkb([1.0], [2.0], [90.0], [65.0], [0.1], [0.1])[0]
+        order, geom_type, rings, points = struct.unpack('<BIII', wkb[:13])
+        self.assertEqual((order, geom_type, rings), (1, 3, 1))
+        self.assertEqual(points, 13 + 3)
+        self.assertEqual(len(wkb), 13 + points * 16)
+        self.assertEqual(struct.unpack('<dd', wkb[13:29]), (1.0, 2.0))
+
+    def test_nested_band_scale(self):
+        """Bands shrink by 15% per rank down to 40% in multi-band groups."""
+        scale = nested_band_scale([0, 1, 2, 5, 0], [3, 3, 3, 6, 1])
+        self.assertEqual(list(scale), [1.0, 0.85, 0.7, 0.4, 1.0])
+
+    def test_band_ranks(self):
+        """Bands are ranked within each site and azimuth group."""
+        lat = [29.5, 29.5, 29.5, 29.5, 30.0]
+        lon = [-95.1, -95.1, -95.1, -95.1, -95.1]
+        azimuth = [0.0, 0.0, 120.0, 0.0, 0.0]
+        band = [1800.0, 700.0, 2100.0, 1800.0, 850.0]
+        rank, size = band_ranks(lat, lon, azimuth, band)
+        self.assertEqual(list(rank), [1, 0, 0, 2, 0])
+        self.assertEqual(list(size), [3, 3, 1, 3, 1])
+
+    def test_unique_sites(self):
+        """The first sector of every distinct site is kept in input order."""
+        lat = [30.0, 29.5, 30.0000001, 29.5]
+        lon = [-95.0, -95.1, -95.0, -95.2]
+        self.assertEqual(list(unique_sites(lat, lon)), [0, 1, 3])
+
+    def test_band_labels(self):
+        """Band labels are de-duplicated, formatted and sorted numerically."""
+        labels = band_labels([1800.0, 700, None, '', 'n78', 2100.5, '1800'])
+        self.assertEqual(labels, ['700', '1800', '2100.5', 'n78'])
+
+    def test_azimuth_bin_labels(self):
+        """Only azimuth bins holding sectors are styled, 360 included."""
+        self.assertEqual(azimuth_bin_labels([0.0, 360.0, 120.0]),
+                         ['0-60', '60-180', '300-360'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SiteSeeGeometryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
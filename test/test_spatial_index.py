@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Sector point spatial index test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core import spatial_index
+from core.geodesy import local_distance
+from core.spatial_index import PointIndex
+
+
+class PointIndexTest(unittest.TestCase):
+    """Test radius queries against a brute force scan."""
+
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        self.x = rng.uniform(-100.0, -90.0, 3000)
+        self.y = rng.uniform(25.0, 45.0, 3000)
+
+    def _check_backend(self, use_scipy):
+        index = PointIndex(self.x, self.y, use_scipy=use_scipy)
+        for i in range(0, len(self.x), 150):
+            indices, distances = index.query_radius(self.x[i], self.y[i], 40000.0)
+            expected = local_distance(self.x[i], self.y[i], self.x, self.y)
+            self.assertEqual(list(indices), list(np.nonzero(expected <= 40000.0)[0]))
+            np.testing.assert_allclose(distances, expected[indices])
+
+    def test_grid_backend(self):
+        """The NumPy grid returns exactly the points within the radius."""
+        self._check_backend(use_scipy=False)
+
+    def test_kdtree_backend(self):
+        """The cKDTree backend returns exactly the points within the radius."""
+        if spatial_index.cKDTree is None:
+            self.skipTest('SciPy is not installed')
+        self._check_backend(use_scipy=True)
+
+    def test_neighbor_lists(self):
+        """Neighbor lists exclude the point itself."""
+        index = PointIndex([0.0, 0.001, 0.5], [0.0, 0.0, 0.0], use_scipy=False)
+        indptr, indices, distances = index.neighbor_lists(1000.0)
+        self.assertEqual(list(indptr), [0, 1, 2, 2])
+        self.assertEqual(list(indices), [1, 0])
+        self.assertAlmostEqual(distances[0], 111.32, places=1)
+
+    def test_planar(self):
+        """Projected coordinates are queried in map units scaled to meters."""
+        index = PointIndex([0.0, 3.0, 10.0], [0.0, 4.0, 0.0], geographic=False,
+                           unit_to_meters=1000.0, use_scipy=False)
+        indices, distances = index.query_radius(0.0, 0.0, 5000.0)
+        self.assertEqual(list(indices), [0, 1])
+        self.assertEqual(list(distances), [0.0, 5000.0])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PointIndexTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,89 @@
+# coding=utf-8
+"""Tilt optimizer engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.propagation import ERICSSON_9999, FREE_SPACE, MODELS, SUI_URBAN, path_loss
+from core.tilt import neighbor_aggregates, optimal_tilt, optimal_tilts, tilt_path_loss
+
+
+class TiltEngineTest(unittest.TestCase):
+    """Test the batch tilt optimizer against the per-sector rule."""
+
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.count = 400
+        self.height = rng.uniform(10.0, 60.0, self.count)
+        self.v_beamwidth = rng.uniform(4.0, 14.0, self.count)
+        self.h_beamwidth = rng.choice([33.0, 45.0, 65.0, 90.0, 120.0], self.count)
+        self.pmax = rng.uniform(30.0, 49.0, self.count)
+        self.gain = rng.uniform(10.0, 21.0, self.count)
+        self.frequency = rng.choice([700.0, 1800.0, 2100.0, 3500.0], self.count)
+
+        # Random sparse neighbor matrix, some sectors without neighbors
+        neighbor_counts = rng.randint(0, 6, self.count)
+        self.indptr = np.concatenate(([0], np.cumsum(neighbor_counts)))
+        self.neighbor_index = rng.randint(0, self.count, self.indptr[-1])
+        self.distances = rng.uniform(0.1, 4.0, self.indptr[-1])
+
+    def test_batch_matches_scalar(self):
+        """Every model gives the same tilts through both code paths."""
+        aggregates = neighbor_aggregates(self.indptr, self.neighbor_index,
+                                         self.distances, self.height)
+        for model in MODELS:
+            for target_distance in (0.5, 1.5, 4.0):
+                batch = optimal_tilts(self.height, self.v_beamwidth, self.h_beamwidth,
+                                      self.pmax, self.gain, self.frequency, model,
+                                      target_distance, *aggregates)
+                for i in range(self.count):
+                    rows = slice(self.indptr[i], self.indptr[i + 1])
+                    expected = optimal_tilt(
+                        self.height[i], self.v_beamwidth[i], self.h_beamwidth[i],
+                        self.pmax[i], self.gain[i], self.frequency[i], model,
+                        target_distance, list(self.distances[rows]),
+                        list(self.height[self.neighbor_index[rows]]))
+                    self.assertAlmostEqual(batch[i], expected, places=9)
+                    self.assertEqual(round(float(batch[i]), 1), round(expected, 1))
+
+    def test_tilt_is_clamped(self):
+        """Tilts stay within the macro cell limits."""
+        low = optimal_tilts([5.0], [0.5], [120.0], [20.0], [5.0], [2100.0],
+                            'Free Space Path Loss', 50.0)
+        high = optimal_tilts([200.0], [10.0], [30.0], [49.0], [21.0], [2100.0],
+                             'Free Space Path Loss', 0.2)
+        tilts = np.concatenate([low, high])
+        self.assertEqual(list(tilts), [0.0, 15.0])
+
+    def test_path_loss_free_space(self):
+        """Free space loss at 1 km and 1000 MHz is 92.45 dB."""
+        self.assertAlmostEqual(float(path_loss(1000.0, 1.0, 30.0, 'Free Space Path Loss')), 92.45)
+        self.assertAlmostEqual(float(path_loss(1000.0, 1.0, 30.0, 'Unknown')), 92.45)
+
+    def test_tilt_model_parity(self):
+        """Models the tilt rule never evaluated keep the free space tilts."""
+        self.assertEqual(float(tilt_path_loss(1800.0, 1.0, 30.0, ERICSSON_9999)),
+                         float(path_loss(1800.0, 1.0, 30.0, FREE_SPACE)))
+        for model in (ERICSSON_9999, SUI_URBAN):
+            self.assertAlmostEqual(optimal_tilt(30.0, 8.0, 65.0, 43.0, 18.0, 1800.0, model, 1.0),
+                                   5.385025, places=6)
+            self.assertAlmostEqual(optimal_tilt(30.0, 8.0, 65.0, 30.0, 10.0, 1800.0, model, 4.0),
+                                   4.096377, places=6)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TiltEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,82 @@
+# coding=utf-8
+"""Coverage-driven tilt search test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import unittest
+
+import numpy as np
+
+from core.tilt_search import CoverageSurrogate, optimize_tilts
+
+
+class TiltSearchTest(unittest.TestCase):
+    """Test the incremental surrogate and the coordinate descent."""
+
+    def setUp(self):
+        rng = np.random.RandomState(11)
+        sites = 40
+        site_x = rng.uniform(-95.5, -95.4, sites)
+        site_y = rng.uniform(29.5, 29.6, sites)
+        self.x = np.repeat(site_x, 3)
+        self.y = np.repeat(site_y, 3)
+        count = len(self.x)
+        self.args = dict(
+            height=rng.uniform(20.0, 40.0, count),
+            azimuth=np.tile([0.0, 120.0, 240.0], sites),
+            h_beamwidth=np.full(count, 65.0),
+            v_beamwidth=np.full(count, 8.0),
+            eirp=np.full(count, 60.0),
+            frequency=np.full(count, 1800.0),
+            propagation_model='COST-231 Hata',
+            radius_km=2.0,
+            resolution_m=250.0,
+        )
+        self.initial = rng.uniform(0.0, 10.0, count)
+
+    def _surrogate(self):
+        return CoverageSurrogate(self.x, self.y, **self.args)
+
+    def test_incremental_matches_full_evaluation(self):
+        """Delta updates leave the same state as evaluating from scratch."""
+        surrogate = self._surrogate()
+        surrogate.set_tilts(self.initial)
+        before = surrogate.objective()
+        delta = surrogate.evaluate(5, [self.initial[5] + 3.0])[0]
+        surrogate.apply(5, self.initial[5] + 3.0)
+        self.assertAlmostEqual(surrogate.objective(), before + delta, places=6)
+
+        incremental = surrogate.objective()
+        surrogate.set_tilts(surrogate.tilts)
+        self.assertAlmostEqual(surrogate.objective(), incremental, places=6)
+
+    def test_optimization_improves_objective(self):
+        """Coordinate descent never makes the network worse and keeps locks."""
+        surrogate = self._surrogate()
+        surrogate.set_tilts(self.initial)
+        before = surrogate.objective()
+        locked = np.zeros(len(self.initial), dtype=bool)
+        locked[::7] = True
+
+        tilts = optimize_tilts(surrogate, self.initial, locked=locked)
+        self.assertGreater(surrogate.objective(), before)
+        np.testing.assert_array_equal(tilts[locked], self.initial[locked])
+        self.assertTrue(np.all((tilts >= 0.0) & (tilts <= 15.0)))
+
+        metrics = surrogate.metrics()
+        self.assertGreaterEqual(metrics['coverage'], metrics['good'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TiltSearchTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
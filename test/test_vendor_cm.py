@@ -0,0 +1,112 @@
+# coding=utf-8
+"""Vendor configuration dump import test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'mbebs@live.com'
+__date__ = '2018-01-29'
+__copyright__ = 'Copyright 2018, Leonard Fodje'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.vendor_cm import (FORMAT_CSV, FORMAT_XML, CELL_COLUMNS, detect_dump_format,
+                            parse_bulk_cm, read_cell_csv_chunks)
+
+BULK_CM = """<?xml version="1.0" encoding="UTF-8"?>
+<bulkCmConfigDataFile xmlns="http://www.3gpp.org/ftp/specs/archive/32_series/32.615#configData"
+    xmlns:xn="http://www.3gpp.org/ftp/specs/archive/32_series/32.625#genericNrm"
+    xmlns:en="http://www.3gpp.org/ftp/specs/archive/32_series/32.765#eutranNrm"
+    xmlns:es="EricssonSpecificAttributes.xsd">
+ <configData dnPrefix="DC=example">
+  <xn:SubNetwork id="ONRM">
+   <xn:MeContext id="SITE1">
+    <xn:ManagedElement id="1">
+     <xn:attributes><xn:latitude>52.0</xn:latitude><xn:longitude>13.0</xn:longitude></xn:attributes>
+     <xn:VsDataContainer id="1">
+      <xn:attributes>
+       <xn:vsDataType>vsDataSectorEquipmentFunction</xn:vsDataType>
+       <es:vsDataSectorEquipmentFunction>
+        <es:latitude>52.1</es:latitude><es:longitude>13.2</es:longitude><es:azimuth>120</es:azimuth>
+       </es:vsDataSectorEquipmentFunction>
+      </xn:attributes>
+     </xn:VsDataContainer>
+     <en:ENBFunction id="1">
+      <en:EUtranCellFDD id="CELL1">
+       <en:attributes>
+        <en:pci>101</en:pci><en:earfcnDl>1300</en:earfcnDl><en:tac>7</en:tac>
+        <en:sectorEquipmentFunctionRef>DC=example,SubNetwork=ONRM,MeContext=SITE1,ManagedElement=1,SectorEquipmentFunction=1</en:sectorEquipmentFunctionRef>
+       </en:attributes>
+      </en:EUtranCellFDD>
+      <en:EUtranCellFDD id="CELL2">
+       <en:attributes><en:pci>102</en:pci><en:azimuth>240</en:azimuth></en:attributes>
+      </en:EUtranCellFDD>
+     </en:ENBFunction>
+    </xn:ManagedElement>
+   </xn:MeContext>
+  </xn:SubNetwork>
+ </configData>
+</bulkCmConfigDataFile>
+"""
+
+
+class VendorDumpImportTest(unittest.TestCase):
+    """Test the streaming vendor dump parsers."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def test_bulk_cm_cells(self):
+        """Cells take antenna attributes through references and the site position otherwise."""
+        path = self.write('dump.xml', BULK_CM)
+        self.assertEqual(detect_dump_format(path), FORMAT_XML)
+
+        table = parse_bulk_cm(path)
+        names = [name for name, _ in CELL_COLUMNS]
+        cells = [dict(zip(names, row)) for row in table.rows()]
+        self.assertEqual([cell['cell_id'] for cell in cells], ['CELL1', 'CELL2'])
+        self.assertEqual(cells[0]['site_id'], 'SITE1')
+        self.assertEqual(cells[0]['technology'], 'LTE')
+        self.assertEqual((cells[0]['pci'], cells[0]['earfcn'], cells[0]['tac']), (101, 1300, 7))
+        self.assertEqual((cells[0]['latitude'], cells[0]['longitude'], cells[0]['azimuth']),
+                         (52.1, 13.2, 120.0))
+        self.assertEqual((cells[1]['latitude'], cells[1]['longitude'], cells[1]['azimuth']),
+                         (52.0, 13.0, 240.0))
+        self.assertTrue(cells[1]['dn'].endswith('ENBFunction=1,EUtranCellFDD=CELL2'))
+
+    def test_csv_chunks(self):
+        """CSV columns are matched by name and streamed in chunks."""
+        lines = ['Site Name;Cell_ID;EARFCN_DL;PCI;Lat;Lon;Comment']
+        lines += [f'S{i // 3};C{i};1300;{i};52.{i};13.{i};x' for i in range(7)]
+        lines.append('S9;C9;;;;;')
+        path = self.write('cells.csv', '\n'.join(lines) + '\n')
+        self.assertEqual(detect_dump_format(path), FORMAT_CSV)
+
+        chunks = list(read_cell_csv_chunks(path, chunk_rows=5))
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 3])
+        last = chunks[-1].rows()
+        self.assertEqual(last[0][:6], ['S1', 'C5', None, None, 1300, 5])
+        self.assertEqual(last[-1][:6], ['S9', 'C9', None, None, None, None])
+        self.assertEqual(chunks[-1].positioned.tolist(), [True, True, False])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(VendorDumpImportTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
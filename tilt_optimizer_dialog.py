@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
 
-import os
-import math
+import numpy as np
 
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
 from qgis.PyQt.QtCore import QVariant
-from qgis.core import QgsProject, QgsField, QgsVectorLayer, QgsFeature, QgsWkbTypes
+from qgis.core import QgsProject, QgsField
 
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'tilt_optimizer_dialog_base.ui'))
+from .core.tilt import (DEFAULT_ANTENNA_GAIN, DEFAULT_FREQUENCY, DEFAULT_HEIGHT,
+                        DEFAULT_H_BEAMWIDTH, DEFAULT_PMAX, DEFAULT_V_BEAMWIDTH,
+                        neighbor_aggregates, optimal_tilts)
+from .core.tilt_search import (RX_POWER_THRESHOLD, SINR_THRESHOLD, CoverageSurrogate,
+                               optimize_tilts)
+from .dialog_state import FieldMappings, LayerList
+from .layer_writers import FeatureColumnWriter
+from .network_model import network_model
+from .run_statistics import finish_run, setup_panel, timed_run
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('tilt_optimizer_dialog_base.ui')
 
 
 class TiltOptimizerDialog(QtWidgets.QDialog, FORM_CLASS):
@@ -24,37 +32,29 @@ class TiltOptimizerDialog(QtWidgets.QDialog, FORM_CLASS):
         
         # Initialize progress bar
         self.progressBar.setValue(0)
+        setup_panel(self)
 
         self._populate_layers()
     
-    def _safe_float(self, value, default=0.0):
-        """Safely convert a value to float, returning default if conversion fails."""
-        if value is None:
-            return default
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return default
-    
-    def _get_point_from_geometry(self, geom):
-        """Extract a point from any geometry type."""
-        if geom.type() == QgsWkbTypes.PointGeometry:
-            return geom.asPoint()
-        else:
-            # For LineString, Polygon, or other geometries, use centroid
-            centroid = geom.centroid()
-            return centroid.asPoint() if centroid else None
-
     def _populate_layers(self):
-        self.layerComboBox.clear()
+        # Created first: selecting the first layer restores its fields
+        self._field_mappings = FieldMappings('TiltOptimizer', [
+            self.heightFieldComboBox,
+            self.vBeamwidthFieldComboBox,
+            self.hBeamwidthFieldComboBox,
+            self.pmaxFieldComboBox,
+            self.antennaGainFieldComboBox,
+            self.frequencyFieldComboBox,
+            getattr(self, 'azimuthFieldComboBox', None),
+        ])
         self._layers = []
-        for layer in QgsProject.instance().mapLayers().values():
-            if isinstance(layer, QgsVectorLayer):
-                self.layerComboBox.addItem(layer.name())
-                self._layers.append(layer)
+        self._layer_list = LayerList(self.layerComboBox, self._layers)
+        self._layer_list.fieldsChanged.connect(self._on_fields_changed)
 
-        if self._layers:
-            self._on_layer_changed(0)
+    def _on_fields_changed(self):
+        """Rebuild the field combos when fields of the selected layer change."""
+        with self._field_mappings.kept():
+            self._on_layer_changed(self.layerComboBox.currentIndex())
 
     def _on_layer_changed(self, index):
         for combo in [
@@ -80,7 +80,15 @@ class TiltOptimizerDialog(QtWidgets.QDialog, FORM_CLASS):
             self.pmaxFieldComboBox.addItem(name)
             self.antennaGainFieldComboBox.addItem(name)
             self.frequencyFieldComboBox.addItem(name)
+        
+        # Azimuth is only needed by the coverage-driven mode
+        if hasattr(self, 'azimuthFieldComboBox'):
+            self.azimuthFieldComboBox.clear()
+            self.azimuthFieldComboBox.addItems(field_names)
+
+        self._field_mappings.restore(layer)
 
+    @timed_run('Tilt Optimizer')
     def _run_optimizer(self):
         if not self._layers:
             QtWidgets.QMessageBox.warning(self, 'Tilt Optimizer', 'No vector layers available.')
@@ -98,6 +106,7 @@ class TiltOptimizerDialog(QtWidgets.QDialog, FORM_CLASS):
             return
 
         layer = self._layers[layer_index]
+        self._field_mappings.save(layer)
 
         height_field = self.heightFieldComboBox.currentText()
         v_beamwidth_field = self.vBeamwidthFieldComboBox.currentText()
@@ -114,283 +123,154 @@ class TiltOptimizerDialog(QtWidgets.QDialog, FORM_CLASS):
             QtWidgets.QMessageBox.warning(self, 'Tilt Optimizer', 'Please provide an output field name.')
             return
 
-        # Get field indices
-        fields = layer.fields()
-        height_idx = fields.indexFromName(height_field) if height_field else -1
-        v_beamwidth_idx = fields.indexFromName(v_beamwidth_field) if v_beamwidth_field else -1
-        h_beamwidth_idx = fields.indexFromName(h_beamwidth_field) if h_beamwidth_field else -1
-        pmax_idx = fields.indexFromName(pmax_field) if pmax_field else -1
-        antenna_gain_idx = fields.indexFromName(antenna_gain_field) if antenna_gain_field else -1
-        frequency_idx = fields.indexFromName(frequency_field) if frequency_field else -1
-
-        # Create new output layer with all source fields plus optimal tilt field
-        crs = layer.crs().authid()
-        geom_type = layer.geometryType()
-        geom_type_str = ['Point', 'LineString', 'Polygon'][geom_type]
-        
-        output_layer_name = f'{layer.name()}_Tilt_Optimized'
-        output_layer = QgsVectorLayer(f'{geom_type_str}?crs={crs}', output_layer_name, 'memory')
-        output_provider = output_layer.dataProvider()
-        
-        # Add all fields from source layer
-        output_provider.addAttributes(layer.fields().toList())
-        
-        # Add optimal tilt field
-        tilt_field = QgsField(output_field_name, QVariant.Double)
-        tilt_field.setLength(10)
-        tilt_field.setPrecision(2)
-        output_provider.addAttributes([tilt_field])
-        output_layer.updateFields()
-        
-        # Get field index in output layer
-        output_fields = output_layer.fields()
-        output_idx = output_fields.indexFromName(output_field_name)
+        # Coverage-driven mode also needs the sector azimuths
+        coverage_mode = hasattr(self, 'optimizationModeComboBox') and \
+            self.optimizationModeComboBox.currentText().startswith('Coverage')
+        if coverage_mode:
+            azimuth_field = self.azimuthFieldComboBox.currentText()
+            if not azimuth_field or layer.fields().indexFromName(azimuth_field) == -1:
+                QtWidgets.QMessageBox.warning(self, 'Tilt Optimizer', 'Please select an azimuth field for the coverage-driven mode.')
+                return
 
         # Build sector list with positions for neighbor analysis
         self.progressBar.setValue(5)
         self.progressBar.setFormat("Analyzing sectors...")
         QtWidgets.QApplication.processEvents()
         
-        features = list(layer.getFeatures())
-        total_features = len(features)
-        
-        # Collect all sectors with their positions
-        sectors = []
-        for feat in features:
-            geom = feat.geometry()
-            if not geom or geom.isEmpty():
-                continue
-            
-            # Extract point from geometry (handles Point, LineString, Polygon, etc.)
-            point = self._get_point_from_geometry(geom)
-            if point is None:
-                continue
-            
-            sectors.append({
-                'feature': feat,
-                'point': point,
-                'height': self._safe_float(feat[height_idx], 30.0) if height_idx != -1 else 30.0
-            })
-        
-        # Calculate optimal tilt for each feature
+        with self.run_stats.phase('load features'):
+            # Sector arrays from the shared network model of the layer
+            model = network_model(layer)
+            model.load([height_field, v_beamwidth_field, h_beamwidth_field, pmax_field,
+                        antenna_gain_field, frequency_field, azimuth_field if coverage_mode else ''])
+            feature_ids = model.fids
+            total_features = len(model)
+            positioned = model.positioned
+            xs = model.x[positioned]
+            ys = model.y[positioned]
+
+            heights = model.floats(height_field, DEFAULT_HEIGHT)
+            v_beamwidths = model.floats(v_beamwidth_field, DEFAULT_V_BEAMWIDTH)
+            h_beamwidths = model.floats(h_beamwidth_field, DEFAULT_H_BEAMWIDTH)
+            pmaxs = model.floats(pmax_field, DEFAULT_PMAX)
+            antenna_gains = model.floats(antenna_gain_field, DEFAULT_ANTENNA_GAIN)
+            frequencies = model.floats(frequency_field, DEFAULT_FREQUENCY)
+        self.run_stats.count('sectors', total_features)
+
+        # Sparse neighbor matrix within target_distance * 2, built from one spatial index
         self.progressBar.setValue(10)
-        self.progressBar.setFormat("Calculating tilts...")
+        self.progressBar.setFormat("Finding neighbors...")
         QtWidgets.QApplication.processEvents()
         
-        output_features = []
-        for idx, feat in enumerate(features):
-            # Get parameters (with safe conversion from field values)
-            height = self._safe_float(feat[height_idx], 30.0) if height_idx != -1 else 30.0
-            v_beamwidth = self._safe_float(feat[v_beamwidth_idx], 10.0) if v_beamwidth_idx != -1 else 10.0
-            h_beamwidth = self._safe_float(feat[h_beamwidth_idx], 65.0) if h_beamwidth_idx != -1 else 65.0
-            pmax = self._safe_float(feat[pmax_idx], 43.0) if pmax_idx != -1 else 43.0
-            antenna_gain = self._safe_float(feat[antenna_gain_idx], 18.0) if antenna_gain_idx != -1 else 18.0
-            frequency = self._safe_float(feat[frequency_idx], 2100.0) if frequency_idx != -1 else 2100.0
+        with self.run_stats.phase('neighbors'):
+            indptr, neighbor_index, distances_m = model.point_index().neighbor_lists(target_distance * 2 * 1000.0)
 
-            # Get sector position
-            geom = feat.geometry()
-            point = self._get_point_from_geometry(geom) if geom and not geom.isEmpty() else None
-            
-            # Find neighbors for this sector
-            neighbors = self._find_neighbors(point, sectors, feat.id(), target_distance * 2) if point else []
-            
-            # Calculate optimal tilt considering neighbors
-            optimal_tilt = self._calculate_optimal_tilt(
-                height, v_beamwidth, h_beamwidth, pmax, antenna_gain, frequency, 
-                propagation_model, target_distance, neighbors
-            )
-            
-            # Create new feature with all source attributes
-            new_feat = QgsFeature(output_layer.fields())
-            new_feat.setGeometry(feat.geometry())
-            
-            # Copy all source attributes
-            for field in layer.fields():
-                new_feat[field.name()] = feat[field.name()]
+            # Co-located sectors of the same site are not neighbors
+            rows = np.repeat(np.arange(len(positioned)), np.diff(indptr))
+            apart = distances_m > 0
+            indptr = np.concatenate(([0], np.cumsum(np.bincount(rows[apart], minlength=len(positioned)))))
+            count, mean_distance, mean_height_diff, mean_height = neighbor_aggregates(
+                indptr, neighbor_index[apart], distances_m[apart] / 1000.0, heights[positioned])
+
+            # Scatter the aggregates back to feature order; features without a position have no neighbors
+            neighbor_count = np.zeros(total_features, dtype=np.int64)
+            neighbor_mean_distance = np.zeros(total_features)
+            neighbor_mean_height_diff = np.zeros(total_features)
+            neighbor_mean_height = np.zeros(total_features)
+            neighbor_count[positioned] = count
+            neighbor_mean_distance[positioned] = mean_distance
+            neighbor_mean_height_diff[positioned] = mean_height_diff
+            neighbor_mean_height[positioned] = mean_height
+
+        # Calculate optimal tilt for all sectors at once
+        self.progressBar.setValue(30)
+        self.progressBar.setFormat("Calculating tilts...")
+        QtWidgets.QApplication.processEvents()
+        
+        with self.run_stats.phase('tilt rules'):
+            optimal_tilt_values = optimal_tilts(
+                heights, v_beamwidths, h_beamwidths, pmaxs, antenna_gains, frequencies,
+                propagation_model, target_distance, neighbor_count,
+                neighbor_mean_distance, neighbor_mean_height_diff, neighbor_mean_height)
+        
+        # Coverage-driven mode refines the heuristic tilts against a coarse RSRP/SINR grid
+        coverage_report = ''
+        if coverage_mode and len(positioned):
+            azimuths = model.floats(azimuth_field, 0.0)
             
-            # Add optimal tilt value
-            new_feat[output_field_name] = round(optimal_tilt, 1)
+            self.progressBar.setFormat("Building coverage grid...")
+            QtWidgets.QApplication.processEvents()
+            with self.run_stats.phase('coverage grid'):
+                surrogate = CoverageSurrogate(
+                    xs, ys, heights[positioned], azimuths[positioned],
+                    h_beamwidths[positioned], v_beamwidths[positioned],
+                    pmaxs[positioned] + antenna_gains[positioned], frequencies[positioned],
+                    propagation_model, radius_km=target_distance * 2,
+                    resolution_m=max(50.0, target_distance * 1000.0 / 4.0),
+                    **model.distance_args)
+            surrogate.set_tilts(optimal_tilt_values[positioned])
+            before = surrogate.metrics()
             
-            output_features.append(new_feat)
+            self.progressBar.setFormat("Optimizing tilts for coverage...")
             
-            # Update progress
-            if idx % max(1, total_features // 20) == 0:
-                progress = 10 + int((idx + 1) / total_features * 80)
-                self.progressBar.setValue(progress)
+            def show_progress(sweep, max_sweeps):
+                self.progressBar.setValue(30 + int(sweep / max_sweeps * 40))
                 QtWidgets.QApplication.processEvents()
-
-        # Add features to output layer
-        self.progressBar.setValue(95)
+            
+            with self.run_stats.phase('tilt search'):
+                optimal_tilt_values[positioned] = optimize_tilts(
+                    surrogate, optimal_tilt_values[positioned], progress=show_progress)
+            self.run_stats.count('grid cells', int(np.prod(surrogate.grid_shape)))
+            after = surrogate.metrics()
+            coverage_report = (
+                f'\n\nCoverage (>= {RX_POWER_THRESHOLD:.0f} dBm): '
+                f'{before["coverage"] * 100:.1f}% -> {after["coverage"] * 100:.1f}%'
+                f'\nGood quality (SINR >= {SINR_THRESHOLD:.0f} dB): '
+                f'{before["good"] * 100:.1f}% -> {after["good"] * 100:.1f}%'
+                f'\nMean SINR: {before["mean_sinr"]:.1f} dB -> {after["mean_sinr"]:.1f} dB')
+        
+        # Append the optimal tilt column to the source features
+        self.progressBar.setValue(70)
         self.progressBar.setFormat("Creating output layer...")
         QtWidgets.QApplication.processEvents()
         
-        output_provider.addFeatures(output_features)
-        output_layer.updateExtents()
-        
-        # Add output layer to project
-        QgsProject.instance().addMapLayer(output_layer)
-        
+        with self.run_stats.phase('write layer'):
+            tilt_field = QgsField(output_field_name, QVariant.Double)
+            tilt_field.setLength(10)
+            tilt_field.setPrecision(2)
+            tilt_values = {int(fid): [round(float(tilt), 1)] for fid, tilt in zip(feature_ids, optimal_tilt_values)}
+            writer = FeatureColumnWriter(layer, [tilt_field])
+
+            def show_write_progress(done, total):
+                self.progressBar.setValue(70 + int(done / max(total, 1) * 25))
+                QtWidgets.QApplication.processEvents()
+
+            if hasattr(self, 'updateInPlaceCheckBox') and self.updateInPlaceCheckBox.isChecked():
+                try:
+                    writer.update_in_place(tilt_values, progress=show_write_progress)
+                except RuntimeError as e:
+                    QtWidgets.QMessageBox.warning(self, 'Tilt Optimizer', str(e))
+                    self.progressBar.setVisible(False)
+                    return
+                result = f'Field {output_field_name} updated in layer: {layer.name()}'
+            else:
+                output_layer_name = f'{layer.name()}_Tilt_Optimized'
+                try:
+                    output_layer, _ = writer.to_memory_layer(output_layer_name, tilt_values,
+                                                             progress=show_write_progress)
+                except RuntimeError as e:
+                    QtWidgets.QMessageBox.warning(self, 'Tilt Optimizer', str(e))
+                    self.progressBar.setVisible(False)
+                    return
+
+                # Add output layer to project
+                QgsProject.instance().addMapLayer(output_layer)
+                result = f'New layer created: {output_layer_name}'
+
         self.progressBar.setValue(100)
         self.progressBar.setFormat("Complete!")
+        finish_run(self, self.run_stats)
         QtWidgets.QMessageBox.information(self, 'Tilt Optimizer', 
-            f'Optimization complete!\n\n{total_features} features optimized.\n\nNew layer created: {output_layer_name}')
+            f'Optimization complete!\n\n{total_features} features optimized.\n\n{result}'
+            f'{coverage_report}')
         self.progressBar.setVisible(False)
 
-    def _calculate_optimal_tilt(self, height, v_beamwidth, h_beamwidth, pmax, 
-                                antenna_gain, frequency, propagation_model, target_distance, neighbors):
-        """
-        Calculate optimal electrical tilt based on antenna parameters, propagation model, and neighbors.
-        
-        Returns: Optimal electrical tilt in degrees (positive = downtilt)
-        """
-        # Convert target distance from km to meters
-        target_distance_m = target_distance * 1000.0
-        
-        # Calculate geometric tilt (angle from horizontal to target point)
-        geometric_tilt = math.degrees(math.atan(height / target_distance_m))
-        
-        # Calculate path loss at target distance
-        path_loss = self._calculate_path_loss(frequency, target_distance, height, propagation_model)
-        
-        # Calculate EIRP and received power at target distance
-        eirp = pmax + antenna_gain
-        rx_power = eirp - path_loss
-        
-        # Adjust tilt based on signal strength at target
-        # If signal is very strong (rx_power > -70 dBm), increase tilt to limit overshoot
-        # If signal is weak (rx_power < -100 dBm), reduce tilt to extend coverage
-        signal_adjustment = 0.0
-        if rx_power > -70:
-            # Strong signal - increase tilt to reduce overshoot and interference
-            signal_adjustment += 1.0
-        elif rx_power < -100:
-            # Weak signal - reduce tilt to extend coverage
-            signal_adjustment -= 0.5
-        
-        # Adjust tilt based on horizontal beamwidth
-        # Narrow beams (< 45°) can use higher tilt as they have less azimuthal coverage overlap
-        # Wide beams (> 90°) should use lower tilt to avoid coverage gaps
-        beamwidth_adjustment = 0.0
-        if h_beamwidth < 45:
-            # Narrow beam - can afford higher tilt
-            beamwidth_adjustment += 0.5
-        elif h_beamwidth > 90:
-            # Wide beam (omni-like) - reduce tilt to maintain coverage
-            beamwidth_adjustment -= 0.5
-        
-        # Adjust tilt based on neighbor density
-        # If there are nearby neighbors (especially at different heights), adjust tilt
-        neighbor_adjustment = 0.0
-        if neighbors:
-            # Calculate average neighbor distance and height difference
-            avg_distance = sum(n['distance'] * 111.0 for n in neighbors) / len(neighbors)  # Convert to km
-            avg_height_diff = sum(abs(n['height'] - height) for n in neighbors) / len(neighbors)
-            
-            # If neighbors are close, increase tilt to reduce interference
-            if avg_distance < target_distance * 0.5:
-                neighbor_adjustment += 1.0  # Add 1 degree for close neighbors
-            
-            # If neighbors are significantly higher/lower, adjust tilt
-            if avg_height_diff > 10:  # More than 10m height difference
-                if sum(n['height'] for n in neighbors) / len(neighbors) > height:
-                    # Neighbors are higher on average - reduce tilt slightly
-                    neighbor_adjustment -= 0.5
-                else:
-                    # Neighbors are lower - increase tilt slightly
-                    neighbor_adjustment += 0.5
-        
-        # Calculate optimal tilt using 3GPP vertical antenna pattern
-        # The 3GPP vertical pattern is: A_V(θ) = -min[12 * ((θ - θ_tilt) / θ_3dB)², SLA_v]
-        # where θ_tilt is the electrical tilt, θ_3dB is vertical beamwidth, SLA_v is side lobe attenuation
-        
-        # For optimal coverage at target distance, we want the main beam (0 dB point) 
-        # to hit the target. This means: θ_tilt = geometric_tilt
-        # However, to maximize coverage area, we typically tilt slightly more to ensure
-        # the 3dB point (half-power) reaches the target distance
-        
-        # Using 3GPP pattern: at 3dB loss, θ = θ_tilt ± θ_3dB/2
-        # So optimal tilt = geometric_tilt + (v_beamwidth / 2) to put target at 3dB point
-        # But this is too aggressive, so we use a factor between 1/4 and 1/2
-        
-        # Base tilt calculation with all adjustments
-        optimal_tilt = (geometric_tilt + 
-                       (v_beamwidth / 3.0) + 
-                       signal_adjustment + 
-                       beamwidth_adjustment + 
-                       neighbor_adjustment)
-        
-        # Clamp tilt to reasonable values (0-15 degrees typical for macro cells)
-        optimal_tilt = max(0.0, min(15.0, optimal_tilt))
-        
-        return round(optimal_tilt, 1)
-    
-    def _find_neighbors(self, point, all_sectors, exclude_id, max_distance_km):
-        """Find neighboring sectors within max distance."""
-        if not point:
-            return []
-        
-        neighbors = []
-        max_distance_deg = max_distance_km / 111.0  # Rough conversion
-        
-        for sector in all_sectors:
-            if sector['feature'].id() == exclude_id:
-                continue
-            
-            dx = sector['point'].x() - point.x()
-            dy = sector['point'].y() - point.y()
-            distance = math.sqrt(dx*dx + dy*dy)
-            
-            if distance <= max_distance_deg and distance > 0:
-                neighbors.append({
-                    'distance': distance,
-                    'height': sector['height']
-                })
-        
-        return neighbors
-
-    def _calculate_path_loss(self, frequency_mhz, distance_km, height_m, model):
-        """
-        Calculate path loss using selected propagation model.
-        
-        Args:
-            frequency_mhz: Frequency in MHz
-            distance_km: Distance in kilometers
-            height_m: Antenna height in meters
-            model: Propagation model name
-            
-        Returns: Path loss in dB
-        """
-        if model == "Free Space Path Loss":
-            # FSPL = 20*log10(d) + 20*log10(f) + 32.45
-            # where d is in km and f is in MHz
-            fspl = 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz) + 32.45
-            return fspl
-            
-        elif model == "Okumura-Hata (Urban)":
-            # Okumura-Hata model for urban areas
-            # Valid for: 150-1500 MHz, 1-20 km, 30-200m BS height
-            a_hm = (1.1 * math.log10(frequency_mhz) - 0.7) * 1.5 - (1.56 * math.log10(frequency_mhz) - 0.8)
-            path_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) - a_hm +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            return path_loss
-            
-        elif model == "Okumura-Hata (Suburban)":
-            # Okumura-Hata model for suburban areas
-            urban_loss = (69.55 + 26.16 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) +
-                         (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km))
-            suburban_correction = 2 * (math.log10(frequency_mhz / 28.0)) ** 2 + 5.4
-            path_loss = urban_loss - suburban_correction
-            return path_loss
-            
-        elif model == "COST-231 Hata":
-            # COST-231 Hata extension (for 1500-2000 MHz)
-            a_hm = (1.1 * math.log10(frequency_mhz) - 0.7) * 1.5 - (1.56 * math.log10(frequency_mhz) - 0.8)
-            C_m = 3  # Urban correction factor
-            path_loss = (46.3 + 33.9 * math.log10(frequency_mhz) - 13.82 * math.log10(height_m) - a_hm +
-                        (44.9 - 6.55 * math.log10(height_m)) * math.log10(distance_km) + C_m)
-            return path_loss
-        
-        else:
-            # Default to Free Space Path Loss
-            fspl = 20 * math.log10(distance_km) + 20 * math.log10(frequency_mhz) + 32.45
-            return fspl
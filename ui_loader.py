@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Form classes of the RF Tools dialogs.
+
+:func:`load_form` returns the generated ``Ui_*`` class of a Designer file.
+A module compiled with ``pyuic5`` next to the ``.ui`` file (``make forms``
+or ``pb_tool compile``) is imported when it is at least as recent as the
+``.ui`` file; otherwise the XML is parsed with ``uic.loadUiType``. Forms
+are cached, so each file is loaded at most once per session.
+"""
+
+import importlib
+import os
+
+from qgis.PyQt import uic
+
+PLUGIN_DIR = os.path.dirname(__file__)
+
+_forms = {}
+
+
+def load_form(ui_file):
+    """Form class of ``ui_file``, a Designer file in the plugin directory."""
+    form = _forms.get(ui_file)
+    if form is None:
+        form = _compiled_form(ui_file)
+        if form is None:
+            form, _ = uic.loadUiType(os.path.join(PLUGIN_DIR, ui_file))
+        _forms[ui_file] = form
+    return form
+
+
+def _compiled_form(ui_file):
+    """``Ui_*`` class of the up to date pyuic module of ``ui_file``, or None."""
+    stem = os.path.splitext(ui_file)[0]
+    compiled_path = os.path.join(PLUGIN_DIR, stem + '.py')
+    try:
+        if os.path.getmtime(compiled_path) < os.path.getmtime(os.path.join(PLUGIN_DIR, ui_file)):
+            return None
+        module = importlib.import_module('.' + stem, __package__)
+    except (OSError, ImportError):
+        return None
+    for name in dir(module):
+        if name.startswith('Ui_'):
+            return getattr(module, name)
+    return None
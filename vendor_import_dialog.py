@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import os
+import xml.etree.ElementTree as ET
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsCoordinateReferenceSystem, QgsField, QgsFields, QgsProject
+
+from .core.vendor_cm import (CELL_COLUMNS, CHUNK_ROWS, FORMAT_XML, INTEGER, REAL,
+                             detect_dump_format, parse_bulk_cm, read_cell_csv_chunks)
+from .layer_writers import FORMAT_GPKG, OgrLayerWriter, point_wkb
+from .ui_loader import load_form
+
+FORM_CLASS = load_form('vendor_import_dialog_base.ui')
+
+_FIELD_TYPES = {
+    INTEGER: QVariant.Int,
+    REAL: QVariant.Double,
+}
+
+
+class VendorImportDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Import vendor configuration dumps into a GeoPackage cell table.
+
+    Bulk CM XML is parsed with a streaming parser that keeps only the cell,
+    site and antenna attributes; CSV exports are read in chunks. Cells are
+    written in one transaction per chunk.
+    """
+
+    def __init__(self, iface, parent=None):
+        """Constructor."""
+        super(VendorImportDialog, self).__init__(parent)
+        self.iface = iface
+        self.setupUi(self)
+
+        self.progressBar.setValue(0)
+
+        self.inputFileButton.clicked.connect(self._browse_input_file)
+        self.inputFileLineEdit.editingFinished.connect(self._on_input_changed)
+        self.outputFileButton.clicked.connect(self._browse_output_file)
+        self.runButton.clicked.connect(self._run_import)
+
+    def _browse_input_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Configuration Dump', self.inputFileLineEdit.text(),
+            'Configuration dumps (*.xml *.csv *.txt);;All files (*)')
+        if path:
+            self.inputFileLineEdit.setText(path)
+            self._on_input_changed()
+
+    def _browse_output_file(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Output File', self.outputFileLineEdit.text(), 'GeoPackage (*.gpkg)')
+        if path:
+            if not path.lower().endswith('.gpkg'):
+                path += '.gpkg'
+            self.outputFileLineEdit.setText(path)
+
+    def _on_input_changed(self):
+        path = self.inputFileLineEdit.text().strip()
+        if not os.path.isfile(path):
+            self.formatValueLabel.setText('-')
+            return
+        if not self.outputFileLineEdit.text().strip():
+            self.outputFileLineEdit.setText(os.path.splitext(path)[0] + '.gpkg')
+        if detect_dump_format(path) == FORMAT_XML:
+            self.formatValueLabel.setText('3GPP bulk CM XML')
+        else:
+            self.formatValueLabel.setText('Vendor CSV export (one row per cell)')
+
+    def _show_progress(self, value, text):
+        self.progressBar.setValue(value)
+        self.progressBar.setFormat(text)
+        QtWidgets.QApplication.processEvents()
+
+    def _write_table(self, writer, layer_name, table):
+        """Write the cells of a :class:`CellTable` in transactions of CHUNK_ROWS."""
+        positioned = table.positioned.tolist()
+        lons = table.arrays['longitude'].tolist()
+        lats = table.arrays['latitude'].tolist()
+        for start in range(0, len(table), CHUNK_ROWS):
+            rows = table.rows(start, start + CHUNK_ROWS)
+            for offset, values in enumerate(rows):
+                row = start + offset
+                wkb = point_wkb(lons[row], lats[row]) if positioned[row] else None
+                writer.write(layer_name, wkb, values)
+            writer.commit()
+            yield start + len(rows)
+
+    def _run_import(self):
+        path = self.inputFileLineEdit.text().strip()
+        if not os.path.isfile(path):
+            QtWidgets.QMessageBox.warning(self, 'Vendor Import', 'Please select a configuration dump.')
+            return
+        output_path = self.outputFileLineEdit.text().strip()
+        if not output_path:
+            QtWidgets.QMessageBox.warning(self, 'Vendor Import', 'Please choose an output GeoPackage.')
+            return
+        if not output_path.lower().endswith('.gpkg'):
+            output_path += '.gpkg'
+        layer_name = self.layerNameLineEdit.text().strip() or 'Cells'
+
+        fields = QgsFields()
+        for name, kind in CELL_COLUMNS:
+            fields.append(QgsField(name, _FIELD_TYPES.get(kind, QVariant.String)))
+
+        self.runButton.setEnabled(False)
+        writer = None
+        total_cells = 0
+        located = 0
+        try:
+            writer = OgrLayerWriter(output_path, FORMAT_GPKG, QgsCoordinateReferenceSystem('EPSG:4326'))
+            writer.create_layer(layer_name, 'Point', fields)
+
+            if detect_dump_format(path) == FORMAT_XML:
+                # Parsing is the long part: 0-70%, writing 70-100%
+                def show_parse_progress(done, total):
+                    self._show_progress(int(70 * done / max(total, 1)), 'Parsing dump... %p%')
+
+                self._show_progress(0, 'Parsing dump...')
+                table = parse_bulk_cm(path, progress=show_parse_progress)
+                total_cells = len(table)
+                located = int(table.positioned.sum())
+                for written in self._write_table(writer, layer_name, table):
+                    self._show_progress(70 + int(30 * written / max(total_cells, 1)),
+                                        f'Writing {written:,} of {total_cells:,} cells...')
+            else:
+                total_bytes = max(os.path.getsize(path), 1)
+                for chunk in read_cell_csv_chunks(path):
+                    for _ in self._write_table(writer, layer_name, chunk):
+                        pass
+                    total_cells += len(chunk)
+                    located += int(chunk.positioned.sum())
+                    self._show_progress(int(100 * chunk.bytes_read / total_bytes),
+                                        f'{total_cells:,} cells imported - %p%')
+        except ET.ParseError as e:
+            QtWidgets.QMessageBox.critical(self, 'Vendor Import', f'The XML dump is not well-formed: {e}')
+            return
+        except (OSError, ValueError, RuntimeError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Vendor Import', f'Import failed: {e}')
+            return
+        finally:
+            if writer is not None:
+                self._show_progress(self.progressBar.value(), 'Building spatial index...')
+                writer.close()
+            self.runButton.setEnabled(True)
+
+        if not total_cells:
+            self.progressBar.setFormat('%p%')
+            QtWidgets.QMessageBox.warning(self, 'Vendor Import', 'No cells found in the dump.')
+            return
+
+        QgsProject.instance().addMapLayer(writer.load_layers()[0])
+        self._show_progress(100, 'Import complete')
+        QtWidgets.QMessageBox.information(
+            self, 'Vendor Import',
+            f'Import complete.\n\n{total_cells:,} cells written to {output_path}.\n'
+            f'{located:,} cells have coordinates; {total_cells - located:,} are stored without geometry.')